@@ -0,0 +1,246 @@
+"""Benchmark TradeExecutor end to end against the IB Gateway simulator and the local Hyperliquid simulator.
+
+两边都是本地模拟：IB 腿使用 simulator.IBSimulator（进程内，ib_insync 兼容客户端），
+HL 腿使用 simulator.HyperliquidSimServer（本地 HTTP / WebSocket，真实 SDK 签名和 userFills 推送）。
+每个场景重复 -n 次，报告开仓 / 平仓耗时分位数和结果计数，最后输出 LatencyTracker 各阶段延迟。
+
+场景：
+- sequential：先 IB 成交再发 HL（默认模式），开仓 + 平仓
+- concurrent：两条腿同时发送，开仓 + 平仓
+- ib-partial：IB 订单拆成多笔部分成交
+- hl-reject：HL 拒单 -> 卖出 IB 回滚
+- hl-partial：并发模式下 HL 部分成交 -> IB 卖出多余股票，按对冲数量记录仓位
+- batch-close：开 --batch 个仓位后一次批量平仓
+
+Usage:
+    python benchmarks/bench_executor.py
+    python benchmarks/bench_executor.py -n 50 --ib-fill-ms 2 --hl-latency-ms 5
+    python benchmarks/bench_executor.py --scenarios hl-reject,hl-partial --storage journal
+"""
+
+import io
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from hyperliquid.info import Info
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from simulator import HyperliquidSimServer, IBSimulator
+from trader.executor import TradeExecutor
+from trader.hl_trader import HLTrader
+from trader.ib_trader import IBTrader
+from latency import LatencyHistogram
+from trader.latency import LatencyTracker
+from trader.position_manager import PositionManager
+from trader.strategy import MarketData, SpreadAnalysis, SignalType
+
+SCENARIOS = ("sequential", "concurrent", "ib-partial", "hl-reject", "hl-partial", "batch-close")
+
+
+class Scenario:
+    """一个场景的耗时直方图和结果计数."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.open = LatencyHistogram()
+        self.close = LatencyHistogram()
+        self.outcomes = {}
+
+    def count(self, outcome: str):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+class Bench:
+    """连接两个模拟器的 TradeExecutor，执行器输出重定向到内存."""
+
+    def __init__(self, args, ib_gateway: IBSimulator, hl_sim: HyperliquidSimServer, data_dir: str):
+        self.args = args
+        self.ib_gateway = ib_gateway
+        self.hl_sim = hl_sim
+        self.tracker = LatencyTracker()
+
+        with self.quiet():
+            self.info = Info(hl_sim.base_url, skip_ws=False, perp_dexs=["xyz"])
+            self.fetcher = HyperliquidFetcherStreaming(symbol=args.hl_symbol, info=self.info)
+        self.ib_trader = IBTrader(symbols=[args.symbol], ib=ib_gateway.client())
+        self.hl_trader = HLTrader("0x" + "11" * 32, stream_info=self.info, price_source=self.fetcher,
+                                  base_url=hl_sim.base_url)
+        self.positions = PositionManager(str(Path(data_dir) / "positions.json"), storage=args.storage)
+        with self.quiet():
+            assert self.ib_trader.connect() and self.hl_trader.connect()
+
+        deadline = time.monotonic() + 5
+        while self.fetcher.get_orderbook_prices()["perp_bid"] is None:
+            if time.monotonic() > deadline:
+                raise RuntimeError("No Hyperliquid book from the simulator")
+            time.sleep(0.01)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        if self.args.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    def executor(self, concurrent_legs: bool) -> TradeExecutor:
+        return TradeExecutor(self.ib_trader, self.hl_trader, self.positions, self.args.symbol,
+                             self.args.hl_symbol, concurrent_legs=concurrent_legs, latency_tracker=self.tracker)
+
+    def market_data(self) -> MarketData:
+        spot_bid, spot_ask = self.ib_gateway.quote(self.args.symbol)
+        perp = self.fetcher.get_orderbook_prices()
+        return MarketData(perp_bid=perp["perp_bid"], perp_ask=perp["perp_ask"], funding_rate=0.0001,
+                          spot_bid=spot_bid, spot_ask=spot_ask, timestamp=time.time())
+
+    def analysis(self) -> SpreadAnalysis:
+        data = self.market_data()
+        return SpreadAnalysis(spread=(data.perp_bid - data.spot_ask) / data.spot_ask,
+                              ib_buy_price=data.spot_ask, hl_sell_price=data.perp_bid, funding_rate=0.0001,
+                              signal=SignalType.OPEN_LONG_SPOT_SHORT_PERP, is_valid=True,
+                              decision_ns=time.perf_counter_ns())
+
+    def open(self, scenario: Scenario, executor: TradeExecutor):
+        start = time.perf_counter_ns()
+        with self.quiet():
+            position_id = executor.open_arbitrage_position(self.args.quantity, self.analysis())
+        scenario.open.record(time.perf_counter_ns() - start)
+        return position_id
+
+    def close(self, scenario: Scenario, executor: TradeExecutor, position_id: str):
+        start = time.perf_counter_ns()
+        with self.quiet():
+            closed = executor.close_arbitrage_position(position_id, self.market_data(),
+                                                       decision_ns=time.perf_counter_ns())
+        scenario.close.record(time.perf_counter_ns() - start)
+        scenario.count("closed" if closed else "close failed")
+
+    def flat(self) -> bool:
+        """两边都没有剩余仓位（回滚 / 对冲后的检查）."""
+        return (not self.ib_gateway.positions.get(self.args.symbol, (0, 0))[0]
+                and not self.hl_sim.positions.get(self.args.hl_symbol, 0))
+
+    # ==================== 场景 ====================
+
+    def run(self, name: str) -> Scenario:
+        scenario = Scenario(name)
+        n = self.args.n
+        if name in ("sequential", "concurrent", "ib-partial"):
+            executor = self.executor(concurrent_legs=name == "concurrent")
+            self.ib_gateway.partial_fills = self.args.ib_partials if name == "ib-partial" else 1
+            for _ in range(n):
+                position_id = self.open(scenario, executor)
+                scenario.count("opened" if position_id else "open failed")
+                if position_id:
+                    self.close(scenario, executor, position_id)
+            self.ib_gateway.partial_fills = 1
+
+        elif name == "hl-reject":
+            executor = self.executor(concurrent_legs=False)
+            self.hl_sim.reject_rate = 1.0
+            for _ in range(n):
+                position_id = self.open(scenario, executor)
+                scenario.count("rolled back" if position_id is None and self.flat() else "unexpected")
+            self.hl_sim.reject_rate = 0.0
+
+        elif name == "hl-partial":
+            executor = self.executor(concurrent_legs=True)
+            for _ in range(n):
+                self.hl_sim.fill_ratio = 0.5
+                position_id = self.open(scenario, executor)
+                self.hl_sim.fill_ratio = 1.0
+                position = self.positions.get_position(position_id) if position_id else None
+                hedged = position is not None and position.quantity < self.args.quantity
+                scenario.count("partially hedged" if hedged else "unexpected")
+                if position_id:
+                    self.close(scenario, executor, position_id)
+
+        elif name == "batch-close":
+            executor = self.executor(concurrent_legs=True)
+            for _ in range(max(1, n // self.args.batch)):
+                position_ids = [self.open(scenario, executor) for _ in range(self.args.batch)]
+                position_ids = [position_id for position_id in position_ids if position_id]
+                start = time.perf_counter_ns()
+                with self.quiet():
+                    closed = executor.close_arbitrage_positions(position_ids, self.market_data(),
+                                                                decision_ns=time.perf_counter_ns())
+                scenario.close.record(time.perf_counter_ns() - start)
+                scenario.count(f"closed {len(closed)}/{self.args.batch}")
+
+        scenario.count("flat" if self.flat() else "NOT FLAT")
+        return scenario
+
+    def close_all(self):
+        with self.quiet():
+            self.hl_trader.disconnect()
+            self.ib_trader.disconnect()
+            self.fetcher.close()
+            self.info.disconnect_websocket()
+        self.positions.close()
+
+
+def fmt_ms(hist: LatencyHistogram, p: float) -> str:
+    value = hist.percentile(p)
+    return f"{value / 1e6:>8.2f}" if value is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradeExecutor end-to-end benchmark (IB + HL simulators)")
+    parser.add_argument("-n", type=int, default=20, help="Iterations per scenario (default: 20)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {','.join(SCENARIOS)}")
+    parser.add_argument("--symbol", default="NVDA")
+    parser.add_argument("--hl-symbol", default="xyz:NVDA")
+    parser.add_argument("--quantity", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=5, help="Positions per batch close")
+    parser.add_argument("--ib-ack-ms", type=float, default=0.5, help="IB placeOrder -> Submitted")
+    parser.add_argument("--ib-fill-ms", type=float, default=1.0, help="IB Submitted -> fill, and between partial fills")
+    parser.add_argument("--ib-partials", type=int, default=4, help="Fills per IB order in the ib-partial scenario")
+    parser.add_argument("--hl-latency-ms", type=float, default=2.0, help="HL /exchange response latency")
+    parser.add_argument("--storage", choices=("json", "journal"), default="json", help="PositionManager storage")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Show executor output")
+    args = parser.parse_args()
+
+    ib_gateway = IBSimulator(symbols=[args.symbol], quote_rate=0, ack_latency=args.ib_ack_ms / 1000,
+                             fill_latency=args.ib_fill_ms / 1000, seed=args.seed)
+    hl_sim = HyperliquidSimServer(coins=[args.hl_symbol], order_latency=args.hl_latency_ms / 1000,
+                                  seed=args.seed).start()
+
+    print("=" * 100)
+    print(f"TradeExecutor benchmark - IB ack {args.ib_ack_ms}ms / fill {args.ib_fill_ms}ms, "
+          f"HL {args.hl_latency_ms}ms, {args.quantity} shares, n={args.n}, storage={args.storage}")
+    print("=" * 100)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        bench = Bench(args, ib_gateway, hl_sim, data_dir)
+        scenarios = [bench.run(name) for name in args.scenarios.split(",")]
+        bench.close_all()
+    hl_sim.stop()
+
+    print(f"\n{'scenario':<12} | {'open p50':>8} {'p99':>8} {'max':>8} ms | {'close p50':>9} {'p99':>8} "
+          f"{'max':>8} ms | outcomes")
+    for scenario in scenarios:
+        outcomes = ", ".join(f"{name}={count}" for name, count in scenario.outcomes.items())
+        print(f"{scenario.name:<12} | {fmt_ms(scenario.open, 50)} {fmt_ms(scenario.open, 99)} "
+              f"{fmt_ms(scenario.open, 100)}    | {fmt_ms(scenario.close, 50):>9} {fmt_ms(scenario.close, 99)} "
+              f"{fmt_ms(scenario.close, 100)}    | {outcomes}")
+
+    print(f"\nIB simulator: {ib_gateway.stats()}")
+    print(f"HL simulator: {hl_sim.orders} orders, positions {hl_sim.positions}")
+    print("\nLatency by stage (recorded trades):")
+    print(bench.tracker.summary())
+
+    if any("NOT FLAT" in scenario.outcomes or "unexpected" in scenario.outcomes for scenario in scenarios):
+        print("\n⚠️  Some scenarios left unhedged positions or unexpected outcomes")
+        sys.exit(1)
+    print("\n✓ All scenarios ended flat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Load-test HyperliquidFetcherStreaming against the local Hyperliquid simulator.
+
+按递增的推送速率向 fetcher 推送 20 档 l2Book，报告每档速率下：
+服务端实际推送 / 丢弃数、客户端接收数与接收速率、投递延迟（服务端发送 -> fetcher 处理完成）、
+fetcher 解析耗时（LatencyTracker ws_parse）。
+
+模拟器默认在子进程中运行（不与被测客户端争用 GIL）；--in-process 在同一进程的线程中运行，
+--url 连接已经运行的模拟器（python benchmarks/bench_hl_feed.py --serve --port 8765）。
+
+Usage:
+    python benchmarks/bench_hl_feed.py
+    python benchmarks/bench_hl_feed.py --rates 1000,5000,20000,50000 --duration 3
+    python benchmarks/bench_hl_feed.py --client asyncio --slow-callback-us 200
+    python benchmarks/bench_hl_feed.py --replay recordings/ticks_20250101.ticks
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import requests
+from hyperliquid.info import Info
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from hl_fetcher.ws_async import HyperliquidAsyncStream
+from simulator import HyperliquidSimServer, load_book_messages, books_from_ticks
+from latency import LatencyHistogram
+from trader.latency import LatencyTracker
+
+
+def build_server(args, port: int) -> HyperliquidSimServer:
+    books = None
+    if args.replay:
+        load = books_from_ticks if args.replay.endswith(".ticks") or Path(args.replay).is_dir() else load_book_messages
+        books = {args.symbol: load(args.replay)}
+    return HyperliquidSimServer(port=port, coins=[args.symbol], levels=args.levels, books=books, seed=args.seed)
+
+
+def serve(args):
+    """--serve：只运行模拟器，直到标准输入关闭（父进程退出）."""
+    server = build_server(args, args.port).start()
+    print(f"READY {server.base_url}", flush=True)
+    try:
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+
+
+def start_simulator(args):
+    """启动模拟器，返回 (base_url, 停止函数)."""
+    if args.url:
+        return args.url, lambda: None
+
+    if args.in_process:
+        server = build_server(args, 0).start()
+        return server.base_url, server.stop
+
+    cmd = [sys.executable, __file__, "--serve", "--port", "0", "--symbol", args.symbol,
+           "--levels", str(args.levels), "--seed", str(args.seed)]
+    if args.replay:
+        cmd += ["--replay", args.replay]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("READY "):
+        proc.kill()
+        raise RuntimeError(f"Simulator failed to start: {line!r}")
+
+    def stop():
+        proc.stdin.close()
+        proc.wait(5)
+    return line.split()[1], stop
+
+
+class FeedProbe:
+    """在 fetcher 之后注册的 l2Book 回调：统计接收数和投递延迟."""
+
+    def __init__(self, slow_callback_us: float = 0):
+        self.slow_ns = int(slow_callback_us * 1000)
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.first_ns = 0
+        self.last_ns = 0
+        self.last_seq = 0
+        self.gaps = 0
+        self.delivery = LatencyHistogram()
+
+    def __call__(self, msg):
+        now_ns = time.time_ns()
+        seq, send_ns = msg["data"].get("sim", (0, 0))
+        if not send_ns:
+            return    # 订阅快照
+        self.delivery.record(now_ns - send_ns)
+        if self.last_seq and seq != self.last_seq + 1:
+            self.gaps += 1
+        self.last_seq = seq
+        self.received += 1
+        if not self.first_ns:
+            self.first_ns = now_ns
+        self.last_ns = now_ns
+
+        # 模拟慢回调（例如策略在 WebSocket 线程中计算），观察服务端丢弃
+        if self.slow_ns:
+            deadline = time.perf_counter_ns() + self.slow_ns
+            while time.perf_counter_ns() < deadline:
+                pass
+
+
+def connect_client(args, base_url: str):
+    """创建支持 subscribe 的 Info，返回 (info, 开始接收函数, 关闭函数)."""
+    if args.client == "sdk":
+        info = Info(base_url, skip_ws=False, perp_dexs=[args.symbol.split(":")[0]])
+        return info, lambda: None, info.disconnect_websocket
+
+    http_info = Info(base_url, skip_ws=True, perp_dexs=[args.symbol.split(":")[0]])
+    stream = HyperliquidAsyncStream(base_url, http_info=http_info)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(stream.run(),), daemon=True)
+
+    def close():
+        asyncio.run_coroutine_threadsafe(stream.close(), loop).result(5)
+        thread.join(5)
+    return stream, thread.start, close
+
+
+def wait_for_drain(probe: FeedProbe, expected: int, timeout: float = 5.0):
+    """等待客户端收完（或接收数不再增长）."""
+    deadline = time.monotonic() + timeout
+    last, idle_since = -1, time.monotonic()
+    while probe.received < expected and time.monotonic() < deadline:
+        time.sleep(0.05)
+        if probe.received != last:
+            last, idle_since = probe.received, time.monotonic()
+        elif time.monotonic() - idle_since > 0.5:
+            break
+
+
+def fmt_us(hist: LatencyHistogram, p: float) -> str:
+    value = hist.percentile(p)
+    return f"{value / 1000:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperliquid feed load benchmark (local simulator)")
+    parser.add_argument("--rates", default="1000,5000,10000,20000,50000", help="Comma-separated msgs/s steps")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per step (default: 2)")
+    parser.add_argument("--ctx-every", type=int, default=10, help="activeAssetCtx every N books (0 = none)")
+    parser.add_argument("--client", choices=("sdk", "asyncio"), default="sdk",
+                        help="sdk = Info WebSocket thread, asyncio = HyperliquidAsyncStream (main_trading)")
+    parser.add_argument("--slow-callback-us", type=float, default=0, help="Busy-wait per book in the client callback")
+    parser.add_argument("--symbol", default="xyz:NVDA")
+    parser.add_argument("--levels", type=int, default=20, help="Levels per side for synthetic books")
+    parser.add_argument("--replay", help="Recorded l2Book JSON Lines or TickRecorder .ticks file/dir")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--in-process", action="store_true", help="Run the simulator in a thread of this process")
+    parser.add_argument("--url", help="Use an already running simulator at this base URL")
+    parser.add_argument("--serve", action="store_true", help="Only run the simulator")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve (0 = any)")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    base_url, stop_simulator = start_simulator(args)
+    mode = args.url or ("in-process" if args.in_process else "subprocess")
+    print("=" * 100)
+    print(f"Hyperliquid feed benchmark - simulator {base_url} ({mode}), client={args.client}, "
+          f"{args.duration}s/step, slow_callback={args.slow_callback_us}µs")
+    print("=" * 100)
+
+    info, start_client, close_client = connect_client(args, base_url)
+    tracker = LatencyTracker()
+    fetcher = HyperliquidFetcherStreaming(symbol=args.symbol, info=info, latency_tracker=tracker)
+    probe = FeedProbe(args.slow_callback_us)
+    info.subscribe({"type": "l2Book", "coin": args.symbol}, probe)
+    start_client()
+    time.sleep(0.5)
+
+    def control(payload):
+        return requests.post(f"{base_url}/sim", json=payload, timeout=args.duration + 30).json()
+
+    rows = []
+    for rate in [float(r) for r in args.rates.split(",")]:
+        probe.reset()
+        tracker = fetcher.latency_tracker = LatencyTracker()
+        stats = control({"type": "feed", "coin": args.symbol, "rate": rate,
+                         "duration": args.duration, "ctx_every": args.ctx_every})
+        wait_for_drain(probe, stats["sent"])
+
+        recv_s = (probe.last_ns - probe.first_ns) / 1e9
+        rows.append((rate, stats, probe.received, probe.received / recv_s if recv_s > 0 else 0.0,
+                     probe.gaps, probe.delivery, tracker.histogram("ws_parse")))
+
+    print(f"\n{'target/s':>9} {'sent/s':>9} {'sent':>8} {'dropped':>8} {'recv':>8} {'recv/s':>9} {'lost':>6} "
+          f"{'gaps':>5} | {'deliver p50':>11} {'p99':>9} {'p99.9':>9} µs | {'parse p50':>9} {'p99':>7} µs")
+    for rate, stats, received, recv_rate, gaps, delivery, parse in rows:
+        lost = stats["sent"] - received
+        print(f"{rate:>9,.0f} {stats['achieved_rate']:>9,.0f} {stats['sent']:>8,} {stats['dropped']:>8,} "
+              f"{received:>8,} {recv_rate:>9,.0f} {lost:>6,} {gaps:>5} | {fmt_us(delivery, 50):>11} "
+              f"{fmt_us(delivery, 99)} {fmt_us(delivery, 99.9)}    | {fmt_us(parse, 50)} {fmt_us(parse, 99):>7}")
+
+    # 持续承受：无丢弃、无丢失，且客户端接收速率跟得上（没有越积越多的积压）
+    sustained = [rate for rate, stats, received, recv_rate, _, _, _ in rows
+                 if not stats["dropped"] and received == stats["sent"] and recv_rate >= 0.95 * rate]
+    print(f"\n✓ Highest sustained step: {max(sustained):,.0f} msgs/s" if sustained
+          else "\n⚠️  Client fell behind at every step")
+
+    fetcher.close()
+    # 先停止模拟器：客户端积压未读完时，WebSocket 关闭握手要等积压读完
+    stop_simulator()
+    close_client()
+
+
+if __name__ == "__main__":
+    main()
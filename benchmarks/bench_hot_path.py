@@ -0,0 +1,342 @@
+"""Micro-benchmarks for the quote-to-signal hot path, reported as ns/op with regression thresholds.
+
+覆盖每个行情 tick 都会经过的函数：
+- hl_l2book_update：HyperliquidFetcherStreaming._on_l2_book_update 解析 20 档 l2Book 消息
+- hl_asset_ctx_update：_on_asset_ctx_update 解析 activeAssetCtx
+- market_data：MarketData 构造
+- open_spread_signal：calculate_spread + get_open_signal（无信号 / 有信号）
+- close_spread_signal：calculate_close_spread + get_close_signal（无信号 / 有信号）
+- prom_update_metrics：PrometheusMetricsPusher.update_metrics（不推送）
+- market_data/update：build_market_data 原地更新预先分配的 MarketData
+- tick/legacy：改为原地更新之前的主循环一次评估（get_all_metrics / get_stock_price 字典 + 新 MarketData
+  + 两个新 SpreadAnalysis + 无信号原因格式化）
+- tick/fresh：evaluate_market 不传 buffers（每次新建 MarketData / SpreadAnalysis）
+- tick/reused：evaluate_market 使用 TickBuffers（与 main_trading 主循环相同）
+  tick 用例持有一个仓位、价差不触发开平仓，每次评估都经过开仓和平仓两条分析路径
+
+每个用例运行 --rounds 轮，每轮循环足够多次（约 --round-ms 毫秒），报告各轮 ns/op 的最小值 / 中位数 / 最大值；
+计时期间关闭 GC（与 timeit 相同）。--check 把最小值（受其他进程干扰最小，与 timeit 的建议相同）与
+hot_path_thresholds.json 比较，超过阈值时退出码为 1；--update-thresholds 按当前最小值 x --headroom 重写阈值文件。
+阈值与机器相关，换机器后先在该机器上 --update-thresholds。
+
+计时之后再用 tracemalloc 测量每个用例的内存分配（--alloc-ops 次操作）：
+- peak B：运行期间高于起点的 tracemalloc 峰值，即单次操作中同时存活的临时分配字节数
+- retained B/op、blocks/op：每次操作净增加的字节数 / 内存块数（sys.getallocatedblocks，应为 0）
+- gc/10k：每 10000 次操作触发的 GC 次数（GC 开启）
+CPython 没有累计分配计数器（gc 计数和 getallocatedblocks 都是净值，对象释放时回减），
+因此用临时分配峰值衡量每个 tick 的分配量。
+
+Usage:
+    python benchmarks/bench_hot_path.py
+    python benchmarks/bench_hot_path.py --check
+    python benchmarks/bench_hot_path.py --filter spread --rounds 20
+    python benchmarks/bench_hot_path.py --filter tick --alloc-ops 5000
+    python benchmarks/bench_hot_path.py --update-thresholds --headroom 2.0
+"""
+
+import gc
+import io
+import sys
+import json
+import itertools
+import time
+import argparse
+import statistics
+import contextlib
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ib_insync import Stock, Ticker
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
+from main_trading import TickBuffers, build_market_data, evaluate_market
+from prom_pusher.pusher import PrometheusMetricsPusher
+from simulator import synthetic_books
+from trader.config import StrategyConfig
+from latency import TickStamps
+from trader.strategy import ArbitrageStrategy, MarketData
+
+THRESHOLDS_FILE = Path(__file__).parent / "hot_path_thresholds.json"
+
+
+class OfflineInfo:
+    """只接受订阅的 Info 替身：回调由基准直接调用."""
+
+    def subscribe(self, subscription, callback):
+        return 1
+
+    def unsubscribe(self, subscription, sub_id):
+        return True
+
+
+def l2book_message(levels: int = 20) -> Dict:
+    """一条真实格式的 l2Book 消息（字符串价格 / 数量，每档带订单数 n）."""
+    (bids, asks), = synthetic_books(1, levels=levels, seed=1)
+    return {"channel": "l2Book", "data": {"coin": "xyz:NVDA", "time": 1735689600000, "levels": [bids, asks]}}
+
+
+def asset_ctx_message() -> Dict:
+    return {"channel": "activeAssetCtx", "data": {"coin": "xyz:NVDA", "ctx": {
+        "funding": "0.0000125", "openInterest": "123456.78", "prevDayPx": "179.50", "dayNtlVlm": "98765432.1",
+        "premium": "0.00031", "oraclePx": "180.05", "markPx": "180.07", "midPx": "180.065",
+    }}}
+
+
+class OpenPositions:
+    """只提供 get_open_positions 的仓位管理器替身：固定持有一个仓位."""
+
+    class Position:
+        position_id = "bench"
+        entry_spread = 0.005
+
+    def __init__(self):
+        self._open = [self.Position()]
+
+    def get_open_positions(self):
+        return self._open
+
+
+def offline_ib_fetcher(bid: float, ask: float) -> IBKRFetcherStreaming:
+    """不连接 TWS 的 fetcher：报价快照由一次 ticker.updateEvent 写入."""
+    fetcher = IBKRFetcherStreaming(symbol="NVDA")
+    fetcher.connected = True
+    fetcher.ticker = Ticker(contract=Stock("NVDA", "SMART", "USD"))
+    fetcher.ticker.bid, fetcher.ticker.ask = bid, ask
+    fetcher._on_ticker_update(fetcher.ticker)
+    return fetcher
+
+
+def tick_cases(hl_fetcher: HyperliquidFetcherStreaming) -> List[Tuple[str, Callable[[], object]]]:
+    """一次主循环评估：读取两个 fetcher 的缓存 -> 开仓 / 平仓分析 -> 信号."""
+    perp_bid = hl_fetcher.get_orderbook().best_bid
+    # 开仓价差 0.06%（低于 0.1% 阈值），平仓价差高于 0.05% 收敛阈值：不开仓也不平仓
+    spot_ask = perp_bid / 1.0006
+    ib_fetcher = offline_ib_fetcher(spot_ask - 0.01, spot_ask)
+
+    config = StrategyConfig(max_positions=2)   # 持有一个仓位时仍检查开仓信号
+    strategy = ArbitrageStrategy(config)
+    positions = OpenPositions()
+    executor = object()                        # 不会被调用
+    buffers = TickBuffers()
+
+    def legacy():
+        hl_metrics = hl_fetcher.get_all_metrics()
+        ib_data = ib_fetcher.get_stock_price()
+        data = MarketData(perp_bid=hl_metrics.get("perp_bid"), perp_ask=hl_metrics.get("perp_ask"),
+                          funding_rate=hl_metrics.get("funding_rate"), spot_bid=ib_data.get("bid"),
+                          spot_ask=ib_data.get("ask"), timestamp=time.time(), stamps=hl_fetcher.get_tick_stamps())
+        open_analysis = strategy.calculate_spread(data)
+        close_analysis = strategy.calculate_close_spread(data)
+        for pos in positions.get_open_positions():
+            strategy.get_close_signal(close_analysis, pos.entry_spread)
+        return strategy.get_open_signal(open_analysis)
+
+    def fresh():
+        data = build_market_data(hl_fetcher, ib_fetcher, config)
+        return evaluate_market(data, strategy, config, executor, positions, True, verbose=False)
+
+    def reused():
+        data = build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)
+        return evaluate_market(data, strategy, config, executor, positions, True, verbose=False, buffers=buffers)
+
+    return [
+        ("market_data/update", lambda: build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)),
+        ("tick/legacy", legacy),
+        ("tick/fresh", fresh),
+        ("tick/reused", reused),
+    ]
+
+
+def build_cases() -> List[Tuple[str, Callable[[], object]]]:
+    """(名称, 无参可调用对象)，每次调用是一次操作."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fetcher = HyperliquidFetcherStreaming(symbol="xyz:NVDA", info=OfflineInfo())
+    fetcher.add_update_listener(lambda source, recv_ns: None)   # 与 main_trading 相同：一个监听器
+    book_msg = l2book_message()
+    ctx_msg = asset_ctx_message()
+
+    # tick 用例读取的 fetcher：缓存固定，不受解析用例影响
+    with contextlib.redirect_stdout(io.StringIO()):
+        book_fetcher = HyperliquidFetcherStreaming(symbol="xyz:NVDA", info=OfflineInfo())
+    book_fetcher._on_l2_book_update(book_msg)
+    book_fetcher._on_asset_ctx_update(ctx_msg)
+
+    strategy = ArbitrageStrategy()
+    stamps = TickStamps(1735689600000, time.time_ns(), time.perf_counter_ns(), time.perf_counter_ns())
+
+    def market_data(perp_bid, perp_ask, spot_bid, spot_ask, funding_rate=0.0001):
+        return MarketData(perp_bid=perp_bid, perp_ask=perp_ask, mark_price=perp_bid, funding_rate=funding_rate,
+                          spot_bid=spot_bid, spot_ask=spot_ask, timestamp=1735689600.0, stamps=stamps)
+
+    # 开仓：价差 0.05%（无信号，绝大多数 tick）/ 0.5%（有信号）
+    open_quiet = market_data(180.10, 180.12, 179.98, 180.01)
+    open_signal = market_data(180.95, 180.97, 179.98, 180.01)
+    # 平仓：价差高于阈值（持有）/ 收敛（平仓）
+    close_hold = market_data(180.95, 180.97, 179.98, 180.01)
+    close_signal = market_data(179.90, 179.92, 179.98, 180.01)
+    entry_spread = 0.005
+
+    def open_spread_signal(data):
+        def run():
+            return strategy.get_open_signal(strategy.calculate_spread(data))
+        return run
+
+    def close_spread_signal(data):
+        def run():
+            return strategy.get_close_signal(strategy.calculate_close_spread(data), entry_spread)
+        return run
+
+    pusher = PrometheusMetricsPusher("localhost:9091")
+    metrics = {"perp_bid": 180.10, "perp_ask": 180.12, "spot_bid": 179.98, "spot_ask": 180.01,
+               "funding_rate": 0.0000125}
+
+    return [
+        ("hl_l2book_update", lambda: fetcher._on_l2_book_update(book_msg)),
+        ("hl_asset_ctx_update", lambda: fetcher._on_asset_ctx_update(ctx_msg)),
+        ("market_data", lambda: market_data(180.10, 180.12, 179.98, 180.01)),
+        ("open_spread_signal/none", open_spread_signal(open_quiet)),
+        ("open_spread_signal/open", open_spread_signal(open_signal)),
+        ("close_spread_signal/none", close_spread_signal(close_hold)),
+        ("close_spread_signal/close", close_spread_signal(close_signal)),
+        ("prom_update_metrics", lambda: pusher.update_metrics(metrics)),
+    ] + tick_cases(book_fetcher)
+
+
+def measure(func: Callable[[], object], rounds: int, round_ms: float) -> Dict[str, float]:
+    """测量一个用例，返回各轮 ns/op 的最小值 / 中位数 / 最大值."""
+    # 校准每轮次数（与 timeit.autorange 相同：1, 2, 5, 10, 20, 50, ...），直到一轮超过 round_ms
+    number = 1
+    for multiplier in itertools.cycle((2, 2.5, 2)):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        if time.perf_counter_ns() - start >= round_ms * 1e6:
+            break
+        number = int(number * multiplier)
+
+    loop = range(number)
+    per_op = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter_ns()
+            for _ in loop:
+                func()
+            per_op.append((time.perf_counter_ns() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"min": min(per_op), "median": statistics.median(per_op), "max": max(per_op), "number": number}
+
+
+def measure_allocations(func: Callable[[], object], ops: int) -> Dict[str, float]:
+    """测量一个用例的内存分配：临时分配峰值、每次操作净增加的字节数 / 内存块数、GC 次数."""
+    func()   # 预热（惰性初始化的缓存不计入）
+    loop = range(ops)
+
+    # 净增加的内存块数和 GC 次数（不开 tracemalloc，它自身也会分配内存块）
+    gc.collect()
+    collections_before = gc.get_stats()[0]["collections"]
+    blocks_before = sys.getallocatedblocks()
+    for _ in loop:
+        func()
+    blocks = sys.getallocatedblocks() - blocks_before
+    collections = gc.get_stats()[0]["collections"] - collections_before
+
+    tracemalloc.start()
+    try:
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        for _ in loop:
+            func()
+        end_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes": peak_bytes - start_bytes,
+        "retained_bytes_per_op": (end_bytes - start_bytes) / ops,
+        "retained_blocks_per_op": blocks / ops,
+        "gc_per_10k": collections * 10000 / ops,
+    }
+
+
+def load_thresholds(path: Path) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)["thresholds_ns"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quote-to-signal hot path micro-benchmarks (ns/op)")
+    parser.add_argument("--rounds", type=int, default=10, help="Timed rounds per case (default: 10)")
+    parser.add_argument("--round-ms", type=float, default=50, help="Target duration of one round (default: 50ms)")
+    parser.add_argument("--filter", help="Only run cases containing this substring")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="Thresholds JSON file")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any best-round ns/op exceeds its threshold")
+    parser.add_argument("--update-thresholds", action="store_true", help="Rewrite thresholds from this run")
+    parser.add_argument("--headroom", type=float, default=2.0, help="Threshold = min x headroom (default: 2.0)")
+    parser.add_argument("--alloc-ops", type=int, default=2000,
+                        help="Operations per case for the tracemalloc allocation pass, 0 to skip (default: 2000)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    cases = [(name, func) for name, func in build_cases() if not args.filter or args.filter in name]
+    thresholds_path = Path(args.thresholds)
+    thresholds = load_thresholds(thresholds_path)
+
+    print("=" * 90)
+    print(f"Hot path micro-benchmarks - {args.rounds} rounds x ~{args.round_ms:.0f}ms, "
+          f"Python {sys.version.split()[0]}")
+    print("=" * 90)
+    print(f"{'case':<28} {'min':>10} {'median':>10} {'max':>10} ns/op {'threshold':>10}  status")
+
+    results = {}
+    regressions = []
+    for name, func in cases:
+        result = results[name] = measure(func, args.rounds, args.round_ms)
+        limit = thresholds.get(name)
+        if limit is None:
+            status = "-"
+        elif result["min"] > limit:
+            status = f"❌ +{(result['min'] / limit - 1) * 100:.0f}%"
+            regressions.append(name)
+        else:
+            status = "✓"
+        limit_text = f"{limit:>10,.0f}" if limit is not None else f"{'-':>10}"
+        print(f"{name:<28} {result['min']:>10,.0f} {result['median']:>10,.0f} {result['max']:>10,.0f}       "
+              f"{limit_text}  {status}")
+
+    if args.alloc_ops > 0:
+        print(f"\n{'case':<28} {'peak B':>10} {'retained B/op':>14} {'blocks/op':>10} {'gc/10k':>8}")
+        for name, func in cases:
+            alloc = results[name]["alloc"] = measure_allocations(func, args.alloc_ops)
+            print(f"{name:<28} {alloc['peak_bytes']:>10,} {alloc['retained_bytes_per_op']:>14.1f} "
+                  f"{alloc['retained_blocks_per_op']:>10.2f} {alloc['gc_per_10k']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+
+    if args.update_thresholds:
+        thresholds.update({name: round(result["min"] * args.headroom, -1) for name, result in results.items()})
+        with open(thresholds_path, 'w') as f:
+            json.dump({"headroom": args.headroom, "thresholds_ns": thresholds}, f, indent=2)
+            f.write("\n")
+        print(f"\n✓ Thresholds updated: {thresholds_path}")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} case(s) over threshold: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+    elif args.check:
+        print("\n✓ All cases within thresholds")
+
+
+if __name__ == "__main__":
+    main()
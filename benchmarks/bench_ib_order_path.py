@@ -0,0 +1,122 @@
+"""Benchmark the IBTrader order path: per-order qualifyContracts vs cached contract + order template.
+
+离线模式使用模拟 IB，qualifyContracts 按 --rtt-ms 模拟一次 TWS 往返；
+--live 连接 TWS/Gateway 实测 qualifyContracts 往返（只确认合约，不下单）。
+
+Usage:
+    python benchmarks/bench_ib_order_path.py
+    python benchmarks/bench_ib_order_path.py --rtt-ms 3 -n 500
+    python benchmarks/bench_ib_order_path.py --live --port 7497 --symbol NVDA
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ib_insync import IB, Stock, MarketOrder, Trade, OrderStatus
+from trader.ib_trader import IBTrader
+
+
+class SimulatedIB:
+    """模拟 IB：qualifyContracts 等待一次往返，placeOrder 立即返回."""
+
+    def __init__(self, rtt_ms: float):
+        self.rtt_s = rtt_ms / 1000
+        self._next_order_id = 1
+
+    def isConnected(self):
+        return True
+
+    def qualifyContracts(self, *contracts):
+        time.sleep(self.rtt_s)
+        for contract in contracts:
+            contract.conId = 1
+        return list(contracts)
+
+    def placeOrder(self, contract, order):
+        order.orderId = self._next_order_id
+        self._next_order_id += 1
+        return Trade(contract, order, OrderStatus(status='PendingSubmit'))
+
+
+def measure(func, n: int):
+    """每次调用的耗时（微秒）."""
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter_ns()
+        func()
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return samples
+
+
+def report(name: str, samples):
+    print(f"  {name:<34} p50={statistics.median(samples):>9.1f}µs  "
+          f"p99={samples[int(len(samples) * 0.99) - 1]:>9.1f}µs  mean={statistics.fmean(samples):>9.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IBTrader order path benchmark")
+    parser.add_argument("-n", type=int, default=200, help="Orders per variant (default: 200)")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated TWS round trip (default: 2ms)")
+    parser.add_argument("--live", action="store_true", help="Measure qualifyContracts against TWS/Gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7497)
+    parser.add_argument("--client-id", type=int, default=99)
+    parser.add_argument("--symbol", default="NVDA")
+    args = parser.parse_args()
+
+    if args.live:
+        ib = IB()
+        ib.connect(args.host, args.port, clientId=args.client_id)
+        mode = f"LIVE {args.host}:{args.port}"
+    else:
+        ib = SimulatedIB(args.rtt_ms)
+        mode = f"SIMULATED (rtt={args.rtt_ms}ms)"
+
+    print("=" * 70)
+    print(f"IBTrader order path benchmark - {mode}, n={args.n}")
+    print("=" * 70)
+
+    trader = IBTrader(symbols=[args.symbol], ib=ib)
+    trader.connect()
+    symbol = args.symbol
+
+    # 每笔订单都确认合约、构造订单（改动前的下单路径）
+    def uncached_prepare():
+        contract = Stock(symbol, 'SMART', 'USD')
+        ib.qualifyContracts(contract)
+        return contract, MarketOrder('BUY', 100)
+
+    # 缓存合约 + 订单模板
+    def cached_prepare():
+        return trader.get_contract(symbol), trader._build_order('BUY', 100)
+
+    results = {
+        "qualify + build (per order)": measure(uncached_prepare, args.n),
+        "cache + template": measure(cached_prepare, args.n),
+        "MarketOrder() construction": measure(lambda: MarketOrder('BUY', 100), args.n),
+        "template copy": measure(lambda: trader._build_order('BUY', 100), args.n),
+    }
+    if not args.live:
+        results["qualify + build + placeOrder"] = measure(lambda: ib.placeOrder(*uncached_prepare()), args.n)
+        results["cache + template + placeOrder"] = measure(lambda: ib.placeOrder(*cached_prepare()), args.n)
+
+    print("\nPer-order latency before placeOrder is sent:")
+    for name, samples in results.items():
+        report(name, samples)
+
+    saved = statistics.median(results["qualify + build (per order)"]) - statistics.median(results["cache + template"])
+    print(f"\n✓ Saved per order (p50): {saved:,.1f}µs")
+
+    if args.live:
+        ib.disconnect()
+
+
+if __name__ == "__main__":
+    main()
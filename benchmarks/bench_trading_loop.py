@@ -0,0 +1,359 @@
+"""End-to-end throughput benchmark for the main_trading event loop against in-process venue simulators.
+
+按 main_trading.py 的方式连接 HyperliquidFetcherStreaming、IBKRFetcherStreaming、ArbitrageStrategy 和
+TradeExecutor：HL 使用本进程线程中的 simulator.HyperliquidSimServer，IB 使用 simulator.IBSimulator。
+主循环与 run_event_loop（--runtime threads）/ run_async_loop --event-driven（--runtime asyncio）相同，
+每次评估调用 main_trading 的 build_market_data + evaluate_market（交易模式，executor 已连接模拟器）。
+
+按递增的总 tick 速率（HL l2Book + activeAssetCtx + IB 报价）运行，每档报告：
+- 实际推送 / 主循环收到的 tick 数和 ticks/s，策略评估次数
+- tick-to-decision 延迟 p50 / p99 / p99.9（事件最早接收时间 -> 策略决策，不含下单和等待成交）
+- 队列深度：合并事件队列待处理数据源、HL WebSocket 积压（模拟器已发送 - fetcher 已处理）、
+  IB 已到期未处理事件数（每 --sample-ms 采样，报告平均 / 最大）
+- CPU（进程 CPU 时间 / 墙钟时间，包含本进程中的 HL 模拟器线程）和 RSS
+
+Usage:
+    python benchmarks/bench_trading_loop.py
+    python benchmarks/bench_trading_loop.py --rates 1000,5000,10000,20000 --duration 3
+    python benchmarks/bench_trading_loop.py --runtime asyncio --ib-share 0.5
+    python benchmarks/bench_trading_loop.py --open-spread -1     # 每次评估都满足开仓价差，压测带成交的循环
+"""
+
+import io
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import contextlib
+from pathlib import Path
+from dataclasses import dataclass, field
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from hyperliquid.info import Info
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from hl_fetcher.ws_async import create_async_info
+from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
+from main_trading import TickBuffers, build_market_data, evaluate_market
+from runtime import create_event_loop, shutdown_event_loop
+from simulator import HyperliquidSimServer, IBSimulator
+from trader.config import StrategyConfig
+from trader.executor import TradeExecutor
+from trader.hl_trader import HLTrader
+from trader.ib_trader import IBTrader
+from latency import LatencyHistogram
+from trader.market_events import MarketEventQueue, AsyncMarketEventQueue
+from trader.position_manager import PositionManager
+from trader.strategy import ArbitrageStrategy
+
+
+@dataclass
+class StepResult:
+    """一档速率的结果."""
+    rate: float
+    duration: float = 0.0
+    hl_sent: int = 0
+    hl_dropped: int = 0
+    ib_quotes: int = 0
+    received: int = 0           # 主循环收到的事件（推送到合并队列的 tick）
+    evaluations: int = 0
+    opens: int = 0               # 本档位开出的仓位数
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    depth_samples: int = 0
+    depth_sum: list = field(default_factory=lambda: [0, 0, 0])   # 事件队列 / HL 积压 / IB 到期未处理
+    depth_max: list = field(default_factory=lambda: [0, 0, 0])
+    cpu: float = 0.0
+    rss_mb: float = 0.0
+
+    @property
+    def offered(self) -> int:
+        return self.hl_sent + self.ib_quotes
+
+    def sample_depths(self, *depths: int):
+        self.depth_samples += 1
+        for i, depth in enumerate(depths):
+            self.depth_sum[i] += depth
+            self.depth_max[i] = max(self.depth_max[i], depth)
+
+    def depth_text(self, i: int) -> str:
+        mean = self.depth_sum[i] / self.depth_samples if self.depth_samples else 0.0
+        return f"{mean:>6.1f}/{self.depth_max[i]:<5}"
+
+
+def current_rss_mb() -> float:
+    """当前 RSS（Linux 读 /proc，其他系统返回峰值 RSS）."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Harness:
+    """main_trading 的组件 + 两个模拟器，按档位驱动主循环."""
+
+    def __init__(self, args, data_dir: str):
+        self.args = args
+        self.hl_sim = HyperliquidSimServer(coins=[args.symbol], levels=args.levels,
+                                           order_latency=args.hl_latency_ms / 1000, seed=args.seed).start()
+        self.ib_gateway = IBSimulator(symbols=[args.stock_symbol], quote_rate=0, seed=args.seed)
+
+        self.config = StrategyConfig()
+        if args.open_spread is not None:
+            self.config.open_spread_threshold = args.open_spread
+            self.config.min_funding_rate = -1.0
+        self.strategy = ArbitrageStrategy(self.config)
+        self.buffers = TickBuffers()
+        self.loop = create_event_loop() if args.runtime == "asyncio" else None
+
+        with self.quiet():
+            if self.loop:
+                self.hl_stream = create_async_info(perp_dexs=["xyz"], base_url=self.hl_sim.base_url)
+                info = self.hl_stream
+            else:
+                self.hl_stream = None
+                info = Info(self.hl_sim.base_url, skip_ws=False, perp_dexs=["xyz"])
+            self.info = info
+            self.hl_fetcher = HyperliquidFetcherStreaming(symbol=args.symbol, info=info)
+            self.ib_fetcher = IBKRFetcherStreaming(symbol=args.stock_symbol, ib=self.ib_gateway.client())
+            connected = (self.loop.run_until_complete(self.ib_fetcher.connect_async()) if self.loop
+                         else self.ib_fetcher.connect())
+            assert connected
+
+            self.ib_trader = IBTrader(client_id=2, symbols=[args.stock_symbol], ib=self.ib_gateway.client())
+            self.hl_trader = HLTrader("0x" + "11" * 32, stream_info=None if self.loop else info,
+                                      price_source=self.hl_fetcher, base_url=self.hl_sim.base_url)
+            assert self.ib_trader.connect() and self.hl_trader.connect()
+            self.position_manager = PositionManager(str(Path(data_dir) / "positions.json"))
+            self.executor = TradeExecutor(self.ib_trader, self.hl_trader, self.position_manager,
+                                          args.stock_symbol, args.symbol)
+
+        # 两个 fetcher 的更新转发到当前档位的事件队列；HL 消息计数用于计算 WebSocket 积压
+        self.event_queue = None
+        self.hl_received = 0
+        self.hl_fetcher.add_update_listener(self.on_hl_update)
+        self.ib_fetcher.add_update_listener(self.on_ib_update)
+
+    def on_hl_update(self, source: str, recv_ns: int):
+        self.hl_received += 1
+        if self.event_queue is not None:
+            self.event_queue.push(source, recv_ns)
+
+    def on_ib_update(self, source: str, recv_ns: int):
+        if self.event_queue is not None:
+            self.event_queue.push(source, recv_ns)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        if self.args.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    def evaluate(self, batch, step: StepResult):
+        """与 main_trading 主循环相同的一次评估."""
+        market_data = build_market_data(self.hl_fetcher, self.ib_fetcher, self.config, self.buffers.market_data)
+        positions_before = len(self.position_manager.positions)
+        evaluate_market(market_data, self.strategy, self.config, self.executor, self.position_manager,
+                        True, verbose=False, buffers=self.buffers)
+        step.latency.record(self.buffers.decision_ns - min(batch.values()))
+        step.evaluations += 1
+        step.opens += len(self.position_manager.positions) - positions_before
+
+    def hl_backlog(self) -> int:
+        """本档位 HL 模拟器已发送、fetcher 还没处理的消息数."""
+        return max(0, (self.hl_sim.messages_sent - self._hl_sent_base) - (self.hl_received - self._hl_received_base))
+
+    def sample(self, step: StepResult):
+        step.sample_depths(len(self.event_queue), self.hl_backlog(), self.ib_gateway.overdue())
+
+    def idle(self) -> bool:
+        """推送结束后：队列、HL 积压和 IB 到期事件都已处理完."""
+        return not len(self.event_queue) and not self.hl_backlog() and not self.ib_gateway.overdue()
+
+    # ==================== 档位 ====================
+
+    def start_step(self, rate: float, event_queue):
+        """开始推送：HL 盘口 + activeAssetCtx 占 (1 - ib_share)，IB 报价占 ib_share."""
+        args = self.args
+        self.event_queue = event_queue
+        self._hl_sent_base, self._hl_received_base = self.hl_sim.messages_sent, self.hl_received
+        self._quotes_base = self.ib_gateway.quotes
+        self._cpu_base, self._wall_base = time.process_time(), time.perf_counter()
+        hl_rate = rate * (1 - args.ib_share)
+        book_rate = hl_rate * args.ctx_every / (args.ctx_every + 1) if args.ctx_every else hl_rate
+        feed = self.hl_sim.start_feed(args.symbol, rate=book_rate, duration=args.duration, ctx_every=args.ctx_every)
+        self.ib_gateway.set_quote_rate(rate * args.ib_share)
+        return feed
+
+    def finish_step(self, step: StepResult, feed):
+        self.ib_gateway.set_quote_rate(0)
+        stats = feed.result(30)
+        step.hl_sent = stats.sent + stats.ctx_sent
+        step.hl_dropped = stats.dropped
+        step.ib_quotes = self.ib_gateway.quotes - self._quotes_base
+        step.received = self.event_queue.pushed
+        step.duration = time.perf_counter() - self._wall_base
+        step.cpu = (time.process_time() - self._cpu_base) / step.duration
+        step.rss_mb = current_rss_mb()
+        self.event_queue = None
+
+    def step_done(self, feed, now: float) -> bool:
+        """推送结束且积压处理完，或超过 duration + drain."""
+        elapsed = now - self._wall_base
+        if elapsed >= self.args.duration and self.ib_gateway.quote_rate:
+            self.ib_gateway.set_quote_rate(0)    # IB 报价与 HL 推送同时结束
+        return elapsed >= self.args.duration + self.args.drain or (
+            feed.done() and elapsed >= self.args.duration and self.idle())
+
+    def run_step_threads(self, rate: float) -> StepResult:
+        """run_event_loop：主线程 pump IB + 等待合并队列，HL 回调在 SDK WebSocket 线程中推送."""
+        step = StepResult(rate)
+        pump_interval = self.args.ib_pump_ms / 1000
+        sample_interval = self.args.sample_ms / 1000
+        event_queue = MarketEventQueue()
+        feed = self.start_step(rate, event_queue)
+        next_sample = self._wall_base
+        with self.quiet():
+            while True:
+                now = time.perf_counter()
+                if now >= next_sample:
+                    self.sample(step)
+                    next_sample = now + sample_interval
+                if self.step_done(feed, now):
+                    break
+                self.ib_fetcher.pump_events()
+                batch = event_queue.wait(timeout=pump_interval)
+                if batch:
+                    self.evaluate(batch, step)
+        self.finish_step(step, feed)
+        return step
+
+    async def run_step_async(self, rate: float) -> StepResult:
+        """run_async_loop --event-driven：HL 流、IB 行情和评估都在同一个事件循环中."""
+        step = StepResult(rate)
+        sample_interval = self.args.sample_ms / 1000
+        event_queue = AsyncMarketEventQueue()
+        feed = self.start_step(rate, event_queue)
+        next_sample = self._wall_base
+        with self.quiet():
+            while True:
+                now = time.perf_counter()
+                if now >= next_sample:
+                    self.sample(step)
+                    next_sample = now + sample_interval
+                if self.step_done(feed, now):
+                    break
+                batch = await event_queue.wait(timeout=sample_interval)
+                if batch:
+                    self.evaluate(batch, step)
+        self.finish_step(step, feed)
+        return step
+
+    def run(self, rates):
+        results = []
+        if self.loop:
+            stream_task = self.loop.create_task(self.hl_stream.run())
+            self.loop.run_until_complete(asyncio.sleep(0.3))
+        else:
+            stream_task = None
+            time.sleep(0.3)
+
+        for rate in rates:
+            step = (self.loop.run_until_complete(self.run_step_async(rate)) if self.loop
+                    else self.run_step_threads(rate))
+            results.append(step)
+            self.print_step(step, self.args.duration)
+
+        if stream_task is not None:
+            stream_task.cancel()
+        return results
+
+    @staticmethod
+    def print_header():
+        print(f"\n{'target/s':>9} {'offered/s':>9} {'recv/s':>9} {'evals/s':>8} {'drop':>5} {'opens':>6} | "
+              f"{'t2d p50':>8} {'p99':>8} {'p99.9':>8} µs | {'queue':>12} {'hl backlog':>12} {'ib overdue':>12} "
+              f"(mean/max) | {'cpu':>5} {'rss MB':>7}")
+
+    @staticmethod
+    def print_step(step: StepResult, feed_seconds: float):
+        def us(p):
+            value = step.latency.percentile(p)
+            return f"{value / 1000:>8.1f}" if value is not None else f"{'-':>8}"
+
+        print(f"{step.rate:>9,.0f} {step.offered / feed_seconds:>9,.0f} {step.received / step.duration:>9,.0f} "
+              f"{step.evaluations / step.duration:>8,.0f} {step.hl_dropped:>5} {step.opens:>6} | "
+              f"{us(50)} {us(99)} {us(99.9)}    | {step.depth_text(0):>12} {step.depth_text(1):>12} "
+              f"{step.depth_text(2):>12}            | {step.cpu * 100:>4.0f}% {step.rss_mb:>7.1f}", flush=True)
+
+    def close(self):
+        with self.quiet():
+            self.hl_trader.disconnect()
+            self.ib_trader.disconnect()
+            self.ib_fetcher.disconnect()
+            self.hl_fetcher.close()
+            self.position_manager.close()
+            if self.loop:
+                shutdown_event_loop(self.loop, self.hl_stream)
+            else:
+                self.info.disconnect_websocket()
+        self.hl_sim.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main_trading loop throughput benchmark (in-process simulators)")
+    parser.add_argument("--rates", default="500,1000,2000,5000,10000,20000", help="Comma-separated total ticks/s")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds of feed per step (default: 2)")
+    parser.add_argument("--drain", type=float, default=2.0, help="Max seconds to drain backlog after each step")
+    parser.add_argument("--runtime", choices=("threads", "asyncio"), default="threads",
+                        help="threads = run_event_loop, asyncio = run_async_loop --event-driven")
+    parser.add_argument("--ib-share", type=float, default=0.2, help="Fraction of ticks that are IB quotes")
+    parser.add_argument("--ctx-every", type=int, default=10, help="activeAssetCtx every N HL books (0 = none)")
+    parser.add_argument("--levels", type=int, default=20, help="HL book levels per side")
+    parser.add_argument("--open-spread", type=float, help="Override open_spread_threshold (e.g. -1 = always open)")
+    parser.add_argument("--hl-latency-ms", type=float, default=2.0, help="HL /exchange response latency")
+    parser.add_argument("--ib-pump-ms", type=float, default=1.0, help="IB_PUMP_INTERVAL for --runtime threads")
+    parser.add_argument("--sample-ms", type=float, default=10.0, help="Queue depth sampling interval")
+    parser.add_argument("--max-p99-ms", type=float, default=5.0, help="Latency budget for a sustained step")
+    parser.add_argument("--symbol", default="xyz:NVDA")
+    parser.add_argument("--stock-symbol", default="NVDA")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Show fetcher / executor output")
+    args = parser.parse_args()
+
+    rates = [float(r) for r in args.rates.split(",")]
+    print("=" * 120)
+    print(f"main_trading loop benchmark - runtime={args.runtime}, {args.duration}s/step, "
+          f"IB share {args.ib_share:.0%}, HL ctx every {args.ctx_every}, {args.levels} levels, "
+          f"open_spread={args.open_spread if args.open_spread is not None else 'default'}")
+    print("=" * 120)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        harness = Harness(args, data_dir)
+        Harness.print_header()
+        try:
+            results = harness.run(rates)
+        finally:
+            harness.close()
+
+    # 持续承受：模拟器达到目标速率、无丢弃、主循环收到全部 tick 且处理速率跟得上（没有靠结束后的排空追上）、
+    # p99 在延迟预算内
+    budget_ns = args.max_p99_ms * 1e6
+    sustained = [step.rate for step in results
+                 if step.offered >= 0.95 * step.rate * args.duration
+                 and not step.hl_dropped and step.received >= 0.99 * step.offered
+                 and step.received / step.duration >= 0.95 * step.offered / args.duration
+                 and (step.latency.percentile(99) or 0) <= budget_ns]
+    print(f"\n✓ Highest sustained step: {max(sustained):,.0f} ticks/s (p99 <= {args.max_p99_ms}ms)" if sustained
+          else f"\n⚠️  Loop fell behind at every step (p99 budget {args.max_p99_ms}ms)")
+    print(f"   Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+回测模块
+
+在 recorder 记录的行情上以向量化方式运行套利策略规则，并支持多进程参数扫描。
+"""
+
+from .engine import (
+    Backtester,
+    BacktestResult,
+    SpreadArrays,
+    TRADE_DTYPE,
+    CLOSE_REASONS,
+    compute_spreads,
+    signal_masks,
+    scan_positions,
+    build_trades,
+    trade_stats,
+)
+from .sweep import (
+    SWEEP_PARAMS,
+    DEFAULT_GRID,
+    SweepResult,
+    grid_configs,
+    random_configs,
+    evaluate_config,
+    run_sweep,
+    format_sweep_table,
+)
+
+__all__ = [
+    'Backtester',
+    'BacktestResult',
+    'SpreadArrays',
+    'TRADE_DTYPE',
+    'CLOSE_REASONS',
+    'compute_spreads',
+    'signal_masks',
+    'scan_positions',
+    'build_trades',
+    'trade_stats',
+    'SWEEP_PARAMS',
+    'DEFAULT_GRID',
+    'SweepResult',
+    'grid_configs',
+    'random_configs',
+    'evaluate_config',
+    'run_sweep',
+    'format_sweep_table',
+]
@@ -0,0 +1,356 @@
+"""Vectorized backtest engine driving the arbitrage rules over recorded ticks."""
+
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import time
+
+import numpy as np
+
+from trader.config import StrategyConfig, DEFAULT_CONFIG
+from trader.position_manager import Position, PositionStatus
+from trader.strategy import ArbitrageStrategy, CLOSE_NONE, CLOSE_CONVERGED, CLOSE_REVERSED, CLOSE_FUNDING
+
+CLOSE_REASONS = {
+    CLOSE_NONE: "open",
+    CLOSE_CONVERGED: "converged",
+    CLOSE_REVERSED: "reversed",
+    CLOSE_FUNDING: "funding",
+}
+
+# 回测成交记录；未平仓的交易 exit_idx = -1，平仓字段为 NaN
+TRADE_DTYPE = np.dtype([
+    ("entry_idx", "<i8"),
+    ("exit_idx", "<i8"),
+    ("entry_ts_ns", "<i8"),
+    ("exit_ts_ns", "<i8"),
+    ("entry_spread", "<f8"),
+    ("exit_spread", "<f8"),
+    ("entry_funding_rate", "<f8"),
+    ("ib_entry_price", "<f8"),
+    ("hl_entry_price", "<f8"),
+    ("ib_exit_price", "<f8"),
+    ("hl_exit_price", "<f8"),
+    ("quantity", "<f8"),
+    ("exit_reason", "u1"),
+    ("pnl", "<f8"),
+])
+
+
+@dataclass
+class SpreadArrays:
+    """与参数无关的逐 tick 价差和有效性（只依赖行情，可在多组参数间复用）."""
+    ts_ns: np.ndarray
+    spot_bid: np.ndarray
+    spot_ask: np.ndarray
+    perp_bid: np.ndarray
+    perp_ask: np.ndarray
+    funding_rate: np.ndarray
+    open_spread: np.ndarray     # perp_bid / spot_ask - 1
+    close_spread: np.ndarray    # perp_ask / spot_bid - 1
+    quotes_valid: np.ndarray    # _validate_market_data 中除数据时效外的检查
+    close_valid: np.ndarray     # calculate_close_spread 的额外检查
+    age: np.ndarray             # 较旧一边行情的年龄（秒）
+
+
+def compute_spreads(ticks: np.ndarray) -> SpreadArrays:
+    """从行情记录计算开仓/平仓价差及数据有效性.
+
+    公式与 ArbitrageStrategy.calculate_spread / calculate_close_spread 相同（最优报价）。
+    记录中缺失的价格为 NaN，与 NaN 的比较结果为 False，等价于实盘中的 None 检查。
+
+    Args:
+        ticks: recorder.TICK_DTYPE 结构化数组（可以是内存映射）
+
+    Returns:
+        SpreadArrays
+    """
+    spot_bid = np.asarray(ticks["spot_bid"], dtype=np.float64)
+    spot_ask = np.asarray(ticks["spot_ask"], dtype=np.float64)
+    perp_bid = np.asarray(ticks["perp_bid"], dtype=np.float64)
+    perp_ask = np.asarray(ticks["perp_ask"], dtype=np.float64)
+    funding_rate = np.asarray(ticks["funding_rate"], dtype=np.float64)
+    ts_ns = np.asarray(ticks["ts_ns"], dtype=np.int64)
+
+    open_spread, close_spread = ArbitrageStrategy.batch_spreads(perp_bid, perp_ask, spot_bid, spot_ask)
+    quotes_valid, close_valid = ArbitrageStrategy.batch_quotes_valid(
+        perp_bid, perp_ask, spot_bid, spot_ask, funding_rate
+    )
+
+    # 实盘时间戳取构造 MarketData 的时刻；回测用两边中较旧的接收时间衡量数据时效
+    oldest_recv = np.minimum(ticks["perp_recv_ns"], ticks["spot_recv_ns"])
+    age = np.where(oldest_recv > 0, (ts_ns - oldest_recv) / 1e9, np.inf)
+
+    return SpreadArrays(
+        ts_ns=ts_ns,
+        spot_bid=spot_bid,
+        spot_ask=spot_ask,
+        perp_bid=perp_bid,
+        perp_ask=perp_ask,
+        funding_rate=funding_rate,
+        open_spread=open_spread,
+        close_spread=close_spread,
+        quotes_valid=quotes_valid,
+        close_valid=close_valid,
+        age=age,
+    )
+
+
+def signal_masks(spreads: SpreadArrays, config: StrategyConfig) -> Tuple[np.ndarray, np.ndarray]:
+    """按 get_open_signal / get_close_signal 的规则计算逐 tick 信号.
+
+    与 evaluate_market 一致：开仓分析无效时不检查平仓。
+    平仓条件与 entry_spread 无关，所以所有持仓在同一 tick 平仓。
+
+    Args:
+        spreads: compute_spreads 的结果
+        config: 策略配置
+
+    Returns:
+        (open_mask, close_reason)，close_reason 为 CLOSE_* 代码数组（0 表示无平仓信号）
+    """
+    strategy = ArbitrageStrategy(config)
+    valid = spreads.quotes_valid & (spreads.age <= config.max_data_age)
+
+    open_mask = strategy.open_signal_mask(spreads.open_spread, spreads.funding_rate, valid)
+    close_reason = strategy.close_signal_codes(
+        spreads.close_spread, spreads.funding_rate, valid & spreads.close_valid
+    )
+    return open_mask, close_reason
+
+
+def scan_positions(
+    open_mask: np.ndarray,
+    close_mask: np.ndarray,
+    max_positions: int = 1
+) -> Tuple[np.ndarray, np.ndarray]:
+    """仓位状态扫描：按实盘顺序（先平仓，再在仓位数未满时开仓）配对开平仓.
+
+    "下一个平仓 / 开仓 tick" 用 searchsorted 一次性算好，循环只在信号 tick 之间跳转，
+    循环次数与交易数成正比而不是 tick 数。
+
+    Args:
+        open_mask: 开仓信号
+        close_mask: 平仓信号
+        max_positions: 最大同时持仓数
+
+    Returns:
+        (entry_idx, exit_idx)，未平仓的交易 exit_idx 为 -1
+    """
+    open_idx = np.flatnonzero(open_mask)
+    close_idx = np.flatnonzero(close_mask)
+    n_open, n_close = len(open_idx), len(close_idx)
+
+    # 每个开仓 tick 之后（不含）第一个平仓 tick 在 close_idx 中的位置
+    close_after_open = np.searchsorted(close_idx, open_idx, side="right")
+    # 每个平仓 tick 之后（不含）第一个开仓 tick 在 open_idx 中的位置
+    open_after_close = np.searchsorted(open_idx, close_idx, side="right")
+
+    entries: List[int] = []
+    exits: List[int] = []
+    holding: List[int] = []     # 当前持仓在 entries 中的下标
+    k = 0                       # 下一个候选开仓在 open_idx 中的位置
+    c = 0                       # 持仓期间下一个平仓在 close_idx 中的位置
+
+    while True:
+        if not holding:
+            if k >= n_open:
+                break
+            holding.append(len(entries))
+            entries.append(int(open_idx[k]))
+            exits.append(-1)
+            c = close_after_open[k]
+            k += 1
+            continue
+
+        next_close = int(close_idx[c]) if c < n_close else None
+        can_open = len(holding) < max_positions
+
+        if can_open and k < n_open and (next_close is None or open_idx[k] < next_close):
+            holding.append(len(entries))
+            entries.append(int(open_idx[k]))
+            exits.append(-1)
+            k += 1
+            continue
+
+        if next_close is None:
+            break
+
+        # 同一 tick 先平仓；开仓判断使用平仓前的持仓数（与 evaluate_market 相同）
+        for h in holding:
+            exits[h] = next_close
+        holding = []
+        if can_open and open_mask[next_close]:
+            holding.append(len(entries))
+            entries.append(next_close)
+            exits.append(-1)
+        k = open_after_close[c]
+        c += 1
+
+    return np.asarray(entries, dtype=np.int64), np.asarray(exits, dtype=np.int64)
+
+
+def build_trades(
+    spreads: SpreadArrays,
+    entry_idx: np.ndarray,
+    exit_idx: np.ndarray,
+    close_reason: np.ndarray,
+    quantity: float
+) -> np.ndarray:
+    """根据开平仓位置生成成交记录并计算盈亏.
+
+    开仓按 spot_ask / perp_bid 成交，平仓按 spot_bid / perp_ask 成交，
+    盈亏与 Position.calculate_pnl 相同（不含资金费）。
+
+    Returns:
+        TRADE_DTYPE 结构化数组
+    """
+    trades = np.zeros(len(entry_idx), dtype=TRADE_DTYPE)
+    closed = exit_idx >= 0
+    xi = np.where(closed, exit_idx, 0)
+
+    def at_exit(values):
+        return np.where(closed, values[xi], np.nan)
+
+    trades["entry_idx"] = entry_idx
+    trades["exit_idx"] = exit_idx
+    trades["entry_ts_ns"] = spreads.ts_ns[entry_idx]
+    trades["exit_ts_ns"] = np.where(closed, spreads.ts_ns[xi], 0)
+    trades["entry_spread"] = spreads.open_spread[entry_idx]
+    trades["exit_spread"] = at_exit(spreads.close_spread)
+    trades["entry_funding_rate"] = spreads.funding_rate[entry_idx]
+    trades["ib_entry_price"] = spreads.spot_ask[entry_idx]
+    trades["hl_entry_price"] = spreads.perp_bid[entry_idx]
+    trades["ib_exit_price"] = at_exit(spreads.spot_bid)
+    trades["hl_exit_price"] = at_exit(spreads.perp_ask)
+    trades["quantity"] = quantity
+    trades["exit_reason"] = np.where(closed, close_reason[xi], CLOSE_NONE)
+
+    # Position.calculate_pnl：IB (卖出 - 买入) + HL (开空 - 平空)
+    trades["pnl"] = (
+        (trades["ib_exit_price"] - trades["ib_entry_price"]) +
+        (trades["hl_entry_price"] - trades["hl_exit_price"])
+    ) * quantity
+
+    return trades
+
+
+@dataclass
+class BacktestResult:
+    """回测结果."""
+    config: StrategyConfig
+    trades: np.ndarray              # TRADE_DTYPE
+    num_ticks: int
+    elapsed: float                  # 回测耗时（秒）
+    stats: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def closed_trades(self) -> np.ndarray:
+        return self.trades[self.trades["exit_idx"] >= 0]
+
+    @property
+    def total_pnl(self) -> float:
+        return float(self.closed_trades["pnl"].sum())
+
+    def to_positions(self, symbol: str = "NVDA", hl_symbol: str = "xyz:NVDA") -> List[Position]:
+        """把成交记录转换为 Position 对象（可直接调用 calculate_pnl）."""
+        positions = []
+        for i, trade in enumerate(self.trades):
+            closed = trade["exit_idx"] >= 0
+            positions.append(Position(
+                position_id=f"bt_{i}",
+                symbol=symbol,
+                hl_symbol=hl_symbol,
+                quantity=float(trade["quantity"]),
+                entry_time=float(trade["entry_ts_ns"]) / 1e9,
+                entry_spread=float(trade["entry_spread"]),
+                entry_funding_rate=float(trade["entry_funding_rate"]),
+                ib_entry_price=float(trade["ib_entry_price"]),
+                hl_entry_price=float(trade["hl_entry_price"]),
+                exit_time=float(trade["exit_ts_ns"]) / 1e9 if closed else None,
+                exit_spread=float(trade["exit_spread"]) if closed else None,
+                ib_exit_price=float(trade["ib_exit_price"]) if closed else None,
+                hl_exit_price=float(trade["hl_exit_price"]) if closed else None,
+                status=PositionStatus.CLOSED if closed else PositionStatus.OPEN,
+                notes=CLOSE_REASONS[int(trade["exit_reason"])],
+            ))
+        return positions
+
+    def summary(self) -> str:
+        """格式化回测统计."""
+        s = self.stats
+        lines = [
+            "=== Backtest Result ===",
+            f"Ticks:          {self.num_ticks:,} ({self.elapsed*1000:.1f} ms)",
+            f"Trades:         {int(s['num_trades'])} closed, {int(s['open_trades'])} still open",
+            f"Total PnL:      ${s['total_pnl']:+,.2f}",
+            f"Win Rate:       {s['win_rate']*100:.1f}%",
+            f"Avg PnL/Trade:  ${s['avg_pnl']:+,.2f}",
+            f"Max Drawdown:   ${s['max_drawdown']:,.2f}",
+        ]
+        return "\n".join(lines)
+
+
+def trade_stats(trades: np.ndarray) -> Dict[str, float]:
+    """计算成交统计（按平仓顺序累计盈亏计算最大回撤）."""
+    closed = trades[trades["exit_idx"] >= 0]
+    pnl = closed["pnl"][np.argsort(closed["exit_idx"], kind="stable")]
+
+    if len(pnl):
+        equity = np.cumsum(pnl)
+        drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+        max_drawdown = float(drawdown.max())
+    else:
+        max_drawdown = 0.0
+
+    return {
+        "num_trades": float(len(pnl)),
+        "open_trades": float(len(trades) - len(pnl)),
+        "total_pnl": float(pnl.sum()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+        "avg_pnl": float(pnl.mean()) if len(pnl) else 0.0,
+        "max_drawdown": max_drawdown,
+    }
+
+
+class Backtester:
+    """向量化回测器.
+
+    用 NumPy 一次性计算所有 tick 的价差和信号，再做一次仓位状态扫描。
+    成交假设：信号 tick 按当时的最优报价全部成交（无延迟、无滑点）。
+    """
+
+    def __init__(self, config: StrategyConfig = None):
+        """初始化回测器.
+
+        Args:
+            config: 策略配置，如果不提供则使用默认配置
+        """
+        self.config = config or DEFAULT_CONFIG
+        if self.config.use_executable_spread:
+            print("⚠️  Recorded ticks are top-of-book only; backtesting with top-of-book spreads")
+
+    def run(self, ticks: np.ndarray, spreads: Optional[SpreadArrays] = None) -> BacktestResult:
+        """运行回测.
+
+        Args:
+            ticks: recorder.TICK_DTYPE 结构化数组
+            spreads: 预先计算的价差（多次回测同一数据时复用）
+
+        Returns:
+            BacktestResult
+        """
+        start = time.perf_counter()
+
+        if spreads is None:
+            spreads = compute_spreads(ticks)
+        open_mask, close_reason = signal_masks(spreads, self.config)
+        entry_idx, exit_idx = scan_positions(open_mask, close_reason > 0, self.config.max_positions)
+        trades = build_trades(spreads, entry_idx, exit_idx, close_reason, self.config.position_size)
+
+        return BacktestResult(
+            config=self.config,
+            trades=trades,
+            num_ticks=len(spreads.ts_ns),
+            elapsed=time.perf_counter() - start,
+            stats=trade_stats(trades),
+        )
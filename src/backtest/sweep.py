@@ -0,0 +1,216 @@
+"""Parallel StrategyConfig parameter sweep over recorded ticks."""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, fields, replace
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import tempfile
+
+import numpy as np
+
+from trader.config import StrategyConfig, DEFAULT_CONFIG
+from .engine import SpreadArrays, compute_spreads, signal_masks, scan_positions, build_trades, trade_stats
+
+
+# 可扫描的参数
+SWEEP_PARAMS = (
+    "open_spread_threshold",
+    "close_spread_threshold",
+    "reverse_spread_threshold",
+    "min_funding_rate",
+    "max_data_age",
+)
+
+# 默认网格（7 x 6 x 4 x 5 x 3 = 2520 组）
+DEFAULT_GRID: Dict[str, Sequence[float]] = {
+    "open_spread_threshold": [0.0005, 0.00075, 0.001, 0.00125, 0.0015, 0.002, 0.003],
+    "close_spread_threshold": [-0.0005, 0.0, 0.00025, 0.0005, 0.00075, 0.001],
+    "reverse_spread_threshold": [-0.003, -0.002, -0.001, -0.0005],
+    "min_funding_rate": [0.0, 0.00005, 0.0001, 0.0002, 0.0005],
+    "max_data_age": [1.0, 5.0, 30.0],
+}
+
+
+@dataclass
+class SweepResult:
+    """单组参数的回测统计."""
+    params: Dict[str, float]
+    stats: Dict[str, float]
+
+
+def grid_configs(grid: Dict[str, Sequence[float]] = None, base: StrategyConfig = None) -> List[StrategyConfig]:
+    """生成网格搜索的配置列表.
+
+    Args:
+        grid: {参数名: 取值列表}，默认 DEFAULT_GRID
+        base: 其余参数使用的基础配置
+
+    Returns:
+        StrategyConfig 列表
+    """
+    grid = grid or DEFAULT_GRID
+    base = base or DEFAULT_CONFIG
+    _check_params(grid)
+
+    names = list(grid)
+    return [replace(base, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+
+
+def random_configs(
+    ranges: Dict[str, Tuple[float, float]],
+    samples: int,
+    base: StrategyConfig = None,
+    seed: Optional[int] = None
+) -> List[StrategyConfig]:
+    """生成随机搜索的配置列表（每个参数在 [low, high] 内均匀采样）.
+
+    Args:
+        ranges: {参数名: (low, high)}
+        samples: 配置数量
+        base: 其余参数使用的基础配置
+        seed: 随机种子
+
+    Returns:
+        StrategyConfig 列表
+    """
+    base = base or DEFAULT_CONFIG
+    _check_params(ranges)
+
+    rng = np.random.default_rng(seed)
+    draws = {name: rng.uniform(low, high, samples) for name, (low, high) in ranges.items()}
+    return [replace(base, **{name: float(values[i]) for name, values in draws.items()}) for i in range(samples)]
+
+
+def _check_params(params: Dict):
+    unknown = set(params) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+
+# ==================== 进程间共享行情数组 ====================
+# 父进程把 SpreadArrays 的各列连续写入一个文件（优先 /dev/shm），
+# 工作进程以只读内存映射打开：所有进程共享同一份页缓存，不复制数据。
+
+_WORKER_SPREADS: Optional[SpreadArrays] = None
+
+
+def _share_spreads(spreads: SpreadArrays, directory: Optional[str] = None) -> Tuple[str, int, list]:
+    """把价差数组写入共享映射文件.
+
+    Returns:
+        (文件路径, 行数, [(列名, dtype, 偏移)])
+    """
+    if directory is None and os.path.isdir("/dev/shm"):
+        directory = "/dev/shm"
+    fd, path = tempfile.mkstemp(prefix="sweep_", suffix=".bin", dir=directory)
+
+    layout = []
+    offset = 0
+    with os.fdopen(fd, 'wb') as f:
+        for field_info in fields(SpreadArrays):
+            column = np.ascontiguousarray(getattr(spreads, field_info.name))
+            layout.append((field_info.name, column.dtype.str, offset))
+            column.tofile(f)
+            offset += column.nbytes
+
+    return path, len(spreads.ts_ns), layout
+
+
+def _attach_spreads(path: str, rows: int, layout: list) -> SpreadArrays:
+    """以只读内存映射打开共享价差数组."""
+    columns = {
+        name: np.memmap(path, dtype=np.dtype(dtype), mode='r', offset=offset, shape=(rows,))
+        for name, dtype, offset in layout
+    }
+    return SpreadArrays(**columns)
+
+
+def _init_worker(path: str, rows: int, layout: list):
+    """工作进程初始化：映射共享数组."""
+    global _WORKER_SPREADS
+    _WORKER_SPREADS = _attach_spreads(path, rows, layout)
+
+
+def evaluate_config(spreads: SpreadArrays, config: StrategyConfig) -> Dict[str, float]:
+    """在价差数组上评估一组参数（向量化信号 + 仓位扫描）.
+
+    Returns:
+        trade_stats 统计
+    """
+    open_mask, close_reason = signal_masks(spreads, config)
+    entry_idx, exit_idx = scan_positions(open_mask, close_reason > 0, config.max_positions)
+    trades = build_trades(spreads, entry_idx, exit_idx, close_reason, config.position_size)
+    return trade_stats(trades)
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, StrategyConfig]]) -> List[Tuple[int, Dict[str, float]]]:
+    """工作进程任务：评估一批配置."""
+    return [(i, evaluate_config(_WORKER_SPREADS, config)) for i, config in chunk]
+
+
+def run_sweep(
+    ticks: np.ndarray,
+    configs: List[StrategyConfig],
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    share_dir: Optional[str] = None
+) -> List[SweepResult]:
+    """并行评估多组策略参数.
+
+    Args:
+        ticks: recorder.TICK_DTYPE 结构化数组
+        configs: 待评估的配置
+        workers: 工作进程数（默认 CPU 核数；1 表示在当前进程内运行）
+        chunk_size: 每个任务包含的配置数（减少进程间通信）
+        share_dir: 共享映射文件目录（默认 /dev/shm，不存在时用系统临时目录）
+
+    Returns:
+        按总盈亏从高到低排序的 SweepResult 列表
+    """
+    spreads = compute_spreads(ticks)
+    workers = workers or os.cpu_count() or 1
+    indexed = list(enumerate(configs))
+    stats: Dict[int, Dict[str, float]] = {}
+
+    if workers == 1:
+        for i, config in indexed:
+            stats[i] = evaluate_config(spreads, config)
+    else:
+        path, rows, layout = _share_spreads(spreads, share_dir)
+        try:
+            chunks = [indexed[k:k + chunk_size] for k in range(0, len(indexed), chunk_size)]
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(path, rows, layout)
+            ) as pool:
+                for results in pool.map(_evaluate_chunk, chunks):
+                    stats.update(results)
+        finally:
+            os.remove(path)
+
+    results = [
+        SweepResult(params={name: getattr(config, name) for name in SWEEP_PARAMS}, stats=stats[i])
+        for i, config in indexed
+    ]
+    results.sort(key=lambda r: r.stats["total_pnl"], reverse=True)
+    return results
+
+
+def format_sweep_table(results: List[SweepResult], top: int = 20) -> str:
+    """把扫描结果格式化为排名表."""
+    header = (
+        f"{'#':>4} {'open%':>8} {'close%':>8} {'reverse%':>9} {'funding%':>9} {'age':>5} "
+        f"{'trades':>7} {'PnL':>12} {'win%':>6} {'max DD':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for rank, result in enumerate(results[:top], 1):
+        p, s = result.params, result.stats
+        lines.append(
+            f"{rank:>4} {p['open_spread_threshold']*100:>8.4f} {p['close_spread_threshold']*100:>8.4f} "
+            f"{p['reverse_spread_threshold']*100:>9.4f} {p['min_funding_rate']*100:>9.4f} "
+            f"{p['max_data_age']:>5.1f} {int(s['num_trades']):>7} {s['total_pnl']:>+12,.2f} "
+            f"{s['win_rate']*100:>6.1f} {s['max_drawdown']:>10,.2f}"
+        )
+    return "\n".join(lines)
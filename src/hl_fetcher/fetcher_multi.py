@@ -0,0 +1,231 @@
+"""Hyperliquid multi-symbol streaming fetcher over a single WebSocket."""
+
+from typing import Callable, Dict, List, Optional, Any, Union
+from hyperliquid.info import Info
+from hyperliquid.utils import constants
+import time
+import threading
+
+import numpy as np
+
+from orderbook import L2OrderBook
+
+
+# 报价表每行一个 symbol（行号即 symbol id），缺失值为 NaN / 0
+QUOTE_DTYPE = np.dtype([
+    ("perp_bid", "<f8"),
+    ("perp_ask", "<f8"),
+    ("perp_bid_sz", "<f8"),
+    ("perp_ask_sz", "<f8"),
+    ("funding_rate", "<f8"),
+    ("mark_price", "<f8"),
+    ("book_time_ms", "<i8"),    # l2Book 交易所时间戳（毫秒）
+    ("book_recv_ns", "<i8"),    # 最近一次 l2Book 接收时间（perf_counter_ns）
+    ("ctx_recv_ns", "<i8"),     # 最近一次 activeAssetCtx 接收时间（perf_counter_ns）
+])
+
+
+class HyperliquidMultiFetcherStreaming:
+    """Streams many Hyperliquid perps over one Info WebSocket into an array-backed quote table."""
+
+    def __init__(
+        self,
+        symbols: List[str],
+        use_testnet: bool = False,
+        perp_dexs: list = None,
+        info: Optional[Info] = None
+    ):
+        """Initialize the multi-symbol fetcher.
+
+        Args:
+            symbols: Trading symbols (e.g., ["xyz:NVDA", "xyz:TSLA"]); list index is the symbol id
+            use_testnet: Whether to use testnet or mainnet
+            perp_dexs: List of perp DEXs to initialize (e.g., ["xyz"])
+            info: Existing Info instance with WebSocket enabled (shares its connection)
+        """
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Duplicate symbols")
+
+        self.symbols = list(symbols)
+        # SDK 按小写 coin 分发消息，这里同样用小写 coin 查 symbol id
+        self._ids: Dict[str, int] = {symbol.lower(): i for i, symbol in enumerate(self.symbols)}
+
+        if info is None:
+            base_url = constants.TESTNET_API_URL if use_testnet else constants.MAINNET_API_URL
+            # Default to xyz DEX if not specified
+            if perp_dexs is None:
+                perp_dexs = ["xyz"]
+            print(f"Initializing Hyperliquid WebSocket for {len(self.symbols)} symbols...")
+            info = Info(base_url, skip_ws=False, perp_dexs=perp_dexs)
+            print(f"✓ WebSocket connection established")
+        self.info = info
+
+        # 报价表（回调中按行原地更新）和完整订单簿快照
+        self._lock = threading.Lock()
+        self._table = np.zeros(len(self.symbols), dtype=QUOTE_DTYPE)
+        for name in ("perp_bid", "perp_ask", "perp_bid_sz", "perp_ask_sz", "funding_rate", "mark_price"):
+            self._table[name] = np.nan
+        self._books: List[L2OrderBook] = [L2OrderBook.empty(symbol) for symbol in self.symbols]
+
+        # 数据更新监听器，签名: callback(source: str, recv_ns: int, symbol_id: int)
+        self._listeners: List[Callable[[str, int, int], None]] = []
+
+        # (subscription, subscription_id) for cleanup
+        self._subscriptions: List[tuple] = []
+
+        self._subscribe_to_feeds()
+
+    def _subscribe_to_feeds(self):
+        """为每个 symbol 订阅 l2Book 和 activeAssetCtx（共用一个 WebSocket 和一对回调）."""
+        print(f"Setting up WebSocket subscriptions for {len(self.symbols)} symbols...")
+
+        for symbol in self.symbols:
+            try:
+                for subscription, callback in (
+                    ({"type": "l2Book", "coin": symbol}, self._on_l2_book_update),
+                    ({"type": "activeAssetCtx", "coin": symbol}, self._on_asset_ctx_update),
+                ):
+                    sub_id = self.info.subscribe(subscription, callback)
+                    self._subscriptions.append((subscription, sub_id))
+                print(f"  ✓ {symbol} subscribed")
+            except Exception as e:
+                print(f"Warning: Could not subscribe to {symbol}: {e}")
+
+        print("✓ All subscriptions ready")
+
+    def symbol_id(self, symbol: str) -> int:
+        """Get the quote table row of a symbol.
+
+        Raises:
+            KeyError: Unknown symbol
+        """
+        return self._ids[symbol.lower()]
+
+    def add_update_listener(self, callback: Callable[[str, int, int], None]):
+        """注册数据更新监听器.
+
+        每次某个 symbol 的 l2Book / activeAssetCtx 写入报价表后，在 WebSocket 线程中调用
+        callback("hl_book" 或 "hl_ctx", recv_ns, symbol_id)。回调应尽快返回。
+
+        Args:
+            callback: 回调函数
+        """
+        self._listeners.append(callback)
+
+    def _notify_listeners(self, source: str, recv_ns: int, symbol_id: int):
+        """通知所有监听器."""
+        for callback in self._listeners:
+            try:
+                callback(source, recv_ns, symbol_id)
+            except Exception as e:
+                print(f"Warning: Update listener error: {e}")
+
+    def _on_l2_book_update(self, msg: Dict[str, Any]):
+        """WebSocket 回调：所有 symbol 的 l2Book 更新."""
+        recv_ns = time.perf_counter_ns()
+        try:
+            data = msg["data"]
+            symbol_id = self._ids.get(data["coin"].lower())
+            if symbol_id is None:
+                return
+
+            # 锁外解析，锁内只写一行
+            book = L2OrderBook.from_message(data)
+            bids, asks = book.bids, book.asks
+            with self._lock:
+                self._books[symbol_id] = book
+                row = self._table[symbol_id]
+                row["perp_bid"] = _nan_if_none(bids.best_price)
+                row["perp_ask"] = _nan_if_none(asks.best_price)
+                row["perp_bid_sz"] = _nan_if_none(bids.best_size)
+                row["perp_ask_sz"] = _nan_if_none(asks.best_size)
+                row["book_time_ms"] = book.timestamp or 0
+                row["book_recv_ns"] = recv_ns
+
+            self._notify_listeners("hl_book", recv_ns, symbol_id)
+
+        except Exception as e:
+            print(f"Error processing L2 book update: {e}")
+
+    def _on_asset_ctx_update(self, msg: Dict[str, Any]):
+        """WebSocket 回调：所有 symbol 的 activeAssetCtx 更新（funding rate / mark price）."""
+        recv_ns = time.perf_counter_ns()
+        try:
+            data = msg["data"]
+            symbol_id = self._ids.get(data["coin"].lower())
+            if symbol_id is None:
+                return
+
+            ctx = data.get("ctx", {})
+            funding_str = ctx.get("funding")
+            mark_str = ctx.get("markPx")
+            with self._lock:
+                row = self._table[symbol_id]
+                if funding_str:
+                    row["funding_rate"] = float(funding_str)
+                if mark_str:
+                    row["mark_price"] = float(mark_str)
+                row["ctx_recv_ns"] = recv_ns
+
+            self._notify_listeners("hl_ctx", recv_ns, symbol_id)
+
+        except Exception as e:
+            print(f"Error processing asset ctx update: {e}")
+
+    def snapshot_all(self) -> np.ndarray:
+        """Get a consistent copy of the whole quote table.
+
+        Returns:
+            QUOTE_DTYPE array, row i belongs to self.symbols[i]
+        """
+        with self._lock:
+            return self._table.copy()
+
+    def get_orderbook(self, symbol: Union[str, int]) -> L2OrderBook:
+        """Get the latest full-depth L2 orderbook snapshot of one symbol.
+
+        Args:
+            symbol: Symbol name or symbol id
+        """
+        symbol_id = symbol if isinstance(symbol, int) else self.symbol_id(symbol)
+        with self._lock:
+            return self._books[symbol_id]
+
+    def get_all_metrics(self, symbol: Union[str, int]) -> Dict[str, Any]:
+        """Get metrics of one symbol in HyperliquidFetcherStreaming.get_all_metrics format.
+
+        Args:
+            symbol: Symbol name or symbol id
+        """
+        symbol_id = symbol if isinstance(symbol, int) else self.symbol_id(symbol)
+        with self._lock:
+            row = self._table[symbol_id].item()
+
+        values = dict(zip(QUOTE_DTYPE.names, row))
+        return {
+            "perp_bid": _none_if_nan(values["perp_bid"]),
+            "perp_ask": _none_if_nan(values["perp_ask"]),
+            "spot_bid": None,
+            "spot_ask": None,
+            "funding_rate": _none_if_nan(values["funding_rate"]),
+        }
+
+    def close(self):
+        """取消所有订阅."""
+        try:
+            print("Unsubscribing from WebSocket feeds...")
+            for subscription, sub_id in self._subscriptions:
+                self.info.unsubscribe(subscription, sub_id)
+            self._subscriptions = []
+            print("✓ Hyperliquid multi-symbol subscriptions closed")
+
+        except Exception as e:
+            print(f"Warning: Error closing connection: {e}")
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if value != value else value
@@ -1,43 +1,79 @@
 """Hyperliquid data fetcher with real WebSocket streaming mode."""
 
-from typing import Dict, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from hyperliquid.info import Info
 from hyperliquid.utils import constants
 import time
 import threading
 
+from orderbook import L2OrderBook
+from latency import TickStamps
+
+
+# activeAssetCtx 中缓存的字段：消息字段 -> get_asset_ctx() 的键
+ASSET_CTX_FIELDS = {
+    "funding": "funding_rate",
+    "markPx": "mark_price",
+    "oraclePx": "oracle_price",
+    "midPx": "mid_price",
+    "openInterest": "open_interest",
+    "premium": "premium",
+}
+
 
 class HyperliquidFetcherStreaming:
     """Fetches market data from Hyperliquid using WebSocket subscriptions."""
 
-    def __init__(self, symbol: str = "xyz:NVDA", use_testnet: bool = False, perp_dexs: list = None):
+    def __init__(
+        self,
+        symbol: str = "xyz:NVDA",
+        use_testnet: bool = False,
+        perp_dexs: list = None,
+        info: Optional[Info] = None,
+        latency_tracker=None
+    ):
         """Initialize the Hyperliquid data fetcher with WebSocket streaming.
 
         Args:
             symbol: The trading symbol to fetch data for (e.g., "xyz:NVDA")
             use_testnet: Whether to use testnet or mainnet
             perp_dexs: List of perp DEXs to initialize (e.g., ["xyz"])
+            info: Existing Info instance with WebSocket enabled (shares its connection)
+            latency_tracker: 提供 record_tick(TickStamps) 的延迟收集器（例如 trader.latency.LatencyTracker），记录每次 l2Book 的网络/解析耗时（可选）
         """
         self.symbol = symbol
         # Extract coin name from symbol (e.g., "xyz:NVDA" -> "NVDA")
         self.coin = symbol.split(":")[-1] if ":" in symbol else symbol
+        # HIP-3 DEX 名称（"xyz:NVDA" -> "xyz"，主 DEX 为 ""）
+        self.dex = symbol.split(":")[0] if ":" in symbol else ""
 
-        base_url = constants.TESTNET_API_URL if use_testnet else constants.MAINNET_API_URL
+        if info is None:
+            base_url = constants.TESTNET_API_URL if use_testnet else constants.MAINNET_API_URL
 
-        # Default to xyz DEX if not specified
-        if perp_dexs is None:
-            perp_dexs = ["xyz"]
+            # Default to xyz DEX if not specified
+            if perp_dexs is None:
+                perp_dexs = ["xyz"]
 
-        # Initialize with WebSocket enabled (skip_ws=False)
-        print(f"Initializing Hyperliquid WebSocket for {symbol}...")
-        self.info = Info(base_url, skip_ws=False, perp_dexs=perp_dexs)
-        print(f"✓ WebSocket connection established")
+            # Initialize with WebSocket enabled (skip_ws=False)
+            print(f"Initializing Hyperliquid WebSocket for {symbol}...")
+            info = Info(base_url, skip_ws=False, perp_dexs=perp_dexs)
+            print(f"✓ WebSocket connection established")
+        self.info = info
 
         # Cache for latest data (will be updated by WebSocket callbacks)
         self._lock = threading.Lock()  # Thread safety for callbacks
-        self._latest_orderbook = {"perp_bid": None, "perp_ask": None, "timestamp": None}
-        self._latest_funding_rate = None
-        self._latest_mark_price = None
+        self._book = L2OrderBook.empty(symbol)  # 不可变快照，回调中整体替换
+        self._asset_ctx: Dict[str, Optional[float]] = dict.fromkeys(ASSET_CTX_FIELDS.values())
+
+        # 最近一次 l2Book 的时间戳（交易所 / 接收 / 解析完成）
+        self._tick_stamps: Optional[TickStamps] = None
+        self.latency_tracker = latency_tracker
+
+        # HTTP 回退用的 universe 名称 -> 索引（首次回退时建立一次）
+        self._asset_index: Optional[Dict[str, int]] = None
+
+        # 数据更新监听器（事件驱动模式使用），签名: callback(source: str, recv_ns: int)
+        self._listeners: List[Callable[[str, int], None]] = []
 
         # Subscription IDs for cleanup
         self._l2_sub_id = None
@@ -74,6 +110,26 @@ class HyperliquidFetcherStreaming:
             print(f"Warning: Could not set up subscriptions: {e}")
             print(f"Error details: {traceback.format_exc()}")
 
+    def add_update_listener(self, callback: Callable[[str, int], None]):
+        """注册数据更新监听器.
+
+        每次 l2Book / activeAssetCtx 更新写入缓存后，在 WebSocket 线程中调用
+        callback("hl_book" 或 "hl_ctx", recv_ns)，recv_ns 为收到消息时的
+        time.perf_counter_ns()。回调应尽快返回（例如只推送到队列）。
+
+        Args:
+            callback: 回调函数
+        """
+        self._listeners.append(callback)
+
+    def _notify_listeners(self, source: str, recv_ns: int):
+        """通知所有监听器."""
+        for callback in self._listeners:
+            try:
+                callback(source, recv_ns)
+            except Exception as e:
+                print(f"Warning: Update listener error: {e}")
+
     def _on_l2_book_update(self, msg: Dict[str, Any]):
         """WebSocket 回调：处理 L2 orderbook 更新.
 
@@ -87,34 +143,27 @@ class HyperliquidFetcherStreaming:
             }
         }
         """
+        recv_ns = time.perf_counter_ns()
+        recv_wall_ns = time.time_ns()
         try:
-            data = msg["data"]
-            levels = data.get("levels", [[], []])
-            timestamp = data.get("time")
-
-            perp_bid = None
-            perp_ask = None
+            # 锁外解析完整档位，锁内只交换快照引用
+            book = L2OrderBook.from_message(msg["data"])
+            stamps = TickStamps(book.timestamp or 0, recv_wall_ns, recv_ns, time.perf_counter_ns())
 
-            # levels[0] = bids, levels[1] = asks
-            if levels[0] and len(levels[0]) > 0:
-                perp_bid = float(levels[0][0]["px"])
+            with self._lock:
+                self._book = book
+                self._tick_stamps = stamps
 
-            if levels[1] and len(levels[1]) > 0:
-                perp_ask = float(levels[1][0]["px"])
+            if self.latency_tracker is not None:
+                self.latency_tracker.record_tick(stamps)
 
-            # 线程安全更新缓存
-            with self._lock:
-                self._latest_orderbook = {
-                    "perp_bid": perp_bid,
-                    "perp_ask": perp_ask,
-                    "timestamp": timestamp
-                }
+            self._notify_listeners("hl_book", recv_ns)
 
         except Exception as e:
             print(f"Error processing L2 book update: {e}")
 
     def _on_asset_ctx_update(self, msg: Dict[str, Any]):
-        """WebSocket 回调：处理 activeAssetCtx 更新（包含 funding rate）.
+        """WebSocket 回调：处理 activeAssetCtx 更新（funding rate、mark / oracle / mid price 等）.
 
         消息格式:
         {
@@ -134,17 +183,16 @@ class HyperliquidFetcherStreaming:
             }
         }
         """
+        recv_ns = time.perf_counter_ns()
         try:
-            data = msg["data"]
-            ctx = data.get("ctx", {})
-
-            funding_str = ctx.get("funding")
-            if funding_str:
-                funding_rate = float(funding_str)
-
+            ctx = msg["data"].get("ctx", {})
+            values = _parse_asset_ctx(ctx)
+            if values:
                 # 线程安全更新缓存
                 with self._lock:
-                    self._latest_funding_rate = funding_rate
+                    self._asset_ctx.update(values)
+
+                self._notify_listeners("hl_ctx", recv_ns)
 
         except Exception as e:
             print(f"Error processing asset ctx update: {e}")
@@ -169,10 +217,25 @@ class HyperliquidFetcherStreaming:
                 latest_funding = funding_history[-1]
                 funding_rate_str = latest_funding.get("fundingRate")
                 if funding_rate_str:
-                    self._latest_funding_rate = float(funding_rate_str)
+                    with self._lock:
+                        self._asset_ctx["funding_rate"] = float(funding_rate_str)
         except Exception as e:
             print(f"Error updating funding rate cache: {e}")
 
+    def get_orderbook(self) -> L2OrderBook:
+        """Get the latest full-depth L2 orderbook snapshot.
+
+        Returns:
+            L2OrderBook snapshot (immutable, safe to read without locking)
+        """
+        with self._lock:
+            return self._book
+
+    def get_tick_stamps(self) -> Optional[TickStamps]:
+        """Get the timestamps of the latest l2Book update (None before the first update)."""
+        with self._lock:
+            return self._tick_stamps
+
     def get_orderbook_prices(self) -> Dict[str, Optional[float]]:
         """Get best bid/ask prices from the orderbook.
 
@@ -181,11 +244,11 @@ class HyperliquidFetcherStreaming:
 
         Note: 数据来自 WebSocket 推送，无需主动请求！
         """
-        with self._lock:
-            return {
-                "perp_bid": self._latest_orderbook["perp_bid"],
-                "perp_ask": self._latest_orderbook["perp_ask"]
-            }
+        book = self.get_orderbook()
+        return {
+            "perp_bid": book.best_bid,
+            "perp_ask": book.best_ask
+        }
 
     def get_spot_prices(self) -> Dict[str, Optional[float]]:
         """Get spot market prices.
@@ -206,68 +269,54 @@ class HyperliquidFetcherStreaming:
         Note: 数据来自 activeAssetCtx WebSocket 推送，实时更新，无需 HTTP 请求
         """
         with self._lock:
-            return self._latest_funding_rate
+            return self._asset_ctx["funding_rate"]
 
-    def _update_mark_price_cache(self):
-        """更新 Mark Price 缓存（HTTP 请求）.
+    def _update_asset_ctx_cache(self):
+        """HTTP 回退：WebSocket 尚未推送 activeAssetCtx 时，用 metaAndAssetCtxs 获取一次.
 
-        使用 meta_and_asset_ctxs API 获取完整的市场数据，包括：
-        - markPx: Mark Price
-        - midPx: Mid Price
-        - funding: 资金费率
-        - openInterest: 持仓量
-        等
+        universe 名称到索引的映射只在第一次请求时建立，之后直接按索引读取。
         """
         try:
-            # 调用 API 获取所有资产的市场数据
-            data = self.info.meta_and_asset_ctxs()
+            # 按 DEX 获取所有资产的元数据和市场数据
+            data = self.info.post("/info", {"type": "metaAndAssetCtxs", "dex": self.dex})
 
-            # data[0] = universe (元数据)
-            # data[1] = assetCtxs (市场数据数组)
+            # data[0] = {"universe": [...]}（元数据）
+            # data[1] = assetCtxs（市场数据数组，与 universe 顺序一致）
             if not data or len(data) < 2:
-                print("Warning: meta_and_asset_ctxs returned invalid data")
+                print("Warning: metaAndAssetCtxs returned invalid data")
                 return
+            universe, asset_ctxs = data[0]["universe"], data[1]
 
-            universe = data[0]
-            asset_ctxs = data[1]
-
-            # 找到对应 symbol 的索引
-            # universe 包含所有资产的名称列表
-            symbol_index = None
-            for idx, asset in enumerate(universe):
-                asset_name = asset.get("name", "")
-                # 匹配 symbol（例如 "xyz:NVDA" 或 "NVDA"）
-                if asset_name == self.symbol or asset_name == self.coin:
-                    symbol_index = idx
-                    break
+            if self._asset_index is None:
+                self._asset_index = {asset["name"]: idx for idx, asset in enumerate(universe)}
 
-            if symbol_index is None:
+            # universe 中的名称可能带或不带 DEX 前缀
+            symbol_index = self._asset_index.get(self.symbol, self._asset_index.get(self.coin))
+            if symbol_index is None or symbol_index >= len(asset_ctxs):
                 print(f"Warning: Symbol {self.symbol} not found in universe")
                 return
 
-            # 获取对应的市场数据
-            if symbol_index < len(asset_ctxs):
-                ctx = asset_ctxs[symbol_index]
-
-                # 检查 ctx 类型
-                if isinstance(ctx, str):
-                    # 如果是字符串，可能需要解析
-                    print(f"Warning: asset_ctx is string, not dict: {ctx[:100]}")
-                    return
+            values = _parse_asset_ctx(asset_ctxs[symbol_index])
+            with self._lock:
+                # 只填补 WebSocket 尚未提供的字段
+                for key, value in values.items():
+                    if self._asset_ctx[key] is None:
+                        self._asset_ctx[key] = value
 
-                if not isinstance(ctx, dict):
-                    print(f"Warning: asset_ctx is not a dict: {type(ctx)}")
-                    return
+        except Exception as e:
+            print(f"Error updating asset ctx cache: {e}")
 
-                mark_price_str = ctx.get("markPx")
+    def get_asset_ctx(self) -> Dict[str, Optional[float]]:
+        """Get the latest asset context cached from the activeAssetCtx stream.
 
-                if mark_price_str:
-                    self._latest_mark_price = float(mark_price_str)
+        Returns:
+            Dictionary with funding_rate, mark_price, oracle_price, mid_price,
+            open_interest and premium (None until received)
 
-        except Exception as e:
-            print(f"Error updating mark price cache: {e}")
-            import traceback
-            traceback.print_exc()
+        Note: 数据来自 activeAssetCtx WebSocket 推送，无需 HTTP 请求
+        """
+        with self._lock:
+            return dict(self._asset_ctx)
 
     def get_mark_price(self) -> Optional[float]:
         """Get current mark price for the perpetual contract.
@@ -275,11 +324,31 @@ class HyperliquidFetcherStreaming:
         Returns:
             Current mark price as a float
 
-        Note: Mark Price 从 HTTP API 获取，建议适度调用频率
+        Note: Mark Price 来自 activeAssetCtx WebSocket 推送；
+              只有在尚未收到推送时才发一次 HTTP 请求
+        """
+        with self._lock:
+            mark_price = self._asset_ctx["mark_price"]
+        if mark_price is None:
+            self._update_asset_ctx_cache()
+            with self._lock:
+                mark_price = self._asset_ctx["mark_price"]
+        return mark_price
+
+    def update_market_data(self, market_data) -> None:
+        """Write the latest perp quotes, funding rate and tick stamps into market_data in place.
+
+        Args:
+            market_data: trader.strategy.MarketData（主循环预先分配，每个 tick 复用）
+
+        Note: 与 get_all_metrics() 读取相同的缓存，但一次加锁、不创建中间字典（事件驱动模式每个 tick 调用）
         """
-        # 每次调用时更新
-        self._update_mark_price_cache()
-        return self._latest_mark_price
+        with self._lock:
+            book = self._book
+            market_data.perp_bid = book.best_bid
+            market_data.perp_ask = book.best_ask
+            market_data.funding_rate = self._asset_ctx["funding_rate"]
+            market_data.stamps = self._tick_stamps
 
     def get_all_metrics(self) -> Dict[str, Any]:
         """Fetch all metrics at once.
@@ -289,18 +358,19 @@ class HyperliquidFetcherStreaming:
 
         Note: 所有数据均来自 WebSocket 实时推送（零 HTTP 请求）
               - orderbook: l2Book 订阅
-              - funding_rate: activeAssetCtx 订阅
+              - funding_rate / mark_price: activeAssetCtx 订阅
         """
         orderbook = self.get_orderbook_prices()
         spot = self.get_spot_prices()
-        funding_rate = self.get_funding_rate()
+        asset_ctx = self.get_asset_ctx()
 
         return {
             "perp_bid": orderbook["perp_bid"],
             "perp_ask": orderbook["perp_ask"],
             "spot_bid": spot["spot_bid"],
             "spot_ask": spot["spot_ask"],
-            "funding_rate": funding_rate
+            "funding_rate": asset_ctx["funding_rate"],
+            "mark_price": asset_ctx["mark_price"]
         }
 
     def close(self):
@@ -334,3 +404,8 @@ class HyperliquidFetcherStreaming:
     def __del__(self):
         """析构函数，确保连接关闭."""
         self.close()
+
+
+def _parse_asset_ctx(ctx: Dict[str, Any]) -> Dict[str, float]:
+    """从 activeAssetCtx / assetCtxs 条目中解析缓存字段（缺失或为空的字段跳过）."""
+    return {key: float(ctx[name]) for name, key in ASSET_CTX_FIELDS.items() if ctx.get(name)}
@@ -0,0 +1,194 @@
+"""Hyperliquid WebSocket client running natively on an asyncio event loop."""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+import asyncio
+import json
+
+from hyperliquid.websocket_manager import subscription_to_identifier, ws_msg_to_identifier
+
+
+class HyperliquidAsyncStream:
+    """asyncio 原生的 Hyperliquid WebSocket 客户端.
+
+    实现 Info.subscribe / unsubscribe 接口，可以作为 info 传给
+    HyperliquidFetcherStreaming / HyperliquidMultiFetcherStreaming。
+    推送在事件循环中读取并直接调用订阅回调，不经过 SDK 的 WebSocket 线程，
+    回调与 ib_insync、策略运行在同一个线程。
+    其他属性（HTTP 接口，例如 post）转发给 http_info。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        http_info=None,
+        ping_interval: float = 50.0,
+        reconnect_delay: float = 1.0
+    ):
+        """Initialize the asyncio WebSocket client.
+
+        Args:
+            base_url: API URL (constants.MAINNET_API_URL / TESTNET_API_URL)
+            http_info: Info(skip_ws=True) used for HTTP requests (optional)
+            ping_interval: 心跳间隔（秒，与 SDK 相同）
+            reconnect_delay: 断线后重连前的等待时间（秒）
+        """
+        self.ws_url = "ws" + base_url[len("http"):] + "/ws"
+        self.http_info = http_info
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+
+        # identifier -> [(subscription_id, callback)]
+        self._callbacks: Dict[str, List[Tuple[int, Callable[[Any], None]]]] = defaultdict(list)
+        # identifier -> subscription（每个 identifier 只向服务器订阅一次）
+        self._subscriptions: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+
+        self._ws = None
+        self._stopped = False
+        self.connected = asyncio.Event()
+
+        # 统计
+        self.messages = 0       # 分发的推送数
+        self.reconnects = 0
+
+    # ==================== Info 订阅接口 ====================
+
+    def subscribe(self, subscription: Dict[str, Any], callback: Callable[[Any], None]) -> int:
+        """注册订阅回调（已连接时立即向服务器发送订阅）.
+
+        Returns:
+            subscription_id
+        """
+        self._next_id += 1
+        identifier = subscription_to_identifier(subscription)
+        self._callbacks[identifier].append((self._next_id, callback))
+        if identifier not in self._subscriptions:
+            self._subscriptions[identifier] = subscription
+            self._send_soon({"method": "subscribe", "subscription": subscription})
+        return self._next_id
+
+    def unsubscribe(self, subscription: Dict[str, Any], subscription_id: int) -> bool:
+        """取消订阅回调（identifier 没有剩余回调时向服务器取消订阅）.
+
+        Returns:
+            是否找到并移除了该订阅
+        """
+        identifier = subscription_to_identifier(subscription)
+        callbacks = self._callbacks.get(identifier, [])
+        remaining = [(sub_id, cb) for sub_id, cb in callbacks if sub_id != subscription_id]
+        self._callbacks[identifier] = remaining
+        if not remaining and self._subscriptions.pop(identifier, None) is not None:
+            self._send_soon({"method": "unsubscribe", "subscription": subscription})
+        return len(remaining) != len(callbacks)
+
+    def _send_soon(self, message: Dict[str, Any]):
+        """已连接时异步发送一条控制消息（未连接时在连接后统一订阅）."""
+        if self._ws is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(self._ws.send(json.dumps(message)))
+        except RuntimeError:
+            # 事件循环已停止（例如退出时关闭 fetcher）
+            pass
+
+    def __getattr__(self, name: str):
+        # HTTP 接口（post、meta 等）转发给 http_info
+        http_info = self.__dict__.get("http_info")
+        if name.startswith("_") or http_info is None:
+            raise AttributeError(name)
+        return getattr(http_info, name)
+
+    # ==================== 事件循环 ====================
+
+    async def run(self):
+        """连接并持续分发推送，断线后自动重连并重新订阅，直到 close()."""
+        from websockets.asyncio.client import connect
+
+        self._stopped = False
+        while not self._stopped:
+            try:
+                # 心跳使用 Hyperliquid 的 {"method": "ping"}，关闭协议层 ping
+                async with connect(self.ws_url, ping_interval=None, max_size=None) as ws:
+                    self._ws = ws
+                    for subscription in self._subscriptions.values():
+                        await ws.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+                    self.connected.set()
+                    print(f"✓ Hyperliquid asyncio WebSocket connected ({len(self._subscriptions)} subscriptions)")
+
+                    ping_task = asyncio.create_task(self._send_pings(ws))
+                    try:
+                        async for message in ws:
+                            self._dispatch(message)
+                    finally:
+                        ping_task.cancel()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: Hyperliquid WebSocket error: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+
+            if not self._stopped:
+                self.reconnects += 1
+                print(f"Reconnecting Hyperliquid WebSocket in {self.reconnect_delay}s...")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _send_pings(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"method": "ping"}))
+
+    def _dispatch(self, message):
+        """解析一条推送并调用对应的订阅回调."""
+        if message == "Websocket connection established.":
+            return
+        try:
+            ws_msg = json.loads(message)
+            identifier = ws_msg_to_identifier(ws_msg)
+        except Exception as e:
+            print(f"Warning: Could not parse WebSocket message: {e}")
+            return
+        if identifier is None or identifier == "pong":
+            return
+
+        self.messages += 1
+        for _, callback in self._callbacks.get(identifier, ()):
+            try:
+                callback(ws_msg)
+            except Exception as e:
+                print(f"Warning: Subscription callback error: {e}")
+
+    async def close(self):
+        """停止重连并关闭连接."""
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+
+def create_async_info(
+    use_testnet: bool = False,
+    perp_dexs: Optional[list] = None,
+    base_url: Optional[str] = None
+) -> HyperliquidAsyncStream:
+    """创建 asyncio WebSocket + HTTP Info 组合，用于在事件循环中构造 HL fetcher.
+
+    Args:
+        use_testnet: Whether to use testnet or mainnet
+        perp_dexs: List of perp DEXs to initialize (e.g., ["xyz"])
+        base_url: API URL override (e.g., a local simulator; None = by use_testnet)
+
+    Returns:
+        HyperliquidAsyncStream（调用 run() 开始接收推送）
+    """
+    from hyperliquid.info import Info
+    from hyperliquid.utils import constants
+
+    if base_url is None:
+        base_url = constants.TESTNET_API_URL if use_testnet else constants.MAINNET_API_URL
+    if perp_dexs is None:
+        perp_dexs = ["xyz"]
+    http_info = Info(base_url, skip_ws=True, perp_dexs=perp_dexs)
+    return HyperliquidAsyncStream(base_url, http_info=http_info)
@@ -0,0 +1,288 @@
+"""Interactive Brokers multi-symbol market data over a single connection."""
+
+from typing import Callable, Dict, Iterable, List, Optional, Any, Union
+import math
+import threading
+import time
+
+import numpy as np
+
+
+# 报价表每行一个 symbol（行号即 symbol id），缺失值为 NaN / 0
+IB_QUOTE_DTYPE = np.dtype([
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("last", "<f8"),
+    ("bid_size", "<f8"),
+    ("ask_size", "<f8"),
+    ("timestamp", "<f8"),     # TWS 时间戳（epoch 秒）
+    ("recv_ns", "<i8"),       # 最近一次更新的接收时间（perf_counter_ns）
+    ("subscribed", "?"),      # 当前是否占用一条行情线
+])
+
+# IB 默认账户的同时行情线数量上限
+DEFAULT_MAX_MARKET_DATA_LINES = 100
+
+
+class IBKRMultiFetcherStreaming:
+    """Streams quotes for many stocks over one IB connection into an array-backed quote table.
+
+    合约在 connect 时一次批量 qualifyContracts。同时订阅的 symbol 数不超过
+    max_lines（IB 行情线限制），超出时优先订阅有持仓的 symbol，其余按 symbols 顺序。
+    行情由 ib.pendingTickersEvent 批量写入报价表，每批事件只触发一次回调。
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        host: str = "127.0.0.1",
+        port: int = 7497,
+        client_id: int = 1,
+        account_id: str = None,
+        max_lines: int = DEFAULT_MAX_MARKET_DATA_LINES,
+        ib=None
+    ):
+        """Initialize the multi-symbol IBKR fetcher.
+
+        Args:
+            symbols: Stock symbols (e.g., ["NVDA", "TSLA"]); list index is the symbol id
+            host: IB Gateway/TWS host
+            port: IB Gateway/TWS port
+            client_id: Unique client ID
+            account_id: IBKR account ID (optional)
+            max_lines: 同时订阅的行情线上限
+            ib: 已连接的 ib_insync.IB（可选，与其他组件共用一个连接）
+        """
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Duplicate symbols")
+
+        self.symbols = list(symbols)
+        self._ids: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.account_id = account_id
+        self.max_lines = max_lines
+        self.ib = ib
+        self._owns_connection = ib is None
+        self.connected = ib is not None and ib.isConnected()
+
+        self.contracts: List[Any] = [None] * len(self.symbols)   # 合格合约（未通过为 None）
+        self.tickers: List[Any] = [None] * len(self.symbols)     # 当前订阅的 ticker
+        self._ticker_ids: Dict[int, int] = {}                     # id(ticker) -> symbol id
+        self._priority: set = set()                               # 有持仓的 symbol id
+
+        self._lock = threading.Lock()
+        self._table = np.zeros(len(self.symbols), dtype=IB_QUOTE_DTYPE)
+        self._clear_rows(range(len(self.symbols)))
+
+        # 数据更新监听器，签名: callback(source: str, recv_ns: int, symbol_id: int)
+        self._listeners: List[Callable[[str, int, int], None]] = []
+
+    def connect(self) -> bool:
+        """Connect (unless an IB instance was given), qualify all contracts and subscribe.
+
+        Returns:
+            True if connected successfully, False otherwise
+        """
+        try:
+            from ib_insync import IB, Stock
+
+            if self.ib is None:
+                self.ib = IB()
+            if not self.ib.isConnected():
+                self.ib.connect(self.host, self.port, clientId=self.client_id)
+                print(f"✓ Connected to IBKR at {self.host}:{self.port}")
+            self.connected = True
+
+            # 一次请求批量确认所有合约
+            contracts = [Stock(symbol, 'SMART', 'USD') for symbol in self.symbols]
+            self.ib.qualifyContracts(*contracts)
+            for i, contract in enumerate(contracts):
+                if contract.conId:
+                    self.contracts[i] = contract
+                else:
+                    print(f"Warning: Could not qualify contract for {self.symbols[i]}")
+            print(f"✓ Qualified {sum(c is not None for c in self.contracts)}/{len(self.symbols)} contracts")
+
+            # 设置市场数据类型: 1=实时, 3=延迟
+            self.ib.reqMarketDataType(1)
+
+            self.ib.pendingTickersEvent += self._on_pending_tickers
+            self._apply_subscriptions()
+            return True
+
+        except ImportError:
+            print("Error: ib_insync not installed. Install with: pip install ib_insync")
+            return False
+        except Exception as e:
+            print(f"Error connecting to IBKR: {e}")
+            return False
+
+    def disconnect(self):
+        """Cancel all subscriptions and disconnect (only if this fetcher owns the connection)."""
+        if self.ib and self.connected:
+            subscribed = [i for i, ticker in enumerate(self.tickers) if ticker is not None]
+            for i in subscribed:
+                self._unsubscribe(i)
+            self.ib.pendingTickersEvent -= self._on_pending_tickers
+            print(f"✓ Unsubscribed from {len(subscribed)} market data streams")
+
+            if self._owns_connection:
+                self.ib.disconnect()
+                print("✓ Disconnected from IBKR")
+            self.connected = False
+
+    # ==================== 行情线分配 ====================
+
+    def set_open_positions(self, symbols: Iterable[str]):
+        """设置有持仓的 symbol（优先占用行情线），并按新的优先级调整订阅.
+
+        Args:
+            symbols: 有持仓的 symbol 列表
+        """
+        self._priority = {self._ids[symbol] for symbol in symbols if symbol in self._ids}
+        if self.connected:
+            self._apply_subscriptions()
+
+    def _desired_subscriptions(self) -> List[int]:
+        """按优先级选择要订阅的 symbol id（有持仓的在前，其余按 symbols 顺序）."""
+        candidates = [i for i in range(len(self.symbols)) if self.contracts[i] is not None]
+        ordered = [i for i in candidates if i in self._priority] + \
+                  [i for i in candidates if i not in self._priority]
+        return ordered[:self.max_lines]
+
+    def _apply_subscriptions(self):
+        """取消不再需要的订阅，再订阅新选中的 symbol（先释放行情线）."""
+        desired = set(self._desired_subscriptions())
+        current = {i for i, ticker in enumerate(self.tickers) if ticker is not None}
+
+        for i in sorted(current - desired):
+            self._unsubscribe(i)
+        for i in sorted(desired - current):
+            ticker = self.ib.reqMktData(self.contracts[i], '', False, False)
+            self.tickers[i] = ticker
+            self._ticker_ids[id(ticker)] = i
+            with self._lock:
+                self._table["subscribed"][i] = True
+
+        skipped = len(self.symbols) - len(desired)
+        print(f"✓ Subscribed to {len(desired)} market data streams" +
+              (f" ({skipped} not subscribed: line limit {self.max_lines} or unqualified)" if skipped else ""))
+
+    def _unsubscribe(self, symbol_id: int):
+        """取消一个 symbol 的订阅并清空其报价（避免读到过期数据）."""
+        ticker = self.tickers[symbol_id]
+        self.ib.cancelMktData(self.contracts[symbol_id])
+        self._ticker_ids.pop(id(ticker), None)
+        self.tickers[symbol_id] = None
+        self._clear_rows([symbol_id])
+
+    def _clear_rows(self, symbol_ids: Iterable[int]):
+        with self._lock:
+            for i in symbol_ids:
+                self._table[i] = (math.nan, math.nan, math.nan, math.nan, math.nan, math.nan, 0, False)
+
+    # ==================== 行情更新 ====================
+
+    def add_update_listener(self, callback: Callable[[str, int, int], None]):
+        """注册数据更新监听器.
+
+        每个 symbol 的 ticker 更新写入报价表后调用 callback("ib", recv_ns, symbol_id)。
+        与单 symbol 版本相同，只有在 pump_events() 运行事件循环时才会触发。
+
+        Args:
+            callback: 回调函数
+        """
+        self._listeners.append(callback)
+
+    def _on_pending_tickers(self, tickers):
+        """ib.pendingTickersEvent 回调：一批更新过的 ticker 一次写入报价表."""
+        recv_ns = time.perf_counter_ns()
+        updated = []
+        try:
+            rows = [(self._ticker_ids.get(id(ticker)), ticker) for ticker in tickers]
+            with self._lock:
+                for symbol_id, ticker in rows:
+                    if symbol_id is None:
+                        continue
+                    self._table[symbol_id] = (
+                        _nan_if_none(ticker.bid),
+                        _nan_if_none(ticker.ask),
+                        _nan_if_none(ticker.last),
+                        _nan_if_none(ticker.bidSize),
+                        _nan_if_none(ticker.askSize),
+                        ticker.time.timestamp() if ticker.time else math.nan,
+                        recv_ns,
+                        True,
+                    )
+                    updated.append(symbol_id)
+
+        except Exception as e:
+            print(f"Error processing ticker updates: {e}")
+
+        for symbol_id in updated:
+            for callback in self._listeners:
+                try:
+                    callback("ib", recv_ns, symbol_id)
+                except Exception as e:
+                    print(f"Warning: Update listener error: {e}")
+
+    def pump_events(self, timeout: float = 0):
+        """运行 ib_insync 事件循环，处理已到达的行情消息.
+
+        Args:
+            timeout: 运行事件循环的时间（秒），0 表示只处理已到达的消息，不等待
+        """
+        if self.ib and self.connected:
+            self.ib.sleep(timeout)
+        elif timeout > 0:
+            time.sleep(timeout)
+
+    # ==================== 读取 ====================
+
+    def symbol_id(self, symbol: str) -> int:
+        """Get the quote table row of a symbol.
+
+        Raises:
+            KeyError: Unknown symbol
+        """
+        return self._ids[symbol]
+
+    def snapshot_all(self) -> np.ndarray:
+        """Get a consistent copy of the whole quote table.
+
+        Returns:
+            IB_QUOTE_DTYPE array, row i belongs to self.symbols[i]
+        """
+        with self._lock:
+            return self._table.copy()
+
+    def get_stock_price(self, symbol: Union[str, int]) -> Dict[str, Optional[float]]:
+        """Get one symbol's quote in IBKRFetcherStreaming.get_stock_price format.
+
+        Args:
+            symbol: Symbol name or symbol id
+        """
+        symbol_id = symbol if isinstance(symbol, int) else self.symbol_id(symbol)
+        with self._lock:
+            row = dict(zip(IB_QUOTE_DTYPE.names, self._table[symbol_id].item()))
+
+        bid, ask = _none_if_nan(row["bid"]), _none_if_nan(row["ask"])
+        return {
+            "bid": bid,
+            "ask": ask,
+            "last": _none_if_nan(row["last"]),
+            "mid": (bid + ask) / 2 if bid is not None and ask is not None else None,
+            "bid_size": _none_if_nan(row["bid_size"]),
+            "ask_size": _none_if_nan(row["ask_size"]),
+            "timestamp": _none_if_nan(row["timestamp"]),
+        }
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if value != value else value
@@ -1,14 +1,19 @@
 """Interactive Brokers data fetcher with streaming/subscription mode."""
 
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Any
+import asyncio
+import math
+import threading
 import time
 
+from orderbook import BookSide, L2OrderBook
+
 
 class IBKRFetcherStreaming:
     """Fetches stock price data from IBKR using subscription mode."""
 
     def __init__(self, symbol: str = "NVDA", host: str = "127.0.0.1", port: int = 7497,
-                 client_id: int = 1, account_id: str = None):
+                 client_id: int = 1, account_id: str = None, market_depth_rows: int = 0, ib=None):
         """Initialize the IBKR data fetcher with streaming mode.
 
         Args:
@@ -17,16 +22,34 @@ class IBKRFetcherStreaming:
             port: IB Gateway/TWS port
             client_id: Unique client ID
             account_id: IBKR account ID (optional)
+            market_depth_rows: 订阅的市场深度档数（0 = 不订阅 L2 深度）
+            ib: ib_insync.IB 兼容实例（可选，默认 connect 时创建；例如 simulator.SimulatedIB）
         """
         self.symbol = symbol
         self.host = host
         self.port = port
         self.client_id = client_id
         self.account_id = account_id
-        self.ib = None
+        self.ib = ib
         self.connected = False
         self.ticker = None  # 保持订阅的 ticker 对象
         self.contract = None
+        self.market_depth_rows = market_depth_rows
+
+        # 最新报价快照（由 ticker.updateEvent 回调整体替换，读取无需运行事件循环）
+        self._lock = threading.Lock()
+        self._latest_quote: Dict[str, Any] = self._empty_quote()
+
+        # 数据更新监听器（事件驱动模式使用），签名: callback(source: str, recv_ns: int)
+        self._listeners: List[Callable[[str, int], None]] = []
+
+    @staticmethod
+    def _empty_quote() -> Dict[str, Any]:
+        """空报价快照."""
+        return {
+            "bid": None, "ask": None, "last": None, "mid": None,
+            "bid_size": None, "ask_size": None, "timestamp": None
+        }
 
     def connect(self) -> bool:
         """Connect to Interactive Brokers and subscribe to market data.
@@ -37,32 +60,24 @@ class IBKRFetcherStreaming:
         try:
             from ib_insync import IB, Stock
 
-            self.ib = IB()
-            self.ib.connect(self.host, self.port, clientId=self.client_id)
+            if self.ib is None:
+                self.ib = IB()
+            if not self.ib.isConnected():
+                self.ib.connect(self.host, self.port, clientId=self.client_id)
             self.connected = True
             print(f"✓ Connected to IBKR at {self.host}:{self.port}")
 
             # 创建合约并订阅市场数据（只订阅一次）
             self.contract = Stock(self.symbol, 'SMART', 'USD')
             self.ib.qualifyContracts(self.contract)
-
-            # 设置市场数据类型: 1=实时, 3=延迟
-            # 如果没有实时数据订阅，使用延迟数据（15分钟延迟，免费）
-            # 订阅实时数据后改为 reqMarketDataType(1)
-            self.ib.reqMarketDataType(1)
-
-            # 订阅市场数据（持续订阅，不取消）
-            self.ticker = self.ib.reqMktData(self.contract, '', False, False)
-            print(f"✓ Subscribed to {self.symbol} market data stream")
+            self._subscribe()
 
             # 等待初始数据
             timeout = 10
             start_time = time.time()
-            import math
             while (time.time() - start_time < timeout):
                 self.ib.sleep(0.1)
-                if (self.ticker.bid and not math.isnan(self.ticker.bid) and
-                    self.ticker.ask and not math.isnan(self.ticker.ask)):
+                if self._has_initial_quote():
                     print(f"✓ Initial market data received")
                     break
 
@@ -75,11 +90,80 @@ class IBKRFetcherStreaming:
             print(f"Error connecting to IBKR: {e}")
             return False
 
+    async def connect_async(self, timeout: float = 10) -> bool:
+        """Connect and subscribe from a coroutine running on the asyncio event loop.
+
+        与 connect() 相同，但使用 connectAsync / qualifyContractsAsync，不阻塞事件循环。
+        之后 ticker 更新随事件循环运行自动到达，无需 pump_events()。
+
+        Args:
+            timeout: 等待初始报价的最长时间（秒）
+
+        Returns:
+            True if connected successfully, False otherwise
+        """
+        try:
+            from ib_insync import IB, Stock
+
+            if self.ib is None:
+                self.ib = IB()
+            if not self.ib.isConnected():
+                await self.ib.connectAsync(self.host, self.port, clientId=self.client_id)
+            self.connected = True
+            print(f"✓ Connected to IBKR at {self.host}:{self.port} (asyncio)")
+
+            self.contract = Stock(self.symbol, 'SMART', 'USD')
+            await self.ib.qualifyContractsAsync(self.contract)
+            self._subscribe()
+
+            # 等待初始数据（期间事件循环继续处理其他任务）
+            start_time = time.time()
+            while (time.time() - start_time < timeout):
+                await asyncio.sleep(0.1)
+                if self._has_initial_quote():
+                    print(f"✓ Initial market data received")
+                    break
+
+            return True
+
+        except ImportError:
+            print("Error: ib_insync not installed. Install with: pip install ib_insync")
+            return False
+        except Exception as e:
+            print(f"Error connecting to IBKR: {e}")
+            return False
+
+    def _subscribe(self):
+        """订阅已确认合约的市场数据（以及可选的市场深度）."""
+        # 设置市场数据类型: 1=实时, 3=延迟
+        # 如果没有实时数据订阅，使用延迟数据（15分钟延迟，免费）
+        # 订阅实时数据后改为 reqMarketDataType(1)
+        self.ib.reqMarketDataType(1)
+
+        # 订阅市场数据（持续订阅，不取消）
+        # ticker 每次更新时刷新报价快照
+        self.ticker = self.ib.reqMktData(self.contract, '', False, False)
+        self.ticker.updateEvent += self._on_ticker_update
+        print(f"✓ Subscribed to {self.symbol} market data stream")
+
+        # 订阅市场深度（用于按仓位大小计算可成交价格）
+        # reqMktDepth 与 reqMktData 共用同一个 ticker，domBids/domAsks 会实时更新
+        if self.market_depth_rows > 0:
+            self.ib.reqMktDepth(self.contract, numRows=self.market_depth_rows, isSmartDepth=True)
+            print(f"✓ Subscribed to {self.symbol} market depth ({self.market_depth_rows} rows)")
+
+    def _has_initial_quote(self) -> bool:
+        """ticker 是否已收到有效的 bid/ask."""
+        return bool(self.ticker.bid and not math.isnan(self.ticker.bid) and
+                    self.ticker.ask and not math.isnan(self.ticker.ask))
+
     def disconnect(self):
         """Disconnect from Interactive Brokers and cancel subscriptions."""
         if self.ib and self.connected:
             # 取消市场数据订阅
             if self.contract:
+                if self.market_depth_rows > 0:
+                    self.ib.cancelMktDepth(self.contract, isSmartDepth=True)
                 self.ib.cancelMktData(self.contract)
                 print(f"✓ Unsubscribed from {self.symbol} market data")
 
@@ -87,51 +171,136 @@ class IBKRFetcherStreaming:
             self.connected = False
             print("✓ Disconnected from IBKR")
 
+    def add_update_listener(self, callback: Callable[[str, int], None]):
+        """注册数据更新监听器.
+
+        ticker 每次更新时（在 ib_insync 事件循环中）调用 callback("ib", recv_ns)。
+        注意：只有在 pump_events() / ib.sleep() 运行事件循环时才会触发。
+
+        Args:
+            callback: 回调函数
+        """
+        self._listeners.append(callback)
+
+    def _on_ticker_update(self, ticker):
+        """ticker.updateEvent 回调：刷新报价快照并通知所有监听器."""
+        recv_ns = time.perf_counter_ns()
+        try:
+            quote = self._read_ticker(ticker)
+
+            # 线程安全更新缓存（只交换引用）
+            with self._lock:
+                self._latest_quote = quote
+
+        except Exception as e:
+            print(f"Error processing ticker update: {e}")
+            return
+
+        for callback in self._listeners:
+            try:
+                callback("ib", recv_ns)
+            except Exception as e:
+                print(f"Warning: Update listener error: {e}")
+
+    @staticmethod
+    def _read_ticker(ticker) -> Dict[str, Any]:
+        """从 ticker 读取报价（NaN 转为 None）.
+
+        Args:
+            ticker: ib_insync Ticker
+
+        Returns:
+            报价快照字典，timestamp 为 ticker.time（TWS 时间戳，epoch 秒）
+        """
+        def valid(value):
+            """检查数值是否有效"""
+            return value if value is not None and not math.isnan(value) else None
+
+        bid = valid(ticker.bid)
+        ask = valid(ticker.ask)
+
+        # Calculate mid price
+        mid = None
+        if bid is not None and ask is not None:
+            mid = (bid + ask) / 2
+
+        return {
+            "bid": bid,
+            "ask": ask,
+            "last": valid(ticker.last),
+            "mid": mid,
+            "bid_size": valid(ticker.bidSize),
+            "ask_size": valid(ticker.askSize),
+            "timestamp": ticker.time.timestamp() if ticker.time else None
+        }
+
+    def pump_events(self, timeout: float = 0):
+        """运行 ib_insync 事件循环，处理已到达的行情消息.
+
+        行情只有在事件循环运行时才会到达，主循环应该用它代替 time.sleep()。
+
+        Args:
+            timeout: 运行事件循环的时间（秒），0 表示只处理已到达的消息，不等待
+        """
+        if self.ib and self.connected:
+            self.ib.sleep(timeout)
+        elif timeout > 0:
+            time.sleep(timeout)
+
     def get_stock_price(self) -> Dict[str, Optional[float]]:
         """Get current stock bid/ask prices from subscribed data stream.
 
         Returns:
-            Dictionary containing bid, ask, last, and mid prices
+            Dictionary containing bid, ask, last, mid, bid_size, ask_size
+            and timestamp (TWS time of the last tick, epoch seconds)
 
         Note:
-            This method reads from the live-updating ticker object.
-            Calls ib.sleep(0) to process incoming market data updates.
+            只读取 ticker.updateEvent 维护的快照，不运行事件循环、不等待。
+            事件循环由 pump_events() 推进。
         """
         if not self.connected or not self.ticker:
             print("Not connected or not subscribed to market data")
-            return {"bid": None, "ask": None, "last": None, "mid": None}
+            return self._empty_quote()
 
-        try:
-            import math
+        with self._lock:
+            return dict(self._latest_quote)
 
-            def is_valid_price(price):
-                """检查价格是否有效"""
-                return price is not None and not math.isnan(price)
+    def update_market_data(self, market_data) -> None:
+        """Write the latest stock bid/ask into market_data in place.
 
-            # 处理消息队列，让 ticker 接收最新更新
-            # 这很关键！不调用 sleep() 的话 ticker 不会自动更新
-            self.ib.sleep(0.1)  # 100ms 处理消息
+        Args:
+            market_data: trader.strategy.MarketData（主循环预先分配，每个 tick 复用）
 
-            # 从 ticker 读取最新数据
-            bid = self.ticker.bid if is_valid_price(self.ticker.bid) else None
-            ask = self.ticker.ask if is_valid_price(self.ticker.ask) else None
-            last = self.ticker.last if is_valid_price(self.ticker.last) else None
+        Note:
+            与 get_stock_price() 读取相同的快照，但不复制字典（事件驱动模式每个 tick 调用）。
+        """
+        if not self.connected or not self.ticker:
+            print("Not connected or not subscribed to market data")
+            market_data.spot_bid = market_data.spot_ask = None
+            return
 
-            # Calculate mid price
-            mid = None
-            if bid is not None and ask is not None:
-                mid = (bid + ask) / 2
+        with self._lock:
+            quote = self._latest_quote
+        market_data.spot_bid = quote["bid"]
+        market_data.spot_ask = quote["ask"]
 
-            return {
-                "bid": bid,
-                "ask": ask,
-                "last": last,
-                "mid": mid
-            }
+    def get_market_depth(self) -> L2OrderBook:
+        """Get the current market depth as an L2 orderbook snapshot.
 
-        except Exception as e:
-            print(f"Error reading stock price: {e}")
-            return {"bid": None, "ask": None, "last": None, "mid": None}
+        Returns:
+            L2OrderBook built from ticker.domBids / ticker.domAsks
+            (empty if market depth is not subscribed)
+        """
+        if not self.connected or not self.ticker or self.market_depth_rows <= 0:
+            return L2OrderBook.empty(self.symbol)
+
+        dom_bids = self.ticker.domBids
+        dom_asks = self.ticker.domAsks
+        return L2OrderBook(
+            self.symbol,
+            BookSide(True, [level.price for level in dom_bids], [level.size for level in dom_bids]),
+            BookSide(False, [level.price for level in dom_asks], [level.size for level in dom_asks]),
+        )
 
     def get_account_id(self) -> str:
         """获取账户ID.
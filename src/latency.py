@@ -0,0 +1,117 @@
+"""Latency primitives shared by the market data fetchers and the trading layer."""
+
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+
+class TickStamps(NamedTuple):
+    """一次 HL l2Book 更新在行情路径上的时间戳."""
+    exchange_ms: int     # 交易所时间戳 data["time"]（epoch 毫秒）
+    recv_wall_ns: int    # WebSocket 收到消息的墙钟时间（time.time_ns，与交易所时间比较）
+    recv_ns: int         # WebSocket 收到消息（time.perf_counter_ns）
+    parsed_ns: int       # 订单簿解析完成（time.perf_counter_ns）
+
+
+class LatencyHistogram:
+    """HDR 风格的对数-线性直方图（纳秒）.
+
+    小于 2**sub_bucket_bits 的值逐个计数；更大的值按 2 的幂分段，
+    每段再等分为 2**(sub_bucket_bits-1) 个子桶，相对误差不超过 2**-(sub_bucket_bits-1)。
+    record() 只做整数位运算和一次列表自增，内存固定，不保存样本。
+    每个直方图应只由一个线程写入；读取（抓取、百分位）可以在任意线程进行。
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7, max_value_ns: int = 60_000_000_000):
+        """初始化直方图.
+
+        Args:
+            sub_bucket_bits: 子桶位数（7 = 每段 64 个子桶，相对误差 < 1.6%）
+            max_value_ns: 可区分的最大值，更大的值计入最后一个桶
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self._linear = 1 << sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self.max_value_ns = max_value_ns
+        self._max_index = self._index(max_value_ns)
+        self.counts: List[int] = [0] * (self._max_index + 1)
+
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._linear:
+            return value
+        exponent = value.bit_length() - self.sub_bucket_bits
+        return self._linear + (exponent - 1) * self._half + ((value >> exponent) - self._half)
+
+    def bucket_bounds(self, index: int) -> Tuple[int, int]:
+        """桶的取值范围 [low, high)."""
+        if index < self._linear:
+            return index, index + 1
+        exponent, offset = divmod(index - self._linear, self._half)
+        mantissa = offset + self._half
+        return mantissa << (exponent + 1), (mantissa + 1) << (exponent + 1)
+
+    def record(self, value_ns: int):
+        """记录一个延迟样本（负值按 0 计，例如时钟偏差导致的负网络延迟）."""
+        if value_ns < 0:
+            value_ns = 0
+        index = self._index(value_ns) if value_ns < self.max_value_ns else self._max_index
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, p: float) -> Optional[float]:
+        """百分位延迟（纳秒，取所在桶的中点）.
+
+        Args:
+            p: 百分位（0-100）
+
+        Returns:
+            延迟（纳秒），无样本时返回 None
+        """
+        counts = list(self.counts)
+        count = sum(counts)
+        if count == 0:
+            return None
+        target = max(1, int(round(count * p / 100)))
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= target:
+                low, high = self.bucket_bounds(index)
+                return min((low + high - 1) / 2, self.max_ns)
+        return float(self.max_ns)
+
+    def cumulative_buckets(self, bounds_ns: Iterable[int]) -> Tuple[List[Tuple[int, int]], int]:
+        """按给定上界统计累计样本数（Prometheus histogram 的 le 桶）.
+
+        每个 HDR 桶按其下界归入上界 >= 下界的第一个输出桶，误差不超过一个 HDR 桶宽。
+
+        Returns:
+            ([(上界纳秒, 累计样本数)], 总样本数)，基于同一份计数快照
+        """
+        counts = list(self.counts)
+        result = []
+        index = 0
+        cumulative = 0
+        for bound in sorted(bounds_ns):
+            while index < len(counts) and self.bucket_bounds(index)[0] <= bound:
+                cumulative += counts[index]
+                index += 1
+            result.append((bound, cumulative))
+        return result, cumulative + sum(counts[index:])
+
+    def summary(self) -> str:
+        """格式化摘要（微秒）."""
+        if self.count == 0:
+            return "no samples"
+        return (
+            f"p50={self.percentile(50) / 1000:.1f}µs "
+            f"p99={self.percentile(99) / 1000:.1f}µs "
+            f"p99.9={self.percentile(99.9) / 1000:.1f}µs "
+            f"max={self.max_ns / 1000:.1f}µs "
+            f"(n={self.count})"
+        )
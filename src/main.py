@@ -1,14 +1,179 @@
 """Main data collection script: fetch Hyperliquid and IBKR data, push to Prometheus."""
 
+from typing import Any, Dict
 import os
 import time
+import asyncio
 import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 
 from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from hl_fetcher.ws_async import create_async_info
 from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
-from prom_pusher import PrometheusMetricsPusher
+from prom_pusher import PrometheusMetricsPusher, PrometheusMetricsExporter
+from recorder import TickRecorder
+from runtime import create_event_loop, shutdown_event_loop
+
+
+def wait_interval(ibkr_fetcher, seconds: float):
+    """等待下一次采集.
+
+    连接了 IBKR 时在等待期间运行 ib_insync 事件循环，行情快照由回调更新，
+    读取时无需再等待。
+
+    Args:
+        ibkr_fetcher: IBKR 数据获取器（可为 None）
+        seconds: 等待时间（秒）
+    """
+    if ibkr_fetcher:
+        ibkr_fetcher.pump_events(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def collect_metrics(hl_fetcher, ibkr_fetcher, args) -> Dict[str, Any]:
+    """读取两个数据流的最新缓存并打印.
+
+    Args:
+        hl_fetcher: Hyperliquid 数据获取器
+        ibkr_fetcher: IBKR 数据获取器（可为 None）
+        args: 命令行参数
+
+    Returns:
+        合并后的指标字典
+    """
+    # Fetch Hyperliquid metrics
+    print("Fetching metrics from Hyperliquid...")
+    hl_metrics = hl_fetcher.get_all_metrics()
+
+    # Fetch IBKR metrics
+    ibkr_metrics = {"spot_bid": None, "spot_ask": None}
+    if ibkr_fetcher:
+        # 检查市场时段（如果启用了仅常规交易时段）
+        should_fetch_ibkr = True
+        market_session = ibkr_fetcher.get_market_session()
+
+        if args.ibkr_regular_hours_only:
+            should_fetch_ibkr = (market_session == 'regular')
+            if not should_fetch_ibkr:
+                session_names = {
+                    'pre_market': '盘前',
+                    'after_hours': '盘后',
+                    'closed': '休市'
+                }
+                print(f"Market session: {session_names.get(market_session, market_session)} - Skipping IBKR data (regular hours only mode)")
+
+        if should_fetch_ibkr:
+            session_indicator = ""
+            if market_session == 'pre_market':
+                session_indicator = " [盘前]"
+            elif market_session == 'after_hours':
+                session_indicator = " [盘后]"
+            elif market_session == 'regular':
+                session_indicator = " [盘中]"
+
+            print(f"Fetching metrics from IBKR...{session_indicator}")
+            ibkr_data = ibkr_fetcher.get_stock_price()
+            ibkr_metrics = {
+                "spot_bid": ibkr_data.get("bid"),
+                "spot_ask": ibkr_data.get("ask")
+            }
+
+    # Merge metrics
+    metrics = {**hl_metrics, **ibkr_metrics}
+
+    # Display fetched metrics
+    print("\nFetched metrics:")
+    print(f"  Perp Bid:     ${metrics.get('perp_bid', 'N/A')}")
+    print(f"  Perp Ask:     ${metrics.get('perp_ask', 'N/A')}")
+    print(f"  Spot Bid:     ${metrics.get('spot_bid', 'N/A')}")
+    print(f"  Spot Ask:     ${metrics.get('spot_ask', 'N/A')}")
+
+    funding_rate = metrics.get('funding_rate')
+    if funding_rate is not None:
+        print(f"  Funding Rate: {funding_rate:.10f} (raw) = {funding_rate * 100:.8f}%")
+    else:
+        print(f"  Funding Rate: N/A")
+
+    return metrics
+
+
+def export_metrics(pusher, metrics: Dict[str, Any], args):
+    """把指标推送到 Push Gateway（push）或更新 /metrics 的内存值（pull）.
+
+    Args:
+        pusher: PrometheusMetricsPusher 或 PrometheusMetricsExporter
+        metrics: collect_metrics() 的结果
+        args: 命令行参数
+    """
+    # Push to Prometheus (pull mode only updates in-memory values)
+    if args.exporter_mode == "pull":
+        pusher.update_metrics(metrics)
+    else:
+        print("\nPushing metrics to Prometheus...")
+        success = pusher.update_and_push(metrics)
+
+        if success:
+            print("✓ Successfully pushed metrics to Prometheus")
+        else:
+            print("✗ Failed to push metrics to Prometheus")
+
+
+def run_collector(hl_fetcher, ibkr_fetcher, pusher, args):
+    """采集循环：每 args.interval 秒读取一次数据并导出（等待期间运行 ib_insync 事件循环）."""
+    iteration = 0
+    while True:
+        try:
+            iteration += 1
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            print(f"\n[{timestamp}] Iteration {iteration}")
+
+            metrics = collect_metrics(hl_fetcher, ibkr_fetcher, args)
+            export_metrics(pusher, metrics, args)
+
+            # Wait for next iteration
+            print(f"\nWaiting {args.interval} seconds until next fetch...")
+            wait_interval(ibkr_fetcher, args.interval)
+
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"\nError in main loop: {e}")
+            print(f"Retrying in {args.interval} seconds...")
+            wait_interval(ibkr_fetcher, args.interval)
+
+
+async def run_async_collector(hl_stream, hl_fetcher, ibkr_fetcher, pusher, args):
+    """asyncio 模式的采集循环：HL 推送和 IB 行情在同一个事件循环中更新缓存.
+
+    等待期间不再需要 pump_events()；push 模式的 HTTP 推送放到工作线程，
+    避免阻塞事件循环中的行情处理。
+    """
+    stream_task = asyncio.create_task(hl_stream.run())
+    iteration = 0
+    try:
+        while True:
+            try:
+                iteration += 1
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                print(f"\n[{timestamp}] Iteration {iteration}")
+
+                metrics = collect_metrics(hl_fetcher, ibkr_fetcher, args)
+                if args.exporter_mode == "pull":
+                    export_metrics(pusher, metrics, args)
+                else:
+                    await asyncio.to_thread(export_metrics, pusher, metrics, args)
+
+            except Exception as e:
+                print(f"\nError in main loop: {e}")
+                print(f"Retrying in {args.interval} seconds...")
+
+            print(f"\nWaiting {args.interval} seconds until next fetch...")
+            await asyncio.sleep(args.interval)
+    finally:
+        stream_task.cancel()
 
 
 def main():
@@ -98,11 +263,36 @@ def main():
         default=os.getenv("IBKR_REGULAR_HOURS_ONLY", "false").lower() == "true",
         help="Only fetch IBKR data during regular market hours (9:30 AM - 4:00 PM ET)"
     )
+    parser.add_argument(
+        "--exporter-mode",
+        choices=["push", "pull"],
+        default=os.getenv("EXPORTER_MODE", "push"),
+        help="push: push to the Push Gateway every iteration; pull: serve /metrics for Prometheus to scrape"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("METRICS_PORT", "8000")),
+        help="HTTP port for /metrics in pull mode (default: 8000)"
+    )
+    parser.add_argument(
+        "--asyncio",
+        dest="use_asyncio",
+        action="store_true",
+        default=os.getenv("ASYNCIO_RUNTIME", "false").lower() == "true",
+        help="Run the Hyperliquid WebSocket and ib_insync on one asyncio event loop"
+    )
+    parser.add_argument(
+        "--record-dir",
+        type=str,
+        default=os.getenv("RECORD_DIR"),
+        help="Record every HL/IB quote update to rotating .ticks files in this directory"
+    )
 
     args = parser.parse_args()
 
     # Validate push gateway URL
-    if not args.push_gateway:
+    if args.exporter_mode == "push" and not args.push_gateway:
         print("Error: Push Gateway URL is required. Set PUSH_GATEWAY_URL in .env or use --push-gateway")
         return
 
@@ -110,7 +300,10 @@ def main():
     print(f"Hyperliquid Symbol: {args.symbol}")
     print(f"Stock Symbol: {args.stock_symbol}")
     print(f"Interval: {args.interval}s")
-    print(f"Push Gateway: {args.push_gateway}")
+    if args.exporter_mode == "push":
+        print(f"Push Gateway: {args.push_gateway}")
+    else:
+        print(f"Metrics Endpoint: http://0.0.0.0:{args.metrics_port}/metrics")
     print(f"Using {'testnet' if args.testnet else 'mainnet'}")
     if args.no_ibkr:
         print(f"IBKR: Disabled")
@@ -119,17 +312,29 @@ def main():
         if args.ibkr_regular_hours_only:
             ibkr_mode += " - Regular hours only (9:30 AM - 4:00 PM ET)"
         print(f"IBKR: {ibkr_mode}")
+    if args.record_dir:
+        print(f"Tick Recording: {args.record_dir}")
+    if args.use_asyncio:
+        print(f"Runtime: asyncio (single event loop)")
     print("-" * 50)
 
     # Parse perp_dexs
     perp_dexs = [dex.strip() for dex in args.perp_dexs.split(",")] if args.perp_dexs else ["xyz"]
 
+    # asyncio 模式：HL WebSocket 和 ib_insync 共用主线程事件循环
+    loop = None
+    hl_stream = None
+    if args.use_asyncio:
+        loop = create_event_loop()
+        hl_stream = create_async_info(use_testnet=args.testnet, perp_dexs=perp_dexs)
+
     # Initialize Hyperliquid fetcher (WebSocket streaming mode)
     print("Initializing Hyperliquid WebSocket connection...")
     hl_fetcher = HyperliquidFetcherStreaming(
         symbol=args.symbol,
         use_testnet=args.testnet,
-        perp_dexs=perp_dexs
+        perp_dexs=perp_dexs,
+        info=hl_stream
     )
     print("-" * 50)
 
@@ -147,7 +352,8 @@ def main():
             account_id=account_id
         )
         # Try to connect (automatically subscribes to market data)
-        if not ibkr_fetcher.connect():
+        connected = loop.run_until_complete(ibkr_fetcher.connect_async()) if loop else ibkr_fetcher.connect()
+        if not connected:
             print("Warning: Could not connect to IBKR. Continuing without IBKR data.")
             ibkr_fetcher = None
         else:
@@ -162,94 +368,29 @@ def main():
             print(f"✓ Subscribed to {args.stock_symbol} real-time data stream")
             print("-" * 50)
 
-    # Initialize Prometheus pusher
-    pusher = PrometheusMetricsPusher(
-        push_gateway_url=args.push_gateway,
-        job_name=args.job_name
-    )
+    # Initialize tick recorder (fed by fetcher update callbacks)
+    recorder = None
+    if args.record_dir:
+        recorder = TickRecorder(args.record_dir)
+        recorder.attach(hl_fetcher=hl_fetcher, ib_fetcher=ibkr_fetcher)
+        print(f"✓ Recording ticks to {args.record_dir}")
+
+    # Initialize Prometheus pusher (push) or /metrics endpoint (pull)
+    if args.exporter_mode == "pull":
+        pusher = PrometheusMetricsExporter(port=args.metrics_port)
+        print(f"✓ Serving metrics on port {args.metrics_port}")
+    else:
+        pusher = PrometheusMetricsPusher(
+            push_gateway_url=args.push_gateway,
+            job_name=args.job_name
+        )
 
     # Main loop
-    iteration = 0
     try:
-        while True:
-            try:
-                iteration += 1
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                print(f"\n[{timestamp}] Iteration {iteration}")
-
-                # Fetch Hyperliquid metrics
-                print("Fetching metrics from Hyperliquid...")
-                hl_metrics = hl_fetcher.get_all_metrics()
-
-                # Fetch IBKR metrics
-                ibkr_metrics = {"spot_bid": None, "spot_ask": None}
-                if ibkr_fetcher:
-                    # 检查市场时段（如果启用了仅常规交易时段）
-                    should_fetch_ibkr = True
-                    market_session = ibkr_fetcher.get_market_session()
-
-                    if args.ibkr_regular_hours_only:
-                        should_fetch_ibkr = (market_session == 'regular')
-                        if not should_fetch_ibkr:
-                            session_names = {
-                                'pre_market': '盘前',
-                                'after_hours': '盘后',
-                                'closed': '休市'
-                            }
-                            print(f"Market session: {session_names.get(market_session, market_session)} - Skipping IBKR data (regular hours only mode)")
-
-                    if should_fetch_ibkr:
-                        session_indicator = ""
-                        if market_session == 'pre_market':
-                            session_indicator = " [盘前]"
-                        elif market_session == 'after_hours':
-                            session_indicator = " [盘后]"
-                        elif market_session == 'regular':
-                            session_indicator = " [盘中]"
-
-                        print(f"Fetching metrics from IBKR...{session_indicator}")
-                        ibkr_data = ibkr_fetcher.get_stock_price()
-                        ibkr_metrics = {
-                            "spot_bid": ibkr_data.get("bid"),
-                            "spot_ask": ibkr_data.get("ask")
-                        }
-
-                # Merge metrics
-                metrics = {**hl_metrics, **ibkr_metrics}
-
-                # Display fetched metrics
-                print("\nFetched metrics:")
-                print(f"  Perp Bid:     ${metrics.get('perp_bid', 'N/A')}")
-                print(f"  Perp Ask:     ${metrics.get('perp_ask', 'N/A')}")
-                print(f"  Spot Bid:     ${metrics.get('spot_bid', 'N/A')}")
-                print(f"  Spot Ask:     ${metrics.get('spot_ask', 'N/A')}")
-
-                funding_rate = metrics.get('funding_rate')
-                if funding_rate is not None:
-                    print(f"  Funding Rate: {funding_rate:.10f} (raw) = {funding_rate * 100:.8f}%")
-                else:
-                    print(f"  Funding Rate: N/A")
-
-                # Push to Prometheus
-                print("\nPushing metrics to Prometheus...")
-                success = pusher.update_and_push(metrics)
-
-                if success:
-                    print("✓ Successfully pushed metrics to Prometheus")
-                else:
-                    print("✗ Failed to push metrics to Prometheus")
-
-                # Wait for next iteration
-                print(f"\nWaiting {args.interval} seconds until next fetch...")
-                time.sleep(args.interval)
-
-            except KeyboardInterrupt:
-                raise
-            except Exception as e:
-                print(f"\nError in main loop: {e}")
-                print(f"Retrying in {args.interval} seconds...")
-                time.sleep(args.interval)
+        if loop:
+            loop.run_until_complete(run_async_collector(hl_stream, hl_fetcher, ibkr_fetcher, pusher, args))
+        else:
+            run_collector(hl_fetcher, ibkr_fetcher, pusher, args)
 
     except KeyboardInterrupt:
         print("\n\nReceived interrupt signal. Shutting down...")
@@ -262,6 +403,11 @@ def main():
         if hl_fetcher:
             print("  Closing Hyperliquid WebSocket...")
             hl_fetcher.close()
+        if recorder:
+            print("  Flushing tick recorder...")
+            recorder.close()
+        if loop:
+            shutdown_event_loop(loop, hl_stream)
 
     print("\nData collector stopped.")
 
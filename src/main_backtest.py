@@ -0,0 +1,158 @@
+"""Backtest the arbitrage strategy on recorded ticks."""
+
+import os
+import time
+import argparse
+from dotenv import load_dotenv
+
+from backtest import Backtester, CLOSE_REASONS, DEFAULT_GRID, grid_configs, random_configs, run_sweep, format_sweep_table
+from recorder import load_ticks
+from trader.config import StrategyConfig
+
+
+def run_parameter_sweep(ticks, config: StrategyConfig, args):
+    """网格 / 随机搜索策略参数并打印排名表.
+
+    Args:
+        ticks: 行情记录
+        config: 基础配置（未扫描的参数使用此配置）
+        args: 命令行参数
+    """
+    if args.samples > 0:
+        ranges = {name: (min(values), max(values)) for name, values in DEFAULT_GRID.items()}
+        configs = random_configs(ranges, args.samples, base=config)
+        mode = f"random search ({args.samples} samples)"
+    else:
+        configs = grid_configs(DEFAULT_GRID, base=config)
+        mode = f"grid search ({len(configs)} configs)"
+
+    print("=" * 70)
+    print(f"Parameter sweep: {mode} over {len(ticks):,} ticks")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    results = run_sweep(ticks, configs, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(format_sweep_table(results, top=args.top))
+    print(f"\n✓ Evaluated {len(configs)} configs in {elapsed:.2f}s")
+
+
+def main():
+    """Run a backtest over recorded tick files."""
+    # Load environment variables
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        description="Backtest the Hyperliquid-IB arbitrage strategy on recorded ticks"
+    )
+    parser.add_argument(
+        "ticks",
+        type=str,
+        nargs="?",
+        default=os.getenv("RECORD_DIR"),
+        help="A .ticks file or a directory of .ticks files (default: RECORD_DIR)"
+    )
+    parser.add_argument("--open-threshold", type=float, help="Override open_spread_threshold")
+    parser.add_argument("--close-threshold", type=float, help="Override close_spread_threshold")
+    parser.add_argument("--reverse-threshold", type=float, help="Override reverse_spread_threshold")
+    parser.add_argument("--min-funding", type=float, help="Override min_funding_rate")
+    parser.add_argument("--max-data-age", type=float, help="Override max_data_age (seconds)")
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Run a parameter sweep instead of a single backtest (grid over DEFAULT_GRID)"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=0,
+        help="With --sweep: random search with this many samples within the grid's ranges"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="With --sweep: worker processes (default: all cores)"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="With --sweep: number of ranked results to print"
+    )
+    parser.add_argument(
+        "--trades-csv",
+        type=str,
+        help="Write every trade to this CSV file"
+    )
+
+    args = parser.parse_args()
+
+    if not args.ticks:
+        print("Error: Tick file or directory is required. Set RECORD_DIR in .env or pass a path")
+        return
+
+    # Strategy configuration: environment first, then command line overrides
+    config = StrategyConfig()
+    if threshold := os.getenv("OPEN_SPREAD_THRESHOLD"):
+        config.open_spread_threshold = float(threshold)
+    if threshold := os.getenv("CLOSE_SPREAD_THRESHOLD"):
+        config.close_spread_threshold = float(threshold)
+    if threshold := os.getenv("REVERSE_SPREAD_THRESHOLD"):
+        config.reverse_spread_threshold = float(threshold)
+    if min_funding := os.getenv("MIN_FUNDING_RATE"):
+        config.min_funding_rate = float(min_funding)
+    if position_size := os.getenv("POSITION_SIZE"):
+        config.position_size = int(position_size)
+    if max_positions := os.getenv("MAX_POSITIONS"):
+        config.max_positions = int(max_positions)
+
+    if args.open_threshold is not None:
+        config.open_spread_threshold = args.open_threshold
+    if args.close_threshold is not None:
+        config.close_spread_threshold = args.close_threshold
+    if args.reverse_threshold is not None:
+        config.reverse_spread_threshold = args.reverse_threshold
+    if args.min_funding is not None:
+        config.min_funding_rate = args.min_funding
+    if args.max_data_age is not None:
+        config.max_data_age = args.max_data_age
+
+    ticks = load_ticks(args.ticks)
+    if len(ticks) == 0:
+        print(f"Error: No ticks found in {args.ticks}")
+        return
+
+    if args.sweep:
+        run_parameter_sweep(ticks, config, args)
+        return
+
+    print("=" * 70)
+    print("Hyperliquid-IB Arbitrage Backtest")
+    print("=" * 70)
+    print(f"Ticks: {args.ticks}")
+    print(f"  Open Spread Threshold:    {config.open_spread_threshold*100:.4f}%")
+    print(f"  Close Spread Threshold:   {config.close_spread_threshold*100:.4f}%")
+    print(f"  Reverse Spread Threshold: {config.reverse_spread_threshold*100:.4f}%")
+    print(f"  Min Funding Rate:         {config.min_funding_rate*100:.4f}%")
+    print(f"  Max Data Age:             {config.max_data_age}s")
+    print(f"  Position Size: {config.position_size} shares, Max Positions: {config.max_positions}")
+    print("-" * 70)
+
+    result = Backtester(config).run(ticks)
+    print(result.summary())
+
+    if args.trades_csv:
+        names = result.trades.dtype.names
+        with open(args.trades_csv, 'w') as f:
+            f.write(",".join(names) + "\n")
+            for trade in result.trades.tolist():
+                row = dict(zip(names, trade))
+                row["exit_reason"] = CLOSE_REASONS[row["exit_reason"]]
+                f.write(",".join(str(row[name]) for name in names) + "\n")
+        print(f"✓ Wrote {len(result.trades)} trades to {args.trades_csv}")
+
+
+if __name__ == "__main__":
+    main()
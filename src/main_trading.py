@@ -2,18 +2,328 @@
 
 import os
 import time
+import asyncio
 import argparse
+from typing import Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
 from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from hl_fetcher.ws_async import create_async_info
 from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
-from trader.strategy import ArbitrageStrategy, MarketData, SignalType
+from trader.strategy import ArbitrageStrategy, MarketData, SpreadAnalysis, SignalType
 from trader.ib_trader import IBTrader
 from trader.hl_trader import HLTrader
 from trader.executor import TradeExecutor
 from trader.position_manager import PositionManager
 from trader.config import StrategyConfig
+from trader.market_events import MarketEventQueue, AsyncMarketEventQueue
+from trader.latency import LatencyTracker
+from runtime import create_event_loop, shutdown_event_loop
+
+
+def build_market_data(hl_fetcher, ib_fetcher, config: StrategyConfig,
+                      market_data: Optional[MarketData] = None) -> MarketData:
+    """用两个数据获取器的最新缓存填充 MarketData.
+
+    Args:
+        hl_fetcher: Hyperliquid 数据获取器
+        ib_fetcher: IBKR 数据获取器
+        config: 策略配置
+        market_data: 预先分配的 MarketData；提供时原地更新（主循环每个 tick 复用同一个实例），
+            否则创建新对象
+
+    Returns:
+        MarketData 对象
+    """
+    if market_data is None:
+        market_data = MarketData()
+
+    hl_fetcher.update_market_data(market_data)
+    ib_fetcher.update_market_data(market_data)
+    market_data.timestamp = time.time()
+    if config.use_executable_spread:
+        market_data.perp_book = hl_fetcher.get_orderbook()
+        market_data.spot_book = ib_fetcher.get_market_depth()
+
+    return market_data
+
+
+class TickBuffers:
+    """主循环每个 tick 复用的行情和分析对象（预先分配，原地更新）.
+
+    executor 只在调用期间同步读取 market_data / analysis，不保存引用，复用是安全的。
+    decision_ns 是最近一次评估做出决策的时间（perf_counter_ns，在执行下单之前），
+    用于 tick-to-decision 延迟统计。
+    """
+
+    __slots__ = ("market_data", "open_analysis", "close_analysis", "decision_ns")
+
+    def __init__(self):
+        self.market_data = MarketData()
+        self.open_analysis = SpreadAnalysis()
+        self.close_analysis = SpreadAnalysis()
+        self.decision_ns = 0
+
+
+def evaluate_market(
+    market_data: MarketData,
+    strategy: ArbitrageStrategy,
+    config: StrategyConfig,
+    executor,
+    position_manager,
+    enable_trading: bool,
+    verbose: bool = True,
+    buffers: Optional[TickBuffers] = None
+) -> SignalType:
+    """计算价差、检查信号并（在交易模式下）执行交易.
+
+    Args:
+        market_data: 市场数据
+        strategy: 策略
+        config: 策略配置
+        executor: 交易执行器（监控模式为 None）
+        position_manager: 仓位管理器（监控模式为 None）
+        enable_trading: 是否启用交易
+        verbose: 是否打印价格和价差明细（信号始终打印）；False 时无信号路径不格式化原因字符串
+        buffers: 预先分配的分析对象；提供时开仓 / 平仓分析原地写入，不创建新对象，
+            并把决策时间（有信号时为信号触发时间，不含下单耗时）写入 buffers.decision_ns
+
+    Returns:
+        本次的开仓信号类型
+    """
+    open_signal = SignalType.NONE
+    decided_ns = 0    # 第一个触发的信号时间（执行下单之前）
+
+    if verbose:
+        # Display current prices
+        print(f"  Perp Bid:     ${market_data.perp_bid if market_data.perp_bid else 'N/A'}")
+        print(f"  Perp Ask:     ${market_data.perp_ask if market_data.perp_ask else 'N/A'}")
+        print(f"  Spot Bid:     ${market_data.spot_bid if market_data.spot_bid else 'N/A'}")
+        print(f"  Spot Ask:     ${market_data.spot_ask if market_data.spot_ask else 'N/A'}")
+        if market_data.funding_rate is not None:
+            print(f"  Funding Rate: {market_data.funding_rate:.10f} (raw) = {market_data.funding_rate*100:.8f}%")
+
+    # Calculate opening spread (for new positions)
+    open_analysis = strategy.calculate_spread(market_data, out=buffers.open_analysis if buffers else None)
+
+    if not open_analysis.is_valid:
+        if verbose:
+            print(f"\n  ⚠️  Invalid data: {open_analysis.reason}")
+        if buffers is not None:
+            buffers.decision_ns = time.perf_counter_ns()
+        return open_signal
+
+    if verbose:
+        print(f"\n  💹 Open Spread Analysis:")
+        print(f"    IB Buy Price:  ${open_analysis.ib_buy_price:.2f}")
+        print(f"    HL Sell Price: ${open_analysis.hl_sell_price:.2f}")
+        print(f"    Open Spread: {open_analysis.spread*100:+.4f}%")
+
+    # Check signals
+    if enable_trading and executor and position_manager:
+        # Check for close signals first
+        open_positions = position_manager.get_open_positions()
+        if open_positions:
+            # Calculate closing spread (for existing positions)
+            close_analysis = strategy.calculate_close_spread(market_data, out=buffers.close_analysis if buffers else None)
+
+            if close_analysis.is_valid:
+                if verbose:
+                    print(f"  💹 Close Spread: {close_analysis.spread*100:+.4f}%")
+
+                to_close = []
+                for pos in open_positions:
+                    close_signal, close_reason = strategy.get_close_signal(
+                        close_analysis,
+                        pos.entry_spread
+                    )
+
+                    if close_signal == SignalType.CLOSE_POSITION:
+                        print(f"\n  🔔 CLOSE SIGNAL: {close_reason}")
+                        print(f"  Closing position {pos.position_id}...")
+                        to_close.append(pos.position_id)
+
+                if to_close:
+                    decided_ns = close_analysis.decision_ns
+                if len(to_close) == 1:
+                    executor.close_arbitrage_position(
+                        to_close[0], market_data, decision_ns=close_analysis.decision_ns
+                    )
+                elif to_close:
+                    # 多个仓位同时平仓：一次批量提交
+                    executor.close_arbitrage_positions(
+                        to_close, market_data, decision_ns=close_analysis.decision_ns
+                    )
+            elif verbose:
+                print(f"  ⚠️  Cannot check close signals: {close_analysis.reason}")
+
+        # Check for open signals (if under max positions)
+        if len(open_positions) < config.max_positions:
+            open_signal, open_reason = strategy.get_open_signal(open_analysis, explain=verbose)
+
+            if open_signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP:
+                print(f"\n  🔔 OPEN SIGNAL: {open_reason}")
+                print(f"  Opening arbitrage position...")
+                decided_ns = decided_ns or open_analysis.decision_ns
+                executor.open_arbitrage_position(
+                    config.position_size,
+                    open_analysis
+                )
+    else:
+        # Monitor mode - just show signals
+        open_signal, open_reason = strategy.get_open_signal(open_analysis, explain=verbose)
+        if open_signal != SignalType.NONE and verbose:
+            print(f"\n  📢 Signal detected: {open_signal.value}")
+            print(f"     {open_reason}")
+            print(f"     (MONITOR MODE - no trade executed)")
+
+    if buffers is not None:
+        buffers.decision_ns = decided_ns or time.perf_counter_ns()
+    return open_signal
+
+
+def run_polling_loop(hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args):
+    """固定间隔轮询模式：每 args.interval 秒读取一次数据并检查信号."""
+    buffers = TickBuffers()
+    iteration = 0
+    while True:
+        iteration += 1
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        print(f"\n[{timestamp}] Iteration {iteration}")
+
+        # Fetch market data
+        market_data = build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)
+
+        evaluate_market(
+            market_data, strategy, config, executor, position_manager, args.enable_trading,
+            buffers=buffers
+        )
+
+        # Sleep（等待期间运行 ib_insync 事件循环接收行情）
+        print(f"\nWaiting {args.interval}s...")
+        ib_fetcher.pump_events(args.interval)
+
+
+def run_event_loop(hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args, latency_tracker):
+    """事件驱动模式：每次 HL l2Book / activeAssetCtx 或 IB ticker 更新都重新评估策略.
+
+    数据回调只向 MarketEventQueue 推送更新事件；突发的多次更新会被合并，
+    每次评估都读取最新快照。HL 回调在 WebSocket 线程中立即唤醒主循环，
+    IB 更新在主循环每次 pump_events() 时产生（最多等待 IB_PUMP_INTERVAL）。
+    """
+    event_queue = MarketEventQueue()
+    hl_fetcher.add_update_listener(event_queue.push)
+    ib_fetcher.add_update_listener(event_queue.push)
+
+    buffers = TickBuffers()   # 每次评估原地更新，不创建新对象
+    ib_pump_interval = float(os.getenv("IB_PUMP_INTERVAL", "0.001"))
+    stats_interval = 10.0
+    last_stats = time.time()
+    evaluations = 0
+    last_signal = SignalType.NONE
+
+    print(f"Event-driven mode: evaluating strategy on every market update")
+
+    while True:
+        # 推进 ib_insync 事件循环（触发 ticker.updateEvent）
+        ib_fetcher.pump_events()
+
+        batch = event_queue.wait(timeout=ib_pump_interval)
+        if batch:
+            market_data = build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)
+            signal = evaluate_market(
+                market_data, strategy, config, executor, position_manager,
+                args.enable_trading, verbose=False, buffers=buffers
+            )
+            latency_tracker.record_decision(buffers.decision_ns - min(batch.values()))
+            evaluations += 1
+
+            # 监控模式下只在信号变化时打印
+            if not args.enable_trading and signal != last_signal:
+                print(f"\n  📢 Signal changed: {last_signal.value} -> {signal.value} (MONITOR MODE)")
+            last_signal = signal
+
+        now = time.time()
+        if now - last_stats >= stats_interval:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(
+                f"[{timestamp}] events={event_queue.pushed} coalesced={event_queue.coalesced} "
+                f"evaluations={evaluations} tick-to-decision {latency_tracker.decision_summary()}"
+            )
+            last_stats = now
+
+
+async def run_async_loop(hl_stream, hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args,
+                         latency_tracker):
+    """asyncio 模式：HL 推送、IB 行情和策略评估都在主线程的同一个事件循环中运行.
+
+    HL 消息由 HyperliquidAsyncStream 在事件循环中读取并直接写入 fetcher 缓存，
+    IB ticker 随事件循环运行自动更新，不需要 pump_events() 轮询，也没有跨线程唤醒。
+    --event-driven 时每次更新都评估策略，否则每 args.interval 秒评估一次。
+    下单仍调用同步的 executor，不是协程：IB 等待（ib.waitOnUpdate）和 HL 等待
+    （HLOrderHandle.result、并发开仓时的 HL 腿）都嵌套运行事件循环，行情和 userFills
+    成交回报照常处理；HL 下单 HTTP 请求在网关线程池中发送。下单期间本协程暂停，
+    不会评估新的信号；盘口缓存为空时市价单保护价的 allMids 查询仍在循环线程上同步请求。
+    """
+    stream_task = asyncio.create_task(hl_stream.run())
+
+    event_queue = AsyncMarketEventQueue()
+    if args.event_driven:
+        hl_fetcher.add_update_listener(event_queue.push)
+        ib_fetcher.add_update_listener(event_queue.push)
+        print(f"Event-driven mode (asyncio): evaluating strategy on every market update")
+
+    buffers = TickBuffers()   # 每次评估原地更新，不创建新对象
+    stats_interval = 10.0
+    last_stats = time.time()
+    evaluations = 0
+    last_signal = SignalType.NONE
+    iteration = 0
+
+    try:
+        while True:
+            if args.event_driven:
+                batch = await event_queue.wait(timeout=stats_interval)
+                if batch:
+                    market_data = build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)
+                    signal = evaluate_market(
+                        market_data, strategy, config, executor, position_manager,
+                        args.enable_trading, verbose=False, buffers=buffers
+                    )
+                    latency_tracker.record_decision(buffers.decision_ns - min(batch.values()))
+                    evaluations += 1
+
+                    # 监控模式下只在信号变化时打印
+                    if not args.enable_trading and signal != last_signal:
+                        print(f"\n  📢 Signal changed: {last_signal.value} -> {signal.value} (MONITOR MODE)")
+                    last_signal = signal
+
+                now = time.time()
+                if now - last_stats >= stats_interval:
+                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    print(
+                        f"[{timestamp}] events={event_queue.pushed} coalesced={event_queue.coalesced} "
+                        f"evaluations={evaluations} hl_messages={hl_stream.messages} "
+                        f"tick-to-decision {latency_tracker.decision_summary()}"
+                    )
+                    last_stats = now
+            else:
+                iteration += 1
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                print(f"\n[{timestamp}] Iteration {iteration}")
+
+                market_data = build_market_data(hl_fetcher, ib_fetcher, config, buffers.market_data)
+                evaluate_market(
+                    market_data, strategy, config, executor, position_manager, args.enable_trading,
+                    buffers=buffers
+                )
+
+                print(f"\nWaiting {args.interval}s...")
+                await asyncio.sleep(args.interval)
+    finally:
+        stream_task.cancel()
 
 
 def main():
@@ -43,6 +353,25 @@ def main():
         default=float(os.getenv("FETCH_INTERVAL", "5")),
         help="Check interval in seconds (default: 5)"
     )
+    parser.add_argument(
+        "--event-driven",
+        action="store_true",
+        default=os.getenv("EVENT_DRIVEN", "false").lower() == "true",
+        help="Evaluate strategy on every market data update instead of polling every --interval"
+    )
+    parser.add_argument(
+        "--asyncio",
+        dest="use_asyncio",
+        action="store_true",
+        default=os.getenv("ASYNCIO_RUNTIME", "false").lower() == "true",
+        help="Run Hyperliquid WebSocket, ib_insync and the strategy on one asyncio event loop"
+    )
+    parser.add_argument(
+        "--concurrent-legs",
+        action="store_true",
+        default=os.getenv("CONCURRENT_EXECUTION", "false").lower() == "true",
+        help="Send the IB and Hyperliquid legs at the same time, then reconcile fills"
+    )
     parser.add_argument(
         "--enable-trading",
         action="store_true",
@@ -68,6 +397,19 @@ def main():
         help="IBKR port (default: 7497 for TWS paper)"
     )
 
+    parser.add_argument(
+        "--latency-dump",
+        type=str,
+        default=os.getenv("LATENCY_DUMP_FILE"),
+        help="Append per-trade latency breakdowns to this JSON Lines file (default: disabled)"
+    )
+    parser.add_argument(
+        "--latency-port",
+        type=int,
+        default=int(os.getenv("LATENCY_METRICS_PORT", "0")),
+        help="Serve latency histograms on /metrics at this port (default: 0 = disabled)"
+    )
+
     args = parser.parse_args()
 
     # Initialize strategy configuration
@@ -82,6 +424,8 @@ def main():
         config.position_size = int(position_size)
     if max_positions := os.getenv("MAX_POSITIONS"):
         config.max_positions = int(max_positions)
+    if executable := os.getenv("EXECUTABLE_SPREAD"):
+        config.use_executable_spread = executable.lower() == "true"
 
     print("=" * 70)
     print("Hyperliquid-IB Arbitrage Trading Bot")
@@ -89,12 +433,18 @@ def main():
     print(f"Symbol: {args.stock_symbol} ({args.symbol})")
     print(f"Mode: {'LIVE TRADING' if args.enable_trading else 'MONITOR ONLY'}")
     print(f"Network: {'TESTNET' if args.testnet else 'MAINNET'}")
-    print(f"Check Interval: {args.interval}s")
+    print(f"Execution: {'CONCURRENT LEGS' if args.concurrent_legs else 'SEQUENTIAL (IB first)'}")
+    if args.event_driven:
+        print(f"Check Mode: EVENT-DRIVEN (every market update)")
+    else:
+        print(f"Check Interval: {args.interval}s")
+    print(f"Runtime: {'ASYNCIO (single event loop)' if args.use_asyncio else 'THREADS (SDK WebSocket thread + ib_insync)'}")
     print("\nStrategy Configuration:")
     print(f"  Open Spread Threshold: {config.open_spread_threshold*100:.2f}%")
     print(f"  Min Funding Rate: {config.min_funding_rate*100:.4f}%")
     print(f"  Position Size: {config.position_size} shares")
     print(f"  Max Positions: {config.max_positions}")
+    print(f"  Spread Mode: {'EXECUTABLE (VWAP)' if config.use_executable_spread else 'TOP OF BOOK'}")
     print("=" * 70)
 
     if not args.enable_trading:
@@ -104,22 +454,42 @@ def main():
     # Initialize components
     print("\nInitializing components...")
 
+    # asyncio 模式：HL WebSocket 和 ib_insync 共用主线程事件循环
+    loop = None
+    hl_stream = None
+    if args.use_asyncio:
+        loop = create_event_loop()
+        hl_stream = create_async_info(use_testnet=args.testnet, perp_dexs=["xyz"])
+
+    # 行情到成交的逐阶段延迟统计
+    latency_tracker = LatencyTracker(dump_path=args.latency_dump)
+    if args.latency_port:
+        from prom_pusher import PrometheusMetricsExporter
+        PrometheusMetricsExporter(port=args.latency_port, latency_tracker=latency_tracker)
+
     # 1. Data fetchers
     hl_fetcher = HyperliquidFetcherStreaming(
         symbol=args.symbol,
         use_testnet=args.testnet,
-        perp_dexs=["xyz"]
+        perp_dexs=["xyz"],
+        info=hl_stream,
+        latency_tracker=latency_tracker
     )
 
     ib_fetcher = IBKRFetcherStreaming(
         symbol=args.stock_symbol,
         host=args.ibkr_host,
         port=args.ibkr_port,
-        client_id=1  # Data fetcher uses client_id=1
+        client_id=1,  # Data fetcher uses client_id=1
+        # 可成交价差模式需要 IB 市场深度
+        market_depth_rows=int(os.getenv("MARKET_DEPTH_ROWS", "10")) if config.use_executable_spread else 0
     )
 
-    if not ib_fetcher.connect():
+    connected = loop.run_until_complete(ib_fetcher.connect_async()) if loop else ib_fetcher.connect()
+    if not connected:
         print("❌ Failed to connect to IBKR")
+        if loop:
+            shutdown_event_loop(loop, hl_stream)
         return
 
     # 2. Strategy
@@ -136,35 +506,47 @@ def main():
             print("❌ HYPERLIQUID_PRIVATE_KEY not set in .env file")
             print("Trading mode requires a private key")
             ib_fetcher.disconnect()
+            if loop:
+                shutdown_event_loop(loop, hl_stream)
             return
 
         # Position manager
         position_data_file = os.getenv("POSITION_DATA_FILE", "positions.json")
-        position_manager = PositionManager(position_data_file)
+        position_storage = os.getenv("POSITION_STORAGE", "json")
+        position_manager = PositionManager(position_data_file, storage=position_storage)
 
         # Trading interfaces
         ib_trader = IBTrader(
             host=args.ibkr_host,
             port=args.ibkr_port,
-            client_id=2  # Trader uses different client_id
+            client_id=2,  # Trader uses different client_id
+            symbols=[args.stock_symbol]
         )
 
         hl_trader = HLTrader(
             private_key=private_key,
             use_testnet=args.testnet,
-            perp_dexs=["xyz"]
+            perp_dexs=["xyz"],
+            # userFills 成交回报共用行情 WebSocket；asyncio 模式下由主线程事件循环分发，
+            # 等待订单时 HLOrderHandle.result() 嵌套运行该循环，成交照常到达
+            stream_info=hl_fetcher.info,
+            price_source=hl_fetcher         # 市价单保护价使用缓存盘口
         )
 
         # Connect traders
         if not ib_trader.connect():
             print("❌ Failed to connect IB Trader")
             ib_fetcher.disconnect()
+            if loop:
+                shutdown_event_loop(loop, hl_stream)
             return
 
         if not hl_trader.connect():
             print("❌ Failed to connect HL Trader")
             ib_trader.disconnect()
             ib_fetcher.disconnect()
+            if loop:
+                shutdown_event_loop(loop, hl_stream)
             return
 
         # Executor
@@ -173,7 +555,9 @@ def main():
             hl_trader=hl_trader,
             position_manager=position_manager,
             symbol=args.stock_symbol,
-            hl_symbol=args.symbol
+            hl_symbol=args.symbol,
+            concurrent_legs=args.concurrent_legs,
+            latency_tracker=latency_tracker
         )
 
         print("✓ Trading components initialized")
@@ -190,109 +574,37 @@ def main():
     print("=" * 70)
 
     # Main loop
-    iteration = 0
     try:
-        while True:
-            iteration += 1
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            print(f"\n[{timestamp}] Iteration {iteration}")
-
-            # Fetch market data
-            hl_metrics = hl_fetcher.get_all_metrics()
-            ib_data = ib_fetcher.get_stock_price()
-
-            # Create MarketData object
-            market_data = MarketData(
-                perp_bid=hl_metrics.get("perp_bid"),
-                perp_ask=hl_metrics.get("perp_ask"),
-                funding_rate=hl_metrics.get("funding_rate"),
-                spot_bid=ib_data.get("bid"),
-                spot_ask=ib_data.get("ask"),
-                timestamp=time.time()
-            )
-
-            # Display current prices
-            print(f"  Perp Bid:     ${market_data.perp_bid if market_data.perp_bid else 'N/A'}")
-            print(f"  Perp Ask:     ${market_data.perp_ask if market_data.perp_ask else 'N/A'}")
-            print(f"  Spot Bid:     ${market_data.spot_bid if market_data.spot_bid else 'N/A'}")
-            print(f"  Spot Ask:     ${market_data.spot_ask if market_data.spot_ask else 'N/A'}")
-            if market_data.funding_rate is not None:
-                print(f"  Funding Rate: {market_data.funding_rate:.10f} (raw) = {market_data.funding_rate*100:.8f}%")
-
-            # Calculate opening spread (for new positions)
-            open_analysis = strategy.calculate_spread(market_data)
-
-            if open_analysis.is_valid:
-                print(f"\n  💹 Open Spread Analysis:")
-                print(f"    IB Buy Price:  ${open_analysis.ib_buy_price:.2f}")
-                print(f"    HL Sell Price: ${open_analysis.hl_sell_price:.2f}")
-                print(f"    Open Spread: {open_analysis.spread*100:+.4f}%")
-
-                # Check signals
-                if args.enable_trading and executor and position_manager:
-                    # Check for close signals first
-                    open_positions = position_manager.get_open_positions()
-                    if open_positions:
-                        # Calculate closing spread (for existing positions)
-                        close_analysis = strategy.calculate_close_spread(market_data)
-
-                        if close_analysis.is_valid:
-                            print(f"  💹 Close Spread: {close_analysis.spread*100:+.4f}%")
-
-                            for pos in open_positions:
-                                close_signal, close_reason = strategy.get_close_signal(
-                                    close_analysis,
-                                    pos.entry_spread
-                                )
-
-                                if close_signal == SignalType.CLOSE_POSITION:
-                                    print(f"\n  🔔 CLOSE SIGNAL: {close_reason}")
-                                    print(f"  Closing position {pos.position_id}...")
-                                    executor.close_arbitrage_position(pos.position_id, market_data)
-                        else:
-                            print(f"  ⚠️  Cannot check close signals: {close_analysis.reason}")
-
-                    # Check for open signals (if under max positions)
-                    if len(open_positions) < config.max_positions:
-                        open_signal, open_reason = strategy.get_open_signal(open_analysis)
-
-                        if open_signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP:
-                            print(f"\n  🔔 OPEN SIGNAL: {open_reason}")
-                            print(f"  Opening arbitrage position...")
-                            executor.open_arbitrage_position(
-                                config.position_size,
-                                open_analysis
-                            )
-                else:
-                    # Monitor mode - just show signals
-                    open_signal, open_reason = strategy.get_open_signal(open_analysis)
-                    if open_signal != SignalType.NONE:
-                        print(f"\n  📢 Signal detected: {open_signal.value}")
-                        print(f"     {open_reason}")
-                        print(f"     (MONITOR MODE - no trade executed)")
-
-            else:
-                print(f"\n  ⚠️  Invalid data: {open_analysis.reason}")
-
-            # Sleep
-            print(f"\nWaiting {args.interval}s...")
-            time.sleep(args.interval)
+        if loop:
+            loop.run_until_complete(run_async_loop(
+                hl_stream, hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args,
+                latency_tracker
+            ))
+        elif args.event_driven:
+            run_event_loop(hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args,
+                           latency_tracker)
+        else:
+            run_polling_loop(hl_fetcher, ib_fetcher, strategy, config, executor, position_manager, args)
 
     except KeyboardInterrupt:
         print("\n\n⚠️  Shutting down...")
     finally:
         # Cleanup
         print("\nCleaning up...")
-        ib_fetcher.disconnect()
-        hl_fetcher.close()
-
         if args.enable_trading and executor:
             executor.ib_trader.disconnect()
+            executor.hl_trader.disconnect()
             print("Trading connections closed")
 
+        ib_fetcher.disconnect()
+        hl_fetcher.close()
+
+        if loop:
+            shutdown_event_loop(loop, hl_stream)
+
         # Display final statistics
         if position_manager:
+            position_manager.close()  # 写完待持久化的仓位事件
             stats = position_manager.get_statistics()
             print("\n" + "=" * 70)
             print("Session Statistics:")
@@ -302,6 +614,11 @@ def main():
             print(f"  Total PnL: ${stats['total_pnl']:.2f}")
             print("=" * 70)
 
+        latency_summary = latency_tracker.summary()
+        if latency_summary:
+            print("\nLatency (tick-to-trade stages):")
+            print(latency_summary)
+
     print("\n✓ Trading bot stopped")
 
 
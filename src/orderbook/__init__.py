@@ -0,0 +1,9 @@
+"""
+订单簿模块
+
+提供紧凑的数组化 L2 订单簿快照，供数据获取器和策略共享。
+"""
+
+from .book import BookSide, L2OrderBook
+
+__all__ = ['BookSide', 'L2OrderBook']
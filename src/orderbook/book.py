@@ -0,0 +1,185 @@
+"""Array-backed L2 order book snapshots."""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+
+class BookSide:
+    """单边价格档位.
+
+    价格、数量、累计数量、累计金额分别存放在紧凑的 array('d') 中，按成交优先级排序：
+    - bids: 价格从高到低
+    - asks: 价格从低到高
+
+    创建后不再修改，可以在线程之间安全共享。
+    """
+
+    __slots__ = ("is_bid", "prices", "sizes", "cum_sizes", "cum_notional", "_keys")
+
+    def __init__(self, is_bid: bool, prices: Sequence[float] = (), sizes: Sequence[float] = ()):
+        """初始化单边档位.
+
+        Args:
+            is_bid: True = 买盘，False = 卖盘
+            prices: 价格序列（已按成交优先级排序）
+            sizes: 每档数量
+        """
+        self.is_bid = is_bid
+        self.prices = array('d', prices)
+        self.sizes = array('d', sizes)
+        self.cum_sizes = array('d', accumulate(self.sizes))
+        self.cum_notional = array('d', accumulate(p * q for p, q in zip(self.prices, self.sizes)))
+
+        # 二分查找用的升序 key（买盘取负数，使其单调递增）
+        self._keys = array('d', (-p for p in self.prices)) if is_bid else self.prices
+
+    @classmethod
+    def from_levels(cls, is_bid: bool, levels: List[Dict[str, Any]]) -> 'BookSide':
+        """从 Hyperliquid l2Book 档位列表创建.
+
+        Args:
+            is_bid: 是否为买盘
+            levels: [{"px": "180.5", "sz": "12.0", "n": 3}, ...]
+        """
+        return cls(
+            is_bid,
+            [float(level["px"]) for level in levels],
+            [float(level["sz"]) for level in levels],
+        )
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def best_price(self) -> Optional[float]:
+        """最优价格（O(1)）."""
+        return self.prices[0] if self.prices else None
+
+    @property
+    def best_size(self) -> Optional[float]:
+        """最优价格上的数量（O(1)）."""
+        return self.sizes[0] if self.sizes else None
+
+    @property
+    def total_size(self) -> float:
+        """全部档位的总数量（O(1)）."""
+        return self.cum_sizes[-1] if self.cum_sizes else 0.0
+
+    def depth(self, levels: int) -> List[Tuple[float, float]]:
+        """返回前 N 档 (价格, 数量).
+
+        Args:
+            levels: 档位数量
+        """
+        n = min(levels, len(self.prices))
+        return list(zip(self.prices[:n], self.sizes[:n]))
+
+    def size_at_or_better(self, price: float) -> float:
+        """价格不差于 price 的累计数量（O(log n)）.
+
+        买盘统计 px >= price 的档位，卖盘统计 px <= price 的档位。
+
+        Args:
+            price: 价格
+
+        Returns:
+            累计数量
+        """
+        key = -price if self.is_bid else price
+        idx = bisect_right(self._keys, key)
+        return self.cum_sizes[idx - 1] if idx else 0.0
+
+    def vwap(self, quantity: float) -> Optional[float]:
+        """吃掉 quantity 数量时的成交均价（O(log n)）.
+
+        在累计数量数组上二分找到最后一个需要吃的档位，
+        前面整档的金额直接取累计金额，最后一档只取剩余部分。
+
+        Args:
+            quantity: 成交数量（正数）
+
+        Returns:
+            成交均价，深度不足或数量无效时返回 None
+        """
+        if quantity <= 0:
+            return None
+
+        idx = bisect_left(self.cum_sizes, quantity)
+        if idx >= len(self.cum_sizes):
+            return None  # 深度不足
+
+        filled = self.cum_sizes[idx - 1] if idx else 0.0
+        notional = self.cum_notional[idx - 1] if idx else 0.0
+        notional += (quantity - filled) * self.prices[idx]
+        return notional / quantity
+
+
+class L2OrderBook:
+    """L2 订单簿快照（不可变）.
+
+    每条 l2Book 消息在锁外解析成一个新快照，读写双方只需要交换引用。
+    """
+
+    __slots__ = ("coin", "bids", "asks", "timestamp")
+
+    def __init__(self, coin: str, bids: BookSide, asks: BookSide, timestamp: Optional[int] = None):
+        """初始化订单簿快照.
+
+        Args:
+            coin: 交易对
+            bids: 买盘
+            asks: 卖盘
+            timestamp: 交易所时间戳（毫秒）
+        """
+        self.coin = coin
+        self.bids = bids
+        self.asks = asks
+        self.timestamp = timestamp
+
+    @classmethod
+    def empty(cls, coin: str = "") -> 'L2OrderBook':
+        """创建空订单簿."""
+        return cls(coin, BookSide(True), BookSide(False))
+
+    @classmethod
+    def from_message(cls, data: Dict[str, Any]) -> 'L2OrderBook':
+        """从 l2Book 消息的 data 部分创建.
+
+        Args:
+            data: {"coin": "xyz:NVDA", "levels": [[bids], [asks]], "time": timestamp_ms}
+        """
+        levels = data.get("levels") or [[], []]
+        return cls(
+            data.get("coin", ""),
+            BookSide.from_levels(True, levels[0]),
+            BookSide.from_levels(False, levels[1]),
+            data.get("time"),
+        )
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best_price
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best_price
+
+    @property
+    def mid(self) -> Optional[float]:
+        """中间价."""
+        if not self.bids.prices or not self.asks.prices:
+            return None
+        return (self.bids.prices[0] + self.asks.prices[0]) / 2
+
+    def depth(self, levels: int) -> Dict[str, List[Tuple[float, float]]]:
+        """返回双边前 N 档.
+
+        Args:
+            levels: 档位数量
+
+        Returns:
+            {"bids": [(px, sz), ...], "asks": [(px, sz), ...]}
+        """
+        return {"bids": self.bids.depth(levels), "asks": self.asks.depth(levels)}
@@ -1,9 +1,12 @@
 """
 Prometheus 指标推送模块
 
-提供将数据推送到 Prometheus Push Gateway 的功能。
+提供将数据推送到 Prometheus Push Gateway 的功能，
+以及供 Prometheus 抓取的进程内 /metrics 端点（含延迟直方图）。
 """
 
-from .pusher import PrometheusMetricsPusher
+from .pusher import PrometheusMetricsPusher, METRIC_DEFINITIONS
+from .exporter import PrometheusMetricsExporter
+from .latency_collector import LatencyHistogramCollector
 
-__all__ = ['PrometheusMetricsPusher']
+__all__ = ['PrometheusMetricsPusher', 'PrometheusMetricsExporter', 'LatencyHistogramCollector', 'METRIC_DEFINITIONS']
@@ -0,0 +1,89 @@
+"""Prometheus /metrics endpoint exporter for Hyperliquid data."""
+
+from typing import Dict, Optional
+from prometheus_client import CollectorRegistry, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from .pusher import METRIC_DEFINITIONS
+from .latency_collector import LatencyHistogramCollector
+
+
+class PrometheusMetricsExporter:
+    """Serves the hyib_arb_* gauges on an in-process HTTP endpoint for Prometheus to scrape.
+
+    与 PrometheusMetricsPusher 接口相同（update_metrics / push_metrics / update_and_push），
+    可以直接替换。更新指标只是把最新值写入字典（不加锁、不做网络调用），
+    Prometheus 抓取时由 HTTP 服务线程读取当前值，采集频率与导出频率完全解耦。
+    """
+
+    def __init__(self, port: int = 8000, addr: str = "0.0.0.0", latency_tracker=None):
+        """Initialize the exporter and start the HTTP server.
+
+        Args:
+            port: HTTP port serving /metrics
+            addr: Address to bind
+            latency_tracker: trader.latency.LatencyTracker，同时导出延迟直方图（可选）
+        """
+        self.port = port
+        self.addr = addr
+
+        # 最新值（None 表示尚未收到，抓取时不输出该指标）
+        self._values: Dict[str, Optional[float]] = dict.fromkeys(METRIC_DEFINITIONS)
+
+        self.registry = CollectorRegistry()
+        self.registry.register(self)
+        if latency_tracker is not None:
+            self.registry.register(LatencyHistogramCollector(latency_tracker))
+
+        self._server, self._thread = start_http_server(port, addr=addr, registry=self.registry)
+
+    def collect(self):
+        """Prometheus 抓取回调（在 HTTP 服务线程中运行）."""
+        for key, (name, documentation) in METRIC_DEFINITIONS.items():
+            value = self._values[key]
+            if value is not None:
+                yield GaugeMetricFamily(name, documentation, value=value)
+
+    def update_metrics(self, metrics: Dict[str, Optional[float]]) -> None:
+        """Update all metrics with new values.
+
+        Args:
+            metrics: Dictionary containing all metric values
+
+        Note:
+            与推送模式相同：价格数据小于 0 的会被过滤掉，Funding rate 可以为负数
+        """
+        values = self._values
+        for key in ("perp_bid", "perp_ask", "spot_bid", "spot_ask"):
+            value = metrics.get(key)
+            if value is not None and value >= 0:
+                values[key] = value
+
+        funding_rate = metrics.get("funding_rate")
+        if funding_rate is not None:
+            values["funding_rate"] = funding_rate
+
+    def push_metrics(self) -> bool:
+        """No-op: Prometheus pulls from /metrics.
+
+        Returns:
+            Always True
+        """
+        return True
+
+    def update_and_push(self, metrics: Dict[str, Optional[float]]) -> bool:
+        """Update metrics (kept for interface compatibility with the pusher).
+
+        Args:
+            metrics: Dictionary containing all metric values
+
+        Returns:
+            Always True
+        """
+        self.update_metrics(metrics)
+        return True
+
+    def close(self) -> None:
+        """Stop the HTTP server."""
+        self._server.shutdown()
+        self._server.server_close()
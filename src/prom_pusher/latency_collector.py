@@ -0,0 +1,66 @@
+"""Prometheus collector exposing tick-to-trade latency histograms."""
+
+from typing import Iterable
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+
+
+# Prometheus histogram 桶上界（纳秒）：1µs ~ 10s，1-2-5 序列
+LATENCY_BUCKETS_NS = tuple(
+    int(mantissa * 10 ** exponent)
+    for exponent in range(3, 10)
+    for mantissa in (1, 2, 5)
+) + (10_000_000_000,)
+
+# 额外导出的百分位
+LATENCY_QUANTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogramCollector:
+    """把 trader.latency.LatencyTracker 的各阶段直方图导出为 Prometheus 指标.
+
+    抓取时才把 HDR 直方图折算成固定的 le 桶和百分位，记录路径上没有任何额外开销。
+    - hyib_arb_latency_seconds{segment=...}: histogram
+    - hyib_arb_latency_quantile_seconds{segment=..., quantile=...}: gauge
+    """
+
+    def __init__(self, tracker, buckets_ns: Iterable[int] = LATENCY_BUCKETS_NS,
+                 quantiles: Iterable[float] = LATENCY_QUANTILES):
+        """Initialize the collector.
+
+        Args:
+            tracker: LatencyTracker
+            buckets_ns: histogram 桶上界（纳秒）
+            quantiles: 导出的百分位（0-100）
+        """
+        self.tracker = tracker
+        self.buckets_ns = tuple(sorted(buckets_ns))
+        self.quantiles = tuple(quantiles)
+
+    def collect(self):
+        """Prometheus 抓取回调（在 HTTP 服务线程中运行）."""
+        histogram = HistogramMetricFamily(
+            "hyib_arb_latency_seconds",
+            "Tick-to-trade latency by stage",
+            labels=["segment"]
+        )
+        quantiles = GaugeMetricFamily(
+            "hyib_arb_latency_quantile_seconds",
+            "Tick-to-trade latency quantiles by stage",
+            labels=["segment", "quantile"]
+        )
+
+        for segment, hist in sorted(self.tracker.histograms.items()):
+            if not hist.count:
+                continue
+            cumulative, total = hist.cumulative_buckets(self.buckets_ns)
+            buckets = [(f"{bound / 1e9:g}", count) for bound, count in cumulative]
+            buckets.append(("+Inf", total))
+            histogram.add_metric([segment], buckets, sum_value=hist.total_ns / 1e9)
+
+            for q in self.quantiles:
+                value = hist.percentile(q)
+                if value is not None:
+                    quantiles.add_metric([segment, f"{q / 100:g}"], value / 1e9)
+
+        yield histogram
+        yield quantiles
@@ -4,6 +4,16 @@ from typing import Dict, Optional
 from prometheus_client import CollectorRegistry, Gauge, push_to_gateway
 
 
+# 指标定义：metrics 字典的键 -> (指标名, 说明)，推送模式和拉取模式共用
+METRIC_DEFINITIONS = {
+    "perp_bid": ("hyib_arb_perp_bid", "Perpetual contract bid price for NVDA"),
+    "perp_ask": ("hyib_arb_perp_ask", "Perpetual contract ask price for NVDA"),
+    "spot_bid": ("hyib_arb_spot_bid", "Spot market bid price for NVDA"),
+    "spot_ask": ("hyib_arb_spot_ask", "Spot market ask price for NVDA"),
+    "funding_rate": ("hyib_arb_funding_rate", "Funding rate for NVDA perpetual contract"),
+}
+
+
 class PrometheusMetricsPusher:
     """Pushes Hyperliquid metrics to Prometheus Push Gateway."""
 
@@ -19,35 +29,11 @@ class PrometheusMetricsPusher:
         self.registry = CollectorRegistry()
 
         # Define all metrics
-        self.perp_bid_gauge = Gauge(
-            "hyib_arb_perp_bid",
-            "Perpetual contract bid price for NVDA",
-            registry=self.registry
-        )
-
-        self.perp_ask_gauge = Gauge(
-            "hyib_arb_perp_ask",
-            "Perpetual contract ask price for NVDA",
-            registry=self.registry
-        )
-
-        self.spot_bid_gauge = Gauge(
-            "hyib_arb_spot_bid",
-            "Spot market bid price for NVDA",
-            registry=self.registry
-        )
-
-        self.spot_ask_gauge = Gauge(
-            "hyib_arb_spot_ask",
-            "Spot market ask price for NVDA",
-            registry=self.registry
-        )
-
-        self.funding_rate_gauge = Gauge(
-            "hyib_arb_funding_rate",
-            "Funding rate for NVDA perpetual contract",
-            registry=self.registry
-        )
+        self.perp_bid_gauge = Gauge(*METRIC_DEFINITIONS["perp_bid"], registry=self.registry)
+        self.perp_ask_gauge = Gauge(*METRIC_DEFINITIONS["perp_ask"], registry=self.registry)
+        self.spot_bid_gauge = Gauge(*METRIC_DEFINITIONS["spot_bid"], registry=self.registry)
+        self.spot_ask_gauge = Gauge(*METRIC_DEFINITIONS["spot_ask"], registry=self.registry)
+        self.funding_rate_gauge = Gauge(*METRIC_DEFINITIONS["funding_rate"], registry=self.registry)
 
     def _is_valid_price(self, value: Optional[float]) -> bool:
         """验证价格数据是否有效（非空且非负）.
@@ -0,0 +1,9 @@
+"""
+行情记录模块
+
+把两个交易所的实时报价记录成可内存映射的列式文件，供回测和盘后分析使用。
+"""
+
+from .tick_recorder import TickRecorder, TICK_DTYPE, SOURCE_IDS, open_tick_file, load_ticks
+
+__all__ = ['TickRecorder', 'TICK_DTYPE', 'SOURCE_IDS', 'open_tick_file', 'load_ticks']
@@ -0,0 +1,284 @@
+"""Tick recorder: persists both venues' quotes to memory-mappable columnar files."""
+
+from typing import List, Optional, Sequence, Union
+from pathlib import Path
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+
+
+# 每条记录是触发时刻两个交易所的完整报价状态（缺失值为 NaN / 0）
+# 文件是该结构的原始小端字节流，无文件头，可直接 np.memmap
+TICK_DTYPE = np.dtype([
+    ("ts_ns", "<i8"),          # 记录时间（epoch 纳秒）
+    ("source", "u1"),          # 触发记录的数据源，见 SOURCE_IDS
+    ("perp_recv_ns", "<i8"),   # 最近一次 HL 行情的接收时间（epoch 纳秒，0 = 尚未收到）
+    ("spot_recv_ns", "<i8"),   # 最近一次 IB 行情的接收时间（epoch 纳秒，0 = 尚未收到）
+    ("perp_exch_ms", "<i8"),   # HL l2Book 交易所时间戳（毫秒）
+    ("perp_bid", "<f8"),
+    ("perp_ask", "<f8"),
+    ("perp_bid_sz", "<f8"),
+    ("perp_ask_sz", "<f8"),
+    ("spot_bid", "<f8"),
+    ("spot_ask", "<f8"),
+    ("spot_bid_sz", "<f8"),
+    ("spot_ask_sz", "<f8"),
+    ("funding_rate", "<f8"),
+])
+
+SOURCE_IDS = {"hl_book": 0, "hl_ctx": 1, "ib": 2}
+
+TICK_FILE_SUFFIX = ".ticks"
+
+_NAN = float("nan")
+
+
+def _num(value) -> float:
+    """None 转为 NaN."""
+    return _NAN if value is None else value
+
+
+class TickRecorder:
+    """行情记录器.
+
+    作为 HyperliquidFetcherStreaming / IBKRFetcherStreaming 的更新监听器，
+    每次任一交易所行情变化时记录一行两边的完整报价。
+
+    热路径（回调线程）只更新内存中的当前状态并向列表追加一个元组；
+    后台线程按批次（batch_size 行或 flush_interval 秒）转换成结构化数组
+    追加写入文件，并按行数 / 时间滚动文件。
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str = "ticks",
+        batch_size: int = 4096,
+        flush_interval: float = 1.0,
+        rotate_rows: int = 5_000_000,
+        rotate_seconds: float = 3600.0
+    ):
+        """初始化行情记录器.
+
+        Args:
+            output_dir: 输出目录
+            prefix: 文件名前缀（文件名为 {prefix}_{YYYYmmdd_HHMMSS}.ticks）
+            batch_size: 累计多少行触发一次写入
+            flush_interval: 最长多久写入一次（秒）
+            rotate_rows: 单个文件最多行数
+            rotate_seconds: 单个文件最长覆盖时间（秒）
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_rows = rotate_rows
+        self.rotate_seconds = rotate_seconds
+
+        self._hl_fetcher = None
+        self._ib_fetcher = None
+
+        # 当前报价状态（按 TICK_DTYPE 字段顺序，不含 ts_ns/source）
+        self._perp_recv_ns = 0
+        self._spot_recv_ns = 0
+        self._perp_exch_ms = 0
+        self._perp = (_NAN, _NAN, _NAN, _NAN)   # bid, ask, bid_sz, ask_sz
+        self._spot = (_NAN, _NAN, _NAN, _NAN)
+        self._funding = _NAN
+
+        self._lock = threading.Lock()
+        self._batch: List[tuple] = []
+        self._flush_event = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 文件状态（仅写线程访问）
+        self._file = None
+        self._file_rows = 0
+        self._file_opened_at = 0.0
+
+        # 统计
+        self.rows_recorded = 0
+        self.rows_written = 0
+        self.files: List[Path] = []
+
+    def attach(self, hl_fetcher=None, ib_fetcher=None):
+        """注册为数据获取器的更新监听器并启动写线程.
+
+        Args:
+            hl_fetcher: HyperliquidFetcherStreaming（可选）
+            ib_fetcher: IBKRFetcherStreaming（可选）
+        """
+        if hl_fetcher is not None:
+            self._hl_fetcher = hl_fetcher
+            hl_fetcher.add_update_listener(self.on_update)
+        if ib_fetcher is not None:
+            self._ib_fetcher = ib_fetcher
+            ib_fetcher.add_update_listener(self.on_update)
+        self.start()
+
+    def on_update(self, source: str, recv_ns: int):
+        """数据更新回调：从对应的 fetcher 读取最新快照并记录一行.
+
+        Args:
+            source: "hl_book" / "hl_ctx" / "ib"
+            recv_ns: 接收时间（perf_counter_ns，仅用于延迟统计，此处不使用）
+        """
+        if source == "hl_book":
+            book = self._hl_fetcher.get_orderbook()
+            self.update_perp(
+                book.best_bid, book.best_ask, book.bids.best_size, book.asks.best_size,
+                exch_ms=book.timestamp, source=source
+            )
+        elif source == "hl_ctx":
+            self.update_funding(self._hl_fetcher.get_funding_rate())
+        elif source == "ib":
+            quote = self._ib_fetcher.get_stock_price()
+            self.update_spot(quote["bid"], quote["ask"], quote.get("bid_size"), quote.get("ask_size"))
+
+    def update_perp(self, bid, ask, bid_sz=None, ask_sz=None, exch_ms: Optional[int] = None,
+                    source: str = "hl_book"):
+        """更新 HL 永续报价并记录一行."""
+        self._perp = (_num(bid), _num(ask), _num(bid_sz), _num(ask_sz))
+        self._perp_exch_ms = exch_ms or 0
+        self._perp_recv_ns = time.time_ns()
+        self._record(SOURCE_IDS[source], self._perp_recv_ns)
+
+    def update_funding(self, funding_rate):
+        """更新资金费率并记录一行."""
+        self._funding = _num(funding_rate)
+        self._record(SOURCE_IDS["hl_ctx"], time.time_ns())
+
+    def update_spot(self, bid, ask, bid_sz=None, ask_sz=None):
+        """更新 IB 现货报价并记录一行."""
+        self._spot = (_num(bid), _num(ask), _num(bid_sz), _num(ask_sz))
+        self._spot_recv_ns = time.time_ns()
+        self._record(SOURCE_IDS["ib"], self._spot_recv_ns)
+
+    def _record(self, source_id: int, ts_ns: int):
+        """把当前状态追加到待写批次（热路径：一次元组构造 + 一次 append）."""
+        row = (ts_ns, source_id, self._perp_recv_ns, self._spot_recv_ns, self._perp_exch_ms,
+               *self._perp, *self._spot, self._funding)
+        with self._lock:
+            self._batch.append(row)
+            self.rows_recorded += 1
+            if len(self._batch) >= self.batch_size:
+                self._flush_event.set()
+
+    def start(self):
+        """启动后台写线程."""
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._writer_loop, name="tick-recorder", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """写完剩余数据并关闭文件."""
+        if self._thread is None:
+            return
+        self._stop = True
+        self._flush_event.set()
+        self._thread.join()
+        self._thread = None
+        print(f"✓ Tick recorder closed: {self.rows_written} rows in {len(self.files)} file(s)")
+
+    def _writer_loop(self):
+        """后台写线程：定期取走批次并写入文件."""
+        while True:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+
+            with self._lock:
+                batch, self._batch = self._batch, []
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"Error writing ticks: {e}")
+
+            if self._stop:
+                break
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self, batch: List[tuple]):
+        """把一批记录转换成结构化数组并追加写入（必要时滚动文件）."""
+        records = np.array(batch, dtype=TICK_DTYPE)
+
+        start = 0
+        while start < len(records):
+            if (self._file is None or self._file_rows >= self.rotate_rows or
+                    time.time() - self._file_opened_at >= self.rotate_seconds):
+                self._rotate()
+
+            n = min(len(records) - start, self.rotate_rows - self._file_rows)
+            records[start:start + n].tofile(self._file)
+            self._file.flush()
+            self._file_rows += n
+            self.rows_written += n
+            start += n
+
+    def _rotate(self):
+        """关闭当前文件并打开新文件."""
+        if self._file:
+            self._file.close()
+
+        name = f"{self.prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        path = self.output_dir / f"{name}{TICK_FILE_SUFFIX}"
+        suffix = 1
+        while path.exists():
+            path = self.output_dir / f"{name}_{suffix}{TICK_FILE_SUFFIX}"
+            suffix += 1
+
+        self._file = open(path, 'ab')
+        self._file_rows = 0
+        self._file_opened_at = time.time()
+        self.files.append(path)
+
+
+def open_tick_file(path: Union[str, Path]) -> np.ndarray:
+    """以内存映射方式打开一个行情文件（只读，不复制）.
+
+    Args:
+        path: .ticks 文件路径
+
+    Returns:
+        TICK_DTYPE 结构化数组（np.memmap）
+    """
+    path = Path(path)
+    rows = path.stat().st_size // TICK_DTYPE.itemsize
+    if rows == 0:
+        return np.empty(0, dtype=TICK_DTYPE)
+    return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(rows,))
+
+
+def load_ticks(source: Union[str, Path, Sequence[Union[str, Path]]]) -> np.ndarray:
+    """加载行情记录.
+
+    Args:
+        source: .ticks 文件、包含 .ticks 文件的目录，或文件路径列表
+
+    Returns:
+        按时间排序的结构化数组（单个文件时直接返回内存映射，不复制）
+    """
+    if isinstance(source, (str, Path)):
+        source = Path(source)
+        paths = sorted(source.glob(f"*{TICK_FILE_SUFFIX}")) if source.is_dir() else [source]
+    else:
+        paths = sorted(Path(p) for p in source)
+
+    arrays = [open_tick_file(p) for p in paths]
+    if len(arrays) == 1:
+        return arrays[0]
+    if not arrays:
+        return np.empty(0, dtype=TICK_DTYPE)
+
+    ticks = np.concatenate(arrays)
+    return ticks[np.argsort(ticks["ts_ns"], kind="stable")]
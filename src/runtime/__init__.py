@@ -0,0 +1,9 @@
+"""
+asyncio 运行时
+
+在主线程的一个 asyncio 事件循环中同时运行 ib_insync 和 Hyperliquid WebSocket。
+"""
+
+from .event_loop import create_event_loop, shutdown_event_loop, nested_loop, wait_nested
+
+__all__ = ['create_event_loop', 'shutdown_event_loop', 'nested_loop', 'wait_nested']
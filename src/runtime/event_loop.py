@@ -0,0 +1,83 @@
+"""Main-thread asyncio event loop shared by ib_insync and the Hyperliquid WebSocket."""
+
+from typing import Awaitable, Optional
+import asyncio
+
+
+def create_event_loop() -> asyncio.AbstractEventLoop:
+    """创建主线程事件循环并允许嵌套运行.
+
+    ib_insync 使用当前线程的事件循环，HyperliquidAsyncStream 也在同一个循环中运行。
+    util.patchAsyncio() 允许在事件循环内部调用 ib_insync 的同步接口
+    （例如 IBTrader 下单时的 ib.sleep），等待期间循环继续处理 HL 推送和 IB 行情。
+    HL 订单的同步等待通过 nested_loop() / wait_nested() 以同样的方式嵌套运行循环。
+
+    Returns:
+        新的事件循环（已设为当前线程的事件循环）
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    # 设置事件循环之后再导入（eventkit 导入时绑定当前事件循环）
+    from ib_insync import util
+    util.patchAsyncio()   # 作用于当前事件循环
+    return loop
+
+
+def shutdown_event_loop(loop: asyncio.AbstractEventLoop, hl_stream: Optional[object] = None):
+    """关闭 HL WebSocket、取消剩余任务并关闭事件循环.
+
+    Args:
+        loop: create_event_loop() 创建的事件循环
+        hl_stream: HyperliquidAsyncStream（可选）
+    """
+    try:
+        if hl_stream is not None:
+            loop.run_until_complete(hl_stream.close())
+
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    except Exception as e:
+        print(f"Warning: Error shutting down event loop: {e}")
+    finally:
+        loop.close()
+
+
+def nested_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """当前线程正在运行、并且允许嵌套运行（patchAsyncio）的事件循环.
+
+    同步代码（例如 TradeExecutor 下单）在 asyncio 模式下从事件循环内部被调用时，
+    不能用 threading.Event.wait 之类的阻塞等待：HL 推送（包括 userFills 成交回报）
+    由同一个循环分发，阻塞期间永远不会到达。
+
+    Returns:
+        事件循环，不在事件循环中或循环不支持嵌套时返回 None
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return loop if getattr(loop, "_nest_patched", False) else None
+
+
+def wait_nested(loop: asyncio.AbstractEventLoop, awaitable: Awaitable, timeout: Optional[float]) -> bool:
+    """在嵌套的事件循环中等待 awaitable 完成，等待期间循环继续处理推送和其他任务.
+
+    超时不会取消 awaitable 本身。
+
+    Args:
+        loop: nested_loop() 返回的事件循环
+        awaitable: 要等待的 future / 协程
+        timeout: 超时时间（秒，None = 一直等待）
+
+    Returns:
+        是否在超时前完成
+    """
+    try:
+        loop.run_until_complete(asyncio.wait_for(asyncio.shield(awaitable), timeout))
+        return True
+    except asyncio.TimeoutError:
+        return False
@@ -0,0 +1,12 @@
+"""
+交易所模拟模块
+
+本地模拟 Hyperliquid 的 WebSocket / HTTP 接口和 IB Gateway（ib_insync.IB 兼容客户端），
+用于离线压测、延迟测试和执行路径（含失败 / 回滚）的基准测试。
+"""
+
+from .hl_server import HyperliquidSimServer, FeedStats, synthetic_books, load_book_messages, books_from_ticks
+from .ib_sim import IBSimulator, SimulatedIB
+
+__all__ = ['HyperliquidSimServer', 'FeedStats', 'synthetic_books', 'load_book_messages', 'books_from_ticks',
+           'IBSimulator', 'SimulatedIB']
@@ -0,0 +1,766 @@
+"""Local Hyperliquid WebSocket/HTTP simulator for offline load and latency testing."""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, asdict
+from concurrent.futures import Future
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+
+from hyperliquid.websocket_manager import subscription_to_identifier
+
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# 单个客户端发送缓冲超过该字节数时丢弃推送（模拟慢消费者丢消息，而不是无限堆积）
+DEFAULT_MAX_CLIENT_BUFFER = 4 * 1024 * 1024
+
+# 预渲染的盘口消息数量（循环发送，每条发送时填入当前时间和序号）
+DEFAULT_BOOK_POOL = 1024
+
+# builder-deployed perp DEX 的资产编号从 110000 开始，每个 DEX 间隔 10000（与 SDK 一致）
+BUILDER_DEX_OFFSET = 110000
+BUILDER_DEX_STRIDE = 10000
+
+Levels = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+@dataclass
+class FeedStats:
+    """一次行情推送压测的结果."""
+    coin: str
+    target_rate: float     # 目标推送速率（条/秒）
+    duration: float        # 目标时长（秒）
+    sent: int              # 实际写入客户端的盘口消息数
+    dropped: int           # 因客户端发送缓冲已满丢弃的消息数
+    ctx_sent: int          # activeAssetCtx 消息数
+    elapsed: float         # 实际推送耗时（秒）
+    clients: int           # 订阅该盘口的客户端数
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["achieved_rate"] = self.achieved_rate
+        return data
+
+
+# ==================== 盘口数据 ====================
+
+def synthetic_books(
+    count: int,
+    mid: float = 180.0,
+    levels: int = 20,
+    tick: float = 0.01,
+    spread_ticks: int = 2,
+    seed: Optional[int] = None
+) -> List[Levels]:
+    """生成随机游走的合成盘口.
+
+    Args:
+        count: 盘口数量
+        mid: 初始中间价
+        levels: 每边档位数
+        tick: 最小价格变动
+        spread_ticks: 买一卖一之间的 tick 数
+        seed: 随机种子（None = 不固定）
+
+    Returns:
+        [(bids, asks)]，档位格式与 l2Book 消息相同
+    """
+    rng = random.Random(seed)
+    books = []
+    for _ in range(count):
+        mid += rng.gauss(0, tick * 2)
+        best_bid = round(mid - spread_ticks * tick / 2, 2)
+        best_ask = round(best_bid + spread_ticks * tick, 2)
+        bids = [_level(best_bid - i * tick, rng) for i in range(levels)]
+        asks = [_level(best_ask + i * tick, rng) for i in range(levels)]
+        books.append((bids, asks))
+    return books
+
+
+def _level(px: float, rng: random.Random) -> Dict[str, Any]:
+    return {"px": f"{px:.2f}", "sz": f"{rng.uniform(0.5, 50.0):.3f}", "n": rng.randint(1, 8)}
+
+
+def load_book_messages(path: str) -> List[Levels]:
+    """读取录制的 l2Book 消息（JSON Lines，每行一条完整 WebSocket 消息或其 data 字段）.
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        [(bids, asks)]
+    """
+    books = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            data = msg.get("data", msg)
+            bids, asks = data["levels"]
+            books.append((bids, asks))
+    return books
+
+
+def books_from_ticks(path: str, levels: int = 20, tick: float = 0.01, seed: Optional[int] = None) -> List[Levels]:
+    """从 TickRecorder 文件回放 HL 盘口（录制的买一卖一 + 合成的更深档位）.
+
+    Args:
+        path: .ticks 文件或目录
+        levels: 每边档位数
+        tick: 合成档位的价格间隔
+        seed: 合成数量的随机种子
+    """
+    from recorder import load_ticks
+
+    ticks = load_ticks(path)
+    rng = random.Random(seed)
+    books = []
+    for row in ticks:
+        bid, ask = float(row["perp_bid"]), float(row["perp_ask"])
+        if not (bid > 0 and ask > 0):      # NaN / 尚未收到
+            continue
+        bids = [_level(bid - i * tick, rng) for i in range(levels)]
+        asks = [_level(ask + i * tick, rng) for i in range(levels)]
+        if row["perp_bid_sz"] > 0:
+            bids[0]["sz"] = f"{float(row['perp_bid_sz']):.3f}"
+        if row["perp_ask_sz"] > 0:
+            asks[0]["sz"] = f"{float(row['perp_ask_sz']):.3f}"
+        books.append((bids, asks))
+    return books
+
+
+# ==================== WebSocket 帧 ====================
+
+def encode_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """编码服务端 WebSocket 帧（FIN，不加掩码）."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """读取一个客户端 WebSocket 帧（客户端只发送小的单帧控制 / 文本消息）.
+
+    Returns:
+        (opcode, payload)
+    """
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b2 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask:
+        key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big")
+    return b1 & 0x0F, payload
+
+
+def _json_frame(message: Any) -> bytes:
+    return encode_frame(json.dumps(message, separators=(",", ":")).encode())
+
+
+class _Client:
+    """一个 WebSocket 客户端连接."""
+
+    __slots__ = ("writer", "subscriptions", "sent", "dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions: Dict[str, Dict[str, Any]] = {}   # identifier -> subscription
+        self.sent = 0
+        self.dropped = 0
+
+
+# ==================== 模拟服务器 ====================
+
+class HyperliquidSimServer:
+    """本地 Hyperliquid 模拟服务器.
+
+    在同一个端口上提供：
+    - WebSocket /ws：l2Book / activeAssetCtx / userFills 订阅，ping/pong
+    - HTTP POST /info：spotMeta / perpDexs / meta / metaAndAssetCtxs / l2Book / allMids /
+      clearinghouseState / openOrders / orderStatus / fundingHistory
+    - HTTP POST /exchange：order（按当前盘口成交，userFills 推送成交）/ cancel / cancelByCloid，不验证签名
+    - HTTP POST /sim：控制接口（feed 压测、config 调整成交行为、stats 统计）
+
+    base_url 可以直接传给 SDK 的 Info / Exchange、HyperliquidAsyncStream 和 HLTrader。
+    服务器在后台线程的事件循环中运行；盘口消息预先渲染，发送时只填入时间和序号，
+    单线程可以推送每秒数万条 20 档盘口。
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        coins: Sequence[str] = ("xyz:NVDA",),
+        mid: float = 180.0,
+        levels: int = 20,
+        books: Optional[Dict[str, List[Levels]]] = None,
+        order_latency: float = 0.0,
+        fill_ratio: float = 1.0,
+        reject_rate: float = 0.0,
+        max_client_buffer: int = DEFAULT_MAX_CLIENT_BUFFER,
+        seed: Optional[int] = None
+    ):
+        """Initialize the simulator.
+
+        Args:
+            host: 监听地址
+            port: 监听端口（0 = 自动分配）
+            coins: 模拟的合约（"xyz:NVDA" 属于 xyz DEX，不带前缀的属于主 DEX）
+            mid: 合成盘口的初始中间价
+            levels: 合成盘口每边档位数
+            books: coin -> 回放的盘口序列（load_book_messages / books_from_ticks），未提供的合约使用合成盘口
+            order_latency: 下单请求的响应延迟（秒）
+            fill_ratio: 可成交订单的成交比例（< 1 = 部分成交）
+            reject_rate: 拒单概率
+            max_client_buffer: 客户端发送缓冲上限（字节），超过时丢弃推送
+            seed: 随机种子
+        """
+        self.host = host
+        self.port = port
+        self.coins = list(coins)
+        self.order_latency = order_latency
+        self.fill_ratio = fill_ratio
+        self.reject_rate = reject_rate
+        self.max_client_buffer = max_client_buffer
+        self._rng = random.Random(seed)
+
+        # 合约元数据：dex -> [coin]，资产编号 -> coin
+        self.dexs: List[str] = [""]
+        for coin in self.coins:
+            dex = coin.split(":")[0] if ":" in coin else ""
+            if dex not in self.dexs:
+                self.dexs.append(dex)
+        self.asset_to_coin: Dict[int, str] = {}
+        for i, dex in enumerate(self.dexs):
+            offset = 0 if dex == "" else BUILDER_DEX_OFFSET + (i - 1) * BUILDER_DEX_STRIDE
+            for j, coin in enumerate(self._dex_coins(dex)):
+                self.asset_to_coin[offset + j] = coin
+
+        # 盘口池：coin -> [(head, tail, best_bid, best_ask)]
+        books = books or {}
+        self._pools: Dict[str, List[Tuple[bytes, bytes, float, float]]] = {}
+        self._levels: Dict[str, Levels] = {}
+        self._cursor: Dict[str, int] = {}
+        for coin in self.coins:
+            pool = books.get(coin) or synthetic_books(DEFAULT_BOOK_POOL, mid=mid, levels=levels, seed=seed)
+            self._pools[coin] = [self._render_book(coin, bids, asks) for bids, asks in pool]
+            self._levels[coin] = pool[0]
+            self._cursor[coin] = 0
+        # 当前买一卖一（尚未推送时为订阅快照，即池中最后一条）
+        self._top: Dict[str, Tuple[float, float]] = {
+            coin: (pool[-1][2], pool[-1][3]) for coin, pool in self._pools.items()
+        }
+        self._ctx: Dict[str, Dict[str, str]] = {coin: self._make_ctx(coin) for coin in self.coins}
+
+        # 账户状态（单账户，不验证签名）
+        self.positions: Dict[str, float] = {}
+        self.resting: Dict[int, Dict[str, Any]] = {}
+        # orderStatus：oid -> {"order": ..., "status": ...}，cloid -> oid
+        self.order_status: Dict[int, Dict[str, Any]] = {}
+        self._cloid_to_oid: Dict[str, int] = {}
+        self.account_value = 100000.0
+        self._next_oid = 1000
+        self._next_tid = 1
+
+        self._clients: List[_Client] = []
+        self._seq = 0
+
+        # 统计
+        self.http_requests = 0
+        self.orders = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # ==================== 生命周期 ====================
+
+    @property
+    def base_url(self) -> str:
+        """API URL（WebSocket 地址为 ws://host:port/ws）."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "HyperliquidSimServer":
+        """在后台线程启动服务器，返回 self."""
+        self._thread = threading.Thread(target=self._run, name="hl-sim", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5):
+            raise RuntimeError("Hyperliquid simulator failed to start")
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_connection, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def stop(self):
+        """关闭所有连接并停止服务器."""
+        if self._loop is None or not self._loop.is_running():
+            return
+
+        async def shutdown():
+            self._server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ==================== 行情推送 ====================
+
+    def run_feed(self, coin: Optional[str] = None, rate: float = 1000.0, duration: float = 1.0,
+                 ctx_every: int = 0) -> FeedStats:
+        """按目标速率推送盘口，推送结束后返回统计（阻塞调用线程）.
+
+        Args:
+            coin: 合约（None = 第一个合约）
+            rate: 每秒盘口消息数
+            duration: 推送时长（秒）
+            ctx_every: 每 N 条盘口推送一条 activeAssetCtx（0 = 不推送）
+        """
+        return self.start_feed(coin, rate, duration, ctx_every).result()
+
+    def start_feed(self, coin: Optional[str] = None, rate: float = 1000.0, duration: float = 1.0,
+                   ctx_every: int = 0) -> Future:
+        """开始推送盘口，立即返回 concurrent.futures.Future[FeedStats]."""
+        coin = coin or self.coins[0]
+        return asyncio.run_coroutine_threadsafe(self._feed(coin, rate, duration, ctx_every), self._loop)
+
+    def publish_book(self, coin: Optional[str] = None):
+        """推送一条盘口（线程安全）."""
+        coin = coin or self.coins[0]
+        self._loop.call_soon_threadsafe(self._publish_next_book, coin)
+
+    def publish_asset_ctx(self, coin: Optional[str] = None, **fields):
+        """更新并推送 activeAssetCtx（线程安全）.
+
+        Args:
+            coin: 合约
+            fields: 覆盖的字段（例如 funding="0.0001", markPx="180.5"）
+        """
+        coin = coin or self.coins[0]
+        self._ctx[coin].update({name: str(value) for name, value in fields.items()})
+        self._loop.call_soon_threadsafe(self._publish_ctx, coin)
+
+    async def _feed(self, coin: str, rate: float, duration: float, ctx_every: int) -> FeedStats:
+        identifier = subscription_to_identifier({"type": "l2Book", "coin": coin})
+        total = int(rate * duration)
+        published = sent = dropped = ctx_sent = 0
+
+        start = time.perf_counter()
+        while published < total:
+            due = min(total, int((time.perf_counter() - start) * rate) + 1)
+            while published < due:
+                written, skipped = self._publish_next_book(coin)
+                published += 1
+                sent += written
+                dropped += skipped
+                if ctx_every and published % ctx_every == 0:
+                    self._publish_ctx(coin)
+                    ctx_sent += 1
+            # 让出事件循环（处理客户端消息和 HTTP 请求），按 1ms 批次发送
+            if published < total:
+                await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+
+        clients = sum(1 for client in self._clients if identifier in client.subscriptions)
+        return FeedStats(
+            coin=coin, target_rate=rate, duration=duration, sent=sent, dropped=dropped,
+            ctx_sent=ctx_sent, elapsed=elapsed, clients=clients,
+        )
+
+    def _render_book(self, coin: str, bids, asks) -> Tuple[bytes, bytes, float, float]:
+        """预渲染 l2Book 消息：time 和 sim（[序号, 发送时间 epoch ns]）在发送时填入."""
+        head = json.dumps({"channel": "l2Book", "data": {"coin": coin, "levels": [bids, asks]}},
+                          separators=(",", ":"))[:-2]
+        return (head + ',"time":').encode(), b"}}", float(bids[0]["px"]), float(asks[0]["px"])
+
+    def _publish_next_book(self, coin: str) -> Tuple[int, int]:
+        pool = self._pools[coin]
+        i = self._cursor[coin]
+        self._cursor[coin] = (i + 1) % len(pool)
+        head, tail, bid, ask = pool[i]
+        self._top[coin] = (bid, ask)
+
+        self._seq += 1
+        now_ns = time.time_ns()
+        payload = b"".join((head, str(now_ns // 1_000_000).encode(),
+                            b',"sim":[', str(self._seq).encode(), b",", str(now_ns).encode(), b"]", tail))
+        return self._broadcast(subscription_to_identifier({"type": "l2Book", "coin": coin}), encode_frame(payload))
+
+    def _publish_ctx(self, coin: str):
+        self._broadcast(subscription_to_identifier({"type": "activeAssetCtx", "coin": coin}),
+                        _json_frame({"channel": "activeAssetCtx", "data": {"coin": coin, "ctx": self._ctx[coin]}}))
+
+    def _broadcast(self, identifier: str, frame: bytes) -> Tuple[int, int]:
+        """发送给订阅了 identifier 的客户端，返回 (写入数, 丢弃数)."""
+        written = dropped = 0
+        for client in self._clients:
+            if identifier not in client.subscriptions:
+                continue
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > self.max_client_buffer:
+                client.dropped += 1
+                dropped += 1
+            else:
+                transport.write(frame)
+                client.sent += 1
+                written += 1
+        self.messages_sent += written
+        self.messages_dropped += dropped
+        return written, dropped
+
+    def _make_ctx(self, coin: str) -> Dict[str, str]:
+        bid, ask = self._top[coin]
+        mid = (bid + ask) / 2
+        return {
+            "funding": "0.0000125", "openInterest": "12345.6", "prevDayPx": f"{mid:.2f}",
+            "dayNtlVlm": "1234567.8", "premium": "0.0001", "oraclePx": f"{mid:.2f}",
+            "markPx": f"{mid:.2f}", "midPx": f"{mid:.3f}",
+        }
+
+    # ==================== 连接 ====================
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, headers)
+                    return
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self._serve_http(writer, method, path, body)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Warning: Simulator connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _serve_http(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes):
+        self.http_requests += 1
+        status, fills = 200, []
+        try:
+            payload = json.loads(body) if body else {}
+            if method != "POST":
+                status, result = 405, None
+            elif path == "/info":
+                result = self._handle_info(payload)
+            elif path == "/exchange":
+                if self.order_latency:
+                    await asyncio.sleep(self.order_latency)
+                result, fills = self._handle_exchange(payload)
+            elif path == "/sim":
+                result = await self._handle_sim(payload)
+            else:
+                status, result = 404, None
+        except (KeyError, ValueError) as e:
+            status, result = 422, None
+            print(f"Warning: Simulator could not handle request {body[:200]!r}: {e!r}")
+
+        data = json.dumps(result, separators=(",", ":")).encode()
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 422: "Unprocessable Entity"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        # 成交推送在下单响应之后发出
+        if fills:
+            self._push_fills(fills)
+        await writer.drain()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Dict[str, str]):
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WS_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        writer.write(encode_frame(b"Websocket connection established."))
+
+        client = _Client(writer)
+        self._clients.append(client)
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:                       # close
+                    writer.write(encode_frame(payload[:2], 0x8))
+                    return
+                if opcode == 0x9:                       # ping
+                    writer.write(encode_frame(payload, 0xA))
+                elif opcode == 0x1:
+                    self._handle_ws_message(client, json.loads(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.remove(client)
+
+    def _handle_ws_message(self, client: _Client, message: Dict[str, Any]):
+        method = message.get("method")
+        if method == "ping":
+            client.writer.write(_json_frame({"channel": "pong"}))
+            return
+
+        subscription = message.get("subscription", {})
+        identifier = subscription_to_identifier(subscription)
+        if method == "subscribe":
+            client.subscriptions[identifier] = subscription
+        elif method == "unsubscribe":
+            client.subscriptions.pop(identifier, None)
+        else:
+            client.writer.write(_json_frame({"channel": "error", "data": f"Unknown method: {method}"}))
+            return
+        client.writer.write(_json_frame({"channel": "subscriptionResponse", "data": message}))
+
+        # 订阅后立即推送当前快照（与交易所相同）
+        if method == "subscribe":
+            sub_type, coin = subscription["type"], subscription.get("coin")
+            if sub_type == "l2Book" and coin in self._pools:
+                head, tail, _, _ = self._pools[coin][(self._cursor[coin] - 1) % len(self._pools[coin])]
+                client.writer.write(encode_frame(head + str(time.time_ns() // 1_000_000).encode() + tail))
+            elif sub_type == "activeAssetCtx" and coin in self._ctx:
+                client.writer.write(_json_frame({"channel": "activeAssetCtx", "data": {"coin": coin, "ctx": self._ctx[coin]}}))
+            elif sub_type == "userFills":
+                client.writer.write(_json_frame({"channel": "userFills", "data": {
+                    "isSnapshot": True, "user": subscription["user"], "fills": []}}))
+
+    # ==================== /info ====================
+
+    def _dex_coins(self, dex: str) -> List[str]:
+        return [coin for coin in self.coins if (coin.split(":")[0] if ":" in coin else "") == dex]
+
+    def _meta(self, dex: str) -> Dict[str, Any]:
+        return {"universe": [{"name": coin, "szDecimals": 3, "maxLeverage": 10} for coin in self._dex_coins(dex)]}
+
+    def _book_snapshot(self, coin: str) -> Dict[str, Any]:
+        head, tail, _, _ = self._pools[coin][(self._cursor[coin] - 1) % len(self._pools[coin])]
+        return json.loads(head + str(time.time_ns() // 1_000_000).encode() + tail)["data"]
+
+    def _handle_info(self, payload: Dict[str, Any]) -> Any:
+        info_type = payload["type"]
+        dex = payload.get("dex", "")
+        if info_type == "spotMeta":
+            return {"universe": [], "tokens": []}
+        if info_type == "perpDexs":
+            return [None] + [{"name": d, "fullName": d, "deployer": None} for d in self.dexs[1:]]
+        if info_type == "meta":
+            return self._meta(dex)
+        if info_type == "metaAndAssetCtxs":
+            return [self._meta(dex), [self._ctx[coin] for coin in self._dex_coins(dex)]]
+        if info_type == "l2Book":
+            return self._book_snapshot(payload["coin"])
+        if info_type == "allMids":
+            return {coin: f"{(bid + ask) / 2:.3f}" for coin, (bid, ask) in self._top.items()}
+        if info_type == "clearinghouseState":
+            return {
+                "assetPositions": [
+                    {"type": "oneWay", "position": {"coin": coin, "szi": str(szi)}}
+                    for coin, szi in self.positions.items() if szi
+                ],
+                "marginSummary": {"accountValue": str(self.account_value)},
+                "withdrawable": str(self.account_value),
+            }
+        if info_type in ("openOrders", "frontendOpenOrders"):
+            return list(self.resting.values())
+        if info_type == "orderStatus":
+            oid = payload["oid"]
+            status = self.order_status.get(self._cloid_to_oid.get(oid) if isinstance(oid, str) else oid)
+            return {"status": "order", "order": status} if status else {"status": "unknownOid"}
+        if info_type == "fundingHistory":
+            return [{"coin": payload["coin"], "fundingRate": self._ctx[payload["coin"]]["funding"],
+                     "premium": "0.0001", "time": int(time.time() * 1000)}]
+        raise KeyError(info_type)
+
+    # ==================== /exchange ====================
+
+    def _handle_exchange(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        action = payload["action"]
+        if action["type"] == "order":
+            fills = []
+            statuses = [self._place(order, fills) for order in action["orders"]]
+            return {"status": "ok", "response": {"type": "order", "data": {"statuses": statuses}}}, fills
+        if action["type"] in ("cancel", "cancelByCloid"):
+            oids = ([c["o"] for c in action["cancels"]] if action["type"] == "cancel" else
+                    [self._cloid_to_oid.get(c["cloid"]) for c in action["cancels"]])
+            statuses = ["success" if self._cancel(oid) else
+                        {"error": "Order was never placed, already canceled, or filled."}
+                        for oid in oids]
+            return {"status": "ok", "response": {"type": "cancel", "data": {"statuses": statuses}}}, []
+        return {"status": "ok", "response": {"type": "default"}}, []
+
+    def _cancel(self, oid: Optional[int]) -> bool:
+        if self.resting.pop(oid, None) is None:
+            return False
+        self.order_status[oid]["status"] = "canceled"
+        return True
+
+    def _record_status(self, oid: int, coin: str, is_buy: bool, order: Dict[str, Any], remaining: float, status: str):
+        self.order_status[oid] = {
+            "order": {"coin": coin, "side": "B" if is_buy else "A", "limitPx": order["p"], "oid": oid,
+                      "origSz": order["s"], "sz": f"{remaining:g}", "timestamp": int(time.time() * 1000),
+                      "cloid": order.get("c")},
+            "status": status,
+            "statusTimestamp": int(time.time() * 1000),
+        }
+        if order.get("c"):
+            self._cloid_to_oid[order["c"]] = oid
+
+    def _place(self, order: Dict[str, Any], fills: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按当前买一 / 卖一成交一笔订单（可成交部分全部按最优价成交）."""
+        self.orders += 1
+        coin = self.asset_to_coin[order["a"]]
+        is_buy, px, sz = order["b"], float(order["p"]), float(order["s"])
+        tif = order["t"].get("limit", {}).get("tif", "Gtc")
+
+        if self.reject_rate and self._rng.random() < self.reject_rate:
+            return {"error": "Insufficient margin to place order."}
+        position = self.positions.get(coin, 0.0)
+        if order.get("r"):
+            if (position >= 0) if is_buy else (position <= 0):
+                return {"error": "Reduce only order would increase position."}
+            sz = min(sz, abs(position))
+
+        oid = self._next_oid
+        self._next_oid += 1
+        bid, ask = self._top[coin]
+        crosses = px >= ask if is_buy else px <= bid
+        filled = round(sz * self.fill_ratio, 3) if crosses else 0.0
+
+        if filled <= 0:
+            if tif == "Ioc":
+                return {"error": f"Order could not immediately match against any resting orders. asset={order['a']}"}
+            self._record_status(oid, coin, is_buy, order, float(order["s"]), "open")
+            self.resting[oid] = {"coin": coin, "side": "B" if is_buy else "A", "limitPx": order["p"],
+                                 "sz": order["s"], "oid": oid, "timestamp": int(time.time() * 1000),
+                                 "cloid": order.get("c")}
+            return {"resting": {"oid": oid}}
+
+        fill_px = ask if is_buy else bid
+        self.positions[coin] = round(position + (filled if is_buy else -filled), 6)
+        fill = {"coin": coin, "px": f"{fill_px:.2f}", "sz": f"{filled:g}", "side": "B" if is_buy else "A",
+                "time": int(time.time() * 1000), "oid": oid, "tid": self._next_tid, "crossed": True,
+                "fee": "0.0", "startPosition": "0.0", "dir": "Open Long" if is_buy else "Open Short"}
+        if order.get("c"):
+            fill["cloid"] = order["c"]
+        self._next_tid += 1
+        fills.append(fill)
+
+        resting = filled < sz and tif != "Ioc"
+        self._record_status(oid, coin, is_buy, order, float(order["s"]) - filled,
+                            "open" if resting else "filled" if filled >= sz else "canceled")
+        if resting:
+            self.resting[oid] = {"coin": coin, "side": fill["side"], "limitPx": order["p"],
+                                 "sz": f"{sz - filled:g}", "oid": oid, "timestamp": fill["time"],
+                                 "cloid": order.get("c")}
+        return {"filled": {"totalSz": f"{filled:g}", "avgPx": fill["px"], "oid": oid}}
+
+    def _push_fills(self, fills: List[Dict[str, Any]]):
+        for client in self._clients:
+            for identifier, subscription in client.subscriptions.items():
+                if subscription.get("type") == "userFills":
+                    client.writer.write(_json_frame({"channel": "userFills", "data": {
+                        "isSnapshot": False, "user": subscription["user"], "fills": fills}}))
+
+    # ==================== /sim ====================
+
+    async def _handle_sim(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """控制接口：feed（推送压测）、config（调整成交行为）、stats（统计）."""
+        command = payload["type"]
+        if command == "feed":
+            stats = await self._feed(payload.get("coin") or self.coins[0], float(payload.get("rate", 1000)),
+                                     float(payload.get("duration", 1.0)), int(payload.get("ctx_every", 0)))
+            return stats.to_dict()
+        if command == "config":
+            for name in ("order_latency", "fill_ratio", "reject_rate", "max_client_buffer"):
+                if name in payload:
+                    setattr(self, name, type(getattr(self, name))(payload[name]))
+            return {"status": "ok"}
+        if command == "stats":
+            return self.stats()
+        raise KeyError(command)
+
+    def stats(self) -> Dict[str, Any]:
+        """服务器统计."""
+        return {
+            "clients": len(self._clients),
+            "http_requests": self.http_requests,
+            "orders": self.orders,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "positions": dict(self.positions),
+        }
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, coins: Iterable[str] = ("xyz:NVDA",), **kwargs):
+    """在前台运行模拟服务器，直到 Ctrl+C.
+
+    Args:
+        host: 监听地址
+        port: 监听端口
+        coins: 模拟的合约
+        kwargs: 传给 HyperliquidSimServer
+    """
+    server = HyperliquidSimServer(host, port, coins=tuple(coins), **kwargs).start()
+    print(f"✓ Hyperliquid simulator listening on {server.base_url} (WebSocket {server.base_url.replace('http', 'ws')}/ws)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
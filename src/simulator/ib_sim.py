@@ -0,0 +1,454 @@
+"""In-process IB Gateway simulator exposing the ib_insync.IB calls used by the fetcher and trader."""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import datetime
+import heapq
+import itertools
+import random
+import time
+
+import ib_insync
+
+
+class IBSimulator:
+    """模拟 IB Gateway：合成报价、订单撮合、持仓.
+
+    client() 返回与 ib_insync.IB 接口兼容的 SimulatedIB，可以作为 ib 参数传给
+    IBTrader / IBKRFetcherStreaming。多个客户端共享同一份行情、订单簿和持仓
+    （与多个 clientId 连接同一个 Gateway 相同）。
+
+    和 ib_insync 一样，事件只在客户端运行事件循环时到达：ib.sleep() / ib.waitOnUpdate()
+    处理到期的事件；connectAsync() 之后由 asyncio 任务处理。订单和行情事件使用真实的
+    ib_insync Trade / Ticker / Fill 对象和 eventkit 事件，顺序与 TWS 相同
+    （execDetails -> orderStatus -> filled）。
+    """
+
+    def __init__(
+        self,
+        symbols: Sequence[str] = ("NVDA",),
+        mid: float = 180.0,
+        spread: float = 0.02,
+        quote_rate: float = 50.0,
+        ack_latency: float = 0.0005,
+        fill_latency: float = 0.001,
+        partial_fills: int = 1,
+        reject_rate: float = 0.0,
+        depth_rows: int = 10,
+        account: str = "DU0000000",
+        seed: Optional[int] = None
+    ):
+        """Initialize the simulator.
+
+        Args:
+            symbols: 可确认合约、有报价的股票（其他 symbol 确认失败）
+            mid: 初始中间价
+            spread: 买一卖一价差（美元）
+            quote_rate: 每个 symbol 每秒报价更新次数（0 = 只用 push_quote 手动推送）
+            ack_latency: 下单到 Submitted（或拒单）的延迟（秒）
+            fill_latency: Submitted 到第一笔成交、以及部分成交之间的间隔（秒）
+            partial_fills: 每笔订单拆成几次成交
+            reject_rate: 拒单概率
+            depth_rows: 市场深度最大档数
+            account: 账户 ID
+            seed: 随机种子
+        """
+        self.symbols = list(symbols)
+        self.spread = spread
+        self.quote_rate = quote_rate
+        self.ack_latency = ack_latency
+        self.fill_latency = fill_latency
+        self.partial_fills = partial_fills
+        self.reject_rate = reject_rate
+        self.depth_rows = depth_rows
+        self.account = account
+        self._rng = random.Random(seed)
+
+        self._mid: Dict[str, float] = {symbol: mid for symbol in self.symbols}
+        self._quotes: Dict[str, Tuple[float, float, float, float]] = {}   # symbol -> (bid, ask, bid_size, ask_size)
+        for symbol in self.symbols:
+            self._quotes[symbol] = self._make_quote(symbol)
+
+        # 事件队列：(到期时间 perf_counter, 序号, 函数)
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+
+        self._quote_generation = 0
+        self._tickers: List[Tuple["SimulatedIB", ib_insync.Ticker]] = []
+        self._working: List[Tuple["SimulatedIB", ib_insync.Trade]] = []   # 已确认、未成交的限价单
+        self._reject_next = 0
+        self._next_order_id = 1
+        self._next_exec_id = 1
+
+        # 持仓：symbol -> (数量, 平均成本)
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        self.net_liquidation = 1_000_000.0
+
+        # 统计
+        self.orders = 0
+        self.fills = 0
+        self.rejects = 0
+        self.quotes = 0
+
+        self.set_quote_rate(quote_rate)
+
+    def client(self) -> "SimulatedIB":
+        """创建一个连接到本模拟器的 IB 客户端（尚未 connect）."""
+        return SimulatedIB(self)
+
+    # ==================== 控制 ====================
+
+    def push_quote(self, symbol: str, bid: float, ask: float, bid_size: float = 100, ask_size: float = 100):
+        """设置报价并立即通知订阅的 ticker（同时撮合可成交的限价单）."""
+        self._mid[symbol] = (bid + ask) / 2
+        self._quotes[symbol] = (bid, ask, bid_size, ask_size)
+        self._publish(symbol)
+
+    def set_quote_rate(self, rate: float):
+        """修改每个 symbol 每秒的报价更新次数（0 = 停止自动报价）.
+
+        报价按固定节拍生成（下一次到期时间 = 上一次到期时间 + 1/rate），客户端事件循环落后时
+        不会降低报价速率，到期的报价在下一次处理时一起到达。
+        """
+        self.quote_rate = rate
+        self._quote_generation += 1
+        if rate > 0:
+            generation = self._quote_generation
+            due = time.perf_counter() + 1 / rate
+            self._schedule_at(due, lambda: self._quote_tick(generation, due))
+
+    def reject_next(self, count: int = 1):
+        """接下来的 count 笔订单被拒绝."""
+        self._reject_next += count
+
+    def quote(self, symbol: str) -> Tuple[float, float]:
+        """当前买一 / 卖一."""
+        bid, ask, _, _ = self._quotes[symbol]
+        return bid, ask
+
+    # ==================== 事件队列 ====================
+
+    def _schedule(self, delay: float, func: Callable[[], None]):
+        self._schedule_at(time.perf_counter() + delay, func)
+
+    def _schedule_at(self, due: float, func: Callable[[], None]):
+        heapq.heappush(self._queue, (due, next(self._seq), func))
+
+    def next_due(self) -> Optional[float]:
+        """下一个事件的到期时间（perf_counter），没有事件时为 None."""
+        return self._queue[0][0] if self._queue else None
+
+    def overdue(self) -> int:
+        """已到期但还没有处理的事件数（客户端事件循环落后的程度）."""
+        now = time.perf_counter()
+        return sum(1 for due, _, _ in self._queue if due <= now)
+
+    def process_due(self) -> int:
+        """处理所有已到期的事件，返回处理的数量."""
+        processed = 0
+        now = time.perf_counter()
+        while self._queue and self._queue[0][0] <= now:
+            _, _, func = heapq.heappop(self._queue)
+            func()
+            processed += 1
+        return processed
+
+    # ==================== 行情 ====================
+
+    def _make_quote(self, symbol: str) -> Tuple[float, float, float, float]:
+        bid = round(self._mid[symbol] - self.spread / 2, 2)
+        return bid, round(bid + self.spread, 2), float(self._rng.randint(1, 10) * 100), float(self._rng.randint(1, 10) * 100)
+
+    def _quote_tick(self, generation: int, due: float):
+        if generation != self._quote_generation:
+            return    # 速率已修改，旧节拍停止
+        for symbol in self.symbols:
+            self._mid[symbol] += self._rng.gauss(0, 0.01)
+            self._quotes[symbol] = self._make_quote(symbol)
+            self._publish(symbol)
+        due += 1 / self.quote_rate
+        self._schedule_at(due, lambda: self._quote_tick(generation, due))
+
+    def _publish(self, symbol: str):
+        self.quotes += 1
+        bid, ask, bid_size, ask_size = self._quotes[symbol]
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for client, ticker in self._tickers:
+            if ticker.contract.symbol != symbol:
+                continue
+            ticker.time = now
+            ticker.bid, ticker.ask, ticker.bidSize, ticker.askSize = bid, ask, bid_size, ask_size
+            ticker.last = round((bid + ask) / 2, 2)
+            rows = min(client._depth.get(symbol, 0), self.depth_rows)
+            if rows:
+                ticker.domBids = [ib_insync.DOMLevel(round(bid - i * 0.01, 2), bid_size, "SMART")
+                                  for i in range(rows)]
+                ticker.domAsks = [ib_insync.DOMLevel(round(ask + i * 0.01, 2), ask_size, "SMART")
+                                  for i in range(rows)]
+            ticker.updateEvent.emit(ticker)
+
+        # 报价变化后撮合挂着的限价单
+        if self._working:
+            ready = [(c, t) for c, t in self._working if t.contract.symbol == symbol and self._marketable(t)]
+            if ready:
+                self._working = [(c, t) for c, t in self._working if all(t is not r for _, r in ready)]
+                for client, trade in ready:
+                    self._start_fills(client, trade)
+
+    # ==================== 订单 ====================
+
+    def _place(self, client: "SimulatedIB", contract, order) -> ib_insync.Trade:
+        self.orders += 1
+        if not order.orderId:
+            order.orderId = self._next_order_id
+            self._next_order_id += 1
+        order.clientId = client.client_id
+        trade = ib_insync.Trade(contract, order, ib_insync.OrderStatus(
+            orderId=order.orderId, status='PendingSubmit', remaining=order.totalQuantity))
+        client.trades.append(trade)
+
+        if self._reject_next or (self.reject_rate and self._rng.random() < self.reject_rate):
+            self._reject_next = max(0, self._reject_next - 1)
+            self._schedule(self.ack_latency, lambda: self._reject(trade, "Order rejected by simulator"))
+        elif contract.symbol not in self._quotes:
+            self._schedule(self.ack_latency, lambda: self._reject(trade, f"No market data for {contract.symbol}"))
+        else:
+            self._schedule(self.ack_latency, lambda: self._ack(client, trade))
+        return trade
+
+    def _ack(self, client: "SimulatedIB", trade: ib_insync.Trade):
+        if trade.orderStatus.status in ib_insync.OrderStatus.DoneStates:
+            return
+        self._set_status(trade, 'Submitted')
+        if self._marketable(trade):
+            self._schedule(self.fill_latency, lambda: self._start_fills(client, trade))
+        else:
+            self._working.append((client, trade))
+
+    def _reject(self, trade: ib_insync.Trade, message: str):
+        self.rejects += 1
+        trade.log.append(ib_insync.TradeLogEntry(
+            datetime.datetime.now(datetime.timezone.utc), 'Cancelled', message, 201))
+        self._set_status(trade, 'Cancelled')
+        trade.cancelledEvent.emit(trade)
+
+    def _cancel(self, trade: ib_insync.Trade):
+        if trade.orderStatus.status in ib_insync.OrderStatus.DoneStates:
+            return
+        self._working = [(c, t) for c, t in self._working if t is not trade]
+        trade.log.append(ib_insync.TradeLogEntry(datetime.datetime.now(datetime.timezone.utc), 'Cancelled', ''))
+        self._set_status(trade, 'Cancelled')
+        trade.cancelledEvent.emit(trade)
+
+    def _marketable(self, trade: ib_insync.Trade) -> bool:
+        order = trade.order
+        if order.orderType != 'LMT':
+            return True
+        bid, ask, _, _ = self._quotes[trade.contract.symbol]
+        return order.lmtPrice >= ask if order.action == 'BUY' else order.lmtPrice <= bid
+
+    def _start_fills(self, client: "SimulatedIB", trade: ib_insync.Trade):
+        """按 partial_fills 拆分成交，第一笔立即成交，其余每隔 fill_latency 成交一笔."""
+        quantity = int(trade.order.totalQuantity)
+        slices = max(1, min(self.partial_fills, quantity))
+        sizes = [quantity // slices + (1 if i < quantity % slices else 0) for i in range(slices)]
+        for i, shares in enumerate(sizes):
+            if i == 0:
+                self._fill(client, trade, shares)
+            else:
+                self._schedule(self.fill_latency * i, lambda shares=shares: self._fill(client, trade, shares))
+
+    def _fill(self, client: "SimulatedIB", trade: ib_insync.Trade, shares: int):
+        if trade.orderStatus.status in ib_insync.OrderStatus.DoneStates:
+            return
+        symbol = trade.contract.symbol
+        bid, ask, _, _ = self._quotes[symbol]
+        is_buy = trade.order.action == 'BUY'
+        price = ask if is_buy else bid
+        now = datetime.datetime.now(datetime.timezone.utc)
+        status = trade.orderStatus
+        total = status.filled + shares
+        avg_price = (status.avgFillPrice * status.filled + price * shares) / total
+
+        # 与 TWS 相同：先 execDetails（fillEvent），再 orderStatus（statusEvent / filledEvent）
+        execution = ib_insync.Execution(
+            execId=f"sim.{self._next_exec_id:08d}", time=now, acctNumber=self.account, exchange="SMART",
+            side="BOT" if is_buy else "SLD", shares=shares, price=price, clientId=client.client_id,
+            orderId=trade.order.orderId, cumQty=total, avgPrice=avg_price)
+        self._next_exec_id += 1
+        fill = ib_insync.Fill(trade.contract, execution, ib_insync.CommissionReport(execId=execution.execId), now)
+        trade.fills.append(fill)
+        trade.log.append(ib_insync.TradeLogEntry(now, status.status, f"Fill {shares}@{price}"))
+        self.fills += 1
+        trade.fillEvent.emit(trade, fill)
+
+        position, cost = self.positions.get(symbol, (0.0, 0.0))
+        signed = shares if is_buy else -shares
+        new_position = position + signed
+        if new_position and (position >= 0) == (signed > 0):
+            cost = (position * cost + signed * price) / new_position
+        self.positions[symbol] = (new_position, cost if new_position else 0.0)
+
+        status.filled = total
+        status.remaining = trade.order.totalQuantity - total
+        status.avgFillPrice = avg_price
+        status.lastFillPrice = price
+        status.status = 'Filled' if status.remaining <= 0 else 'Submitted'
+        trade.statusEvent.emit(trade)
+        if status.status == 'Filled':
+            trade.filledEvent.emit(trade)
+
+    def _set_status(self, trade: ib_insync.Trade, status: str):
+        trade.orderStatus.status = status
+        trade.statusEvent.emit(trade)
+
+    # ==================== 统计 ====================
+
+    def stats(self) -> Dict:
+        """模拟器统计."""
+        return {
+            "orders": self.orders,
+            "fills": self.fills,
+            "rejects": self.rejects,
+            "quotes": self.quotes,
+            "positions": {symbol: position for symbol, (position, _) in self.positions.items()},
+        }
+
+
+class SimulatedIB:
+    """与 ib_insync.IB 接口兼容的模拟客户端（IBTrader / IBKRFetcherStreaming 使用的调用）."""
+
+    def __init__(self, gateway: IBSimulator):
+        self.gateway = gateway
+        self.client_id = 0
+        self.trades: List[ib_insync.Trade] = []
+        self._connected = False
+        self._depth: Dict[str, int] = {}     # symbol -> 订阅的深度档数
+        self._pump_task: Optional[asyncio.Task] = None
+
+    # ==================== 连接 ====================
+
+    def connect(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, **kwargs) -> "SimulatedIB":
+        self.client_id = clientId
+        self._connected = True
+        return self
+
+    async def connectAsync(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, **kwargs) -> "SimulatedIB":
+        """连接并在当前事件循环中启动事件处理任务（行情随事件循环运行到达）."""
+        self.connect(host, port, clientId)
+        self._pump_task = asyncio.get_running_loop().create_task(self._pump())
+        return self
+
+    def isConnected(self) -> bool:
+        return self._connected
+
+    def disconnect(self):
+        self._connected = False
+        self.gateway._tickers = [(c, t) for c, t in self.gateway._tickers if c is not self]
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
+
+    def managedAccounts(self) -> List[str]:
+        return [self.gateway.account]
+
+    # ==================== 事件循环 ====================
+
+    def sleep(self, secs: float = 0.02) -> bool:
+        """运行事件处理 secs 秒（处理期间到期的行情和订单事件）."""
+        deadline = time.perf_counter() + secs
+        while True:
+            self.gateway.process_due()
+            now = time.perf_counter()
+            if now >= deadline:
+                return True
+            next_due = self.gateway.next_due()
+            time.sleep(max(0.0, min(deadline, next_due if next_due is not None else deadline) - now))
+
+    def waitOnUpdate(self, timeout: float = 0) -> bool:
+        """等待下一个事件并处理（timeout 秒内没有事件时返回 False）."""
+        if self.gateway.process_due():
+            return True
+        next_due = self.gateway.next_due()
+        if next_due is None:
+            time.sleep(timeout)
+            return False
+        wait = next_due - time.perf_counter()
+        if timeout and wait > timeout:
+            time.sleep(timeout)
+            return False
+        time.sleep(max(0.0, wait))
+        self.gateway.process_due()
+        return True
+
+    async def _pump(self):
+        while self._connected:
+            self.gateway.process_due()
+            next_due = self.gateway.next_due()
+            await asyncio.sleep(0.001 if next_due is None else max(0.0, next_due - time.perf_counter()))
+
+    # ==================== 合约 / 行情 ====================
+
+    def qualifyContracts(self, *contracts) -> List:
+        qualified = []
+        for contract in contracts:
+            if contract.symbol in self.gateway._quotes:
+                contract.conId = 100000 + self.gateway.symbols.index(contract.symbol)
+                contract.primaryExchange = contract.primaryExchange or "NASDAQ"
+                qualified.append(contract)
+        return qualified
+
+    async def qualifyContractsAsync(self, *contracts) -> List:
+        return self.qualifyContracts(*contracts)
+
+    def reqMarketDataType(self, marketDataType: int):
+        pass
+
+    def reqMktData(self, contract, genericTickList: str = '', snapshot: bool = False,
+                   regulatorySnapshot: bool = False, mktDataOptions=None) -> ib_insync.Ticker:
+        ticker = ib_insync.Ticker(contract=contract)
+        self.gateway._tickers.append((self, ticker))
+        # 首次报价在一次往返后到达
+        if contract.symbol in self.gateway._quotes:
+            self.gateway._schedule(self.gateway.ack_latency, lambda: self.gateway._publish(contract.symbol))
+        return ticker
+
+    def cancelMktData(self, contract):
+        self.gateway._tickers = [(c, t) for c, t in self.gateway._tickers
+                                 if not (c is self and t.contract.symbol == contract.symbol)]
+
+    def reqMktDepth(self, contract, numRows: int = 5, isSmartDepth: bool = False, mktDepthOptions=None):
+        self._depth[contract.symbol] = numRows
+        for client, ticker in self.gateway._tickers:
+            if client is self and ticker.contract.symbol == contract.symbol:
+                return ticker
+        return None
+
+    def cancelMktDepth(self, contract, isSmartDepth: bool = False):
+        self._depth.pop(contract.symbol, None)
+
+    # ==================== 订单 / 账户 ====================
+
+    def placeOrder(self, contract, order) -> ib_insync.Trade:
+        return self.gateway._place(self, contract, order)
+
+    def cancelOrder(self, order) -> Optional[ib_insync.Trade]:
+        for trade in self.trades:
+            if trade.order.orderId == order.orderId:
+                self.gateway._schedule(self.gateway.ack_latency, lambda: self.gateway._cancel(trade))
+                return trade
+        return None
+
+    def openTrades(self) -> List[ib_insync.Trade]:
+        return [t for t in self.trades if t.orderStatus.status not in ib_insync.OrderStatus.DoneStates]
+
+    def positions(self, account: str = '') -> List[ib_insync.Position]:
+        return [
+            ib_insync.Position(self.gateway.account, ib_insync.Stock(symbol, 'SMART', 'USD'), position, cost)
+            for symbol, (position, cost) in self.gateway.positions.items() if position
+        ]
+
+    def accountSummary(self, account: str = '') -> List[ib_insync.AccountValue]:
+        value = str(self.gateway.net_liquidation)
+        return [ib_insync.AccountValue(self.gateway.account, tag, value, 'USD', '')
+                for tag in ('NetLiquidation', 'TotalCashValue', 'AvailableFunds')]
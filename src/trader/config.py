@@ -42,6 +42,11 @@ class StrategyConfig:
     # 最大同时持仓数
     max_positions: int = 1
 
+    # 是否使用可成交价差（按 position_size 吃深度计算 VWAP）
+    # False = 只用最优 bid/ask 计算价差
+    # True  = 用 HL 订单簿和 IB 市场深度计算 position_size 数量的成交均价
+    use_executable_spread: bool = False
+
     # ==================== 风控参数 ====================
 
     # 最大滑点容忍（百分比）
@@ -84,4 +89,7 @@ def load_config_from_env():
     if size := os.getenv("POSITION_SIZE"):
         config.position_size = int(size)
 
+    if executable := os.getenv("EXECUTABLE_SPREAD"):
+        config.use_executable_spread = executable.lower() == "true"
+
     return config
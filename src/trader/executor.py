@@ -1,6 +1,8 @@
 """Trade executor - coordinates IB and Hyperliquid trading."""
 
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import time
 import uuid
 
@@ -8,6 +10,28 @@ from .ib_trader import IBTrader
 from .hl_trader import HLTrader
 from .position_manager import PositionManager, Position, PositionStatus
 from .strategy import SpreadAnalysis
+from .latency import LatencyTracker, TradeLatency
+from latency import TickStamps
+from runtime import nested_loop, wait_nested
+
+
+def allocate_fills(quantities: List[float], filled_qty: float) -> List[float]:
+    """把合并订单的成交量按顺序（先开的仓位优先）分配回各仓位.
+
+    Args:
+        quantities: 各仓位的数量（按分配顺序）
+        filled_qty: 合并订单的成交量
+
+    Returns:
+        各仓位分到的成交量
+    """
+    allocations = []
+    remaining = filled_qty
+    for quantity in quantities:
+        allocated = min(quantity, max(remaining, 0))
+        allocations.append(allocated)
+        remaining -= allocated
+    return allocations
 
 
 class TradeExecutor:
@@ -19,7 +43,9 @@ class TradeExecutor:
         hl_trader: HLTrader,
         position_manager: PositionManager,
         symbol: str,
-        hl_symbol: str
+        hl_symbol: str,
+        concurrent_legs: bool = False,
+        latency_tracker: Optional[LatencyTracker] = None
     ):
         """初始化交易执行器.
 
@@ -29,12 +55,126 @@ class TradeExecutor:
             position_manager: 仓位管理器
             symbol: 股票代码（如 "NVDA"）
             hl_symbol: Hyperliquid 符号（如 "xyz:NVDA"）
+            concurrent_legs: 开仓时是否同时发送两条腿（False = 先 IB 成交再发 HL）
+            latency_tracker: 逐笔记录行情到成交各阶段延迟（可选）
         """
         self.ib_trader = ib_trader
         self.hl_trader = hl_trader
         self.position_manager = position_manager
         self.symbol = symbol
         self.hl_symbol = hl_symbol
+        self.concurrent_legs = concurrent_legs
+        self.latency_tracker = latency_tracker
+
+        # HL 腿的发送线程（ib_insync 不是线程安全的，IB 腿始终在调用线程执行）
+        self._leg_pool: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _ack_latency_ms(result: Dict) -> Optional[float]:
+        """订单发送到交易所确认（ack）的耗时（不含等待成交）.
+
+        Returns:
+            毫秒，结果中没有 send_ns / ack_ns 时返回 None
+        """
+        send_ns, ack_ns = result.get("send_ns"), result.get("ack_ns")
+        if not send_ns or not ack_ns:
+            return None
+        return (ack_ns - send_ns) / 1e6
+
+    def _record_latency(
+        self,
+        trade_id: str,
+        action: str,
+        stamps: Optional[TickStamps],
+        decision_ns: int,
+        ib_result: Dict,
+        hl_result: Dict
+    ):
+        """把一笔交易的行情 / 决策 / 两条腿下单时间戳交给 latency_tracker 并打印明细."""
+        if self.latency_tracker is None:
+            return
+
+        trade = TradeLatency(trade_id=trade_id, action=action, decision_ns=decision_ns or 0)
+        if stamps is not None:
+            trade.exchange_ms, trade.recv_wall_ns, trade.recv_ns, trade.parsed_ns = stamps
+        for leg, result in (("ib", ib_result), ("hl", hl_result)):
+            trade.legs[leg] = {key: result.get(key) or 0 for key in ("send_ns", "ack_ns", "fill_ns")}
+
+        self.latency_tracker.record_trade(trade)
+        segments = trade.breakdown()["segments_us"]
+        print("⏱️  Latency (µs): " + ", ".join(f"{name}={value:,.1f}" for name, value in segments.items()))
+
+    def _open_legs_concurrently(
+        self,
+        quantity: int,
+        ib_limit_price: Optional[float],
+        hl_limit_price: Optional[float]
+    ) -> Tuple[Dict, Dict, float]:
+        """同时发送 IB 买入和 HL 开空，然后对账并对冲不平衡部分.
+
+        HL 订单在线程池中发送（HTTPS 请求），IB 订单在当前线程发送，
+        两条腿几乎同时离开本机。成交后按两边实际成交量对账：
+        - 一边多成交的部分立即反向平掉（IB 卖出多余股票 / HL 买入平掉多余空单）
+        - 最终只记录两边都成交的对冲数量
+
+        Args:
+            quantity: 数量
+            ib_limit_price: IB 限价（None = 市价）
+            hl_limit_price: HL 限价（None = 市价）
+
+        Returns:
+            (ib_result, hl_result, hedged_qty)
+        """
+        if self._leg_pool is None:
+            self._leg_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hl-leg")
+
+        print("\n[1/2] Sending IB buy and Hyperliquid short concurrently...")
+        hl_future = self._leg_pool.submit(
+            self.hl_trader.open_short, self.hl_symbol, quantity, limit_price=hl_limit_price
+        )
+        try:
+            ib_result = self.ib_trader.buy_stock(self.symbol, quantity, limit_price=ib_limit_price)
+        except Exception as e:
+            ib_result = {"success": False, "message": str(e)}
+
+        try:
+            # asyncio 模式下 HL 成交回报由本线程的事件循环分发：嵌套运行循环等待，不能阻塞
+            loop = nested_loop()
+            if loop is not None:
+                wait_nested(loop, asyncio.wrap_future(hl_future, loop=loop), None)
+            hl_result = hl_future.result()
+        except Exception as e:
+            hl_result = {"success": False, "message": str(e)}
+
+        # 对账：以实际成交量为准（失败或部分成交都可能有成交量）
+        ib_filled = ib_result.get("filled_qty") or 0
+        hl_filled = hl_result.get("filled_qty") or 0
+        hedged_qty = min(ib_filled, hl_filled)
+
+        print(f"\n[2/2] Reconciling fills: IB {ib_filled}, HL {hl_filled}")
+        if not ib_result.get("success"):
+            print(f"❌ IB order failed: {ib_result.get('message')}")
+        if not hl_result.get("success"):
+            print(f"❌ Hyperliquid order failed: {hl_result.get('message')}")
+
+        # 对冲不平衡部分
+        if ib_filled > hedged_qty:
+            excess = int(ib_filled - hedged_qty)
+            print(f"🔄 Unwinding {excess} unhedged shares on IB...")
+            unwind = self.ib_trader.sell_stock(self.symbol, excess, limit_price=None)
+            if not unwind["success"]:
+                print(f"❌ CRITICAL: IB unwind failed! Manual intervention required!")
+                print(f"   Need to manually sell {excess} shares of {self.symbol}")
+
+        if hl_filled > hedged_qty:
+            excess = hl_filled - hedged_qty
+            print(f"🔄 Unwinding {excess} unhedged perp short on Hyperliquid...")
+            unwind = self.hl_trader.close_short(self.hl_symbol, excess, limit_price=None)
+            if not unwind["success"]:
+                print(f"❌ CRITICAL: HL unwind failed! Manual intervention required!")
+                print(f"   Need to manually buy back {excess} {self.hl_symbol}")
+
+        return ib_result, hl_result, hedged_qty
 
     def open_arbitrage_position(
         self,
@@ -66,53 +206,67 @@ class TradeExecutor:
         # 生成仓位ID
         position_id = f"pos_{int(time.time())}_{uuid.uuid4().hex[:8]}"
 
-        # 步骤1：IB 买入现货
-        print("\n[1/2] Buying spot on IB...")
         ib_limit_price = analysis.ib_buy_price if use_limit_orders else None
+        hl_limit_price = analysis.hl_sell_price if use_limit_orders else None
 
-        ib_result = self.ib_trader.buy_stock(
-            self.symbol,
-            quantity,
-            limit_price=ib_limit_price
-        )
+        if self.concurrent_legs:
+            # 并发模式：两条腿同时发送，成交后对账
+            ib_result, hl_result, hedged_qty = self._open_legs_concurrently(
+                quantity, ib_limit_price, hl_limit_price
+            )
+            if hedged_qty <= 0:
+                print(f"❌ No hedged quantity, position not opened")
+                return None
+
+            if hedged_qty < quantity:
+                print(f"⚠️  Partially hedged: {hedged_qty}/{quantity}")
+            quantity = hedged_qty
+        else:
+            # 步骤1：IB 买入现货
+            print("\n[1/2] Buying spot on IB...")
+
+            ib_result = self.ib_trader.buy_stock(
+                self.symbol,
+                quantity,
+                limit_price=ib_limit_price
+            )
 
-        if not ib_result["success"]:
-            print(f"❌ IB order failed: {ib_result['message']}")
-            return None
+            if not ib_result["success"]:
+                print(f"❌ IB order failed: {ib_result['message']}")
+                return None
 
-        print(f"✅ IB order filled: {ib_result['filled_qty']} @ ${ib_result['avg_price']:.2f}")
+            print(f"✅ IB order filled: {ib_result['filled_qty']} @ ${ib_result['avg_price']:.2f}")
 
-        # 步骤2：Hyperliquid 开空永续
-        print("\n[2/2] Opening short on Hyperliquid...")
-        hl_limit_price = analysis.hl_sell_price if use_limit_orders else None
+            # 步骤2：Hyperliquid 开空永续
+            print("\n[2/2] Opening short on Hyperliquid...")
 
-        hl_result = self.hl_trader.open_short(
-            self.hl_symbol,
-            quantity,
-            limit_price=hl_limit_price
-        )
+            hl_result = self.hl_trader.open_short(
+                self.hl_symbol,
+                quantity,
+                limit_price=hl_limit_price
+            )
 
-        if not hl_result["success"]:
-            print(f"❌ Hyperliquid order failed: {hl_result['message']}")
-            print(f"⚠️  WARNING: IB position opened but HL failed!")
-            print(f"🔄 Attempting to rollback IB position...")
+            if not hl_result["success"]:
+                print(f"❌ Hyperliquid order failed: {hl_result['message']}")
+                print(f"⚠️  WARNING: IB position opened but HL failed!")
+                print(f"🔄 Attempting to rollback IB position...")
 
-            # 自动回滚：卖出刚才买入的股票
-            rollback_result = self.ib_trader.sell_stock(
-                self.symbol,
-                int(ib_result["filled_qty"]),
-                limit_price=None  # 使用市价单快速平仓
-            )
+                # 自动回滚：卖出刚才买入的股票
+                rollback_result = self.ib_trader.sell_stock(
+                    self.symbol,
+                    int(ib_result["filled_qty"]),
+                    limit_price=None  # 使用市价单快速平仓
+                )
 
-            if rollback_result["success"]:
-                print(f"✅ IB position rolled back successfully")
-            else:
-                print(f"❌ CRITICAL: Rollback failed! Manual intervention required!")
-                print(f"   Need to manually sell {ib_result['filled_qty']} shares of {self.symbol}")
+                if rollback_result["success"]:
+                    print(f"✅ IB position rolled back successfully")
+                else:
+                    print(f"❌ CRITICAL: Rollback failed! Manual intervention required!")
+                    print(f"   Need to manually sell {ib_result['filled_qty']} shares of {self.symbol}")
 
-            return None
+                return None
 
-        print(f"✅ HL order filled: {hl_result['filled_qty']} @ ${hl_result['avg_price']:.2f}")
+            print(f"✅ HL order filled: {hl_result['filled_qty']} @ ${hl_result['avg_price']:.2f}")
 
         # 步骤3：记录仓位
         position = Position(
@@ -127,11 +281,14 @@ class TradeExecutor:
             ib_order_id=ib_result.get("order_id"),
             hl_entry_price=hl_result["avg_price"],
             hl_order_id=hl_result.get("order_id"),
+            ib_entry_latency_ms=self._ack_latency_ms(ib_result),
+            hl_entry_latency_ms=self._ack_latency_ms(hl_result),
             status=PositionStatus.OPEN,
             notes=f"Opened at spread {analysis.spread*100:.4f}%"
         )
 
         self.position_manager.add_position(position)
+        self._record_latency(position_id, "open", analysis.stamps, analysis.decision_ns, ib_result, hl_result)
 
         print("\n" + "=" * 60)
         print(f"✅ Arbitrage position opened: {position_id}")
@@ -143,7 +300,8 @@ class TradeExecutor:
         self,
         position_id: str,
         market_data,  # MarketData object
-        use_limit_orders: bool = False
+        use_limit_orders: bool = False,
+        decision_ns: Optional[int] = None
     ) -> bool:
         """平仓套利仓位（卖出现货 + 平空永续）.
 
@@ -151,6 +309,7 @@ class TradeExecutor:
             position_id: 仓位ID
             market_data: 市场数据（需要包含 spot_bid 和 perp_ask）
             use_limit_orders: 是否使用限价单
+            decision_ns: 平仓信号触发时间（perf_counter_ns，延迟统计使用）
 
         Returns:
             True if successful, False otherwise
@@ -230,6 +389,7 @@ class TradeExecutor:
             hl_exit_price=hl_result["avg_price"],
             exit_spread=close_analysis.spread
         )
+        self._record_latency(position_id, "close", market_data.stamps, decision_ns, ib_result, hl_result)
 
         # 计算盈亏
         pnl = position.calculate_pnl()
@@ -242,6 +402,164 @@ class TradeExecutor:
 
         return True
 
+    def close_arbitrage_positions(
+        self,
+        position_ids: List[str],
+        market_data,  # MarketData object
+        use_limit_orders: bool = False,
+        decision_ns: Optional[int] = None,
+        timeout: float = 30
+    ) -> List[str]:
+        """批量平仓多个套利仓位.
+
+        - IB：每个仓位一笔卖单，全部提交后再一起等待（不逐笔等待成交）
+        - HL：同一交易对的平空数量合并为一笔订单，所有交易对在一次签名请求中提交
+        - 两条腿同时在途；HL 合并订单的成交按开仓时间先后分配回各仓位
+        - 超时仍在工作的订单撤单（HL 句柄超时自动撤单），以撤单后的成交为准
+
+        每个仓位按两条腿都成交的数量处理：全部成交的仓位平仓；部分成交的仓位拆出已对冲
+        的部分平仓，剩余数量保留为 OPEN；某条腿多成交（单边敞口）的剩余部分标记为 ERROR，
+        需要人工处理，不会再次自动平仓。
+
+        Args:
+            position_ids: 仓位ID列表
+            market_data: 市场数据（需要包含 spot_bid 和 perp_ask）
+            use_limit_orders: 是否使用限价单
+            decision_ns: 平仓信号触发时间（perf_counter_ns，延迟统计使用）
+            timeout: 等待所有订单成交的总超时时间（秒，两条腿共用同一截止时间）
+
+        Returns:
+            已平仓的仓位ID列表（部分平仓时为拆出的仓位ID）
+        """
+        from .strategy import ArbitrageStrategy
+
+        positions = []
+        for position_id in position_ids:
+            position = self.position_manager.get_position(position_id)
+            if not position:
+                print(f"❌ Position {position_id} not found")
+            elif position.status != PositionStatus.OPEN:
+                print(f"❌ Position {position_id} is not open")
+            else:
+                positions.append(position)
+        if not positions:
+            return []
+
+        close_analysis = ArbitrageStrategy().calculate_close_spread(market_data)
+        if not close_analysis.is_valid:
+            print(f"❌ Invalid market data for closing: {close_analysis.reason}")
+            return []
+
+        # 先开的仓位优先分配 HL 成交
+        positions.sort(key=lambda p: p.entry_time)
+        hl_quantities: Dict[str, float] = {}
+        for position in positions:
+            hl_quantities[position.hl_symbol] = hl_quantities.get(position.hl_symbol, 0) + position.quantity
+
+        print("\n" + "=" * 60)
+        print("批量平仓套利仓位")
+        print("=" * 60)
+        print(f"Positions: {len(positions)} ({', '.join(p.position_id for p in positions)})")
+        print(f"Total Quantity: {sum(p.quantity for p in positions)}")
+        print(f"Exit Spread: {close_analysis.spread*100:.4f}%")
+        print("=" * 60)
+
+        ib_limit_price = market_data.spot_bid if use_limit_orders else None
+        hl_limit_price = market_data.perp_ask if use_limit_orders else None
+
+        # 步骤1：提交所有订单（不等待）
+        print(f"\n[1/3] Submitting {len(positions)} IB sells and {len(hl_quantities)} HL close(s)...")
+        ib_handles = {}
+        for position in positions:
+            try:
+                ib_handles[position.position_id] = self.ib_trader.submit_order(
+                    position.symbol, 'SELL', int(position.quantity), ib_limit_price
+                )
+            except Exception as e:
+                print(f"❌ IB sell for {position.position_id} not submitted: {e}")
+
+        try:
+            hl_handles = self.hl_trader.submit_close_short_batch(
+                hl_quantities,
+                {symbol: hl_limit_price for symbol in hl_quantities} if hl_limit_price else None
+            )
+        except Exception as e:
+            print(f"❌ HL batch close not submitted: {e}")
+            hl_handles = {}
+
+        # 步骤2：等待两条腿
+        print("\n[2/3] Waiting for fills...")
+        # 所有订单共用一个截止时间：IB 卖单一起等待，HL 句柄只等剩余时间
+        deadline = time.monotonic() + timeout
+        self.ib_trader.orders.wait(ib_handles.values(), timeout)
+        ib_results = {pid: handle.to_result() for pid, handle in ib_handles.items()}
+        hl_results = {symbol: handle.result(max(0.0, deadline - time.monotonic()))
+                      for symbol, handle in hl_handles.items()}
+        for pid, handle in ib_handles.items():
+            if not handle.done():
+                ib_results[pid] = self.ib_trader.cancel_order(handle)
+        for symbol, result in hl_results.items():
+            print(f"  HL {symbol}: {result['filled_qty']}/{hl_quantities[symbol]} "
+                  f"@ {result['avg_price']} ({result['message']})")
+        # 撤单失败仍在挂单：成交数量不确定
+        working = {pid for pid, handle in ib_handles.items() if not handle.done()}
+        working |= {p.position_id for p in positions
+                    if p.hl_symbol in hl_handles and not hl_handles[p.hl_symbol].done()}
+
+        # 步骤3：分配 HL 成交并更新仓位
+        print("\n[3/3] Allocating fills to positions...")
+        hl_allocated: Dict[str, float] = {}
+        for symbol, result in hl_results.items():
+            group = [p for p in positions if p.hl_symbol == symbol]
+            allocations = allocate_fills([p.quantity for p in group], result.get("filled_qty") or 0)
+            for position, allocated in zip(group, allocations):
+                hl_allocated[position.position_id] = allocated
+
+        closed = []
+        for position in positions:
+            pid = position.position_id
+            ib_result = ib_results.get(pid, {"success": False, "message": "Not submitted"})
+            hl_result = hl_results.get(position.hl_symbol, {"success": False, "message": "Not submitted"})
+            quantity = position.quantity
+            ib_filled = min(ib_result.get("filled_qty") or 0, quantity)
+            hl_filled = hl_allocated.get(pid, 0)
+            hedged = min(ib_filled, hl_filled)
+
+            if hedged > 0:
+                # 两条腿都成交的部分平仓；部分成交时先拆出这部分
+                close_id = pid if hedged >= quantity else self.position_manager.split_position(pid, hedged).position_id
+                self.position_manager.close_position(
+                    close_id,
+                    ib_exit_price=ib_result["avg_price"],
+                    hl_exit_price=hl_result["avg_price"],
+                    exit_spread=close_analysis.spread
+                )
+                self._record_latency(close_id, "close", market_data.stamps, decision_ns, ib_result, hl_result)
+                closed.append(close_id)
+
+            if hedged >= quantity:
+                continue
+            remaining = quantity - hedged
+            if ib_filled != hl_filled or pid in working:
+                # 单边敞口（或订单状态不确定）：剩余部分不能再按套利仓位自动平仓
+                print(f"❌ CRITICAL: {pid} one-sided close "
+                      f"(IB sold {ib_filled}/{quantity}, HL bought {hl_filled}/{quantity})")
+                print(f"   Manual intervention required")
+                self.position_manager.mark_error(
+                    pid,
+                    f"Batch close one-sided fill: IB sold {ib_filled - hedged:g}, HL bought {hl_filled - hedged:g} "
+                    f"of remaining {remaining:g}" + (" (order still working)" if pid in working else "")
+                )
+            else:
+                print(f"⚠️  {pid} not closed: {remaining}/{quantity} remain open "
+                      f"(IB {ib_result.get('message')}, HL {hl_result.get('message')})")
+
+        print("\n" + "=" * 60)
+        print(f"✅ Closed {len(closed)} position(s) from {len(positions)} requested")
+        print("=" * 60)
+
+        return closed
+
     def check_and_execute_open_signal(
         self,
         quantity: int,
@@ -286,14 +604,8 @@ class TradeExecutor:
         if not open_positions:
             return False
 
-        closed_any = False
-
-        # 检查每个开仓仓位
-        for position in open_positions:
-            # 这里可以添加平仓条件判断
-            # 简化版：直接尝试平仓
-            success = self.close_arbitrage_position(position.position_id, market_data)
-            if success:
-                closed_any = True
-
-        return closed_any
+        # 简化版：直接尝试平仓（所有仓位一次批量提交）
+        closed = self.close_arbitrage_positions(
+            [position.position_id for position in open_positions], market_data
+        )
+        return bool(closed)
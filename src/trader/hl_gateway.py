@@ -0,0 +1,546 @@
+"""Non-blocking Hyperliquid order gateway with order handles and userFills tracking."""
+
+from typing import Any, Callable, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import itertools
+import os
+import threading
+import time
+
+from runtime import nested_loop, wait_nested
+
+
+# 暂存的未匹配成交（非本网关订单，或先于下单响应到达）数量上限
+MAX_UNMATCHED_FILLS = 1000
+
+# 市价单 = 带滑点保护价的 IOC 限价单（与 SDK market_open 相同）
+DEFAULT_SLIPPAGE = 0.05
+IOC = {"limit": {"tif": "Ioc"}}
+GTC = {"limit": {"tif": "Gtc"}}
+
+# 超时撤单后等待撤单 / 订单状态查询完成的时间（秒）
+CANCEL_TIMEOUT = 10.0
+
+
+class HLOrderHandle:
+    """一笔已提交 Hyperliquid 订单的句柄.
+
+    下单 HTTP 响应（ack）在网关线程池中处理，成交由 userFills WebSocket 推送（或
+    IOC 响应中的 filled）更新。可以同步等待 result()、在 asyncio 中 await，或注册回调。
+    result() 超时时撤销仍在挂单的订单，并按交易所的订单状态补记撤单前的成交。
+    """
+
+    def __init__(self, coin: str, is_buy: bool, size: float, limit_px: float,
+                 order_type: Dict, reduce_only: bool, cloid):
+        self.coin = coin
+        self.is_buy = is_buy
+        self.size = size
+        self.limit_px = limit_px
+        self.order_type = order_type
+        self.reduce_only = reduce_only
+        self.cloid = cloid
+
+        self.oid: Optional[int] = None
+        self.error: Optional[str] = None
+        self.acked = False
+        self.cancelled = False        # IOC 未成交的剩余部分 / 被撤单
+
+        # perf_counter_ns，0 = 未发生
+        self.send_ns = 0
+        self.ack_ns = 0
+        self.fill_ns = 0
+
+        self._fills: Dict[Any, Dict] = {}      # tid -> WebSocket 成交
+        self._ack_filled = (0.0, None)          # 下单响应中的 (totalSz, avgPx)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._fill_callbacks: List[Callable] = []
+        self._done_callbacks: List[Callable] = []
+        self._future: Optional[asyncio.Future] = None
+        self._gateway: Optional["HLOrderGateway"] = None
+        self._send_future = None
+
+    # ==================== 状态 ====================
+
+    @property
+    def filled_qty(self) -> float:
+        """已成交数量（WebSocket 成交与下单响应取较大者，两者可能先后到达）."""
+        with self._lock:
+            ws_qty = sum(float(fill["sz"]) for fill in self._fills.values())
+            return max(ws_qty, self._ack_filled[0])
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        with self._lock:
+            ws_qty = sum(float(fill["sz"]) for fill in self._fills.values())
+            if ws_qty and ws_qty >= self._ack_filled[0]:
+                return sum(float(f["sz"]) * float(f["px"]) for f in self._fills.values()) / ws_qty
+            return self._ack_filled[1]
+
+    def done(self) -> bool:
+        """订单是否已结束（全部成交、IOC 剩余撤销或被拒绝）."""
+        return self._done.is_set()
+
+    def _fills_settled(self) -> bool:
+        """已结束且下单响应报告的成交都已由 userFills 推送（之后不会再有本订单的成交）."""
+        with self._lock:
+            ws_qty = sum(float(fill["sz"]) for fill in self._fills.values())
+            return self._done.is_set() and (self.error is not None or ws_qty >= self._ack_filled[0])
+
+    def to_result(self) -> Dict:
+        """转换为 HLTrader 的订单结果字典.
+
+        Returns:
+            {"success", "order_id", "filled_qty", "avg_price", "message",
+             "send_ns", "ack_ns", "fill_ns"}
+        """
+        filled_qty = self.filled_qty
+        if self.error:
+            message = self.error
+        elif filled_qty >= self.size:
+            message = "Order filled"
+        elif self.acked and not self.done():
+            message = "Order resting"
+        elif filled_qty and (self.acked or self.cancelled):
+            message = "Order partially filled"
+        elif self.acked and self.order_type.get("limit", {}).get("tif") == "Ioc":
+            message = "Order cancelled (IOC not filled)"
+        elif self.cancelled:
+            message = "Order cancelled"
+        else:
+            message = "Order pending"
+        return {
+            "success": self.error is None and filled_qty > 0,
+            "order_id": self.oid,
+            "filled_qty": filled_qty,
+            "avg_price": self.avg_price,
+            "message": message,
+            "send_ns": self.send_ns,
+            "ack_ns": self.ack_ns,
+            "fill_ns": self.fill_ns,
+        }
+
+    # ==================== 等待 ====================
+
+    def result(self, timeout: Optional[float] = 30, cancel_on_timeout: bool = True) -> Dict:
+        """同步等待订单结束.
+
+        超时时撤销订单（按 oid，尚无 oid 时按 cloid），再查询订单状态把撤单前的成交
+        计入结果，返回的是最终状态；撤单失败时返回当前状态（"Order resting"）。
+
+        在允许嵌套的事件循环中调用时（asyncio 模式），通过嵌套运行循环等待，
+        同一循环分发的 userFills 成交在等待期间照常到达。
+
+        Args:
+            timeout: 超时时间（秒，None = 一直等待）
+            cancel_on_timeout: 超时是否撤单（False = 保留挂单，直接返回当前状态）
+        """
+        if not self._wait(timeout) and cancel_on_timeout and self._gateway is not None:
+            self._gateway.cancel(self)
+            self._wait(CANCEL_TIMEOUT)
+        return self.to_result()
+
+    def _wait(self, timeout: Optional[float]) -> bool:
+        """等待订单结束（嵌套事件循环中让循环继续运行）."""
+        loop = nested_loop()
+        if loop is None or self._done.is_set():
+            return self._done.wait(timeout)
+        return wait_nested(loop, self._get_future(), timeout)
+
+    def __await__(self):
+        return self._get_future().__await__()
+
+    def _get_future(self) -> asyncio.Future:
+        if self._future is None:
+            future = asyncio.get_event_loop().create_future()
+            # 与 _finish 在同一把锁下交换：要么 _finish 看到 future，要么这里看到已结束
+            with self._lock:
+                self._future = future
+                done = self._done.is_set()
+            if done:
+                future.set_result(self.to_result())
+        return self._future
+
+    # ==================== 回调 ====================
+
+    def add_fill_callback(self, callback: Callable[["HLOrderHandle", Dict], None]):
+        """注册成交回调 callback(handle, fill)，每条 userFills 成交调用一次（可能在 WebSocket 线程）."""
+        self._fill_callbacks.append(callback)
+
+    def add_done_callback(self, callback: Callable[["HLOrderHandle"], None]):
+        """注册结束回调 callback(handle)（已结束时立即调用）."""
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(callback)
+                return
+        callback(self)
+
+    # ==================== 网关回调 ====================
+
+    def _on_ack(self, status: Dict):
+        """处理下单响应中本订单的 status（resting / filled / error）."""
+        now = time.perf_counter_ns()
+        with self._lock:
+            self.ack_ns = now
+            self.acked = True
+            if "error" in status:
+                self.error = status["error"]
+            elif "resting" in status:
+                self.oid = status["resting"].get("oid")
+            elif "filled" in status:
+                filled = status["filled"]
+                self.oid = filled.get("oid")
+                self._ack_filled = (abs(float(filled.get("totalSz", 0))),
+                                    float(filled["avgPx"]) if filled.get("avgPx") else None)
+                if not self.fill_ns:
+                    self.fill_ns = now
+
+        if self.error:
+            self._finish()
+        elif "resting" not in status and self.order_type.get("limit", {}).get("tif") == "Ioc":
+            # IOC 响应即最终结果：未成交部分已撤销
+            self.cancelled = self.filled_qty < self.size
+            self._finish()
+        elif self.filled_qty >= self.size:
+            self._finish()
+
+    def _on_fill(self, fill: Dict):
+        """处理一条 userFills 成交."""
+        with self._lock:
+            tid = fill.get("tid", id(fill))
+            if tid in self._fills:
+                return
+            self._fills[tid] = fill
+            if not self._done.is_set():
+                self.fill_ns = time.perf_counter_ns()
+        for callback in self._fill_callbacks:
+            try:
+                callback(self, fill)
+            except Exception as e:
+                print(f"Warning: Fill callback error: {e}")
+        if self.filled_qty >= self.size:
+            self._finish()
+
+    def _on_cancelled(self, filled_qty: float):
+        """撤单完成（或订单已在撤单前结束）：按交易所订单状态中的成交数量结束句柄.
+
+        Args:
+            filled_qty: 订单状态中的已成交数量（origSz - sz）
+        """
+        with self._lock:
+            ws_qty = sum(float(fill["sz"]) for fill in self._fills.values())
+            if filled_qty > max(ws_qty, self._ack_filled[0]):
+                # 撤单前的成交可能还没有通过 userFills 到达：按成交数量补记，价格沿用已知成交价或限价
+                known_px = (sum(float(f["sz"]) * float(f["px"]) for f in self._fills.values()) / ws_qty
+                            if ws_qty else self._ack_filled[1])
+                self._ack_filled = (filled_qty, known_px or self.limit_px)
+                if not self.fill_ns:
+                    self.fill_ns = time.perf_counter_ns()
+            self.cancelled = max(filled_qty, ws_qty, self._ack_filled[0]) < self.size
+        self._finish()
+
+    def _fail(self, message: str):
+        with self._lock:
+            self.error = message
+            self.ack_ns = self.ack_ns or time.perf_counter_ns()
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._done.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+            future = self._future
+
+        if future is not None:
+            result = self.to_result()
+            future.get_loop().call_soon_threadsafe(_set_future_result, future, result)
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Warning: Order done callback error: {e}")
+
+
+def _set_future_result(future: asyncio.Future, result: Dict):
+    if not future.done():
+        future.set_result(result)
+
+
+class HLOrderGateway:
+    """Hyperliquid 下单网关：非阻塞提交、持久连接池、userFills 成交回报.
+
+    - submit() / submit_batch() 在调用线程完成签名所需的参数准备后立即返回句柄，
+      签名和 HTTPS 请求在线程池中执行
+    - 复用 Exchange 的 requests.Session：按线程池大小配置连接池（keep-alive），
+      warm() 预先建立 TLS 连接，下单时不再握手
+    - 订阅 userFills 后成交按 oid / cloid 匹配到句柄；成交可能先于下单响应到达，先缓存
+    """
+
+    def __init__(self, exchange, address: str, stream_info=None, max_workers: int = 4):
+        """Initialize the gateway.
+
+        Args:
+            exchange: hyperliquid.exchange.Exchange
+            address: 账户地址（userFills 订阅使用）
+            stream_info: 支持 subscribe 的 Info（SDK Info 或 HyperliquidAsyncStream），None = 不订阅成交
+            max_workers: 同时在途的下单请求数（同时也是连接池大小）
+        """
+        self.exchange = exchange
+        self.address = address
+        self.stream_info = stream_info
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hl-order")
+        # 撤单使用独立线程池：下单线程池满载时撤单不排在下单请求后面
+        self._cancel_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hl-cancel")
+        self._configure_session(max_workers)
+
+        self._lock = threading.Lock()
+        self._by_oid: Dict[int, HLOrderHandle] = {}
+        self._by_cloid: Dict[str, HLOrderHandle] = {}
+        self._unmatched: "OrderedDict[int, List[Dict]]" = OrderedDict()   # 未匹配的成交，oid -> fills
+        self._cloid_prefix = int.from_bytes(os.urandom(8), "big") << 64
+        self._cloid_seq = itertools.count(1)
+
+        self._fills_sub_id = None
+        if stream_info is not None:
+            self._fills_sub_id = stream_info.subscribe(
+                {"type": "userFills", "user": address}, self._on_user_fills
+            )
+
+    def _configure_session(self, pool_size: int):
+        session = getattr(self.exchange, "session", None)
+        if session is None:
+            return
+        from requests.adapters import HTTPAdapter
+        # 不自动重试：下单请求重发可能导致重复下单
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+
+    def warm(self, dex: str = "") -> bool:
+        """用一次 /info 请求预先建立连接（TLS 握手不在下单路径上）."""
+        try:
+            self.exchange.post("/info", {"type": "meta", "dex": dex})
+            return True
+        except Exception as e:
+            print(f"Warning: Could not warm Hyperliquid connection: {e}")
+            return False
+
+    # ==================== 提交 ====================
+
+    def _next_cloid(self):
+        from hyperliquid.utils.types import Cloid
+        return Cloid.from_int(self._cloid_prefix | next(self._cloid_seq))
+
+    def new_handle(
+        self,
+        coin: str,
+        is_buy: bool,
+        size: float,
+        limit_px: float,
+        order_type: Dict = IOC,
+        reduce_only: bool = False
+    ) -> HLOrderHandle:
+        """创建（尚未提交的）订单句柄，分配 cloid 并登记以便匹配成交."""
+        handle = HLOrderHandle(coin, is_buy, size, limit_px, order_type, reduce_only, self._next_cloid())
+        handle._gateway = self
+        with self._lock:
+            self._by_cloid[handle.cloid.to_raw()] = handle
+        return handle
+
+    def submit(
+        self,
+        coin: str,
+        is_buy: bool,
+        size: float,
+        limit_px: float,
+        order_type: Dict = IOC,
+        reduce_only: bool = False
+    ) -> HLOrderHandle:
+        """提交一笔订单并立即返回句柄.
+
+        Args:
+            coin: 交易对符号（例如 "xyz:NVDA"）
+            is_buy: 买入 / 卖出
+            size: 数量
+            limit_px: 限价（市价单传入带滑点的保护价）
+            order_type: IOC（市价）或 GTC（挂单）
+            reduce_only: 是否仅减仓
+        """
+        return self.submit_batch([self.new_handle(coin, is_buy, size, limit_px, order_type, reduce_only)])[0]
+
+    def submit_batch(self, handles: List[HLOrderHandle]) -> List[HLOrderHandle]:
+        """一次签名请求提交多笔订单（exchange.bulk_orders），立即返回.
+
+        Args:
+            handles: new_handle() 创建的句柄
+
+        Returns:
+            同一组句柄
+        """
+        send_ns = time.perf_counter_ns()
+        for handle in handles:
+            handle.send_ns = send_ns
+        future = self._pool.submit(self._send, handles)
+        for handle in handles:
+            handle._send_future = future
+        return handles
+
+    def _send(self, handles: List[HLOrderHandle]):
+        """线程池中执行：签名、发送、按顺序把 statuses 分配给句柄."""
+        requests = [{
+            "coin": h.coin,
+            "is_buy": h.is_buy,
+            "sz": h.size,
+            "limit_px": h.limit_px,
+            "order_type": h.order_type,
+            "reduce_only": h.reduce_only,
+            "cloid": h.cloid,
+        } for h in handles]
+
+        try:
+            response = self.exchange.bulk_orders(requests)
+        except Exception as e:
+            for handle in handles:
+                handle._fail(f"{type(e).__name__}: {e}")
+            return
+
+        statuses = []
+        if isinstance(response, dict) and response.get("status") == "ok":
+            data = response.get("response", {}).get("data", {})
+            statuses = data.get("statuses", []) if isinstance(data, dict) else []
+        if len(statuses) != len(handles):
+            for handle in handles:
+                handle._fail(f"Unexpected response: {response}")
+            return
+
+        for handle, status in zip(handles, statuses):
+            if not isinstance(status, dict):
+                handle._fail(str(status))
+            else:
+                handle._on_ack(status)
+                self._register_oid(handle)
+            self._release_if_settled(handle)
+
+    def _register_oid(self, handle: HLOrderHandle):
+        with self._lock:
+            if handle.oid is not None:
+                self._by_oid[handle.oid] = handle
+            early = self._unmatched.pop(handle.oid, [])
+        for fill in early:
+            handle._on_fill(fill)
+
+    def _release_if_settled(self, handle: HLOrderHandle):
+        """订单的成交全部到达后释放匹配表项."""
+        if handle._fills_settled():
+            with self._lock:
+                self._by_cloid.pop(handle.cloid.to_raw(), None)
+                self._by_oid.pop(handle.oid, None)
+
+    # ==================== 撤单 ====================
+
+    def cancel(self, handle: HLOrderHandle):
+        """撤销订单并按订单状态结束句柄（在撤单线程池中执行，立即返回）.
+
+        下单请求尚未完成时，撤单在下单响应处理后才提交（不占用等待中的线程）。
+
+        Returns:
+            concurrent.futures.Future，撤单处理完成时结束
+        """
+        future = Future()
+
+        def run():
+            try:
+                self._cancel(handle)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+        def submit(_send_future=None):
+            try:
+                self._cancel_pool.submit(run)
+            except RuntimeError as e:
+                # 网关已关闭
+                future.set_exception(e)
+
+        if handle._send_future is None:
+            submit()
+        else:
+            handle._send_future.add_done_callback(submit)
+        return future
+
+    def _cancel(self, handle: HLOrderHandle):
+        """撤单线程池中执行：撤单，查询订单状态补记成交."""
+        if handle.done():
+            return
+
+        try:
+            if handle.oid is not None:
+                response = self.exchange.cancel(handle.coin, handle.oid)
+            else:
+                response = self.exchange.cancel_by_cloid(handle.coin, handle.cloid)
+            print(f"🔄 Cancel {handle.coin} order {handle.oid or handle.cloid.to_raw()}: {response}")
+
+            # 撤单可能因为订单已经成交而失败：以订单状态为准
+            if handle.oid is not None:
+                status = self.exchange.info.query_order_by_oid(self.address, handle.oid)
+            else:
+                status = self.exchange.info.query_order_by_cloid(self.address, handle.cloid)
+        except Exception as e:
+            print(f"❌ CRITICAL: Could not cancel {handle.coin} order {handle.oid or handle.cloid.to_raw()}: {e}")
+            return
+
+        if status.get("status") == "unknownOid":
+            # 下单请求没有到达交易所
+            handle._on_cancelled(0.0)
+        elif status.get("status") == "order":
+            order_status = status["order"]
+            order = order_status["order"]
+            if order_status.get("status") == "open":
+                print(f"❌ CRITICAL: {handle.coin} order {handle.oid} still open after cancel")
+                return
+            handle._on_cancelled(float(order["origSz"]) - float(order["sz"]))
+        else:
+            print(f"❌ CRITICAL: Unexpected order status for {handle.coin} order {handle.oid}: {status}")
+            return
+        self._release_if_settled(handle)
+
+    # ==================== 成交回报 ====================
+
+    def _on_user_fills(self, msg: Dict):
+        """userFills 推送回调（快照为历史成交，忽略）."""
+        data = msg.get("data", {})
+        if data.get("isSnapshot"):
+            return
+        for fill in data.get("fills", []):
+            with self._lock:
+                handle = self._by_cloid.get(fill.get("cloid")) or self._by_oid.get(fill.get("oid"))
+                if handle is None:
+                    # 下单响应尚未处理（或不是本网关的订单）：按 oid 暂存
+                    self._unmatched.setdefault(fill.get("oid"), []).append(fill)
+                    while len(self._unmatched) > MAX_UNMATCHED_FILLS:
+                        self._unmatched.popitem(last=False)
+                    continue
+            handle._on_fill(fill)
+            self._release_if_settled(handle)
+
+    def pending_count(self) -> int:
+        """仍在匹配表中的订单数（等待响应或成交）."""
+        with self._lock:
+            return len(self._by_cloid)
+
+    def close(self):
+        """取消成交订阅并等待在途请求完成."""
+        if self._fills_sub_id is not None:
+            try:
+                self.stream_info.unsubscribe({"type": "userFills", "user": self.address}, self._fills_sub_id)
+            except Exception as e:
+                print(f"Warning: Could not unsubscribe userFills: {e}")
+            self._fills_sub_id = None
+        self._pool.shutdown(wait=True)
+        self._cancel_pool.shutdown(wait=True)
@@ -1,17 +1,28 @@
 """Hyperliquid perpetual contract trading interface."""
 
 from typing import Optional, Dict
-import time
+
+from .hl_gateway import HLOrderGateway, HLOrderHandle, DEFAULT_SLIPPAGE, IOC, GTC
 
 
 class HLTrader:
-    """Hyperliquid 永续合约交易接口."""
+    """Hyperliquid 永续合约交易接口.
+
+    下单通过 HLOrderGateway 发送：submit_* 立即返回 HLOrderHandle，open_short / close_short
+    在句柄结束后返回结果字典。市价单是带滑点保护价的 IOC 限价单，保护价优先按
+    price_source（例如 HyperliquidFetcherStreaming）缓存的盘口计算，不额外请求 allMids。
+    """
 
     def __init__(
         self,
         private_key: str,
         use_testnet: bool = False,
-        perp_dexs: list = None
+        perp_dexs: list = None,
+        stream_info=None,
+        price_source=None,
+        slippage: float = DEFAULT_SLIPPAGE,
+        max_inflight: int = 4,
+        base_url: Optional[str] = None
     ):
         """初始化 Hyperliquid 交易接口.
 
@@ -19,40 +30,60 @@ class HLTrader:
             private_key: 私钥（0x开头的十六进制字符串）
             use_testnet: 是否使用测试网
             perp_dexs: Perp DEX 列表（例如 ["xyz"]）
+            stream_info: 支持 subscribe 的 Info，用于订阅 userFills 成交回报（可选）
+            price_source: 提供 get_orderbook_prices() 的行情对象，市价单保护价使用（可选）
+            slippage: 市价单保护价相对盘口的滑点
+            max_inflight: 同时在途的下单请求数
+            base_url: API URL（None = 按 use_testnet 选择；例如本地模拟器的地址）
         """
         self.private_key = private_key
         self.use_testnet = use_testnet
         self.perp_dexs = perp_dexs or ["xyz"]
-
+        self.stream_info = stream_info
+        self.price_source = price_source
+        self.slippage = slippage
+        self.max_inflight = max_inflight
+        self.base_url = base_url
+
+        self.wallet = None
+        self.address: Optional[str] = None
         self.exchange = None
         self.info = None
+        self.gateway: Optional[HLOrderGateway] = None
         self.connected = False
 
     def connect(self) -> bool:
-        """连接到 Hyperliquid.
+        """连接到 Hyperliquid（加载元数据、建立下单连接池并订阅成交回报）.
 
         Returns:
             True if successful, False otherwise
         """
         try:
+            from eth_account import Account
             from hyperliquid.exchange import Exchange
-            from hyperliquid.info import Info
             from hyperliquid.utils import constants
 
-            base_url = constants.TESTNET_API_URL if self.use_testnet else constants.MAINNET_API_URL
+            base_url = self.base_url or (constants.TESTNET_API_URL if self.use_testnet else constants.MAINNET_API_URL)
 
-            # 初始化 Exchange（用于交易）
+            # Exchange 需要 LocalAccount 签名（不是私钥字符串）
+            self.wallet = Account.from_key(self.private_key)
+            self.address = self.wallet.address
             self.exchange = Exchange(
-                self.private_key,
+                self.wallet,
                 base_url=base_url,
                 perp_dexs=self.perp_dexs
             )
+            # Exchange 内部的 Info（skip_ws）用于查询
+            self.info = self.exchange.info
 
-            # 初始化 Info（用于查询）
-            self.info = Info(base_url, skip_ws=True, perp_dexs=self.perp_dexs)
+            self.gateway = HLOrderGateway(
+                self.exchange, self.address,
+                stream_info=self.stream_info, max_workers=self.max_inflight
+            )
+            self.gateway.warm(self.perp_dexs[0] if self.perp_dexs else "")
 
             self.connected = True
-            network = "TESTNET" if self.use_testnet else "MAINNET"
+            network = base_url if self.base_url else ("TESTNET" if self.use_testnet else "MAINNET")
             print(f"✓ Hyperliquid Trader connected ({network})")
             return True
 
@@ -63,23 +94,140 @@ class HLTrader:
             print(f"Error connecting Hyperliquid Trader: {e}")
             return False
 
+    def disconnect(self):
+        """取消成交订阅并等待在途订单请求完成."""
+        if self.gateway is not None:
+            self.gateway.close()
+            self.gateway = None
+        self.connected = False
+
+    # ==================== 非阻塞下单 ====================
+
+    def _protection_price(self, symbol: str, is_buy: bool, reference_price: Optional[float]) -> float:
+        """市价单的 IOC 保护价（参考价 ± 滑点，按合约精度取整）."""
+        if reference_price is None and self.price_source is not None:
+            prices = self.price_source.get_orderbook_prices()
+            reference_price = prices.get("perp_ask" if is_buy else "perp_bid")
+        # reference_price 为 None 时 SDK 请求 allMids 取中间价
+        return self.exchange._slippage_price(symbol, is_buy, self.slippage, reference_price)
+
+    def build_order(
+        self,
+        symbol: str,
+        is_buy: bool,
+        quantity: float,
+        limit_price: Optional[float] = None,
+        reduce_only: bool = False,
+        reference_price: Optional[float] = None
+    ) -> HLOrderHandle:
+        """构造订单句柄（不提交，可与其他订单一起用 gateway.submit_batch 提交）.
+
+        Args:
+            symbol: 交易对符号（例如 "xyz:NVDA"）
+            is_buy: 买入 / 卖出
+            quantity: 数量（正数）
+            limit_price: 限价（None = 市价 IOC）
+            reduce_only: 是否仅减仓
+            reference_price: 市价单保护价的参考价（None = price_source 盘口）
+        """
+        if limit_price is None:
+            px, order_type = self._protection_price(symbol, is_buy, reference_price), IOC
+        else:
+            px, order_type = limit_price, GTC
+        return self.gateway.new_handle(symbol, is_buy, abs(quantity), px, order_type, reduce_only)
+
+    def submit_open_short(
+        self,
+        symbol: str,
+        quantity: float,
+        limit_price: Optional[float] = None,
+        reduce_only: bool = False,
+        reference_price: Optional[float] = None
+    ) -> HLOrderHandle:
+        """提交开空订单并立即返回句柄."""
+        kind = "MARKET" if limit_price is None else "LIMIT"
+        print(f"📤 Placing {kind} SHORT order: {abs(quantity)} {symbol}" +
+              (f" @ ${limit_price}" if limit_price is not None else ""))
+        handle = self.build_order(symbol, False, quantity, limit_price, reduce_only, reference_price)
+        return self.gateway.submit_batch([handle])[0]
+
+    def submit_close_short(
+        self,
+        symbol: str,
+        quantity: float,
+        limit_price: Optional[float] = None,
+        reference_price: Optional[float] = None
+    ) -> HLOrderHandle:
+        """提交平空（仅减仓买入）订单并立即返回句柄."""
+        kind = "MARKET" if limit_price is None else "LIMIT"
+        print(f"📤 Placing {kind} CLOSE order: {abs(quantity)} {symbol}" +
+              (f" @ ${limit_price}" if limit_price is not None else ""))
+        handle = self.build_order(symbol, True, quantity, limit_price, True, reference_price)
+        return self.gateway.submit_batch([handle])[0]
+
+    def submit_close_short_batch(
+        self,
+        quantities: Dict[str, float],
+        limit_prices: Optional[Dict[str, float]] = None
+    ) -> Dict[str, HLOrderHandle]:
+        """一次签名请求提交多个交易对的平空订单（exchange.bulk_orders），立即返回.
+
+        Args:
+            quantities: 交易对 -> 平仓数量（同一交易对的多个仓位应先合并）
+            limit_prices: 交易对 -> 限价（缺省 = 市价 IOC）
+
+        Returns:
+            交易对 -> HLOrderHandle
+        """
+        limit_prices = limit_prices or {}
+        handles = {
+            symbol: self.build_order(symbol, True, quantity, limit_prices.get(symbol), True)
+            for symbol, quantity in quantities.items()
+        }
+        print(f"📤 Placing batch CLOSE order ({len(handles)} in one request): " +
+              ", ".join(f"{quantity} {symbol}" for symbol, quantity in quantities.items()))
+        self.gateway.submit_batch(list(handles.values()))
+        return handles
+
+    # ==================== 阻塞下单 ====================
+
+    @staticmethod
+    def _report(result: Dict) -> Dict:
+        if result["success"] and result["filled_qty"] > 0:
+            print(f"✅ Order FILLED: {result['filled_qty']} @ ${result['avg_price']:.2f}")
+        elif result["message"] == "Order resting":
+            print(f"⚠️  Order still RESTING (cancel after timeout failed)")
+        else:
+            print(f"❌ Order failed: {result['message']}")
+        return result
+
     def open_short(
         self,
         symbol: str,
         quantity: float,
         limit_price: Optional[float] = None,
-        reduce_only: bool = False
+        reduce_only: bool = False,
+        timeout: float = 30
     ) -> Dict:
-        """开空永续合约.
+        """开空永续合约（等待订单结束）.
 
         Args:
             symbol: 交易对符号（例如 "xyz:NVDA"）
             quantity: 数量（正数）
             limit_price: 限价（None = 市价单）
             reduce_only: 是否仅减仓
+            timeout: 等待成交的超时时间（秒，超时撤单并按订单状态返回已成交部分）
 
         Returns:
-            订单结果字典
+            订单结果字典：
+            {
+                "success": bool,
+                "order_id": int,
+                "filled_qty": float,
+                "avg_price": float,
+                "message": str,
+                "send_ns" / "ack_ns" / "fill_ns": int（perf_counter_ns，0 = 未发生）
+            }
         """
         if not self.connected:
             return {
@@ -88,66 +236,10 @@ class HLTrader:
             }
 
         try:
-            # 开空 = 卖出（负数量）
-            size = -abs(quantity)
-
-            if limit_price is None:
-                # 市价单
-                print(f"📤 Placing MARKET SHORT order: {abs(size)} {symbol}")
-                order_result = self.exchange.market_open(
-                    symbol,
-                    is_buy=False,
-                    sz=abs(size),
-                    reduce_only=reduce_only
-                )
-            else:
-                # 限价单
-                print(f"📤 Placing LIMIT SHORT order: {abs(size)} {symbol} @ ${limit_price}")
-                order_result = self.exchange.limit_order(
-                    symbol,
-                    is_buy=False,
-                    sz=abs(size),
-                    limit_px=limit_price,
-                    reduce_only=reduce_only
-                )
-
-            # 解析结果
-            if order_result and order_result.get("status") == "ok":
-                response = order_result.get("response", {})
-                data = response.get("data", {}) if isinstance(response, dict) else {}
-
-                statuses = data.get("statuses", []) if isinstance(data, dict) else []
-
-                if statuses and len(statuses) > 0:
-                    status = statuses[0]
-                    filled = status.get("filled", {})
-
-                    result = {
-                        "success": True,
-                        "order_id": status.get("oid"),
-                        "filled_qty": abs(float(filled.get("totalSz", 0))),
-                        "avg_price": float(filled.get("avgPx", 0)) if filled.get("avgPx") else None,
-                        "message": "Order placed successfully"
-                    }
-
-                    if result["filled_qty"] > 0:
-                        print(f"✅ Order FILLED: {result['filled_qty']} @ ${result['avg_price']:.2f}")
-                    else:
-                        print(f"⏳ Order SUBMITTED (waiting for fill)")
-
-                    return result
-
-            # 失败情况
-            print(f"❌ Order failed: {order_result}")
-            return {
-                "success": False,
-                "message": str(order_result)
-            }
-
+            handle = self.submit_open_short(symbol, quantity, limit_price, reduce_only)
+            return self._report(handle.result(timeout))
         except Exception as e:
             print(f"Error placing short order: {e}")
-            import traceback
-            traceback.print_exc()
             return {
                 "success": False,
                 "message": str(e)
@@ -157,17 +249,19 @@ class HLTrader:
         self,
         symbol: str,
         quantity: float,
-        limit_price: Optional[float] = None
+        limit_price: Optional[float] = None,
+        timeout: float = 30
     ) -> Dict:
-        """平空永续合约（买入平仓）.
+        """平空永续合约（仅减仓买入，等待订单结束）.
 
         Args:
             symbol: 交易对符号
             quantity: 数量（正数）
             limit_price: 限价（None = 市价单）
+            timeout: 等待成交的超时时间（秒，超时撤单并按订单状态返回已成交部分）
 
         Returns:
-            订单结果字典
+            订单结果字典（格式同 open_short）
         """
         if not self.connected:
             return {
@@ -176,64 +270,10 @@ class HLTrader:
             }
 
         try:
-            # 平空 = 买入（正数量）
-            size = abs(quantity)
-
-            if limit_price is None:
-                # 市价单 - 使用 market_open 配合 reduce_only 来指定数量
-                print(f"📤 Placing MARKET CLOSE order: {size} {symbol}")
-                order_result = self.exchange.market_open(
-                    symbol,
-                    is_buy=True,
-                    sz=size,
-                    reduce_only=True
-                )
-            else:
-                # 限价单（使用 reduce_only）
-                print(f"📤 Placing LIMIT CLOSE order: {size} {symbol} @ ${limit_price}")
-                order_result = self.exchange.limit_order(
-                    symbol,
-                    is_buy=True,
-                    sz=size,
-                    limit_px=limit_price,
-                    reduce_only=True
-                )
-
-            # 解析结果（同 open_short）
-            if order_result and order_result.get("status") == "ok":
-                response = order_result.get("response", {})
-                data = response.get("data", {}) if isinstance(response, dict) else {}
-                statuses = data.get("statuses", []) if isinstance(data, dict) else []
-
-                if statuses and len(statuses) > 0:
-                    status = statuses[0]
-                    filled = status.get("filled", {})
-
-                    result = {
-                        "success": True,
-                        "order_id": status.get("oid"),
-                        "filled_qty": abs(float(filled.get("totalSz", 0))),
-                        "avg_price": float(filled.get("avgPx", 0)) if filled.get("avgPx") else None,
-                        "message": "Order placed successfully"
-                    }
-
-                    if result["filled_qty"] > 0:
-                        print(f"✅ Order FILLED: {result['filled_qty']} @ ${result['avg_price']:.2f}")
-                    else:
-                        print(f"⏳ Order SUBMITTED (waiting for fill)")
-
-                    return result
-
-            print(f"❌ Order failed: {order_result}")
-            return {
-                "success": False,
-                "message": str(order_result)
-            }
-
+            handle = self.submit_close_short(symbol, quantity, limit_price)
+            return self._report(handle.result(timeout))
         except Exception as e:
             print(f"Error closing short position: {e}")
-            import traceback
-            traceback.print_exc()
             return {
                 "success": False,
                 "message": str(e)
@@ -252,12 +292,8 @@ class HLTrader:
             return None
 
         try:
-            # 获取用户地址
-            from eth_account import Account
-            address = Account.from_key(self.private_key).address
-
             # 查询持仓
-            user_state = self.info.user_state(address)
+            user_state = self.info.user_state(self.address)
 
             if not user_state or "assetPositions" not in user_state:
                 return 0.0
@@ -286,10 +322,7 @@ class HLTrader:
             return None
 
         try:
-            from eth_account import Account
-            address = Account.from_key(self.private_key).address
-
-            user_state = self.info.user_state(address)
+            user_state = self.info.user_state(self.address)
 
             if not user_state:
                 return None
@@ -1,49 +1,70 @@
 """Interactive Brokers trading interface."""
 
-from typing import Optional, Dict
-from enum import Enum
-import time
+from typing import Optional, Dict, Iterable, List, Tuple
 
-
-class OrderStatus(Enum):
-    """订单状态."""
-    PENDING = "pending"
-    FILLED = "filled"
-    PARTIAL = "partial"
-    CANCELLED = "cancelled"
-    ERROR = "error"
+from .order_tracker import OrderHandle, OrderStatus, OrderTracker
 
 
 class IBTrader:
-    """IB 股票交易接口."""
+    """IB 股票交易接口.
+
+    合约在 connect 时为 symbols 一次批量 qualifyContracts 并缓存，订单从预先构造的
+    模板复制，下单路径上只有一次 placeOrder 调用，不再等待合约确认的往返。
+    订单状态由 OrderTracker 通过 trade 事件跟踪：submit_order() 立即返回 OrderHandle，
+    buy_stock / sell_stock 在成交事件到达时返回，没有轮询间隔。
+    """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 7497, client_id: int = 2):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 7497,
+        client_id: int = 2,
+        symbols: Optional[List[str]] = None,
+        ib=None
+    ):
         """初始化 IB 交易接口.
 
         Args:
             host: IB Gateway/TWS 主机地址
             port: 端口号（7497=TWS Paper, 4002=Gateway Paper）
             client_id: 客户端 ID（与 fetcher 使用不同的 ID）
+            symbols: 交易的股票代码，connect 时预先确认合约（未列出的在首次下单时确认）
+            ib: ib_insync.IB 实例（可选，默认 connect 时创建）
         """
         self.host = host
         self.port = port
         self.client_id = client_id
-        self.ib = None
+        self.symbols = list(symbols or [])
+        self.ib = ib
         self.connected = False
 
+        self.contracts: Dict[str, object] = {}                      # symbol -> 已确认合约
+        self._order_templates: Dict[Tuple[str, str], object] = {}   # (action, orderType) -> 订单模板
+        self.orders: Optional[OrderTracker] = None                   # 订单事件跟踪（connect 后可用）
+
     def connect(self) -> bool:
-        """连接到 IB.
+        """连接到 IB，并预先确认交易合约、构造订单模板.
 
         Returns:
             True if successful, False otherwise
         """
         try:
-            from ib_insync import IB
+            from ib_insync import IB, MarketOrder, LimitOrder
 
-            self.ib = IB()
-            self.ib.connect(self.host, self.port, clientId=self.client_id)
+            if self.ib is None:
+                self.ib = IB()
+            if not self.ib.isConnected():
+                self.ib.connect(self.host, self.port, clientId=self.client_id)
             self.connected = True
+            self.orders = OrderTracker(self.ib)
             print(f"✓ IB Trader connected at {self.host}:{self.port}")
+
+            self._order_templates = {
+                (action, template.orderType): template
+                for action in ('BUY', 'SELL')
+                for template in (MarketOrder(action, 0), LimitOrder(action, 0, 0.0))
+            }
+            self.warm_contracts(self.symbols)
             return True
 
         except ImportError:
@@ -60,32 +81,131 @@ class IBTrader:
             self.connected = False
             print("✓ IB Trader disconnected")
 
-    def buy_stock(
+    def warm_contracts(self, symbols: Iterable[str]) -> int:
+        """一次请求批量确认合约并缓存.
+
+        Args:
+            symbols: 股票代码列表（已缓存的跳过）
+
+        Returns:
+            新缓存的合约数量
+        """
+        from ib_insync import Stock
+
+        contracts = [Stock(symbol, 'SMART', 'USD') for symbol in dict.fromkeys(symbols)
+                     if symbol not in self.contracts]
+        if not contracts:
+            return 0
+
+        self.ib.qualifyContracts(*contracts)
+        cached = 0
+        for contract in contracts:
+            if contract.conId:
+                self.contracts[contract.symbol] = contract
+                cached += 1
+            else:
+                print(f"Warning: Could not qualify contract for {contract.symbol}")
+        print(f"✓ Cached {cached}/{len(contracts)} IB contracts")
+        return cached
+
+    def get_contract(self, symbol: str):
+        """获取已确认的合约（未缓存时确认一次并缓存）.
+
+        Raises:
+            ValueError: 合约无法确认
+        """
+        contract = self.contracts.get(symbol)
+        if contract is None:
+            print(f"⚠️  Contract for {symbol} not cached, qualifying before order")
+            self.warm_contracts([symbol])
+            contract = self.contracts.get(symbol)
+            if contract is None:
+                raise ValueError(f"Could not qualify contract for {symbol}")
+        return contract
+
+    def _build_order(self, action: str, quantity: int, limit_price: Optional[float] = None):
+        """从模板复制订单并填入数量 / 限价.
+
+        浅复制模板的属性字典，比重新构造 Order（约 140 个字段的 dataclass）快一个数量级；
+        模板本身不提交，也不会被修改。
+        """
+        template = self._order_templates.get((action, 'MKT' if limit_price is None else 'LMT'))
+        if template is None:
+            from ib_insync import MarketOrder, LimitOrder
+            return MarketOrder(action, quantity) if limit_price is None else LimitOrder(action, quantity, limit_price)
+
+        order = object.__new__(type(template))
+        order.__dict__.update(template.__dict__)
+        order.totalQuantity = quantity
+        if limit_price is not None:
+            order.lmtPrice = limit_price
+        return order
+
+    def submit_order(
         self,
         symbol: str,
+        action: str,
         quantity: int,
-        limit_price: Optional[float] = None,
-        timeout: int = 30
-    ) -> Dict:
-        """买入股票.
+        limit_price: Optional[float] = None
+    ) -> OrderHandle:
+        """提交订单并立即返回句柄（不等待成交）.
+
+        可以连续提交多笔订单，再用 handle.result() / self.orders.wait() / await handle 等待。
 
         Args:
-            symbol: 股票代码（如 "NVDA"）
+            symbol: 股票代码
+            action: "BUY" / "SELL"
             quantity: 数量
             limit_price: 限价（None = 市价单）
-            timeout: 超时时间（秒）
 
         Returns:
-            订单结果字典：
-            {
-                "success": bool,
-                "order_id": int,
-                "status": OrderStatus,
-                "filled_qty": int,
-                "avg_price": float,
-                "message": str
-            }
+            OrderHandle
+
+        Raises:
+            RuntimeError: 未连接
+            ValueError: 合约无法确认
+        """
+        if not self.connected:
+            raise RuntimeError("Not connected to IB")
+
+        # 缓存的合约 + 订单模板
+        contract = self.get_contract(symbol)
+        order = self._build_order(action, quantity, limit_price)
+        if limit_price is None:
+            print(f"📤 Placing MARKET {action} order: {quantity} {symbol}")
+        else:
+            print(f"📤 Placing LIMIT {action} order: {quantity} {symbol} @ ${limit_price}")
+
+        return self.orders.submit(contract, order)
+
+    def cancel_order(self, handle: OrderHandle, timeout: float = 5) -> Dict:
+        """撤销仍在工作的订单，等待 IB 确认撤单后返回最终状态（含撤单前的部分成交）.
+
+        Args:
+            handle: submit_order() 返回的句柄
+            timeout: 等待撤单确认的超时时间（秒）
+
+        Returns:
+            订单结果字典（格式同 buy_stock）
         """
+        if not handle.done():
+            print(f"🔄 Cancelling IB order {handle.order_id} "
+                  f"({handle.filled_qty}/{handle.trade.order.totalQuantity} filled)")
+            self.ib.cancelOrder(handle.trade.order)
+        result = handle.result(timeout)
+        if not handle.done():
+            print(f"❌ CRITICAL: IB order {handle.order_id} still working after cancel")
+        return result
+
+    def _execute_order(
+        self,
+        symbol: str,
+        action: str,
+        quantity: int,
+        limit_price: Optional[float],
+        timeout: float
+    ) -> Dict:
+        """提交订单并等待完成（buy_stock / sell_stock 共用）."""
         if not self.connected:
             return {
                 "success": False,
@@ -94,155 +214,72 @@ class IBTrader:
             }
 
         try:
-            from ib_insync import Stock, MarketOrder, LimitOrder
-
-            # 创建合约
-            contract = Stock(symbol, 'SMART', 'USD')
-            self.ib.qualifyContracts(contract)
-
-            # 创建订单
-            if limit_price is None:
-                order = MarketOrder('BUY', quantity)
-                print(f"📤 Placing MARKET BUY order: {quantity} {symbol}")
-            else:
-                order = LimitOrder('BUY', quantity, limit_price)
-                print(f"📤 Placing LIMIT BUY order: {quantity} {symbol} @ ${limit_price}")
-
-            # 提交订单
-            trade = self.ib.placeOrder(contract, order)
-
-            # 等待订单完成
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                self.ib.sleep(0.1)
-
-                if trade.orderStatus.status in ['Filled', 'Cancelled']:
-                    break
-
-            # 获取订单状态
-            status_map = {
-                'Filled': OrderStatus.FILLED,
-                'Cancelled': OrderStatus.CANCELLED,
-                'Submitted': OrderStatus.PENDING,
-                'PreSubmitted': OrderStatus.PENDING,
-            }
-
-            order_status = status_map.get(
-                trade.orderStatus.status,
-                OrderStatus.ERROR
-            )
-
-            result = {
-                "success": order_status == OrderStatus.FILLED,
-                "order_id": trade.order.orderId,
-                "status": order_status,
-                "filled_qty": int(trade.orderStatus.filled),
-                "avg_price": float(trade.orderStatus.avgFillPrice) if trade.orderStatus.avgFillPrice else None,
-                "message": f"Order {trade.orderStatus.status}"
-            }
+            handle = self.submit_order(symbol, action, quantity, limit_price)
+            result = handle.result(timeout)
 
             if result["success"]:
                 print(f"✅ Order FILLED: {result['filled_qty']} @ ${result['avg_price']:.2f}")
             else:
-                print(f"❌ Order {order_status.value}: {result['message']}")
+                print(f"❌ Order {result['status'].value}: {result['message']}")
 
             return result
 
         except Exception as e:
-            print(f"Error placing buy order: {e}")
+            print(f"Error placing {action.lower()} order: {e}")
             return {
                 "success": False,
                 "status": OrderStatus.ERROR,
                 "message": str(e)
             }
 
-    def sell_stock(
+    def buy_stock(
         self,
         symbol: str,
         quantity: int,
         limit_price: Optional[float] = None,
         timeout: int = 30
     ) -> Dict:
-        """卖出股票.
+        """买入股票（等待成交，成交事件到达即返回）.
 
         Args:
-            symbol: 股票代码
+            symbol: 股票代码（如 "NVDA"）
             quantity: 数量
             limit_price: 限价（None = 市价单）
             timeout: 超时时间（秒）
 
         Returns:
-            订单结果字典（格式同 buy_stock）
-        """
-        if not self.connected:
-            return {
-                "success": False,
-                "status": OrderStatus.ERROR,
-                "message": "Not connected to IB"
-            }
-
-        try:
-            from ib_insync import Stock, MarketOrder, LimitOrder
-
-            # 创建合约
-            contract = Stock(symbol, 'SMART', 'USD')
-            self.ib.qualifyContracts(contract)
-
-            # 创建订单
-            if limit_price is None:
-                order = MarketOrder('SELL', quantity)
-                print(f"📤 Placing MARKET SELL order: {quantity} {symbol}")
-            else:
-                order = LimitOrder('SELL', quantity, limit_price)
-                print(f"📤 Placing LIMIT SELL order: {quantity} {symbol} @ ${limit_price}")
-
-            # 提交订单
-            trade = self.ib.placeOrder(contract, order)
-
-            # 等待订单完成
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                self.ib.sleep(0.1)
-
-                if trade.orderStatus.status in ['Filled', 'Cancelled']:
-                    break
-
-            # 获取订单状态
-            status_map = {
-                'Filled': OrderStatus.FILLED,
-                'Cancelled': OrderStatus.CANCELLED,
-                'Submitted': OrderStatus.PENDING,
-                'PreSubmitted': OrderStatus.PENDING,
-            }
-
-            order_status = status_map.get(
-                trade.orderStatus.status,
-                OrderStatus.ERROR
-            )
-
-            result = {
-                "success": order_status == OrderStatus.FILLED,
-                "order_id": trade.order.orderId,
-                "status": order_status,
-                "filled_qty": int(trade.orderStatus.filled),
-                "avg_price": float(trade.orderStatus.avgFillPrice) if trade.orderStatus.avgFillPrice else None,
-                "message": f"Order {trade.orderStatus.status}"
+            订单结果字典：
+            {
+                "success": bool,
+                "order_id": int,
+                "status": OrderStatus,
+                "filled_qty": int,
+                "avg_price": float,
+                "message": str,
+                "send_ns" / "ack_ns" / "fill_ns": int（perf_counter_ns，0 = 未发生）
             }
+        """
+        return self._execute_order(symbol, 'BUY', quantity, limit_price, timeout)
 
-            if result["success"]:
-                print(f"✅ Order FILLED: {result['filled_qty']} @ ${result['avg_price']:.2f}")
-            else:
-                print(f"❌ Order {order_status.value}: {result['message']}")
+    def sell_stock(
+        self,
+        symbol: str,
+        quantity: int,
+        limit_price: Optional[float] = None,
+        timeout: int = 30
+    ) -> Dict:
+        """卖出股票（等待成交，成交事件到达即返回）.
 
-            return result
+        Args:
+            symbol: 股票代码
+            quantity: 数量
+            limit_price: 限价（None = 市价单）
+            timeout: 超时时间（秒）
 
-        except Exception as e:
-            print(f"Error placing sell order: {e}")
-            return {
-                "success": False,
-                "status": OrderStatus.ERROR,
-                "message": str(e)
-            }
+        Returns:
+            订单结果字典（格式同 buy_stock）
+        """
+        return self._execute_order(symbol, 'SELL', quantity, limit_price, timeout)
 
     def get_position(self, symbol: str) -> Optional[int]:
         """获取持仓数量.
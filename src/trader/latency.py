@@ -0,0 +1,139 @@
+"""Tick-to-trade latency instrumentation with HDR-style histograms."""
+
+from typing import Deque, Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, field, asdict
+import json
+import threading
+
+from latency import LatencyHistogram, TickStamps
+
+
+@dataclass
+class TradeLatency:
+    """一笔交易（开仓或平仓）的逐阶段时间戳（perf_counter_ns，0 表示未知）."""
+    trade_id: str
+    action: str                      # "open" / "close"
+    exchange_ms: int = 0
+    recv_wall_ns: int = 0
+    recv_ns: int = 0
+    parsed_ns: int = 0
+    decision_ns: int = 0
+    # 每条腿的 send_ns / ack_ns / fill_ns，例如 {"ib": {...}, "hl": {...}}
+    legs: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def segments(self) -> Dict[str, int]:
+        """各阶段耗时（纳秒），缺少时间戳的阶段不输出."""
+        segments = {}
+        if self.exchange_ms and self.recv_wall_ns:
+            segments["ws_network"] = self.recv_wall_ns - self.exchange_ms * 1_000_000
+        if self.recv_ns and self.parsed_ns:
+            segments["ws_parse"] = self.parsed_ns - self.recv_ns
+        if self.parsed_ns and self.decision_ns:
+            segments["strategy"] = self.decision_ns - self.parsed_ns
+
+        sends, fills = [], []
+        for leg, stamps in self.legs.items():
+            send_ns, ack_ns, fill_ns = stamps.get("send_ns", 0), stamps.get("ack_ns", 0), stamps.get("fill_ns", 0)
+            if self.decision_ns and send_ns:
+                segments[f"{leg}_send"] = send_ns - self.decision_ns
+            if send_ns and ack_ns:
+                segments[f"{leg}_ack"] = ack_ns - send_ns
+            if ack_ns and fill_ns:
+                segments[f"{leg}_fill"] = fill_ns - ack_ns
+            if send_ns:
+                sends.append(send_ns)
+            if fill_ns:
+                fills.append(fill_ns)
+
+        if self.recv_ns and sends:
+            segments["tick_to_order"] = min(sends) - self.recv_ns
+        if self.recv_ns and fills and len(fills) == len(self.legs):
+            segments["tick_to_fill"] = max(fills) - self.recv_ns
+        return segments
+
+    def breakdown(self) -> Dict:
+        """逐笔延迟明细（微秒），用于打印和导出."""
+        return {
+            "trade_id": self.trade_id,
+            "action": self.action,
+            "segments_us": {name: round(ns / 1000, 1) for name, ns in self.segments().items()},
+        }
+
+
+class LatencyTracker:
+    """收集行情路径和下单路径的延迟，按阶段维护直方图，并保留最近的逐笔明细.
+
+    - 行情路径（每次 HL l2Book 更新）：record_tick()，在 WebSocket 线程调用
+    - 策略决策（主循环每次评估）：record_decision()，事件最早接收到决策的耗时，在主循环线程调用
+    - 交易路径（每笔开平仓）：record_trade()，在交易线程调用
+    """
+
+    TICK_SEGMENTS = ("ws_network", "ws_parse")
+
+    def __init__(self, max_trades: int = 1000, dump_path: Optional[str] = None):
+        """初始化延迟收集器.
+
+        Args:
+            max_trades: 保留的逐笔明细数量
+            dump_path: 每笔交易的延迟明细追加写入的 JSON Lines 文件（可选）
+        """
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.trades: Deque[TradeLatency] = deque(maxlen=max_trades)
+        self.dump_path = dump_path
+        self._lock = threading.Lock()   # 保护直方图字典的创建和逐笔明细
+
+        # 行情路径直方图预先创建，热路径上不查锁
+        self._tick_network = self.histogram("ws_network")
+        self._tick_parse = self.histogram("ws_parse")
+        self._tick_decision = self.histogram("tick_decision")
+
+    def histogram(self, segment: str) -> LatencyHistogram:
+        """获取（必要时创建）某个阶段的直方图."""
+        hist = self.histograms.get(segment)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(segment, LatencyHistogram())
+        return hist
+
+    def record_tick(self, stamps: TickStamps):
+        """记录一次行情更新的网络和解析耗时."""
+        if stamps.exchange_ms:
+            self._tick_network.record(stamps.recv_wall_ns - stamps.exchange_ms * 1_000_000)
+        self._tick_parse.record(stamps.parsed_ns - stamps.recv_ns)
+
+    def record_decision(self, latency_ns: int):
+        """记录一次策略评估的 tick-to-decision 耗时（纳秒）."""
+        self._tick_decision.record(latency_ns)
+
+    def decision_summary(self) -> str:
+        """tick-to-decision 延迟摘要."""
+        return self._tick_decision.summary()
+
+    def record_trade(self, trade: TradeLatency):
+        """记录一笔交易的各阶段耗时（行情阶段已由 record_tick 统计）并保存明细."""
+        for segment, value_ns in trade.segments().items():
+            if segment not in self.TICK_SEGMENTS:
+                self.histogram(segment).record(value_ns)
+
+        with self._lock:
+            self.trades.append(trade)
+            if self.dump_path:
+                try:
+                    with open(self.dump_path, 'a') as f:
+                        f.write(json.dumps({**asdict(trade), **trade.breakdown()}) + "\n")
+                except OSError as e:
+                    print(f"Warning: Could not write latency dump: {e}")
+
+    def recent_trades(self) -> List[TradeLatency]:
+        """最近的逐笔延迟记录."""
+        with self._lock:
+            return list(self.trades)
+
+    def summary(self) -> str:
+        """格式化所有阶段的延迟摘要."""
+        return "\n".join(
+            f"  {segment:<14} {hist.summary()}"
+            for segment, hist in sorted(self.histograms.items())
+            if hist.count
+        )
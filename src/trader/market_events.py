@@ -0,0 +1,126 @@
+"""Coalescing market event queue for the event-driven trading loop."""
+
+from typing import Dict, Optional
+import asyncio
+import threading
+import time
+
+
+class MarketEventQueue:
+    """合并型市场事件队列.
+
+    数据回调（HL WebSocket 线程、IB 事件循环）只推送 "哪个数据源更新了"，
+    不推送数据本身；消费者每次取走全部待处理事件，再从 fetcher 读取最新快照。
+    同一数据源在两次消费之间的多次更新会被合并成一次，因此突发行情下
+    消费者永远不会落后于最新数据。
+    """
+
+    def __init__(self):
+        """初始化事件队列."""
+        self._cond = threading.Condition()
+
+        # source -> 该数据源最早一条未处理事件的接收时间（perf_counter_ns）
+        self._pending: Dict[str, int] = {}
+
+        # 统计
+        self.pushed = 0      # 推送的事件总数
+        self.coalesced = 0   # 被合并掉的事件数
+
+    def push(self, source: str, recv_ns: Optional[int] = None):
+        """推送一条更新事件（线程安全，可在任意线程调用）.
+
+        Args:
+            source: 数据源名称（例如 "hl_book", "hl_ctx", "ib"）
+            recv_ns: 接收时间（time.perf_counter_ns），None 表示现在
+        """
+        if recv_ns is None:
+            recv_ns = time.perf_counter_ns()
+
+        with self._cond:
+            self.pushed += 1
+            if source in self._pending:
+                # 保留最早的接收时间，延迟统计反映最坏情况
+                self.coalesced += 1
+            else:
+                self._pending[source] = recv_ns
+            self._cond.notify()
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """等待并取走所有待处理事件.
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            {source: 最早接收时间}，超时返回空字典
+        """
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            batch = self._pending
+            self._pending = {}
+        return batch
+
+    def __len__(self) -> int:
+        """当前待处理的数据源数量（队列深度）."""
+        with self._cond:
+            return len(self._pending)
+
+
+class AsyncMarketEventQueue:
+    """asyncio 版合并型市场事件队列.
+
+    用于 asyncio 运行模式：HL 推送和 IB ticker 回调都在事件循环线程中执行，
+    因此不需要锁，消费者用 await wait() 等待。合并规则与 MarketEventQueue 相同。
+    """
+
+    def __init__(self):
+        """初始化事件队列."""
+        self._event = asyncio.Event()
+
+        # source -> 该数据源最早一条未处理事件的接收时间（perf_counter_ns）
+        self._pending: Dict[str, int] = {}
+
+        # 统计
+        self.pushed = 0      # 推送的事件总数
+        self.coalesced = 0   # 被合并掉的事件数
+
+    def push(self, source: str, recv_ns: Optional[int] = None):
+        """推送一条更新事件（只能在事件循环线程中调用）.
+
+        Args:
+            source: 数据源名称（例如 "hl_book", "hl_ctx", "ib"）
+            recv_ns: 接收时间（time.perf_counter_ns），None 表示现在
+        """
+        if recv_ns is None:
+            recv_ns = time.perf_counter_ns()
+
+        self.pushed += 1
+        if source in self._pending:
+            self.coalesced += 1
+        else:
+            self._pending[source] = recv_ns
+        self._event.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """等待并取走所有待处理事件.
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            {source: 最早接收时间}，超时返回空字典
+        """
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        batch = self._pending
+        self._pending = {}
+        self._event.clear()
+        return batch
+
+    def __len__(self) -> int:
+        """当前待处理的数据源数量（队列深度）."""
+        return len(self._pending)
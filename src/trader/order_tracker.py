@@ -0,0 +1,260 @@
+"""Event-driven IB order tracking with future-style order handles."""
+
+from typing import Callable, Dict, Iterable, List, Optional
+from enum import Enum
+import asyncio
+import time
+
+
+class OrderStatus(Enum):
+    """订单状态."""
+    PENDING = "pending"
+    FILLED = "filled"
+    PARTIAL = "partial"
+    CANCELLED = "cancelled"
+    ERROR = "error"
+
+
+# IB 订单状态 -> OrderStatus（与 ib_insync.OrderStatus.DoneStates / ActiveStates 对应）
+IB_STATUS_MAP = {
+    'Filled': OrderStatus.FILLED,
+    'Cancelled': OrderStatus.CANCELLED,
+    'ApiCancelled': OrderStatus.CANCELLED,
+    'Submitted': OrderStatus.PENDING,
+    'PreSubmitted': OrderStatus.PENDING,
+    'PendingSubmit': OrderStatus.PENDING,
+    'ApiPending': OrderStatus.PENDING,
+}
+IB_DONE_STATES = frozenset(['Filled', 'Cancelled', 'ApiCancelled'])
+IB_ACK_STATES = frozenset(['PreSubmitted', 'Submitted', 'Filled'])
+
+
+class OrderHandle:
+    """一笔已提交 IB 订单的句柄.
+
+    状态由 ib_insync 的 trade 事件推进（statusEvent / fillEvent / filledEvent / cancelledEvent），
+    不轮询。支持三种等待方式：
+    - result(timeout): 同步等待，运行 ib_insync 事件循环直到订单完成
+    - await handle: 在 asyncio 事件循环中等待
+    - add_fill_callback / add_done_callback: 部分成交 / 完成时回调
+    """
+
+    def __init__(self, tracker: "OrderTracker", trade, send_ns: int):
+        self._tracker = tracker
+        self.trade = trade
+        self.symbol = trade.contract.symbol
+        self.action = trade.order.action
+        self.quantity = trade.order.totalQuantity
+
+        # perf_counter_ns，0 = 未发生
+        self.send_ns = send_ns
+        self.ack_ns = 0
+        self.fill_ns = 0
+
+        self._fill_callbacks: List[Callable] = []
+        self._done_callbacks: List[Callable] = []
+        self._future: Optional[asyncio.Future] = None
+
+    # ==================== 状态 ====================
+
+    @property
+    def order_id(self) -> int:
+        return self.trade.order.orderId
+
+    @property
+    def filled_qty(self) -> float:
+        """已成交数量（逐笔成交先于订单状态到达时以成交记录为准）."""
+        return max(self.trade.orderStatus.filled, sum(fill.execution.shares for fill in self.trade.fills))
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        """成交均价（订单状态尚未更新时按逐笔成交加权）."""
+        if self.trade.orderStatus.avgFillPrice:
+            return float(self.trade.orderStatus.avgFillPrice)
+        shares = sum(fill.execution.shares for fill in self.trade.fills)
+        if not shares:
+            return None
+        return sum(fill.execution.shares * fill.execution.price for fill in self.trade.fills) / shares
+
+    @property
+    def status(self) -> OrderStatus:
+        ib_status = self.trade.orderStatus.status
+        if ib_status not in IB_DONE_STATES and self.filled_qty > 0:
+            return OrderStatus.PARTIAL
+        return IB_STATUS_MAP.get(ib_status, OrderStatus.ERROR)
+
+    def done(self) -> bool:
+        """订单是否已完成（全部成交或已取消）."""
+        return self.trade.orderStatus.status in IB_DONE_STATES
+
+    def to_result(self) -> Dict:
+        """转换为 IBTrader 的订单结果字典.
+
+        Returns:
+            {"success", "order_id", "status", "filled_qty", "avg_price", "message",
+             "send_ns", "ack_ns", "fill_ns"}
+        """
+        status = self.status
+        return {
+            "success": status == OrderStatus.FILLED,
+            "order_id": self.order_id,
+            "status": status,
+            "filled_qty": int(self.filled_qty),
+            "avg_price": self.avg_price,
+            "message": f"Order {self.trade.orderStatus.status}",
+            "send_ns": self.send_ns,
+            "ack_ns": self.ack_ns,
+            "fill_ns": self.fill_ns,
+        }
+
+    # ==================== 等待 ====================
+
+    def result(self, timeout: Optional[float] = 30) -> Dict:
+        """同步等待订单完成，超时返回当前状态.
+
+        每收到一条 IB 消息即检查一次（ib.waitOnUpdate），没有固定的轮询间隔。
+
+        Args:
+            timeout: 超时时间（秒，None = 一直等待）
+        """
+        self._tracker.wait([self], timeout)
+        return self.to_result()
+
+    def __await__(self):
+        return self._get_future().__await__()
+
+    def _get_future(self) -> asyncio.Future:
+        if self._future is None:
+            self._future = asyncio.get_event_loop().create_future()
+            if self.done():
+                self._future.set_result(self.to_result())
+        return self._future
+
+    # ==================== 回调 ====================
+
+    def add_fill_callback(self, callback: Callable[["OrderHandle", object], None]):
+        """注册成交回调 callback(handle, fill)，每笔（部分）成交调用一次."""
+        self._fill_callbacks.append(callback)
+
+    def add_done_callback(self, callback: Callable[["OrderHandle"], None]):
+        """注册完成回调 callback(handle)（已完成时立即调用）."""
+        if self.done():
+            callback(self)
+        else:
+            self._done_callbacks.append(callback)
+
+    # ==================== trade 事件 ====================
+
+    def _on_status(self, trade):
+        status = trade.orderStatus.status
+        if not self.ack_ns and status in IB_ACK_STATES:
+            self.ack_ns = time.perf_counter_ns()
+        if status == 'Filled' and not self.fill_ns:
+            # statusEvent 先于 filledEvent 触发
+            self.fill_ns = time.perf_counter_ns()
+        if status in IB_DONE_STATES:
+            self._finish()
+
+    def _on_fill(self, trade, fill):
+        if not self.ack_ns:
+            self.ack_ns = time.perf_counter_ns()
+        for callback in self._fill_callbacks:
+            try:
+                callback(self, fill)
+            except Exception as e:
+                print(f"Warning: Fill callback error: {e}")
+
+    def _on_filled(self, trade):
+        if not self.fill_ns:
+            self.fill_ns = time.perf_counter_ns()
+        if not self.ack_ns:
+            self.ack_ns = self.fill_ns
+        self._finish()
+
+    def _finish(self):
+        """订单完成：解除事件订阅，唤醒等待者（filledEvent 和 statusEvent 都会到达，只处理一次）."""
+        if id(self.trade) not in self._tracker._active:
+            return
+        self._tracker._release(self)
+
+        if self._future is not None and not self._future.done():
+            self._future.set_result(self.to_result())
+        callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Warning: Order done callback error: {e}")
+
+
+class OrderTracker:
+    """提交 IB 订单并通过 trade 事件跟踪状态，返回 OrderHandle.
+
+    submit() 不阻塞，可以连续提交多笔订单后用 wait() 一起等待。
+    事件在 ib_insync 事件循环中处理（ib.sleep / waitOnUpdate 或 asyncio 运行时）。
+    """
+
+    def __init__(self, ib):
+        """Initialize the tracker.
+
+        Args:
+            ib: 已连接的 ib_insync.IB
+        """
+        self.ib = ib
+        self._active: Dict[int, OrderHandle] = {}    # id(trade) -> 未完成订单的句柄（Trade 不可哈希）
+
+    def submit(self, contract, order) -> OrderHandle:
+        """提交订单并立即返回句柄.
+
+        Args:
+            contract: 已确认的合约
+            order: ib_insync 订单
+
+        Returns:
+            OrderHandle
+        """
+        send_ns = time.perf_counter_ns()
+        trade = self.ib.placeOrder(contract, order)
+        handle = OrderHandle(self, trade, send_ns)
+
+        if handle.done():
+            handle.ack_ns = handle.fill_ns = time.perf_counter_ns()
+            return handle
+
+        self._active[id(trade)] = handle
+        trade.statusEvent += handle._on_status
+        trade.fillEvent += handle._on_fill
+        trade.filledEvent += handle._on_filled
+        trade.cancelledEvent += handle._on_status
+        return handle
+
+    def _release(self, handle: OrderHandle):
+        trade = handle.trade
+        del self._active[id(trade)]
+        trade.statusEvent -= handle._on_status
+        trade.fillEvent -= handle._on_fill
+        trade.filledEvent -= handle._on_filled
+        trade.cancelledEvent -= handle._on_status
+
+    def wait(self, handles: Iterable[OrderHandle], timeout: Optional[float] = 30) -> bool:
+        """同步等待一组订单全部完成.
+
+        Args:
+            handles: 订单句柄
+            timeout: 超时时间（秒，None = 一直等待）
+
+        Returns:
+            True if all orders are done, False on timeout
+        """
+        handles = list(handles)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(handle.done() for handle in handles):
+            remaining = 1.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.ib.waitOnUpdate(timeout=remaining)
+        return True
+
+    def open_handles(self) -> List[OrderHandle]:
+        """未完成订单的句柄."""
+        return list(self._active.values())
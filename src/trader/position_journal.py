@@ -0,0 +1,285 @@
+"""Append-only journal storage for position events."""
+
+from typing import Dict, Optional, Any
+from pathlib import Path
+import json
+import os
+import queue
+import threading
+import time
+
+
+# 队列中的控制消息
+_COMPACT = object()
+_STOP = object()
+
+
+class PositionJournal:
+    """仓位事件追加日志（JSON Lines）.
+
+    每个仓位事件（开仓/平仓）追加一行完整的仓位记录，由后台线程写入，
+    交易线程只做一次有界队列的 put。fsync 按批次进行：队列暂时为空、
+    累计 fsync_batch 条或距离上次 fsync 超过 fsync_interval 时同步一次。
+
+    写入的记录数超过 compact_every 时自动压缩：把当前全部仓位写成快照
+    （与 PositionManager JSON 文件格式相同），然后清空日志。
+    加载时先读快照，再按顺序重放日志（同一仓位以最后一条记录为准）。
+
+    写线程异常退出后，append() 改为在调用线程同步写入并 fsync
+    （先补写队列中剩余的记录），不会向已经停止的线程继续排队。
+    """
+
+    def __init__(
+        self,
+        snapshot_file: str,
+        journal_file: Optional[str] = None,
+        max_queue: int = 10000,
+        fsync_batch: int = 64,
+        fsync_interval: float = 0.05,
+        compact_every: int = 1000,
+        put_timeout: float = 5.0
+    ):
+        """初始化仓位日志.
+
+        Args:
+            snapshot_file: 快照文件路径（例如 positions.json）
+            journal_file: 日志文件路径（默认 snapshot_file + ".journal"）
+            max_queue: 待写入队列的最大长度（满时 append 阻塞）
+            fsync_batch: 每多少条记录至少 fsync 一次
+            fsync_interval: 两次 fsync 之间的最长间隔（秒）
+            compact_every: 日志累计多少条记录后自动压缩
+            put_timeout: 队列满时 append 最多等待写线程多少秒
+        """
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = Path(journal_file) if journal_file else Path(f"{snapshot_file}.journal")
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.put_timeout = put_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        # 写线程退出时的异常（None = 正常）
+        self._error: Optional[Exception] = None
+        # 同步写入降级时串行化多个交易线程
+        self._sync_lock = threading.Lock()
+
+        # 写线程维护的仓位状态（仓位字典），用于压缩时生成快照
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._records_since_compact = 0
+
+    def replay(self) -> Dict[str, Dict[str, Any]]:
+        """读取快照并重放日志.
+
+        Returns:
+            {position_id: 仓位字典}
+        """
+        state: Dict[str, Dict[str, Any]] = {}
+
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, 'r') as f:
+                state.update(json.load(f))
+
+        records = 0
+        if self.journal_file.exists():
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时最后一行可能只写了一半
+                        print(f"Warning: Skipping corrupt journal line in {self.journal_file}")
+                        continue
+                    position = record["position"]
+                    state[position["position_id"]] = position
+                    records += 1
+
+        self._state = {pid: dict(pos) for pid, pos in state.items()}
+        self._records_since_compact = records
+        return state
+
+    @property
+    def writer_alive(self) -> bool:
+        """后台写线程是否正常运行."""
+        return self._thread is not None and self._thread.is_alive() and self._error is None
+
+    def _writer_dead(self) -> bool:
+        """写线程已启动但已经退出（异常或意外结束）."""
+        return self._error is not None or (self._thread is not None and not self._thread.is_alive())
+
+    def start(self):
+        """启动后台写线程."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._writer_loop, name="position-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, event: str, position: Dict[str, Any]):
+        """追加一条仓位事件（交易线程调用，只入队不写盘）.
+
+        Args:
+            event: 事件类型（"open" / "close" / "update"）
+            position: 完整的仓位字典（Position.to_dict()）
+
+        Raises:
+            RuntimeError: 写线程仍在运行但 put_timeout 内没有腾出队列空间
+        """
+        record = {"event": event, "time": time.time(), "position": position}
+        if self._writer_dead():
+            self._write_sync(record)
+            return
+
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            print("Warning: Position journal queue full, waiting for writer...")
+
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            if self._writer_dead():
+                self._write_sync(record)
+                return
+            raise RuntimeError(
+                f"Position journal writer stalled: queue still full after {self.put_timeout}s"
+            )
+
+    def compact(self):
+        """请求写线程压缩日志."""
+        if self._writer_dead():
+            print("Warning: Position journal writer is not running, skipping compaction")
+            return
+        self._queue.put(_COMPACT, timeout=self.put_timeout)
+
+    def close(self):
+        """写完队列中的所有记录、压缩并停止写线程."""
+        if self._thread is None:
+            return
+        if self._writer_dead():
+            # 补写队列中剩余的记录，不再向已停止的线程发送控制消息
+            self._write_sync(None)
+        else:
+            self._queue.put(_COMPACT, timeout=self.put_timeout)
+            self._queue.put(_STOP, timeout=self.put_timeout)
+        self._thread.join()
+        self._thread = None
+
+    def _write_sync(self, record: Optional[Dict[str, Any]]):
+        """写线程退出后的降级路径：在调用线程写入并 fsync.
+
+        先写队列中尚未落盘的记录，保证日志顺序与 append 顺序一致。
+
+        Args:
+            record: 要追加的记录（None = 只补写队列中的记录）
+        """
+        with self._sync_lock:
+            pending = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, dict):
+                    pending.append(item)
+            if record is not None:
+                pending.append(record)
+            if not pending:
+                return
+
+            print(f"⚠️  Position journal writer is down ({self._error}), "
+                  f"writing {len(pending)} record(s) synchronously")
+            with open(self.journal_file, 'a') as f:
+                for item in pending:
+                    f.write(json.dumps(item, separators=(',', ':')) + "\n")
+                    position = item["position"]
+                    self._state[position["position_id"]] = position
+                    self._records_since_compact += 1
+                self._sync(f)
+
+    def _writer_loop(self):
+        """后台写线程：批量写入、批量 fsync、按需压缩."""
+        f = None
+        unsynced = 0
+        last_sync = time.monotonic()
+
+        try:
+            f = open(self.journal_file, 'a')
+            while True:
+                # 有未同步的数据时不无限等待，保证 fsync_interval 内落盘
+                try:
+                    item = self._queue.get(timeout=self.fsync_interval if unsynced else None)
+                except queue.Empty:
+                    item = None
+
+                if item is None or item is _COMPACT or item is _STOP:
+                    if unsynced:
+                        self._sync(f)
+                        unsynced = 0
+                        last_sync = time.monotonic()
+                    if item is _COMPACT:
+                        f = self._compact(f)
+                    elif item is _STOP:
+                        break
+                    continue
+
+                f.write(json.dumps(item, separators=(',', ':')) + "\n")
+                position = item["position"]
+                self._state[position["position_id"]] = position
+                self._records_since_compact += 1
+                unsynced += 1
+
+                if (self._queue.empty() or unsynced >= self.fsync_batch or
+                        time.monotonic() - last_sync >= self.fsync_interval):
+                    self._sync(f)
+                    unsynced = 0
+                    last_sync = time.monotonic()
+
+                if self._records_since_compact >= self.compact_every:
+                    f = self._compact(f)
+
+        except Exception as e:
+            # 记录失败原因，之后的 append() 改为同步写入
+            self._error = e
+            print(f"Error in position journal writer: {e}")
+        finally:
+            if f is not None:
+                f.close()
+
+    @staticmethod
+    def _sync(f):
+        """刷新并 fsync 日志文件."""
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _compact(self, f):
+        """把当前状态写成快照并清空日志.
+
+        先原子替换快照，再截断日志；两步之间崩溃时重放结果不变
+        （日志中的记录会再次覆盖快照中的同一仓位）。
+
+        Returns:
+            新的日志文件句柄
+        """
+        if self._records_since_compact == 0:
+            return f
+
+        try:
+            tmp_file = self.snapshot_file.with_name(self.snapshot_file.name + ".tmp")
+            with open(tmp_file, 'w') as snapshot:
+                json.dump(self._state, snapshot, indent=2)
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+
+            f.close()
+            f = open(self.journal_file, 'w')
+            self._sync(f)
+            self._records_since_compact = 0
+
+        except Exception as e:
+            print(f"Error compacting position journal: {e}")
+            if f.closed:
+                f = open(self.journal_file, 'a')
+
+        return f
@@ -1,12 +1,14 @@
 """Position state management and persistence."""
 
 from typing import Optional, Dict, List, Callable
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
 import json
 import time
 from pathlib import Path
 
+from .position_journal import PositionJournal
+
 
 class PositionStatus(Enum):
     """仓位状态."""
@@ -33,14 +35,18 @@ class Position:
     entry_spread: float          # 开仓时价差
     entry_funding_rate: float    # 开仓时资金费率
 
-    # IB 开仓价格
+    # 开仓价格
     ib_entry_price: float        # IB 买入价
-    ib_order_id: Optional[int] = None
-
-    # HL 开仓价格
     hl_entry_price: float        # HL 开空价
+
+    # 订单ID
+    ib_order_id: Optional[int] = None
     hl_order_id: Optional[str] = None
 
+    # 开仓下单确认延迟（发送到交易所 ack，毫秒；不含等待成交，None = 结果中没有时间戳）
+    ib_entry_latency_ms: Optional[float] = None
+    hl_entry_latency_ms: Optional[float] = None
+
     # 平仓信息（如果已平仓）
     exit_time: Optional[float] = None
     exit_spread: Optional[float] = None
@@ -95,15 +101,25 @@ class Position:
 class PositionManager:
     """仓位管理器."""
 
-    def __init__(self, data_file: str = "positions.json"):
+    def __init__(self, data_file: str = "positions.json", storage: str = "json"):
         """初始化仓位管理器.
 
         Args:
             data_file: 仓位数据文件路径
+            storage: 存储方式
+                - "json": 每次变化重写整个 JSON 文件
+                - "journal": 追加日志（data_file + ".journal"），后台线程写入，
+                  data_file 作为压缩后的快照
         """
         self.data_file = Path(data_file)
         self.positions: Dict[str, Position] = {}
 
+        if storage not in ("json", "journal"):
+            raise ValueError(f"Unknown position storage: {storage}")
+        self._journal: Optional[PositionJournal] = (
+            PositionJournal(str(self.data_file)) if storage == "journal" else None
+        )
+
         # 通知回调（预留给 Slack 等）
         self.notification_callback: Optional[Callable] = None
 
@@ -142,7 +158,7 @@ class PositionManager:
             position: 仓位对象
         """
         self.positions[position.position_id] = position
-        self.save()
+        self._persist("open", position)
 
         # 触发通知
         self._notify("position_opened", {
@@ -181,7 +197,7 @@ class PositionManager:
         position.hl_exit_price = hl_exit_price
         position.status = PositionStatus.CLOSED
 
-        self.save()
+        self._persist("close", position)
 
         # 计算盈亏
         pnl = position.calculate_pnl()
@@ -204,6 +220,64 @@ class PositionManager:
         if pnl is not None:
             print(f"  PnL: ${pnl:.2f}")
 
+    def split_position(self, position_id: str, quantity: float) -> Position:
+        """从仓位中拆出一部分作为新仓位（部分平仓时使用）.
+
+        新仓位复制原仓位的开仓信息，ID 为 "{position_id}-{n}"；原仓位数量相应减少，状态不变。
+
+        Args:
+            position_id: 仓位ID
+            quantity: 拆出的数量（0 < quantity < 仓位数量）
+
+        Returns:
+            拆出的新仓位
+        """
+        if position_id not in self.positions:
+            raise ValueError(f"Position {position_id} not found")
+
+        position = self.positions[position_id]
+        if not 0 < quantity < position.quantity:
+            raise ValueError(f"Cannot split {quantity} from position {position_id} ({position.quantity})")
+
+        n = 1
+        while f"{position_id}-{n}" in self.positions:
+            n += 1
+        part = replace(position, position_id=f"{position_id}-{n}", quantity=quantity,
+                       notes=f"Split from {position_id}")
+
+        position.quantity -= quantity
+        self.positions[part.position_id] = part
+        self._persist("update", position)
+        self._persist("open", part)
+
+        print(f"✓ Position split: {part.position_id} ({quantity}) from {position_id} ({position.quantity} left)")
+        return part
+
+    def mark_error(self, position_id: str, notes: str):
+        """把仓位标记为 ERROR（需要人工处理，不再参与自动平仓）.
+
+        Args:
+            position_id: 仓位ID
+            notes: 异常说明（例如单边成交的数量）
+        """
+        if position_id not in self.positions:
+            raise ValueError(f"Position {position_id} not found")
+
+        position = self.positions[position_id]
+        position.status = PositionStatus.ERROR
+        position.notes = notes
+
+        self._persist("update", position)
+
+        self._notify("position_error", {
+            "position_id": position.position_id,
+            "symbol": position.symbol,
+            "quantity": position.quantity,
+            "notes": notes,
+        })
+
+        print(f"⚠️  Position marked ERROR: {position_id} ({notes})")
+
     def get_open_positions(self) -> List[Position]:
         """获取所有开仓中的仓位.
 
@@ -226,6 +300,18 @@ class PositionManager:
         """
         return self.positions.get(position_id)
 
+    def _persist(self, event: str, position: Position):
+        """持久化一次仓位变化.
+
+        Args:
+            event: 事件类型（"open" / "close" / "update"）
+            position: 变化的仓位
+        """
+        if self._journal:
+            self._journal.append(event, position.to_dict())
+        else:
+            self.save()
+
     def save(self):
         """保存仓位数据到文件."""
         try:
@@ -242,6 +328,10 @@ class PositionManager:
 
     def load(self):
         """从文件加载仓位数据."""
+        if self._journal:
+            self._load_journal()
+            return
+
         if not self.data_file.exists():
             return
 
@@ -259,6 +349,34 @@ class PositionManager:
         except Exception as e:
             print(f"Error loading positions: {e}")
 
+    def _load_journal(self):
+        """从快照 + 追加日志恢复仓位，并启动日志写线程."""
+        try:
+            data = self._journal.replay()
+
+            self.positions = {
+                pid: Position.from_dict(dict(pos_data))
+                for pid, pos_data in data.items()
+            }
+
+            if self.positions:
+                print(f"✓ Loaded {len(self.positions)} positions from {self.data_file} + journal")
+
+        except Exception as e:
+            print(f"Error loading positions: {e}")
+
+        self._journal.start()
+
+    def compact(self):
+        """把追加日志压缩进快照文件（journal 模式）."""
+        if self._journal:
+            self._journal.compact()
+
+    def close(self):
+        """刷新并关闭持久化存储（journal 模式下写完所有待写记录）."""
+        if self._journal:
+            self._journal.close()
+
     def get_statistics(self) -> Dict:
         """获取仓位统计信息.
 
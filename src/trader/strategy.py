@@ -2,9 +2,13 @@
 
 from typing import Dict, Optional, Tuple
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import time
 
+import numpy as np
+
+from latency import TickStamps
+from orderbook import BookSide, L2OrderBook
 from .config import StrategyConfig, DEFAULT_CONFIG
 
 
@@ -15,44 +19,150 @@ class SignalType(Enum):
     CLOSE_POSITION = "close_position"  # 平仓信号
 
 
-@dataclass
-class MarketData:
-    """市场数据结构."""
-    # Hyperliquid 永续合约数据
-    perp_bid: Optional[float] = None
-    perp_ask: Optional[float] = None
-    mark_price: Optional[float] = None
-    funding_rate: Optional[float] = None
+# 平仓原因代码（批量接口使用，顺序与 get_close_signal 的判断顺序一致）
+CLOSE_NONE = 0
+CLOSE_CONVERGED = 1     # 价差收敛（获利平仓）
+CLOSE_REVERSED = 2      # 价差反转（止损平仓）
+CLOSE_FUNDING = 3       # 资金费率反转
 
-    # IB 现货数据
-    spot_bid: Optional[float] = None
-    spot_ask: Optional[float] = None
+# 无信号时的固定返回值（每个 tick 都会返回，避免重复创建元组）
+_NO_OPEN_SIGNAL = (SignalType.NONE, "No open signal")
+_NO_CLOSE_SIGNAL = (SignalType.NONE, "No close signal")
 
-    # 数据时间戳
-    timestamp: Optional[float] = None
 
+class MarketData:
+    """市场数据结构.
+
+    主循环预先分配一个实例，每个 tick 由 fetcher 的 update_market_data() 原地更新，
+    不再为每次评估创建新对象（使用 __slots__，没有实例 __dict__）。
+    """
+
+    __slots__ = (
+        # Hyperliquid 永续合约数据
+        "perp_bid", "perp_ask", "mark_price", "funding_rate",
+        # IB 现货数据
+        "spot_bid", "spot_ask",
+        # 数据时间戳
+        "timestamp",
+        # 订单簿深度（可选，可成交价差模式使用）：HL l2Book / IB market depth
+        "perp_book", "spot_book",
+        # HL l2Book 的行情路径时间戳（可选，延迟统计使用）
+        "stamps",
+    )
+
+    def __init__(
+        self,
+        perp_bid: Optional[float] = None,
+        perp_ask: Optional[float] = None,
+        mark_price: Optional[float] = None,
+        funding_rate: Optional[float] = None,
+        spot_bid: Optional[float] = None,
+        spot_ask: Optional[float] = None,
+        timestamp: Optional[float] = None,
+        perp_book: Optional[L2OrderBook] = None,
+        spot_book: Optional[L2OrderBook] = None,
+        stamps: Optional[TickStamps] = None,
+    ):
+        self.perp_bid = perp_bid
+        self.perp_ask = perp_ask
+        self.mark_price = mark_price
+        self.funding_rate = funding_rate
+        self.spot_bid = spot_bid
+        self.spot_ask = spot_ask
+        self.timestamp = timestamp
+        self.perp_book = perp_book
+        self.spot_book = spot_book
+        self.stamps = stamps
+
+    def clear(self):
+        """把所有字段重置为 None（复用实例前调用）."""
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def __repr__(self) -> str:
+        return _slots_repr(self)
 
-@dataclass
-class SpreadAnalysis:
-    """价差分析结果."""
-    # 价差（百分比）
-    spread: Optional[float] = None
 
-    # 用于计算的价格
-    ib_buy_price: Optional[float] = None   # IB 买入成本（spot_ask）
-    hl_sell_price: Optional[float] = None  # HL 开空成交价（perp_bid）
+class SpreadAnalysis:
+    """价差分析结果.
+
+    calculate_spread / calculate_close_spread 可以通过 out 参数原地写入预先分配的实例。
+    """
+
+    __slots__ = (
+        "spread",          # 价差（百分比）
+        "ib_buy_price",    # IB 买入成本（spot_ask）
+        "hl_sell_price",   # HL 开空成交价（perp_bid）
+        "funding_rate",    # 资金费率
+        "signal",          # 信号类型
+        "reason",          # 信号原因（便于调试）
+        "is_valid",        # 数据有效性
+        "stamps",          # 延迟统计：行情时间戳
+        "decision_ns",     # 信号触发时间（perf_counter_ns，0 表示未触发）
+    )
+
+    def __init__(
+        self,
+        spread: Optional[float] = None,
+        ib_buy_price: Optional[float] = None,
+        hl_sell_price: Optional[float] = None,
+        funding_rate: Optional[float] = None,
+        signal: SignalType = SignalType.NONE,
+        reason: str = "",
+        is_valid: bool = False,
+        stamps: Optional[TickStamps] = None,
+        decision_ns: int = 0,
+    ):
+        self.spread = spread
+        self.ib_buy_price = ib_buy_price
+        self.hl_sell_price = hl_sell_price
+        self.funding_rate = funding_rate
+        self.signal = signal
+        self.reason = reason
+        self.is_valid = is_valid
+        self.stamps = stamps
+        self.decision_ns = decision_ns
+
+    def reset(self) -> 'SpreadAnalysis':
+        """恢复为默认值（与 SpreadAnalysis() 相同），返回自身."""
+        self.spread = None
+        self.ib_buy_price = None
+        self.hl_sell_price = None
+        self.funding_rate = None
+        self.signal = SignalType.NONE
+        self.reason = ""
+        self.is_valid = False
+        self.stamps = None
+        self.decision_ns = 0
+        return self
+
+    def __repr__(self) -> str:
+        return _slots_repr(self)
+
+
+def _slots_repr(obj) -> str:
+    """按 __slots__ 顺序输出字段（与 dataclass 的 repr 格式相同）."""
+    fields_text = ", ".join(f"{name}={getattr(obj, name)!r}" for name in obj.__slots__)
+    return f"{type(obj).__name__}({fields_text})"
 
-    # 资金费率
-    funding_rate: Optional[float] = None
 
-    # 信号类型
-    signal: SignalType = SignalType.NONE
+@dataclass
+class BatchSignals:
+    """批量信号评估结果（每个数组一行对应一个 symbol / tick）."""
+    open_spread: np.ndarray         # perp_bid / spot_ask - 1
+    close_spread: np.ndarray        # perp_ask / spot_bid - 1
+    valid: np.ndarray               # 开仓分析有效（calculate_spread 的 is_valid）
+    close_valid: np.ndarray         # 平仓分析有效（calculate_close_spread 的 is_valid）
+    open_mask: np.ndarray           # 开仓信号
+    close_reason: np.ndarray        # 平仓原因代码 CLOSE_*（0 表示无平仓信号）
 
-    # 信号原因（便于调试）
-    reason: str = ""
+    # 只为触发信号的行生成的原因说明 {行号: 原因}
+    open_reasons: Dict[int, str] = field(default_factory=dict)
+    close_reasons: Dict[int, str] = field(default_factory=dict)
 
-    # 数据有效性
-    is_valid: bool = False
+    @property
+    def close_mask(self) -> np.ndarray:
+        return self.close_reason != CLOSE_NONE
 
 
 class ArbitrageStrategy:
@@ -66,11 +176,13 @@ class ArbitrageStrategy:
         """
         self.config = config or DEFAULT_CONFIG
 
-    def calculate_spread(self, market_data: MarketData) -> SpreadAnalysis:
+    def calculate_spread(self, market_data: MarketData,
+                         out: Optional[SpreadAnalysis] = None) -> SpreadAnalysis:
         """计算开仓价差并分析.
 
         Args:
             market_data: 市场数据
+            out: 预先分配的结果对象；提供时重置后原地写入并返回它（不创建新对象）
 
         Returns:
             SpreadAnalysis: 价差分析结果
@@ -80,8 +192,12 @@ class ArbitrageStrategy:
             - ib_buy_price = spot_ask（IB 买入成本）
             - hl_sell_price = perp_bid（HL 开空成交价）
             - spread = (hl_sell_price / ib_buy_price) - 1
+
+            可成交价差模式（config.use_executable_spread）：
+            - ib_buy_price = IB 卖盘吃 position_size 股的 VWAP
+            - hl_sell_price = HL 买盘吃 position_size 的 VWAP
         """
-        analysis = SpreadAnalysis()
+        analysis = out.reset() if out is not None else SpreadAnalysis()
 
         # 1. 数据有效性检查
         if not self._validate_market_data(market_data):
@@ -89,8 +205,15 @@ class ArbitrageStrategy:
             return analysis
 
         # 2. 提取价格
-        ib_buy_price = market_data.spot_ask    # IB 买入价（ask）
-        hl_sell_price = market_data.perp_bid   # HL 开空价（bid）
+        if self.config.use_executable_spread:
+            ib_buy_price = self._executable_price(market_data.spot_book, "asks")    # IB 买入均价
+            hl_sell_price = self._executable_price(market_data.perp_book, "bids")   # HL 开空均价
+            if ib_buy_price is None or hl_sell_price is None:
+                analysis.reason = f"Insufficient depth for {self.config.position_size} shares"
+                return analysis
+        else:
+            ib_buy_price = market_data.spot_ask    # IB 买入价（ask）
+            hl_sell_price = market_data.perp_bid   # HL 开空价（bid）
         funding_rate = market_data.funding_rate
 
         # 3. 计算价差
@@ -102,14 +225,17 @@ class ArbitrageStrategy:
         analysis.hl_sell_price = hl_sell_price
         analysis.funding_rate = funding_rate
         analysis.is_valid = True
+        analysis.stamps = market_data.stamps
 
         return analysis
 
-    def calculate_close_spread(self, market_data: MarketData) -> SpreadAnalysis:
+    def calculate_close_spread(self, market_data: MarketData,
+                               out: Optional[SpreadAnalysis] = None) -> SpreadAnalysis:
         """计算平仓价差.
 
         Args:
             market_data: 市场数据
+            out: 预先分配的结果对象；提供时重置后原地写入并返回它（不创建新对象）
 
         Returns:
             SpreadAnalysis: 价差分析结果
@@ -121,8 +247,10 @@ class ArbitrageStrategy:
             - spread = (hl_buy_price / ib_sell_price) - 1
 
             注意：平仓spread通常是负数（因为bid<ask），这是正常的
+
+            可成交价差模式下使用 IB 买盘 / HL 卖盘吃 position_size 的 VWAP
         """
-        analysis = SpreadAnalysis()
+        analysis = out.reset() if out is not None else SpreadAnalysis()
 
         # 1. 数据有效性检查（平仓时也需要spot_bid和perp_ask）
         if not market_data.spot_bid or market_data.spot_bid <= 0:
@@ -138,8 +266,15 @@ class ArbitrageStrategy:
             return analysis
 
         # 2. 提取平仓价格
-        ib_sell_price = market_data.spot_bid   # IB 卖出价（bid）
-        hl_buy_price = market_data.perp_ask    # HL 平空价（ask）
+        if self.config.use_executable_spread:
+            ib_sell_price = self._executable_price(market_data.spot_book, "bids")   # IB 卖出均价
+            hl_buy_price = self._executable_price(market_data.perp_book, "asks")    # HL 平空均价
+            if ib_sell_price is None or hl_buy_price is None:
+                analysis.reason = f"Insufficient depth for {self.config.position_size} shares"
+                return analysis
+        else:
+            ib_sell_price = market_data.spot_bid   # IB 卖出价（bid）
+            hl_buy_price = market_data.perp_ask    # HL 平空价（ask）
         funding_rate = market_data.funding_rate
 
         # 3. 计算平仓价差
@@ -151,14 +286,17 @@ class ArbitrageStrategy:
         analysis.hl_sell_price = hl_buy_price  # 实际是买入价
         analysis.funding_rate = funding_rate
         analysis.is_valid = True
+        analysis.stamps = market_data.stamps
 
         return analysis
 
-    def get_open_signal(self, analysis: SpreadAnalysis) -> Tuple[SignalType, str]:
+    def get_open_signal(self, analysis: SpreadAnalysis, explain: bool = True) -> Tuple[SignalType, str]:
         """判断是否有开仓信号.
 
         Args:
             analysis: 价差分析结果
+            explain: 无信号时是否格式化具体原因；False 时返回固定的 "No open signal"
+                （事件驱动模式每个 tick 都调用，跳过字符串格式化）
 
         Returns:
             (信号类型, 原因说明)
@@ -166,6 +304,8 @@ class ArbitrageStrategy:
         开仓条件（情况1）：
             1. spread > open_spread_threshold（价差足够大）
             2. funding_rate > min_funding_rate（资金费率为正）
+
+        有信号时把触发时间写入 analysis.decision_ns（延迟统计）
         """
         if not analysis.is_valid:
             return SignalType.NONE, "Invalid spread analysis"
@@ -175,18 +315,19 @@ class ArbitrageStrategy:
 
         # 检查价差是否足够大
         if spread <= self.config.open_spread_threshold:
+            if not explain:
+                return _NO_OPEN_SIGNAL
             return SignalType.NONE, f"Spread {spread*100:.4f}% < threshold {self.config.open_spread_threshold*100:.4f}%"
 
         # 检查资金费率是否为正
         if funding_rate is None or funding_rate <= self.config.min_funding_rate:
+            if not explain:
+                return _NO_OPEN_SIGNAL
             return SignalType.NONE, f"Funding rate {funding_rate*100:.4f}% <= threshold {self.config.min_funding_rate*100:.4f}%"
 
         # 满足开仓条件
-        reason = (
-            f"Spread {spread*100:.4f}% > {self.config.open_spread_threshold*100:.4f}%, "
-            f"Funding {funding_rate*100:.4f}% > {self.config.min_funding_rate*100:.4f}%"
-        )
-        return SignalType.OPEN_LONG_SPOT_SHORT_PERP, reason
+        analysis.decision_ns = time.perf_counter_ns()
+        return SignalType.OPEN_LONG_SPOT_SHORT_PERP, self._open_reason(spread, funding_rate)
 
     def get_close_signal(self, analysis: SpreadAnalysis, entry_spread: float) -> Tuple[SignalType, str]:
         """判断是否有平仓信号.
@@ -202,6 +343,8 @@ class ArbitrageStrategy:
             1. 价差收敛：spread < close_spread_threshold（获利平仓）
             2. 价差反转：spread < reverse_spread_threshold（止损平仓）
             3. 资金费率反转：funding_rate < reverse_funding_threshold（可选）
+
+        有信号时把触发时间写入 analysis.decision_ns（延迟统计）
         """
         if not analysis.is_valid:
             return SignalType.NONE, "Invalid spread analysis"
@@ -211,22 +354,166 @@ class ArbitrageStrategy:
 
         # 1. 价差收敛（获利平仓）
         if spread < self.config.close_spread_threshold:
-            reason = f"Spread converged {spread*100:.4f}% < {self.config.close_spread_threshold*100:.4f}% (profit taking)"
-            return SignalType.CLOSE_POSITION, reason
+            analysis.decision_ns = time.perf_counter_ns()
+            return SignalType.CLOSE_POSITION, self._close_reason(CLOSE_CONVERGED, spread, funding_rate)
 
         # 2. 价差反转（止损平仓）
         if spread < self.config.reverse_spread_threshold:
-            reason = f"Spread reversed {spread*100:.4f}% < {self.config.reverse_spread_threshold*100:.4f}% (stop loss)"
-            return SignalType.CLOSE_POSITION, reason
+            analysis.decision_ns = time.perf_counter_ns()
+            return SignalType.CLOSE_POSITION, self._close_reason(CLOSE_REVERSED, spread, funding_rate)
 
         # 3. 资金费率反转（可选）
         if (self.config.reverse_funding_threshold is not None and
             funding_rate is not None and
             funding_rate < self.config.reverse_funding_threshold):
-            reason = f"Funding rate reversed {funding_rate*100:.4f}% < {self.config.reverse_funding_threshold*100:.4f}%"
-            return SignalType.CLOSE_POSITION, reason
+            analysis.decision_ns = time.perf_counter_ns()
+            return SignalType.CLOSE_POSITION, self._close_reason(CLOSE_FUNDING, spread, funding_rate)
+
+        return _NO_CLOSE_SIGNAL
+
+    def _open_reason(self, spread: float, funding_rate: float) -> str:
+        """开仓信号原因说明."""
+        return (
+            f"Spread {spread*100:.4f}% > {self.config.open_spread_threshold*100:.4f}%, "
+            f"Funding {funding_rate*100:.4f}% > {self.config.min_funding_rate*100:.4f}%"
+        )
+
+    def _close_reason(self, code: int, spread: float, funding_rate: float) -> str:
+        """平仓信号原因说明."""
+        if code == CLOSE_CONVERGED:
+            return f"Spread converged {spread*100:.4f}% < {self.config.close_spread_threshold*100:.4f}% (profit taking)"
+        if code == CLOSE_REVERSED:
+            return f"Spread reversed {spread*100:.4f}% < {self.config.reverse_spread_threshold*100:.4f}% (stop loss)"
+        return f"Funding rate reversed {funding_rate*100:.4f}% < {self.config.reverse_funding_threshold*100:.4f}%"
+
+    # ==================== 批量（向量化）接口 ====================
+
+    @staticmethod
+    def batch_spreads(perp_bid, perp_ask, spot_bid, spot_ask) -> Tuple[np.ndarray, np.ndarray]:
+        """批量计算开仓 / 平仓价差（最优报价，公式同 calculate_spread / calculate_close_spread）.
+
+        Returns:
+            (open_spread, close_spread)
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            open_spread = np.asarray(perp_bid, dtype=np.float64) / spot_ask - 1
+            close_spread = np.asarray(perp_ask, dtype=np.float64) / spot_bid - 1
+        return open_spread, close_spread
+
+    @staticmethod
+    def batch_quotes_valid(perp_bid, perp_ask, spot_bid, spot_ask, funding_rate) -> Tuple[np.ndarray, np.ndarray]:
+        """批量数据有效性检查（不含数据时效）.
+
+        缺失值用 NaN 表示；与 NaN 的比较结果为 False，等价于标量接口中的 None 检查。
+
+        Returns:
+            (valid, close_valid)：_validate_market_data 的价格检查，
+            以及 calculate_close_spread 额外要求的 spot_bid / perp_ask 检查
+        """
+        perp_bid, perp_ask, spot_bid, spot_ask, funding_rate = (
+            np.asarray(x, dtype=np.float64) for x in (perp_bid, perp_ask, spot_bid, spot_ask, funding_rate)
+        )
+        has_funding = ~np.isnan(funding_rate)
+        valid = (
+            (spot_ask > 0) & (perp_bid > 0) & has_funding &
+            ~(spot_bid >= spot_ask) & ~(perp_bid >= perp_ask)
+        )
+        close_valid = (spot_bid > 0) & (perp_ask > 0) & has_funding
+        return valid, close_valid
+
+    def open_signal_mask(self, open_spread: np.ndarray, funding_rate: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """批量版 get_open_signal：返回开仓信号掩码."""
+        return (
+            valid &
+            (open_spread > self.config.open_spread_threshold) &
+            (funding_rate > self.config.min_funding_rate)
+        )
+
+    def close_signal_codes(self, close_spread: np.ndarray, funding_rate: np.ndarray,
+                           close_valid: np.ndarray) -> np.ndarray:
+        """批量版 get_close_signal：返回平仓原因代码（CLOSE_*，按判断顺序取第一个满足的条件）."""
+        conditions = [
+            close_valid & (close_spread < self.config.close_spread_threshold),
+            close_valid & (close_spread < self.config.reverse_spread_threshold),
+        ]
+        choices = [CLOSE_CONVERGED, CLOSE_REVERSED]
+        if self.config.reverse_funding_threshold is not None:
+            conditions.append(close_valid & (funding_rate < self.config.reverse_funding_threshold))
+            choices.append(CLOSE_FUNDING)
+        return np.select(conditions, choices, default=CLOSE_NONE).astype(np.uint8)
+
+    def evaluate_batch(
+        self,
+        perp_bid,
+        perp_ask,
+        spot_bid,
+        spot_ask,
+        funding_rate,
+        timestamps=None,
+        now: Optional[float] = None
+    ) -> BatchSignals:
+        """批量计算价差和开平仓信号（例如一组 symbol 的最新报价）.
+
+        Args:
+            perp_bid / perp_ask / spot_bid / spot_ask / funding_rate: 等长数组，缺失值为 NaN
+            timestamps: 数据时间戳（epoch 秒，NaN 表示不检查时效），None 表示全部不检查
+            now: 当前时间（默认 time.time()）
+
+        Returns:
+            BatchSignals，原因说明只为触发信号的行生成
+
+        Note:
+            与 get_close_signal 相同，平仓条件与开仓价差无关；是否有持仓由调用方判断。
+            只使用最优报价（可成交价差模式需要逐个 symbol 的订单簿，使用标量接口）。
+        """
+        funding_rate = np.asarray(funding_rate, dtype=np.float64)
+        open_spread, close_spread = self.batch_spreads(perp_bid, perp_ask, spot_bid, spot_ask)
+        valid, close_valid = self.batch_quotes_valid(perp_bid, perp_ask, spot_bid, spot_ask, funding_rate)
+
+        if timestamps is not None:
+            age = (time.time() if now is None else now) - np.asarray(timestamps, dtype=np.float64)
+            valid &= ~(age > self.config.max_data_age)
+        close_valid &= valid   # evaluate_market：开仓分析无效时不检查平仓
+
+        open_mask = self.open_signal_mask(open_spread, funding_rate, valid)
+        close_reason = self.close_signal_codes(close_spread, funding_rate, close_valid)
+
+        # 只为触发的行格式化原因
+        open_reasons = {
+            int(i): self._open_reason(open_spread[i], funding_rate[i])
+            for i in np.flatnonzero(open_mask)
+        }
+        close_reasons = {
+            int(i): self._close_reason(close_reason[i], close_spread[i], funding_rate[i])
+            for i in np.flatnonzero(close_reason)
+        }
+
+        return BatchSignals(
+            open_spread=open_spread,
+            close_spread=close_spread,
+            valid=valid,
+            close_valid=close_valid,
+            open_mask=open_mask,
+            close_reason=close_reason,
+            open_reasons=open_reasons,
+            close_reasons=close_reasons,
+        )
+
+    def _executable_price(self, book: Optional[L2OrderBook], side: str) -> Optional[float]:
+        """计算吃掉 position_size 数量时的成交均价.
+
+        Args:
+            book: 订单簿快照
+            side: "bids"（卖出时吃买盘）或 "asks"（买入时吃卖盘）
+
+        Returns:
+            VWAP，订单簿缺失或深度不足时返回 None
+        """
+        if book is None:
+            return None
 
-        return SignalType.NONE, "No close signal"
+        book_side: BookSide = getattr(book, side)
+        return book_side.vwap(self.config.position_size)
 
     def _validate_market_data(self, market_data: MarketData) -> bool:
         """验证市场数据有效性.
@@ -0,0 +1,187 @@
+"""Test the asyncio runtime: native HL WebSocket client, async event queue, nested loop (local server)."""
+
+import sys
+import json
+import asyncio
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from hl_fetcher.ws_async import HyperliquidAsyncStream
+from trader.market_events import AsyncMarketEventQueue
+from runtime import create_event_loop, shutdown_event_loop
+
+
+class LocalHyperliquidServer:
+    """本地 WebSocket 服务器：记录订阅请求，按需推送消息."""
+
+    def __init__(self):
+        self.requests = []
+        self.connections = []
+        self.server = None
+
+    async def handler(self, ws):
+        self.connections.append(ws)
+        await ws.send("Websocket connection established.")
+        async for message in ws:
+            request = json.loads(message)
+            self.requests.append(request)
+            if request["method"] == "ping":
+                await ws.send(json.dumps({"channel": "pong"}))
+
+    async def start(self):
+        from websockets.asyncio.server import serve
+        self.server = await serve(self.handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def broadcast(self, channel, data):
+        await self.connections[-1].send(json.dumps({"channel": channel, "data": data}))
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def book_data(coin, bid, ask):
+    return {
+        "coin": coin,
+        "time": 1764000000000,
+        "levels": [[{"px": str(bid), "sz": "10", "n": 1}], [{"px": str(ask), "sz": "12", "n": 1}]],
+    }
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        await asyncio.sleep(0.01)
+
+
+def test_async_stream_feeds_fetcher():
+    """测试 asyncio WebSocket 客户端驱动 HyperliquidFetcherStreaming（订阅、分发、重连）."""
+    print("=" * 60)
+    print("Testing Hyperliquid asyncio WebSocket client")
+    print("=" * 60)
+
+    async def scenario():
+        server = LocalHyperliquidServer()
+        base_url = await server.start()
+
+        stream = HyperliquidAsyncStream(base_url, reconnect_delay=0.05)
+        fetcher = HyperliquidFetcherStreaming("xyz:NVDA", info=stream)
+        events = []
+        fetcher.add_update_listener(lambda source, recv_ns: events.append(source))
+
+        task = asyncio.create_task(stream.run())
+        await asyncio.wait_for(stream.connected.wait(), 2)
+        await wait_until(lambda: len(server.requests) == 2)
+        assert {r["subscription"]["type"] for r in server.requests} == {"l2Book", "activeAssetCtx"}
+        print(f"✓ Subscribed on connect: {[r['subscription']['type'] for r in server.requests]}")
+
+        await server.broadcast("l2Book", book_data("xyz:NVDA", 180.50, 180.52))
+        await server.broadcast("activeAssetCtx", {"coin": "xyz:NVDA", "ctx": {"funding": "0.0001", "markPx": "180.51"}})
+        await server.broadcast("l2Book", book_data("xyz:TSLA", 400.0, 400.1))   # 未订阅，忽略
+        await wait_until(lambda: len(events) == 2)
+
+        assert fetcher.get_orderbook_prices() == {"perp_bid": 180.50, "perp_ask": 180.52}
+        assert fetcher.get_funding_rate() == 0.0001
+        assert fetcher.get_mark_price() == 180.51
+        assert events == ["hl_book", "hl_ctx"]
+        print("✓ Frames dispatched to the fetcher on the event loop")
+
+        # 服务器断开后重连并重新订阅
+        await server.connections[-1].close()
+        await wait_until(lambda: stream.reconnects == 1 and len(server.requests) == 4)
+        await asyncio.wait_for(stream.connected.wait(), 2)
+        await server.broadcast("l2Book", book_data("xyz:NVDA", 181.00, 181.02))
+        await wait_until(lambda: len(events) == 3)
+        assert fetcher.get_orderbook_prices()["perp_bid"] == 181.00
+        print("✓ Reconnected and resubscribed")
+
+        # 取消订阅发送到服务器
+        fetcher.close()
+        await wait_until(lambda: sum(r["method"] == "unsubscribe" for r in server.requests) == 2)
+        print("✓ Unsubscribe sent")
+
+        await stream.close()
+        await asyncio.wait_for(task, 2)
+        await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_async_event_queue():
+    """测试 asyncio 版事件队列的合并和超时."""
+    print("\n" + "=" * 60)
+    print("Testing AsyncMarketEventQueue")
+    print("=" * 60)
+
+    async def scenario():
+        queue = AsyncMarketEventQueue()
+        assert await queue.wait(timeout=0.01) == {}
+
+        queue.push("hl_book", 100)
+        queue.push("hl_book", 200)
+        queue.push("ib", 300)
+        assert len(queue) == 2
+        assert await queue.wait() == {"hl_book": 100, "ib": 300}
+        assert queue.pushed == 3 and queue.coalesced == 1
+
+        # 等待中的消费者被推送唤醒
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.02, queue.push, "hl_ctx", 400)
+        start = time.perf_counter()
+        assert await queue.wait(timeout=1.0) == {"hl_ctx": 400}
+        assert time.perf_counter() - start < 0.5
+        print("✓ Coalescing, timeout and wake-up")
+
+    asyncio.run(scenario())
+
+
+def test_nested_loop_keeps_streaming():
+    """测试嵌套运行：同步代码（例如 ib_insync 下单等待）阻塞期间事件循环继续处理推送."""
+    print("\n" + "=" * 60)
+    print("Testing nested event loop")
+    print("=" * 60)
+
+    loop = create_event_loop()
+    try:
+        received = []
+
+        async def producer():
+            for i in range(5):
+                await asyncio.sleep(0.01)
+                received.append(i)
+
+        async def consumer():
+            task = asyncio.create_task(producer())
+            # 同步调用中嵌套运行事件循环（IBTrader 的 ib.sleep 即是如此）
+            loop.run_until_complete(asyncio.sleep(0.2))
+            assert received == [0, 1, 2, 3, 4]
+            await task
+
+        loop.run_until_complete(consumer())
+        print("✓ Other tasks progress while synchronous code waits")
+    finally:
+        shutdown_event_loop(loop)
+        asyncio.set_event_loop(None)
+
+
+def main():
+    """运行所有测试."""
+    test_async_stream_feeds_fetcher()
+    test_async_event_queue()
+    test_nested_loop_keeps_streaming()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
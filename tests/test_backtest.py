@@ -0,0 +1,148 @@
+"""Test the vectorized backtester against the per-tick strategy rules."""
+
+import sys
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from backtest import Backtester
+from recorder import TICK_DTYPE
+from trader.config import StrategyConfig
+from trader.strategy import ArbitrageStrategy, MarketData, SignalType
+
+
+def make_ticks(
+    n: int,
+    seed: int = 7,
+    max_spot_age: int = 8,
+    funding_swing: float = 0.0003,
+    dirty: bool = True
+) -> np.ndarray:
+    """生成随机游走的两边报价（价差在开平仓阈值附近来回穿越）.
+
+    Args:
+        n: tick 数量
+        seed: 随机种子
+        max_spot_age: IB 报价最大滞后秒数（不含），用于制造过期数据
+        funding_swing: 资金费率正弦波动幅度（0 = 固定 0.0002）
+        dirty: 是否加入缺失 / 交叉的报价
+    """
+    rng = np.random.default_rng(seed)
+    ticks = np.zeros(n, dtype=TICK_DTYPE)
+
+    ts = 1_764_000_000_000_000_000 + np.arange(n, dtype=np.int64) * 50_000_000
+    spot_mid = 180 + np.cumsum(rng.normal(0, 0.01, n))
+    basis = 0.0008 + 0.001 * np.sin(np.arange(n) / 40) + rng.normal(0, 0.0002, n)
+    perp_mid = spot_mid * (1 + basis)
+
+    ticks["ts_ns"] = ts
+    ticks["spot_bid"], ticks["spot_ask"] = spot_mid - 0.01, spot_mid + 0.01
+    ticks["perp_bid"], ticks["perp_ask"] = perp_mid - 0.005, perp_mid + 0.005
+    ticks["funding_rate"] = 0.0002 + funding_swing * np.sin(np.arange(n) / 300)
+    ticks["perp_recv_ns"] = ts
+    ticks["spot_recv_ns"] = ts - rng.integers(0, max_spot_age, n) * 1_000_000_000 - 250_000_000   # 部分 IB 数据过期
+
+    if dirty:
+        # 一些缺失 / 交叉的报价
+        ticks["spot_bid"][rng.choice(n, n // 50)] = np.nan
+        ticks["funding_rate"][:5] = np.nan
+        crossed = rng.choice(n, n // 100)
+        ticks["perp_bid"][crossed] = ticks["perp_ask"][crossed] + 0.01
+    return ticks
+
+
+def reference_backtest(ticks: np.ndarray, config: StrategyConfig):
+    """逐 tick 调用 ArbitrageStrategy，按 evaluate_market 的顺序开平仓."""
+    strategy = ArbitrageStrategy(config)
+    holding, trades = [], []
+
+    def value(x):
+        return None if math.isnan(x) else float(x)
+
+    for i, tick in enumerate(ticks):
+        age = (tick["ts_ns"] - min(tick["perp_recv_ns"], tick["spot_recv_ns"])) / 1e9
+        market_data = MarketData(
+            perp_bid=value(tick["perp_bid"]), perp_ask=value(tick["perp_ask"]),
+            spot_bid=value(tick["spot_bid"]), spot_ask=value(tick["spot_ask"]),
+            funding_rate=value(tick["funding_rate"]), timestamp=time.time() - age,
+        )
+        open_analysis = strategy.calculate_spread(market_data)
+        if not open_analysis.is_valid:
+            continue
+
+        n_open = len(holding)
+        if holding:
+            close_analysis = strategy.calculate_close_spread(market_data)
+            if close_analysis.is_valid:
+                signal, _ = strategy.get_close_signal(close_analysis, 0)
+                if signal == SignalType.CLOSE_POSITION:
+                    for entry in holding:
+                        pnl = ((close_analysis.ib_buy_price - entry[1]) +
+                               (entry[2] - close_analysis.hl_sell_price)) * config.position_size
+                        trades.append((entry[0], i, pnl))
+                    holding = []
+
+        if n_open < config.max_positions:
+            signal, _ = strategy.get_open_signal(open_analysis)
+            if signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP:
+                holding.append((i, open_analysis.ib_buy_price, open_analysis.hl_sell_price))
+
+    return trades, holding
+
+
+def test_matches_strategy_rules():
+    """测试向量化回测与逐 tick 策略调用结果一致."""
+    print("=" * 60)
+    print("Testing vectorized backtester")
+    print("=" * 60)
+
+    ticks = make_ticks(5000)
+    for max_positions in (1, 3):
+        config = StrategyConfig(max_positions=max_positions, max_data_age=5.0)
+        result = Backtester(config).run(ticks)
+        expected, still_open = reference_backtest(ticks, config)
+
+        closed = result.closed_trades
+        print(f"max_positions={max_positions}: {len(closed)} trades, PnL ${result.total_pnl:+.2f}")
+        assert len(expected) > 10
+        assert sorted(zip(closed["entry_idx"], closed["exit_idx"])) == sorted((e, x) for e, x, _ in expected)
+        assert abs(result.total_pnl - sum(p for _, _, p in expected)) < 1e-6
+        assert sorted(result.trades["entry_idx"][result.trades["exit_idx"] < 0]) == [e[0] for e in still_open]
+
+
+def test_to_positions_pnl():
+    """成交记录转换为 Position 后 calculate_pnl 与回测 PnL 一致."""
+    result = Backtester(StrategyConfig()).run(make_ticks(2000))
+    positions = result.to_positions()
+    closed_pnl = [p.calculate_pnl() for p in positions if p.calculate_pnl() is not None]
+    assert len(closed_pnl) == len(result.closed_trades)
+    assert abs(sum(closed_pnl) - result.total_pnl) < 1e-6
+    print(result.summary())
+
+
+def test_speed():
+    """一百万 tick 的回测应远小于一秒."""
+    ticks = make_ticks(1_000_000)
+    result = Backtester(StrategyConfig()).run(ticks)
+    print(f"1M ticks: {result.elapsed*1000:.1f} ms, {len(result.trades)} trades")
+    assert result.elapsed < 1.0
+
+
+def main():
+    """运行所有测试."""
+    test_matches_strategy_rules()
+    test_to_positions_pnl()
+    test_speed()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Test TradeExecutor two-leg execution with in-memory fake traders."""
+
+import sys
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from trader.executor import TradeExecutor, allocate_fills
+from trader.position_manager import PositionManager, Position, PositionStatus
+from trader.strategy import MarketData, SpreadAnalysis
+from runtime import create_event_loop, shutdown_event_loop
+
+
+class FakeHandle:
+    """模拟订单句柄：提交后 delay 秒完成（working=True 时超时后仍在工作，需要撤单）."""
+
+    def __init__(self, delay, result, working=False):
+        self.ready_at = time.perf_counter() + delay
+        self._result = result
+        self.working = working
+
+    def done(self):
+        return not self.working and time.perf_counter() >= self.ready_at
+
+    def to_result(self):
+        return self._result
+
+    def result(self, timeout=30):
+        wait = max(0.0, self.ready_at - time.perf_counter())
+        time.sleep(min(wait, timeout) if self.working else wait)
+        return self._result
+
+
+class FakeOrders(list):
+    """模拟 OrderTracker：记录提交的订单，wait() 一起等待一组句柄."""
+
+    def wait(self, handles, timeout=30):
+        handles = list(handles)
+        deadline = time.monotonic() + timeout
+        while not all(handle.done() for handle in handles):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+
+def timestamps(start_ns, ack_delay, delay):
+    """模拟回报时间戳：ack_delay 秒后确认，delay 秒后成交."""
+    return {
+        "send_ns": start_ns,
+        "ack_ns": start_ns + int(ack_delay * 1e9),
+        "fill_ns": start_ns + int(delay * 1e9),
+    }
+
+
+class FakeIBTrader:
+    """模拟 IBTrader：固定延迟，按 fill_ratio 成交."""
+
+    def __init__(self, delay: float = 0.05, fill_ratio: float = 1.0, price: float = 180.32,
+                 ack_delay: float = 0.01, sell_fill_ratio: float = 1.0):
+        self.delay = delay
+        self.ack_delay = ack_delay
+        self.fill_ratio = fill_ratio
+        self.sell_fill_ratio = sell_fill_ratio     # submit_order 的成交比例（< 1 = 超时仍在工作）
+        self.price = price
+        self.orders = FakeOrders()
+        self.cancels = []
+
+    def _order(self, side, symbol, quantity, limit_price=None):
+        start, start_ns = time.perf_counter(), time.perf_counter_ns()
+        time.sleep(self.delay)
+        filled = int(quantity * self.fill_ratio) if side == "BUY" else quantity
+        self.orders.append((side, quantity, start, threading.current_thread().name))
+        return {
+            "success": filled == quantity,
+            "order_id": len(self.orders),
+            "filled_qty": filled,
+            "avg_price": self.price if filled else None,
+            "message": "Order Filled" if filled == quantity else "Order Cancelled",
+            **timestamps(start_ns, self.ack_delay, self.delay),
+        }
+
+    def buy_stock(self, symbol, quantity, limit_price=None):
+        return self._order("BUY", symbol, quantity, limit_price)
+
+    def sell_stock(self, symbol, quantity, limit_price=None):
+        return self._order("SELL", symbol, quantity, limit_price)
+
+    def submit_order(self, symbol, action, quantity, limit_price=None):
+        self.orders.append((action, quantity, time.perf_counter(), threading.current_thread().name))
+        filled = int(quantity * self.sell_fill_ratio)
+        return FakeHandle(self.delay, {
+            "success": filled == quantity,
+            "order_id": len(self.orders),
+            "filled_qty": filled,
+            "avg_price": self.price if filled else None,
+            "message": "Order Filled" if filled == quantity else "Order Submitted",
+        }, working=filled < quantity)
+
+    def cancel_order(self, handle, timeout=5):
+        self.cancels.append(handle._result["order_id"])
+        handle.working = False
+        return dict(handle._result, message="Order Cancelled")
+
+
+class FakeHLTrader:
+    """模拟 HLTrader：固定延迟，可模拟失败."""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False, price: float = 180.50, fill_ratio: float = 1.0,
+                 ack_delay: float = 0.01):
+        self.delay = delay
+        self.ack_delay = ack_delay
+        self.fail = fail
+        self.price = price
+        self.fill_ratio = fill_ratio
+        self.orders = []
+        self.batches = []
+
+    def _order(self, side, symbol, quantity, limit_price=None):
+        start, start_ns = time.perf_counter(), time.perf_counter_ns()
+        time.sleep(self.delay)
+        self.orders.append((side, quantity, start, threading.current_thread().name))
+        if self.fail and side == "SHORT":
+            return {"success": False, "message": "Insufficient margin"}
+        return {
+            "success": True,
+            "order_id": f"oid{len(self.orders)}",
+            "filled_qty": float(quantity),
+            "avg_price": self.price,
+            "message": "Order placed successfully",
+            **timestamps(start_ns, self.ack_delay, self.delay),
+        }
+
+    def open_short(self, symbol, quantity, limit_price=None):
+        return self._order("SHORT", symbol, quantity, limit_price)
+
+    def close_short(self, symbol, quantity, limit_price=None):
+        return self._order("COVER", symbol, quantity, limit_price)
+
+    def submit_close_short_batch(self, quantities, limit_prices=None):
+        self.batches.append(dict(quantities))
+        return {
+            symbol: FakeHandle(self.delay, {
+                "success": True,
+                "order_id": f"oid{len(self.batches)}",
+                "filled_qty": quantity * self.fill_ratio,
+                "avg_price": self.price,
+                "message": "Order filled",
+            })
+            for symbol, quantity in quantities.items()
+        }
+
+
+def make_executor(tmp, ib_trader, hl_trader, concurrent_legs=True):
+    """创建使用临时目录中仓位文件的执行器."""
+    data_file = Path(tmp) / "positions.json"
+    return TradeExecutor(
+        ib_trader=ib_trader,
+        hl_trader=hl_trader,
+        position_manager=PositionManager(str(data_file)),
+        symbol="NVDA",
+        hl_symbol="xyz:NVDA",
+        concurrent_legs=concurrent_legs,
+    )
+
+
+def make_analysis():
+    return SpreadAnalysis(
+        spread=0.001, ib_buy_price=180.32, hl_sell_price=180.50,
+        funding_rate=0.0002, is_valid=True
+    )
+
+
+def test_concurrent_open():
+    """测试两条腿同时发送，并记录每条腿的确认延迟."""
+    print("=" * 60)
+    print("Testing concurrent two-leg open")
+    print("=" * 60)
+
+    ib, hl = FakeIBTrader(delay=0.1, ack_delay=0.02), FakeHLTrader(delay=0.1, ack_delay=0.03)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+
+        start = time.perf_counter()
+        position_id = executor.open_arbitrage_position(100, make_analysis())
+        elapsed = time.perf_counter() - start
+
+        assert position_id is not None
+        position = executor.position_manager.get_position(position_id)
+        print(f"Elapsed: {elapsed*1000:.0f}ms, IB {position.ib_entry_latency_ms:.1f}ms, "
+              f"HL {position.hl_entry_latency_ms:.1f}ms")
+
+        # 两条腿几乎同时发送，总耗时接近单腿耗时而不是两者之和
+        send_gap = abs(ib.orders[0][2] - hl.orders[0][2])
+        assert send_gap < 0.05
+        assert elapsed < 0.19
+        assert ib.orders[0][3] != hl.orders[0][3]
+        assert position.quantity == 100
+        # 延迟是发送到 ack，不包含等待成交的时间
+        assert abs(position.ib_entry_latency_ms - 20) < 1
+        assert abs(position.hl_entry_latency_ms - 30) < 1
+
+
+def test_concurrent_unwind_on_hl_failure():
+    """HL 失败时卖出 IB 已成交部分."""
+    ib, hl = FakeIBTrader(delay=0.01), FakeHLTrader(delay=0.01, fail=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+
+        assert executor.open_arbitrage_position(100, make_analysis()) is None
+        assert [o[:2] for o in ib.orders] == [("BUY", 100), ("SELL", 100)]
+        assert executor.position_manager.get_open_positions() == []
+
+
+def test_concurrent_partial_fill_hedge():
+    """IB 部分成交时平掉 HL 多出来的空单，只记录对冲数量."""
+    ib, hl = FakeIBTrader(delay=0.01, fill_ratio=0.6), FakeHLTrader(delay=0.01)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+
+        position_id = executor.open_arbitrage_position(100, make_analysis())
+        position = executor.position_manager.get_position(position_id)
+
+        assert position.quantity == 60
+        assert [o[:2] for o in hl.orders] == [("SHORT", 100), ("COVER", 40.0)]
+
+
+def test_concurrent_open_inside_event_loop():
+    """asyncio 模式：等待 HL 腿时嵌套运行事件循环，由循环分发的成交回报照常到达."""
+
+    class LoopFilledHLTrader(FakeHLTrader):
+        """HL 腿等待事件循环中的回调（模拟 userFills 由主线程事件循环分发）."""
+
+        def __init__(self):
+            super().__init__(delay=0.0)
+            self.filled = threading.Event()
+
+        def open_short(self, symbol, quantity, limit_price=None):
+            if not self.filled.wait(2):
+                return {"success": False, "message": "fill never dispatched"}
+            return super().open_short(symbol, quantity, limit_price)
+
+    ib, hl = FakeIBTrader(delay=0.01), LoopFilledHLTrader()
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        loop = create_event_loop()
+
+        async def scenario():
+            loop.call_later(0.05, hl.filled.set)
+            start = time.perf_counter()
+            position_id = executor.open_arbitrage_position(100, make_analysis())
+            return position_id, time.perf_counter() - start
+
+        try:
+            position_id, elapsed = loop.run_until_complete(scenario())
+        finally:
+            shutdown_event_loop(loop)
+            asyncio.set_event_loop(None)
+
+        assert position_id is not None and elapsed < 1
+
+
+def test_sequential_open_records_latency():
+    """顺序模式仍然先 IB 后 HL，同样记录确认延迟."""
+    ib, hl = FakeIBTrader(delay=0.01), FakeHLTrader(delay=0.01)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl, concurrent_legs=False)
+
+        position_id = executor.open_arbitrage_position(100, make_analysis())
+        position = executor.position_manager.get_position(position_id)
+
+        assert ib.orders[0][2] < hl.orders[0][2]
+        assert abs(position.ib_entry_latency_ms - 10) < 1
+        assert abs(position.hl_entry_latency_ms - 10) < 1
+
+
+def add_open_position(executor, position_id, quantity, entry_time):
+    executor.position_manager.add_position(Position(
+        position_id=position_id, symbol="NVDA", hl_symbol="xyz:NVDA", quantity=quantity,
+        entry_time=entry_time, entry_spread=0.001, entry_funding_rate=0.0002,
+        ib_entry_price=180.00, hl_entry_price=180.60,
+    ))
+
+
+def test_allocate_fills():
+    """合并订单的成交按顺序分配."""
+    assert allocate_fills([100, 50, 30], 180) == [100, 50, 30]
+    assert allocate_fills([100, 50, 30], 120) == [100, 20, 0]
+    assert allocate_fills([100, 50], 0) == [0, 0]
+
+
+def test_batch_close():
+    """多个仓位同时平仓：IB 并行提交，HL 一次批量请求，成交分配回各仓位."""
+    print("\n" + "=" * 60)
+    print("Testing batch close")
+    print("=" * 60)
+
+    ib, hl = FakeIBTrader(delay=0.1, price=180.40), FakeHLTrader(delay=0.1, price=180.45)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        for i, quantity in enumerate((100, 50, 30)):
+            add_open_position(executor, f"pos{i}", quantity, entry_time=1000 + i)
+        market_data = MarketData(perp_bid=180.44, perp_ask=180.45, spot_bid=180.40, spot_ask=180.42, funding_rate=0.0001)
+
+        start = time.perf_counter()
+        closed = executor.close_arbitrage_positions(["pos2", "pos0", "pos1"], market_data)
+        elapsed = time.perf_counter() - start
+
+        print(f"Closed {closed} in {elapsed*1000:.0f}ms")
+        assert sorted(closed) == ["pos0", "pos1", "pos2"]
+        assert elapsed < 0.25                         # 3 笔 IB + HL 同时在途，不是逐个等待
+        assert [o[:2] for o in ib.orders] == [("SELL", 100), ("SELL", 50), ("SELL", 30)]
+        assert hl.batches == [{"xyz:NVDA": 180}]      # 一次签名请求，同一交易对合并
+        assert hl.orders == []
+        position = executor.position_manager.get_position("pos1")
+        assert position.hl_exit_price == 180.45 and position.ib_exit_price == 180.40
+        assert abs(position.calculate_pnl() - (0.40 * 50 + 0.15 * 50)) < 1e-9
+
+
+def close_market_data():
+    return MarketData(perp_bid=180.44, perp_ask=180.45, spot_bid=180.40, spot_ask=180.42, funding_rate=0.0001)
+
+
+def reload_positions(executor):
+    """从仓位文件重新加载，检查持久化后的仓位状态."""
+    return PositionManager(str(executor.position_manager.data_file)).positions
+
+
+def test_batch_close_partial_hl_fill():
+    """HL 合并订单部分成交：先开的仓位优先平仓，后开的仓位拆出已对冲部分，单边剩余标记 ERROR."""
+    ib, hl = FakeIBTrader(delay=0.01), FakeHLTrader(delay=0.01, fill_ratio=0.5)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        add_open_position(executor, "old", 40, entry_time=1000)
+        add_open_position(executor, "new", 60, entry_time=2000)
+
+        # HL 成交 50：old 分到 40，new 分到 10；IB 两笔都全部成交
+        closed = executor.close_arbitrage_positions(["new", "old"], close_market_data())
+        assert closed == ["old", "new-1"]
+        assert executor.position_manager.get_open_positions() == []
+
+        stored = reload_positions(executor)
+        assert stored["old"].status == PositionStatus.CLOSED and stored["old"].quantity == 40
+        assert stored["new-1"].status == PositionStatus.CLOSED and stored["new-1"].quantity == 10
+        assert stored["new"].status == PositionStatus.ERROR and stored["new"].quantity == 50
+        assert "IB sold 50, HL bought 0" in stored["new"].notes
+
+        # ERROR 仓位不会再次平仓
+        assert executor.close_arbitrage_positions(["new"], close_market_data()) == []
+        assert len(hl.batches) == 1
+
+
+def test_batch_close_one_sided_ib_fill():
+    """IB 卖单超时部分成交：撤单，已对冲部分平仓，HL 多买回的剩余部分标记 ERROR."""
+    ib, hl = FakeIBTrader(delay=0.01, sell_fill_ratio=0.3), FakeHLTrader(delay=0.01)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        add_open_position(executor, "pos", 100, entry_time=1000)
+
+        closed = executor.close_arbitrage_positions(["pos"], close_market_data(), timeout=0.05)
+        assert closed == ["pos-1"]
+        assert ib.cancels == [1]
+
+        stored = reload_positions(executor)
+        assert stored["pos-1"].status == PositionStatus.CLOSED and stored["pos-1"].quantity == 30
+        assert stored["pos"].status == PositionStatus.ERROR and stored["pos"].quantity == 70
+        assert "IB sold 0, HL bought 70" in stored["pos"].notes
+
+
+def test_batch_close_single_deadline():
+    """多笔 IB 卖单同时超时：所有订单共用一个截止时间，总等待约一个 timeout 而不是逐笔累加."""
+    ib, hl = FakeIBTrader(delay=0.01, sell_fill_ratio=0.5), FakeHLTrader(delay=0.01, fill_ratio=0.5)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        for i in range(4):
+            add_open_position(executor, f"pos{i}", 100, entry_time=1000 + i)
+
+        start = time.perf_counter()
+        closed = executor.close_arbitrage_positions([f"pos{i}" for i in range(4)], close_market_data(),
+                                                    timeout=0.2)
+        elapsed = time.perf_counter() - start
+        print(f"Batch close with 4 working IB orders: {elapsed * 1000:.0f}ms")
+        assert elapsed < 0.4
+        assert sorted(ib.cancels) == [1, 2, 3, 4]
+        assert closed
+
+
+def test_batch_close_equal_partial_fills_stay_open():
+    """两条腿成交相同的部分：拆出平仓，剩余数量保持 OPEN，下次可以继续平仓."""
+    ib, hl = FakeIBTrader(delay=0.01, sell_fill_ratio=0.5), FakeHLTrader(delay=0.01, fill_ratio=0.5)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = make_executor(tmp, ib, hl)
+        add_open_position(executor, "pos", 100, entry_time=1000)
+
+        assert executor.close_arbitrage_positions(["pos"], close_market_data(), timeout=0.05) == ["pos-1"]
+        stored = reload_positions(executor)
+        assert stored["pos"].status == PositionStatus.OPEN and stored["pos"].quantity == 50
+        assert stored["pos-1"].status == PositionStatus.CLOSED and stored["pos-1"].quantity == 50
+
+
+def main():
+    """运行所有测试."""
+    test_concurrent_open()
+    test_concurrent_unwind_on_hl_failure()
+    test_concurrent_partial_fill_hedge()
+    test_concurrent_open_inside_event_loop()
+    test_sequential_open_records_latency()
+    test_allocate_fills()
+    test_batch_close()
+    test_batch_close_partial_hl_fill()
+    test_batch_close_one_sided_ib_fill()
+    test_batch_close_single_deadline()
+    test_batch_close_equal_partial_fills_stay_open()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -96,7 +96,8 @@ def main():
             print()
 
             # 等待（可以很短，因为是流式数据）
-            time.sleep(2)  # 2 秒一次，展示实时性
+            # 等待期间运行 ib_insync 事件循环，IBKR 报价快照由回调更新
+            ibkr_fetcher.pump_events(2)  # 2 秒一次，展示实时性
 
     except KeyboardInterrupt:
         print("\n\nStopping...")
@@ -0,0 +1,149 @@
+"""Test activeAssetCtx caching in the Hyperliquid streaming fetcher (no network; fake Info)."""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from trader.strategy import MarketData
+
+
+class FakeInfo:
+    """模拟 Info：记录订阅和 HTTP 请求."""
+
+    def __init__(self, universe_size=200):
+        self.subscriptions = {}
+        self.posts = []
+        self.universe = [{"name": f"xyz:COIN{i}"} for i in range(universe_size)] + [{"name": "xyz:NVDA"}]
+        self.asset_ctxs = [{"markPx": "1.0"} for _ in range(universe_size)] + [
+            {"funding": "0.0001", "markPx": "180.25", "oraclePx": "180.20", "midPx": None,
+             "openInterest": "5000.5", "premium": "0.0002"}
+        ]
+
+    def subscribe(self, subscription, callback):
+        self.subscriptions[subscription["type"]] = callback
+        return len(self.subscriptions)
+
+    def unsubscribe(self, subscription, sub_id):
+        return True
+
+    def post(self, url_path, payload=None):
+        self.posts.append(payload)
+        return [{"universe": self.universe}, self.asset_ctxs]
+
+    def send_ctx(self, ctx):
+        self.subscriptions["activeAssetCtx"]({
+            "channel": "activeAssetCtx",
+            "data": {"coin": "xyz:NVDA", "ctx": ctx},
+        })
+
+
+def test_stream_cache_zero_http():
+    """测试 activeAssetCtx 推送的所有字段都被缓存，读取不发 HTTP 请求."""
+    print("=" * 60)
+    print("Testing activeAssetCtx cache")
+    print("=" * 60)
+
+    info = FakeInfo()
+    fetcher = HyperliquidFetcherStreaming("xyz:NVDA", info=info)
+
+    events = []
+    fetcher.add_update_listener(lambda source, recv_ns: events.append(source))
+
+    info.send_ctx({
+        "funding": "0.00012345",
+        "openInterest": "1234567.89",
+        "prevDayPx": "180.50",
+        "dayNtlVlm": "12345678.90",
+        "premium": "0.0001",
+        "oraclePx": "180.60",
+        "markPx": "180.61",
+        "midPx": "180.615",
+    })
+
+    ctx = fetcher.get_asset_ctx()
+    assert ctx == {
+        "funding_rate": 0.00012345,
+        "mark_price": 180.61,
+        "oracle_price": 180.60,
+        "mid_price": 180.615,
+        "open_interest": 1234567.89,
+        "premium": 0.0001,
+    }
+    assert events == ["hl_ctx"]
+
+    for _ in range(1000):
+        assert fetcher.get_mark_price() == 180.61
+    metrics = fetcher.get_all_metrics()
+    assert metrics["mark_price"] == 180.61
+    assert metrics["funding_rate"] == 0.00012345
+
+    # 原地更新 MarketData：与 get_all_metrics() 读取相同的缓存
+    market_data = MarketData()
+    fetcher.update_market_data(market_data)
+    assert market_data.funding_rate == metrics["funding_rate"]
+    assert market_data.perp_bid is None and market_data.stamps is None
+    assert info.posts == []
+    print(f"✓ Cached {ctx}")
+    print("✓ 1000 get_mark_price() calls made 0 HTTP requests")
+
+    # 部分字段更新（midPx 为空时保留旧值）
+    info.send_ctx({"markPx": "181.00", "midPx": None})
+    ctx = fetcher.get_asset_ctx()
+    assert ctx["mark_price"] == 181.0
+    assert ctx["mid_price"] == 180.615
+    print("✓ Partial updates keep previous values")
+
+
+def test_http_fallback_index_built_once():
+    """测试尚未收到推送时的 HTTP 回退：名称->索引映射只建立一次."""
+    print("\n" + "=" * 60)
+    print("Testing HTTP fallback")
+    print("=" * 60)
+
+    info = FakeInfo()
+    fetcher = HyperliquidFetcherStreaming("xyz:NVDA", info=info)
+
+    assert fetcher.get_mark_price() == 180.25
+    assert info.posts == [{"type": "metaAndAssetCtxs", "dex": "xyz"}]
+    index = fetcher._asset_index
+    assert index["xyz:NVDA"] == 200
+
+    ctx = fetcher.get_asset_ctx()
+    assert ctx["oracle_price"] == 180.20
+    assert ctx["mid_price"] is None
+    print(f"✓ Fallback filled {ctx}")
+
+    # 已有缓存后不再请求
+    fetcher.get_mark_price()
+    assert len(info.posts) == 1
+
+    # 再次回退时复用同一映射
+    with fetcher._lock:
+        fetcher._asset_ctx["mark_price"] = None
+    fetcher.get_mark_price()
+    assert len(info.posts) == 2
+    assert fetcher._asset_index is index
+    print("✓ Name-to-index map built once")
+
+    # 推送到达后的值优先于回退值
+    info.send_ctx({"markPx": "182.00", "oraclePx": "181.90"})
+    assert fetcher.get_mark_price() == 182.0
+    assert fetcher.get_asset_ctx()["oracle_price"] == 181.9
+    print("✓ Stream values replace fallback values")
+
+
+def main():
+    """运行所有测试."""
+    test_stream_cache_zero_http()
+    test_http_fallback_index_built_once()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
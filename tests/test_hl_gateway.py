@@ -0,0 +1,370 @@
+"""Test the non-blocking Hyperliquid order gateway and HLTrader on top of it (no network; fake Exchange)."""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import requests
+from trader.hl_gateway import HLOrderGateway, IOC, GTC
+from trader.hl_trader import HLTrader
+from runtime import create_event_loop, shutdown_event_loop
+
+USER = "0x0000000000000000000000000000000000000001"
+
+
+class FakeInfo:
+    """模拟 Info.query_order_by_oid：撤单后按 FakeExchange.filled_at_cancel 报告成交数量."""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def query_order_by_oid(self, user, oid):
+        if oid not in self.exchange.sizes:
+            return {"status": "unknownOid"}
+        size = self.exchange.sizes[oid]
+        remaining = size - self.exchange.filled_at_cancel
+        return {"status": "order", "order": {
+            "order": {"coin": "xyz:NVDA", "oid": oid, "origSz": str(size), "sz": str(remaining)},
+            "status": "canceled" if remaining else "filled",
+        }}
+
+
+class FakeExchange:
+    """模拟 Exchange：bulk_orders 固定延迟后按脚本返回 statuses."""
+
+    def __init__(self, delay=0.05, respond=None):
+        self.delay = delay
+        self.respond = respond or (lambda order, oid: {"filled": {"totalSz": str(order["sz"]), "avgPx": "180.5", "oid": oid}})
+        self.session = requests.Session()
+        self.calls = []
+        self.posts = []
+        self._oid = 100
+        self._lock = threading.Lock()
+        self.sizes = {}              # oid -> 下单数量
+        self.cancels = []
+        self.filled_at_cancel = 0
+        self.info = FakeInfo(self)
+
+    def bulk_orders(self, order_requests, builder=None, grouping="na"):
+        with self._lock:
+            self.calls.append(order_requests)
+        time.sleep(self.delay)
+        statuses = []
+        for order in order_requests:
+            with self._lock:
+                self._oid += 1
+                oid = self._oid
+                self.sizes[oid] = order["sz"]
+            statuses.append(self.respond(order, oid))
+        return {"status": "ok", "response": {"type": "order", "data": {"statuses": statuses}}}
+
+    def cancel(self, name, oid):
+        self.cancels.append((name, oid))
+        return {"status": "ok", "response": {"type": "cancel", "data": {"statuses": ["success"]}}}
+
+    def post(self, path, payload=None):
+        self.posts.append((path, payload))
+        return {}
+
+    def _slippage_price(self, name, is_buy, slippage, px=None):
+        assert px is not None, "reference price should come from the cached book"
+        return round(px * ((1 + slippage) if is_buy else (1 - slippage)), 2)
+
+
+class FakeStream:
+    """模拟支持 subscribe 的 Info：手动推送 userFills."""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def subscribe(self, subscription, callback):
+        self.callbacks[subscription["type"]] = callback
+        return 1
+
+    def unsubscribe(self, subscription, sub_id):
+        del self.callbacks[subscription["type"]]
+        return True
+
+    def push_fills(self, fills, snapshot=False):
+        self.callbacks["userFills"]({
+            "channel": "userFills",
+            "data": {"isSnapshot": snapshot, "user": USER, "fills": fills},
+        })
+
+
+def fill(oid, sz, px, tid, cloid=None):
+    data = {"coin": "xyz:NVDA", "px": str(px), "sz": str(sz), "side": "B", "time": 0, "oid": oid, "tid": tid}
+    if cloid:
+        data["cloid"] = cloid
+    return data
+
+
+def test_submit_returns_immediately():
+    """测试提交立即返回，多笔订单同时在途，共用连接池."""
+    print("=" * 60)
+    print("Testing non-blocking HL submission")
+    print("=" * 60)
+
+    exchange = FakeExchange(delay=0.1)
+    gateway = HLOrderGateway(exchange, USER, max_workers=4)
+    assert gateway.warm("xyz") and exchange.posts == [("/info", {"type": "meta", "dex": "xyz"})]
+    adapter = exchange.session.get_adapter("https://api.hyperliquid.xyz")
+    assert adapter._pool_maxsize == 4 and adapter.max_retries.total == 0
+
+    start = time.perf_counter()
+    handles = [gateway.submit("xyz:NVDA", False, 10, 170.0) for _ in range(4)]
+    submit_ms = (time.perf_counter() - start) * 1000
+    assert submit_ms < 50 and not any(h.done() for h in handles)
+
+    results = [h.result(timeout=2) for h in handles]
+    total_ms = (time.perf_counter() - start) * 1000
+    print(f"  submit: {submit_ms:.1f}ms for 4 orders, all acked after {total_ms:.0f}ms")
+    assert total_ms < 300          # 4 笔并发，不是 4 x 100ms 串行
+    assert all(r["success"] and r["filled_qty"] == 10 and r["avg_price"] == 180.5 for r in results)
+    assert len({r["order_id"] for r in results}) == 4
+    assert all(r["ack_ns"] >= r["send_ns"] > 0 for r in results)
+    assert len({h.cloid.to_raw() for h in handles}) == 4
+    gateway.close()
+    print("✓ Orders pipelined")
+
+
+def test_user_fills_complete_resting_order():
+    """测试挂单由 userFills 推送的部分成交逐步完成."""
+    print("\n" + "=" * 60)
+    print("Testing userFills acks")
+    print("=" * 60)
+
+    exchange = FakeExchange(delay=0.0, respond=lambda order, oid: {"resting": {"oid": oid}})
+    stream = FakeStream()
+    gateway = HLOrderGateway(exchange, USER, stream_info=stream)
+
+    handle = gateway.submit("xyz:NVDA", True, 10, 180.0, order_type=GTC, reduce_only=True)
+    result = handle.result(timeout=0.2, cancel_on_timeout=False)
+    assert not handle.done() and result["message"] == "Order resting" and not result["success"]
+    assert exchange.cancels == []
+
+    fills = []
+    done = threading.Event()
+    handle.add_fill_callback(lambda h, f: fills.append(float(f["sz"])))
+    handle.add_done_callback(lambda h: done.set())
+
+    stream.push_fills([fill(handle.oid, 4, 180.0, tid=1)], snapshot=True)     # 历史快照忽略
+    stream.push_fills([fill(handle.oid, 4, 180.0, tid=1)])
+    stream.push_fills([fill(handle.oid, 4, 180.0, tid=1)])                    # 重复推送忽略
+    assert handle.filled_qty == 4 and not handle.done()
+    stream.push_fills([fill(handle.oid, 6, 179.0, tid=2)])
+
+    assert done.is_set() and fills == [4.0, 6.0]
+    result = handle.result(timeout=0)
+    assert result["success"] and result["filled_qty"] == 10
+    assert abs(result["avg_price"] - 179.4) < 1e-9
+    assert result["fill_ns"] >= result["ack_ns"]
+    assert gateway.pending_count() == 0
+    gateway.close()
+    assert "userFills" not in stream.callbacks
+    print(f"✓ Partial fills {fills} completed the order")
+
+
+def test_fill_before_ack_and_errors():
+    """测试成交先于下单响应到达、拒单、请求异常."""
+    exchange = FakeExchange(delay=0.05)
+    stream = FakeStream()
+    gateway = HLOrderGateway(exchange, USER, stream_info=stream)
+
+    # 成交（按 oid）先于 HTTP 响应到达
+    handle = gateway.submit("xyz:NVDA", False, 10, 170.0)
+    stream.push_fills([fill(101, 10, 180.4, tid=7)])
+    result = handle.result(timeout=1)
+    assert result["success"] and result["filled_qty"] == 10
+    assert abs(result["avg_price"] - 180.4) < 1e-9       # WebSocket 成交价优先
+    assert gateway.pending_count() == 0
+
+    # 按 cloid 匹配（oid 未知）
+    exchange.respond = lambda order, oid: {"resting": {"oid": oid}}
+    handle = gateway.submit("xyz:NVDA", False, 1, 170.0, order_type=GTC)
+    handle.result(timeout=0.2, cancel_on_timeout=False)
+    stream.push_fills([fill(None, 1, 181.0, tid=8, cloid=handle.cloid.to_raw())])
+    assert handle.done() and handle.filled_qty == 1
+
+    # 拒单
+    exchange.respond = lambda order, oid: {"error": "Insufficient margin to place order."}
+    result = gateway.submit("xyz:NVDA", False, 10, 170.0).result(timeout=1)
+    assert not result["success"] and result["message"] == "Insufficient margin to place order."
+
+    # IOC 未成交
+    exchange.respond = lambda order, oid: {"error": "Order could not immediately match against any resting orders."}
+    assert gateway.submit("xyz:NVDA", False, 10, 170.0, order_type=IOC).result(timeout=1)["filled_qty"] == 0
+
+    # 请求异常
+    def boom(*args, **kwargs):
+        raise ConnectionError("connection reset")
+    exchange.bulk_orders = boom
+    result = gateway.submit("xyz:NVDA", False, 10, 170.0).result(timeout=1)
+    assert not result["success"] and "connection reset" in result["message"]
+    gateway.close()
+    print("✓ Early fills, cloid matching, rejects and transport errors")
+
+
+def test_timeout_cancels_resting_order():
+    """测试超时撤销挂单，撤单前的成交按订单状态计入结果，迟到的 userFills 只更新价格."""
+    print("\n" + "=" * 60)
+    print("Testing cancel on timeout")
+    print("=" * 60)
+
+    exchange = FakeExchange(delay=0.0, respond=lambda order, oid: {"resting": {"oid": oid}})
+    exchange.filled_at_cancel = 3
+    stream = FakeStream()
+    gateway = HLOrderGateway(exchange, USER, stream_info=stream)
+
+    handle = gateway.submit("xyz:NVDA", True, 10, 180.0, order_type=GTC, reduce_only=True)
+    result = handle.result(timeout=0.1)
+    assert exchange.cancels == [("xyz:NVDA", handle.oid)]
+    assert handle.done() and handle.cancelled
+    assert result["success"] and result["filled_qty"] == 3 and result["avg_price"] == 180.0
+    assert result["message"] == "Order partially filled"
+
+    # 撤单前的成交随后由 userFills 到达：数量不重复计算，价格改为实际成交价
+    stream.push_fills([fill(handle.oid, 3, 179.9, tid=1)])
+    assert handle.filled_qty == 3 and abs(handle.avg_price - 179.9) < 1e-9
+    assert gateway.pending_count() == 0
+
+    # 撤单前没有成交
+    exchange.filled_at_cancel = 0
+    handle = gateway.submit("xyz:NVDA", True, 10, 180.0, order_type=GTC, reduce_only=True)
+    result = handle.result(timeout=0.1)
+    assert not result["success"] and result["filled_qty"] == 0 and result["message"] == "Order cancelled"
+    assert gateway.pending_count() == 0
+    gateway.close()
+    print("✓ Resting order cancelled on timeout, fills before cancel folded in")
+
+
+def test_cancel_not_queued_behind_sends():
+    """测试下单线程池满载时超时撤单不排在下单请求后面，result() 返回撤单后的最终状态."""
+    exchange = FakeExchange(delay=0.1, respond=lambda order, oid: {"resting": {"oid": oid}})
+    gateway = HLOrderGateway(exchange, USER, max_workers=1)
+
+    start = time.perf_counter()
+    handle = gateway.submit("xyz:NVDA", True, 10, 180.0, order_type=GTC, reduce_only=True)
+    queued = [gateway.submit("xyz:NVDA", True, 1, 180.0, order_type=GTC) for _ in range(5)]
+
+    # 下单响应 0.1 秒后到达，0.15 秒超时撤单；其余 5 笔下单还要占用线程池 0.5 秒
+    result = handle.result(timeout=0.15)
+    elapsed = time.perf_counter() - start
+    print(f"Cancel with saturated send pool: {elapsed * 1000:.0f}ms")
+    assert elapsed < 0.35
+    assert exchange.cancels[0] == ("xyz:NVDA", handle.oid)
+    assert handle.done() and result["message"] == "Order cancelled"
+
+    # 下单请求还在排队时超时：撤单在下单响应之后提交
+    late = queued[-1]
+    result = late.result(timeout=0.05)
+    assert late.done() and result["message"] == "Order cancelled"
+    assert ("xyz:NVDA", late.oid) in exchange.cancels
+    gateway.close()
+    print("✓ Cancels run on their own pool and follow queued sends")
+
+
+def test_result_inside_event_loop():
+    """测试在事件循环中同步调用 result()：嵌套运行循环，由同一循环分发的成交能够到达."""
+    exchange = FakeExchange(delay=0.0, respond=lambda order, oid: {"resting": {"oid": oid}})
+    stream = FakeStream()
+    gateway = HLOrderGateway(exchange, USER, stream_info=stream)
+    loop = create_event_loop()
+
+    async def scenario():
+        handle = gateway.submit("xyz:NVDA", True, 10, 180.0, order_type=GTC, reduce_only=True)
+        # 成交推送在事件循环中分发（asyncio 模式下 HyperliquidAsyncStream 的回调）
+        loop.call_later(0.05, stream.push_fills, [fill(None, 10, 180.0, tid=1, cloid=handle.cloid.to_raw())])
+        start = time.perf_counter()
+        result = handle.result(timeout=2)
+        return result, time.perf_counter() - start
+
+    try:
+        result, elapsed = loop.run_until_complete(scenario())
+    finally:
+        shutdown_event_loop(loop)
+        asyncio.set_event_loop(None)
+        gateway.close()
+
+    print(f"  filled inside the loop after {elapsed * 1000:.0f}ms")
+    assert result["success"] and result["filled_qty"] == 10
+    assert elapsed < 1 and exchange.cancels == []
+    print("✓ Synchronous wait nests the event loop")
+
+
+def test_await_handles():
+    """测试在 asyncio 中 await 句柄（结果由网关线程设置）."""
+    exchange = FakeExchange(delay=0.02)
+    gateway = HLOrderGateway(exchange, USER)
+
+    async def scenario():
+        handles = [gateway.submit("xyz:NVDA", False, 5, 170.0) for _ in range(3)]
+        results = await asyncio.wait_for(asyncio.gather(*handles), 1)
+        assert all(r["filled_qty"] == 5 for r in results)
+        assert (await handles[0])["success"]
+
+    asyncio.run(scenario())
+    gateway.close()
+    print("✓ await handle / asyncio.gather")
+
+
+def test_hl_trader_uses_gateway():
+    """测试 HLTrader：市价单为 IOC，保护价来自缓存盘口，平仓仅减仓."""
+    print("\n" + "=" * 60)
+    print("Testing HLTrader on the gateway")
+    print("=" * 60)
+
+    class Book:
+        def get_orderbook_prices(self):
+            return {"perp_bid": 180.00, "perp_ask": 180.10}
+
+    exchange = FakeExchange(delay=0.0)
+    trader = HLTrader("0x" + "11" * 32, price_source=Book(), slippage=0.01)
+    trader.exchange = exchange
+    trader.gateway = HLOrderGateway(exchange, USER)
+    trader.connected = True
+
+    result = trader.open_short("xyz:NVDA", 10)
+    assert result["success"] and result["filled_qty"] == 10
+    result = trader.close_short("xyz:NVDA", 10, limit_price=181.0)
+    assert result["success"]
+
+    (short,), (close,) = exchange.calls
+    assert short["is_buy"] is False and short["order_type"] == IOC and not short["reduce_only"]
+    assert short["limit_px"] == round(180.00 * 0.99, 2)
+    assert close["is_buy"] is True and close["order_type"] == GTC and close["reduce_only"]
+    assert close["limit_px"] == 181.0
+
+    # 多个交易对的平空在一次签名请求中提交
+    handles = trader.submit_close_short_batch({"xyz:NVDA": 10, "xyz:TSLA": 5})
+    assert all(h.result(timeout=1)["success"] for h in handles.values())
+    assert [(o["coin"], o["sz"], o["reduce_only"]) for o in exchange.calls[-1]] == [
+        ("xyz:NVDA", 10, True), ("xyz:TSLA", 5, True)
+    ]
+    trader.disconnect()
+    print("✓ IOC with book-based protection price, reduce-only close, batch close")
+
+
+def main():
+    """运行所有测试."""
+    test_submit_returns_immediately()
+    test_user_fills_complete_resting_order()
+    test_fill_before_ack_and_errors()
+    test_timeout_cancels_resting_order()
+    test_cancel_not_queued_behind_sends()
+    test_result_inside_event_loop()
+    test_await_handles()
+    test_hl_trader_uses_gateway()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
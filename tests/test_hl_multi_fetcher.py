@@ -0,0 +1,129 @@
+"""Test the Hyperliquid multi-symbol fetcher (no network; fake Info WebSocket)."""
+
+import sys
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from hl_fetcher.fetcher_multi import HyperliquidMultiFetcherStreaming, QUOTE_DTYPE
+
+
+class FakeInfo:
+    """模拟 Info：记录订阅，按 SDK 的方式（小写 coin）分发消息."""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.unsubscribed = []
+        self._next_id = 0
+
+    def subscribe(self, subscription, callback):
+        self._next_id += 1
+        key = f'{subscription["type"]}:{subscription["coin"].lower()}'
+        self.subscriptions[key] = callback
+        return self._next_id
+
+    def unsubscribe(self, subscription, sub_id):
+        self.unsubscribed.append(sub_id)
+        return True
+
+    def send(self, channel, data):
+        self.subscriptions[f'{channel}:{data["coin"].lower()}']({"channel": channel, "data": data})
+
+
+def book_msg(coin, bid, ask):
+    return {
+        "coin": coin,
+        "time": 1764000000000,
+        "levels": [
+            [{"px": str(bid), "sz": "10", "n": 1}, {"px": str(bid - 0.05), "sz": "20", "n": 2}],
+            [{"px": str(ask), "sz": "15", "n": 1}],
+        ],
+    }
+
+
+def test_dispatch_into_quote_table():
+    """测试多个 symbol 共用一个 WebSocket，回调写入各自的报价表行."""
+    print("=" * 60)
+    print("Testing Hyperliquid multi-symbol fetcher")
+    print("=" * 60)
+
+    info = FakeInfo()
+    symbols = ["xyz:NVDA", "xyz:TSLA", "xyz:AAPL"]
+    fetcher = HyperliquidMultiFetcherStreaming(symbols, info=info)
+    assert len(info.subscriptions) == 6
+
+    events = []
+    fetcher.add_update_listener(lambda source, recv_ns, symbol_id: events.append((source, symbol_id)))
+
+    info.send("l2Book", book_msg("xyz:TSLA", 420.10, 420.20))
+    info.send("activeAssetCtx", {"coin": "xyz:TSLA", "ctx": {"funding": "0.0001", "markPx": "420.15"}})
+    info.send("l2Book", book_msg("xyz:NVDA", 180.45, 180.50))
+    # 未订阅的 coin 被忽略
+    fetcher._on_l2_book_update({"channel": "l2Book", "data": book_msg("xyz:MSFT", 500.0, 500.1)})
+
+    snapshot = fetcher.snapshot_all()
+    print(snapshot)
+    assert snapshot.dtype == QUOTE_DTYPE and len(snapshot) == 3
+
+    tsla = fetcher.symbol_id("xyz:TSLA")
+    assert snapshot["perp_bid"][tsla] == 420.10
+    assert snapshot["perp_bid_sz"][tsla] == 10.0
+    assert snapshot["funding_rate"][tsla] == 0.0001
+    assert snapshot["mark_price"][tsla] == 420.15
+    assert snapshot["perp_ask"][0] == 180.50
+    assert math.isnan(snapshot["perp_bid"][2])
+    assert events == [("hl_book", tsla), ("hl_ctx", tsla), ("hl_book", 0)]
+
+    # 快照是副本，后续更新不影响
+    info.send("l2Book", book_msg("xyz:NVDA", 181.0, 181.1))
+    assert snapshot["perp_bid"][0] == 180.45
+    assert fetcher.snapshot_all()["perp_bid"][0] == 181.0
+
+    assert fetcher.get_orderbook("xyz:TSLA").bids.depth(2) == [(420.10, 10.0), (420.05, 20.0)]
+    metrics = fetcher.get_all_metrics("xyz:NVDA")
+    assert metrics["perp_bid"] == 181.0 and metrics["funding_rate"] is None
+
+    fetcher.close()
+    assert len(info.unsubscribed) == 6
+
+
+def test_snapshot_cost():
+    """100 个 symbol 的批量快照应远快于逐个读取字典."""
+    info = FakeInfo()
+    fetcher = HyperliquidMultiFetcherStreaming([f"xyz:S{i}" for i in range(100)], info=info)
+    for i in range(100):
+        info.send("l2Book", book_msg(f"xyz:S{i}", 100.0 + i, 100.1 + i))
+
+    n = 2000
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        fetcher.snapshot_all()
+    snapshot_ns = (time.perf_counter_ns() - start) / n
+
+    start = time.perf_counter_ns()
+    for _ in range(n // 20):
+        [fetcher.get_all_metrics(i) for i in range(100)]
+    per_symbol_ns = (time.perf_counter_ns() - start) / (n // 20)
+
+    print(f"snapshot_all (100 symbols): {snapshot_ns:.0f} ns, per-symbol dicts: {per_symbol_ns:.0f} ns")
+    assert np.allclose(fetcher.snapshot_all()["perp_bid"], 100.0 + np.arange(100))
+    assert snapshot_ns < per_symbol_ns
+
+
+def main():
+    """运行所有测试."""
+    test_dispatch_into_quote_table()
+    test_snapshot_cost()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
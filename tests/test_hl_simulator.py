@@ -0,0 +1,153 @@
+"""Test the local Hyperliquid simulator with the real SDK client, fetcher and HLTrader (localhost only)."""
+
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import json
+import websocket
+from hyperliquid.info import Info
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from simulator import HyperliquidSimServer
+from trader.hl_trader import HLTrader
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_info_endpoints():
+    """测试 SDK Info 可以基于模拟器的元数据初始化."""
+    print("=" * 60)
+    print("Testing simulator /info")
+    print("=" * 60)
+
+    with HyperliquidSimServer(coins=("xyz:NVDA", "xyz:TSLA"), seed=1) as sim:
+        info = Info(sim.base_url, skip_ws=True, perp_dexs=["xyz"])
+        assert info.coin_to_asset == {"xyz:NVDA": 110000, "xyz:TSLA": 110001}
+
+        book = info.l2_snapshot("xyz:NVDA")
+        bids, asks = book["levels"]
+        assert len(bids) == len(asks) == 20
+        assert float(bids[0]["px"]) < float(asks[0]["px"])
+        assert set(info.all_mids()) == {"xyz:NVDA", "xyz:TSLA"}
+
+        meta, ctxs = info.post("/info", {"type": "metaAndAssetCtxs", "dex": "xyz"})
+        assert [asset["name"] for asset in meta["universe"]] == ["xyz:NVDA", "xyz:TSLA"]
+        assert float(ctxs[0]["markPx"]) > 0
+    print(f"✓ Metadata and snapshots served ({sim.http_requests} requests)")
+
+
+def test_fetcher_streams_books():
+    """测试 fetcher 通过 SDK WebSocket 接收模拟器推送的盘口和 activeAssetCtx."""
+    print("\n" + "=" * 60)
+    print("Testing fetcher against the simulator feed")
+    print("=" * 60)
+
+    with HyperliquidSimServer(seed=2) as sim:
+        info = Info(sim.base_url, skip_ws=False, perp_dexs=["xyz"])
+        fetcher = HyperliquidFetcherStreaming(symbol="xyz:NVDA", info=info)
+        updates = {"hl_book": 0, "hl_ctx": 0}
+        fetcher.add_update_listener(lambda source, recv_ns: updates.__setitem__(source, updates[source] + 1))
+
+        # 订阅后立即收到快照
+        assert wait_until(lambda: fetcher.get_orderbook_prices()["perp_bid"] and fetcher.get_asset_ctx()["mark_price"])
+        updates.update(hl_book=0, hl_ctx=0)
+
+        stats = sim.run_feed(rate=2000, duration=0.25, ctx_every=10)
+        assert stats.sent == 500 and stats.dropped == 0 and stats.ctx_sent == 50 and stats.clients == 1
+        assert wait_until(lambda: updates["hl_book"] == 500 and updates["hl_ctx"] == 50)
+
+        bid, ask = sim._top["xyz:NVDA"]
+        assert fetcher.get_orderbook_prices() == {"perp_bid": bid, "perp_ask": ask}
+        assert len(fetcher.get_orderbook().bids) == 20
+
+        sim.publish_asset_ctx(funding="0.0005")
+        assert wait_until(lambda: fetcher.get_funding_rate() == 0.0005)
+        info.disconnect_websocket()
+    print(f"✓ {updates['hl_book']} books / {updates['hl_ctx']} ctx updates received, "
+          f"{stats.achieved_rate:,.0f} msgs/s")
+
+
+def test_slow_client_dropped():
+    """测试不读取的客户端发送缓冲满后，推送被丢弃而不是无限堆积."""
+    with HyperliquidSimServer(max_client_buffer=256 * 1024, seed=3) as sim:
+        ws = websocket.create_connection(sim.base_url.replace("http", "ws") + "/ws")
+        ws.send(json.dumps({"method": "subscribe", "subscription": {"type": "l2Book", "coin": "xyz:NVDA"}}))
+        assert wait_until(lambda: sim.stats()["clients"] == 1 and sim._clients[0].subscriptions)
+
+        stats = sim.run_feed(rate=200000, duration=0.1)
+        assert stats.sent + stats.dropped == 20000
+        assert stats.dropped > 0
+        ws.close()
+    print(f"✓ Slow client: {stats.sent} sent, {stats.dropped} dropped")
+
+
+def test_hl_trader_on_simulator():
+    """测试 HLTrader 经模拟器下单：IOC 成交、userFills 推送、减仓、部分成交、超时撤单和拒单."""
+    print("\n" + "=" * 60)
+    print("Testing HLTrader against the simulator")
+    print("=" * 60)
+
+    with HyperliquidSimServer(seed=4) as sim:
+        info = Info(sim.base_url, skip_ws=False, perp_dexs=["xyz"])
+        fetcher = HyperliquidFetcherStreaming(symbol="xyz:NVDA", info=info)
+        assert wait_until(lambda: fetcher.get_orderbook_prices()["perp_bid"] is not None)
+
+        trader = HLTrader("0x" + "11" * 32, stream_info=info, price_source=fetcher, base_url=sim.base_url)
+        assert trader.connect()
+
+        result = trader.open_short("xyz:NVDA", 10)
+        bid, _ = sim._top["xyz:NVDA"]
+        assert result["success"] and result["filled_qty"] == 10 and result["avg_price"] == bid
+        assert trader.get_position("xyz:NVDA") == -10.0
+
+        # 部分成交：IOC 剩余部分取消
+        sim.fill_ratio = 0.5
+        result = trader.close_short("xyz:NVDA", 4)
+        assert result["filled_qty"] == 2
+        sim.fill_ratio = 1.0
+        assert trader.get_position("xyz:NVDA") == -8.0
+
+        # 减仓单不会超过持仓
+        assert trader.close_short("xyz:NVDA", 20)["filled_qty"] == 8
+        assert trader.get_position("xyz:NVDA") == 0.0
+
+        # 不可成交的 GTC 挂单：超时撤单，订单状态确认没有成交
+        _, ask = sim._top["xyz:NVDA"]
+        result = trader.open_short("xyz:NVDA", 1, limit_price=round(ask + 10, 2), timeout=0.3)
+        assert not result["success"] and result["message"] == "Order cancelled"
+        assert sim.resting == {} and sim.order_status[result["order_id"]]["status"] == "canceled"
+
+        sim.reject_rate = 1.0
+        result = trader.open_short("xyz:NVDA", 1)
+        assert not result["success"] and "Insufficient margin" in result["message"]
+
+        assert trader.get_account_value() == 100000.0
+        trader.disconnect()
+        info.disconnect_websocket()
+    print(f"✓ {sim.orders} orders handled, positions {sim.positions}")
+
+
+def main():
+    """运行所有测试."""
+    test_info_endpoints()
+    test_fetcher_streams_books()
+    test_slow_client_dropped()
+    test_hl_trader_on_simulator()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Test the multi-symbol IBKR fetcher (no TWS connection; fake IB)."""
+
+import sys
+import math
+import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from eventkit import Event
+from ib_insync import Ticker
+from ib_fetcher.fetcher_multi import IBKRMultiFetcherStreaming
+
+
+class FakeIB:
+    """模拟 ib_insync.IB：记录批量合约确认和行情订阅."""
+
+    def __init__(self, unknown=()):
+        self.unknown = set(unknown)
+        self.pendingTickersEvent = Event("pendingTickersEvent")
+        self.qualify_calls = []
+        self.subscribed = {}
+        self.cancelled = []
+
+    def isConnected(self):
+        return True
+
+    def qualifyContracts(self, *contracts):
+        self.qualify_calls.append([c.symbol for c in contracts])
+        for i, contract in enumerate(contracts):
+            if contract.symbol not in self.unknown:
+                contract.conId = 1000 + i
+        return [c for c in contracts if c.conId]
+
+    def reqMarketDataType(self, market_data_type):
+        pass
+
+    def reqMktData(self, contract, *args):
+        ticker = Ticker(contract=contract)
+        self.subscribed[contract.symbol] = ticker
+        return ticker
+
+    def cancelMktData(self, contract):
+        self.cancelled.append(contract.symbol)
+        del self.subscribed[contract.symbol]
+
+    def tick(self, symbol, bid, ask):
+        """模拟一批行情到达."""
+        ticker = self.subscribed[symbol]
+        ticker.bid, ticker.ask, ticker.bidSize, ticker.askSize = bid, ask, 100.0, 200.0
+        ticker.time = datetime.datetime(2025, 11, 24, 15, 0, tzinfo=datetime.timezone.utc)
+        self.pendingTickersEvent.emit({ticker})
+
+
+def test_batched_qualify_and_quote_table():
+    """测试一次批量确认合约，行情写入共享报价表."""
+    print("=" * 60)
+    print("Testing IBKR multi-symbol fetcher")
+    print("=" * 60)
+
+    ib = FakeIB(unknown={"BADX"})
+    fetcher = IBKRMultiFetcherStreaming(["NVDA", "TSLA", "BADX", "AAPL"], ib=ib)
+    events = []
+    fetcher.add_update_listener(lambda source, recv_ns, symbol_id: events.append(symbol_id))
+
+    assert fetcher.connect()
+    assert ib.qualify_calls == [["NVDA", "TSLA", "BADX", "AAPL"]]
+    assert sorted(ib.subscribed) == ["AAPL", "NVDA", "TSLA"]
+
+    ib.tick("TSLA", 420.10, 420.20)
+    snapshot = fetcher.snapshot_all()
+    print(snapshot)
+    assert snapshot["bid"][1] == 420.10 and snapshot["ask_size"][1] == 200.0
+    assert math.isnan(snapshot["bid"][0])
+    assert list(snapshot["subscribed"]) == [True, True, False, True]
+    assert events == [1]
+
+    quote = fetcher.get_stock_price("TSLA")
+    assert abs(quote["mid"] - 420.15) < 1e-9 and quote["last"] is None
+
+    fetcher.disconnect()
+    assert sorted(ib.cancelled) == ["AAPL", "NVDA", "TSLA"]
+
+
+def test_line_limit_prioritizes_positions():
+    """行情线不足时优先订阅有持仓的 symbol，调整时释放的行情清空."""
+    ib = FakeIB()
+    fetcher = IBKRMultiFetcherStreaming(["NVDA", "TSLA", "AAPL", "MSFT"], ib=ib, max_lines=2)
+    fetcher.connect()
+    assert sorted(ib.subscribed) == ["NVDA", "TSLA"]
+
+    ib.tick("TSLA", 420.10, 420.20)
+    fetcher.set_open_positions(["MSFT"])
+    assert sorted(ib.subscribed) == ["MSFT", "NVDA"]
+    assert ib.cancelled == ["TSLA"]
+
+    snapshot = fetcher.snapshot_all()
+    assert math.isnan(snapshot["bid"][1]) and not snapshot["subscribed"][1]
+
+    # 已取消的 ticker 的迟到更新被忽略
+    ib.pendingTickersEvent.emit({Ticker(contract=fetcher.contracts[1])})
+    assert math.isnan(fetcher.snapshot_all()["bid"][1])
+
+
+def main():
+    """运行所有测试."""
+    test_batched_qualify_and_quote_table()
+    test_line_limit_prioritizes_positions()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
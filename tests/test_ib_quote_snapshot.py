@@ -0,0 +1,92 @@
+"""Test the event-updated IBKR quote snapshot (no TWS connection needed)."""
+
+import sys
+import time
+import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ib_insync import Ticker, Stock
+from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
+from trader.strategy import MarketData
+
+
+def make_fetcher():
+    """创建一个已"订阅"的 fetcher（不连接 TWS）."""
+    fetcher = IBKRFetcherStreaming(symbol="NVDA")
+    fetcher.connected = True
+    fetcher.ticker = Ticker(contract=Stock("NVDA", "SMART", "USD"))
+    fetcher.ticker.updateEvent += fetcher._on_ticker_update
+    return fetcher
+
+
+def test_snapshot_updated_by_event():
+    """测试 ticker.updateEvent 刷新快照，读取不运行事件循环."""
+    print("=" * 60)
+    print("Testing IBKR quote snapshot")
+    print("=" * 60)
+
+    fetcher = make_fetcher()
+    events = []
+    fetcher.add_update_listener(lambda source, recv_ns: events.append(source))
+
+    # 初始状态：ticker 全是 NaN
+    quote = fetcher.get_stock_price()
+    assert quote["bid"] is None and quote["ask"] is None
+
+    ticker = fetcher.ticker
+    ticker.bid, ticker.ask, ticker.last = 180.30, 180.32, 180.31
+    ticker.bidSize, ticker.askSize = 300.0, 200.0
+    ticker.time = datetime.datetime(2025, 11, 24, 15, 0, tzinfo=datetime.timezone.utc)
+    ticker.updateEvent.emit(ticker)
+
+    quote = fetcher.get_stock_price()
+    print(f"Quote: {quote}")
+    assert quote["bid"] == 180.30
+    assert quote["ask"] == 180.32
+    assert abs(quote["mid"] - 180.31) < 1e-9
+    assert quote["bid_size"] == 300.0
+    assert quote["timestamp"] == ticker.time.timestamp()
+    assert events == ["ib"]
+
+    # 修改返回值不影响内部快照
+    quote["bid"] = 0
+    assert fetcher.get_stock_price()["bid"] == 180.30
+
+    # 原地更新 MarketData
+    market_data = MarketData()
+    fetcher.update_market_data(market_data)
+    assert (market_data.spot_bid, market_data.spot_ask) == (180.30, 180.32)
+
+    # 未连接时清空现货报价
+    fetcher.connected = False
+    fetcher.update_market_data(market_data)
+    assert market_data.spot_bid is None and market_data.spot_ask is None
+
+
+def test_read_cost():
+    """读取快照不应等待事件循环（旧实现每次 100ms）."""
+    fetcher = make_fetcher()
+    n = 10000
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        fetcher.get_stock_price()
+    per_read_ns = (time.perf_counter_ns() - start) / n
+    print(f"get_stock_price: {per_read_ns:.0f} ns/op")
+    assert per_read_ns < 1_000_000
+
+
+def main():
+    """运行所有测试."""
+    test_snapshot_updated_by_event()
+    test_read_cost()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
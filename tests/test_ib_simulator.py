@@ -0,0 +1,188 @@
+"""Test the in-process IB Gateway simulator with the real fetcher, IBTrader and TradeExecutor (no TWS needed)."""
+
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ib_fetcher.fetcher_streaming import IBKRFetcherStreaming
+from simulator import IBSimulator
+from trader.ib_trader import IBTrader
+from trader.executor import TradeExecutor
+from trader.order_tracker import OrderStatus
+from trader.position_manager import PositionManager
+from trader.strategy import SpreadAnalysis, SignalType
+
+
+def test_fetcher_streams_quotes():
+    """测试 fetcher 通过模拟客户端接收报价和市场深度."""
+    print("=" * 60)
+    print("Testing IBKRFetcherStreaming on the simulator")
+    print("=" * 60)
+
+    gateway = IBSimulator(quote_rate=200, seed=1)
+    fetcher = IBKRFetcherStreaming(symbol="NVDA", market_depth_rows=5, ib=gateway.client())
+    assert fetcher.connect()
+
+    updates = []
+    fetcher.add_update_listener(lambda source, recv_ns: updates.append(source))
+    fetcher.pump_events(0.1)
+    assert len(updates) >= 10 and set(updates) == {"ib"}
+
+    bid, ask = gateway.quote("NVDA")
+    prices = fetcher.get_stock_price()
+    assert prices["bid"] == bid and prices["ask"] == ask
+
+    book = fetcher.get_market_depth()
+    assert len(book.bids) == len(book.asks) == 5
+    assert book.bids.prices[0] == bid and book.asks.prices[0] == ask
+
+    # 手动推送报价
+    gateway.push_quote("NVDA", 181.00, 181.02)
+    assert fetcher.get_stock_price()["bid"] == 181.00
+    assert fetcher.get_account_id() == gateway.account
+    fetcher.disconnect()
+    print(f"✓ {len(updates)} quote updates, depth {len(book.bids)} rows")
+
+
+def test_ib_trader_fills_and_rejects():
+    """测试 IBTrader：市价成交、部分成交、拒单、限价挂单与撤单、持仓."""
+    print("\n" + "=" * 60)
+    print("Testing IBTrader on the simulator")
+    print("=" * 60)
+
+    gateway = IBSimulator(quote_rate=0, partial_fills=3, seed=2)
+    trader = IBTrader(symbols=["NVDA"], ib=gateway.client())
+    assert trader.connect() and trader.contracts["NVDA"].conId == 100000
+
+    # 市价买入，拆成 3 笔成交
+    partials = []
+    handle = trader.submit_order("NVDA", "BUY", 10)
+    handle.add_fill_callback(lambda h, fill: partials.append(fill.execution.shares))
+    result = handle.result(timeout=1)
+    _, ask = gateway.quote("NVDA")
+    assert result["success"] and result["filled_qty"] == 10 and result["avg_price"] == ask
+    assert partials == [4, 3, 3]
+    assert result["fill_ns"] > result["ack_ns"] > result["send_ns"] > 0
+    assert trader.get_position("NVDA") == 10
+
+    # 拒单
+    gateway.reject_next()
+    result = trader.sell_stock("NVDA", 10)
+    assert not result["success"] and result["status"] == OrderStatus.CANCELLED
+    assert trader.get_position("NVDA") == 10
+
+    # 不可成交的限价单挂着，报价穿过限价后成交
+    handle = trader.submit_order("NVDA", "SELL", 10, limit_price=181.00)
+    handle.result(timeout=0.01)
+    assert not handle.done() and trader.ib.openTrades()
+    gateway.push_quote("NVDA", 181.00, 181.02)
+    result = handle.result(timeout=1)
+    assert result["success"] and result["avg_price"] == 181.00
+    assert trader.get_position("NVDA") == 0
+
+    # 挂单撤销
+    handle = trader.submit_order("NVDA", "BUY", 5, limit_price=170.00)
+    handle.result(timeout=0.01)
+    trader.ib.cancelOrder(handle.trade.order)
+    result = handle.result(timeout=1)
+    assert not result["success"] and result["status"] == OrderStatus.CANCELLED
+    assert not trader.ib.openTrades()
+
+    assert trader.get_account_summary()
+    trader.disconnect()
+    print(f"✓ {gateway.stats()}")
+
+
+def test_connect_async():
+    """测试 asyncio 模式：connect_async 之后行情由事件循环中的任务处理."""
+    gateway = IBSimulator(quote_rate=200, seed=3)
+    fetcher = IBKRFetcherStreaming(symbol="NVDA", ib=gateway.client())
+
+    async def scenario():
+        assert await fetcher.connect_async()
+        before = gateway.quotes
+        await asyncio.sleep(0.1)
+        assert gateway.quotes - before >= 10
+        assert fetcher.get_stock_price()["bid"] == gateway.quote("NVDA")[0]
+        fetcher.disconnect()
+
+    asyncio.run(scenario())
+    print("✓ connect_async streams quotes from the event loop")
+
+
+class FakeHLTrader:
+    """模拟 HLTrader：按脚本返回开空结果，记录平空请求."""
+
+    def __init__(self, open_result):
+        self.open_result = open_result
+        self.closed = []
+
+    def open_short(self, symbol, quantity, limit_price=None):
+        return dict(self.open_result)
+
+    def close_short(self, symbol, quantity, limit_price=None):
+        self.closed.append(quantity)
+        return {"success": True, "filled_qty": quantity, "avg_price": 180.0}
+
+
+def make_analysis(gateway):
+    bid, ask = gateway.quote("NVDA")
+    return SpreadAnalysis(spread=0.003, ib_buy_price=ask, hl_sell_price=bid + 0.5,
+                          funding_rate=0.0001, signal=SignalType.OPEN_LONG_SPOT_SHORT_PERP, is_valid=True)
+
+
+def test_executor_rollback_paths():
+    """测试执行器失败路径：HL 拒单后回滚 IB，并发模式下 IB 拒单后平掉 HL."""
+    print("\n" + "=" * 60)
+    print("Testing TradeExecutor failure paths on the simulator")
+    print("=" * 60)
+
+    gateway = IBSimulator(quote_rate=0, seed=4)
+    ib_trader = IBTrader(symbols=["NVDA"], ib=gateway.client())
+    assert ib_trader.connect()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        positions = PositionManager(str(Path(tmp) / "positions.json"))
+
+        # 顺序模式：IB 买入成交，HL 拒单 -> 卖出回滚
+        hl_trader = FakeHLTrader({"success": False, "filled_qty": 0, "message": "Insufficient margin"})
+        executor = TradeExecutor(ib_trader, hl_trader, positions, "NVDA", "xyz:NVDA")
+        assert executor.open_arbitrage_position(10, make_analysis(gateway)) is None
+        assert ib_trader.get_position("NVDA") == 0
+        assert gateway.stats()["fills"] == 2
+
+        # 并发模式：IB 拒单，HL 成交 -> HL 平掉未对冲的空单
+        hl_trader = FakeHLTrader({"success": True, "filled_qty": 10, "avg_price": 180.5})
+        executor = TradeExecutor(ib_trader, hl_trader, positions, "NVDA", "xyz:NVDA", concurrent_legs=True)
+        gateway.reject_next()
+        assert executor.open_arbitrage_position(10, make_analysis(gateway)) is None
+        assert hl_trader.closed == [10]
+
+        # 并发模式：两边成交，仓位记录
+        position_id = executor.open_arbitrage_position(10, make_analysis(gateway))
+        assert position_id and positions.get_position(position_id).quantity == 10
+        assert ib_trader.get_position("NVDA") == 10
+        positions.close()
+
+    ib_trader.disconnect()
+    print(f"✓ Rollback / unwind paths: {gateway.stats()}")
+
+
+def main():
+    """运行所有测试."""
+    test_fetcher_streams_quotes()
+    test_ib_trader_fills_and_rejects()
+    test_connect_async()
+    test_executor_rollback_paths()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Test IBTrader contract cache and order templates (no TWS connection; fake IB)."""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import ib_insync
+from trader.ib_trader import IBTrader, OrderStatus
+
+
+class FakeIB:
+    """模拟 ib_insync.IB：记录合约确认和下单，ib.sleep / waitOnUpdate 时成交所有未完成订单."""
+
+    def __init__(self, unknown=()):
+        self.unknown = set(unknown)
+        self.qualify_calls = []
+        self.trades = []
+        self._next_order_id = 1
+
+    def isConnected(self):
+        return True
+
+    def qualifyContracts(self, *contracts):
+        self.qualify_calls.append([c.symbol for c in contracts])
+        for i, contract in enumerate(contracts):
+            if contract.symbol not in self.unknown:
+                contract.conId = 2000 + i
+        return [c for c in contracts if c.conId]
+
+    def placeOrder(self, contract, order):
+        order.orderId = self._next_order_id
+        self._next_order_id += 1
+        trade = ib_insync.Trade(contract, order, ib_insync.OrderStatus(status='PendingSubmit'))
+        self.trades.append(trade)
+        return trade
+
+    def sleep(self, seconds=0):
+        for trade in self.trades:
+            if trade.orderStatus.status != 'Filled':
+                trade.orderStatus.status = 'Filled'
+                trade.orderStatus.filled = trade.order.totalQuantity
+                trade.orderStatus.avgFillPrice = trade.order.lmtPrice if trade.order.orderType == 'LMT' else 180.0
+                trade.statusEvent.emit(trade)
+                trade.filledEvent.emit(trade)
+
+    def waitOnUpdate(self, timeout=0):
+        self.sleep()
+        return True
+
+    def disconnect(self):
+        pass
+
+
+def test_contracts_warmed_at_connect():
+    """测试 connect 时一次批量确认合约，下单路径不再确认."""
+    print("=" * 60)
+    print("Testing IBTrader contract cache")
+    print("=" * 60)
+
+    ib = FakeIB(unknown={"BADX"})
+    trader = IBTrader(symbols=["NVDA", "TSLA", "BADX", "NVDA"], ib=ib)
+    assert trader.connect()
+    assert ib.qualify_calls == [["NVDA", "TSLA", "BADX"]]
+    assert sorted(trader.contracts) == ["NVDA", "TSLA"]
+    print(f"✓ Qualified at connect: {ib.qualify_calls}")
+
+    for _ in range(3):
+        result = trader.buy_stock("NVDA", 10)
+        assert result["success"] and result["filled_qty"] == 10
+        result = trader.sell_stock("TSLA", 5, limit_price=420.5)
+        assert result["success"] and result["avg_price"] == 420.5
+    assert len(ib.qualify_calls) == 1
+    assert all(trade.contract is trader.contracts[trade.contract.symbol] for trade in ib.trades)
+    print("✓ 6 orders placed with 0 additional qualifyContracts calls")
+
+    # 未缓存的 symbol 首次下单时确认一次
+    assert trader.buy_stock("AAPL", 1)["success"]
+    trader.buy_stock("AAPL", 1)
+    assert ib.qualify_calls[1:] == [["AAPL"]]
+
+    # 无法确认的合约返回错误结果
+    result = trader.buy_stock("BADX", 1)
+    assert not result["success"] and result["status"] == OrderStatus.ERROR
+    print("✓ Uncached symbols qualified once, unknown symbols rejected")
+
+
+def test_order_templates():
+    """测试订单从模板复制：每笔订单独立，模板不被修改."""
+    print("\n" + "=" * 60)
+    print("Testing IBTrader order templates")
+    print("=" * 60)
+
+    ib = FakeIB()
+    trader = IBTrader(symbols=["NVDA"], ib=ib)
+    trader.connect()
+
+    trader.buy_stock("NVDA", 10)
+    trader.buy_stock("NVDA", 20, limit_price=180.25)
+    trader.sell_stock("NVDA", 30)
+
+    orders = [trade.order for trade in ib.trades]
+    assert [(o.action, o.orderType, o.totalQuantity) for o in orders] == [
+        ("BUY", "MKT", 10), ("BUY", "LMT", 20), ("SELL", "MKT", 30)
+    ]
+    assert orders[1].lmtPrice == 180.25
+    assert [o.orderId for o in orders] == [1, 2, 3]
+    assert all(isinstance(o, ib_insync.Order) for o in orders)
+    assert len({id(o) for o in orders}) == 3
+
+    for template in trader._order_templates.values():
+        assert template.totalQuantity == 0 and template.orderId == 0
+    print("✓ Independent orders, templates untouched")
+
+    # 下单时间戳来自订单事件
+    result = trader.sell_stock("NVDA", 1)
+    assert result["ack_ns"] >= result["send_ns"] > 0 and result["fill_ns"] >= result["ack_ns"]
+    print("✓ Send/ack/fill stamps recorded")
+
+
+def main():
+    """运行所有测试."""
+    test_contracts_warmed_at_connect()
+    test_order_templates()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Test tick-to-trade latency histograms, per-trade breakdowns and the Prometheus collector."""
+
+import sys
+import json
+import random
+import tempfile
+import urllib.request
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from latency import LatencyHistogram, TickStamps
+from trader.latency import LatencyTracker, TradeLatency
+from hl_fetcher.fetcher_streaming import HyperliquidFetcherStreaming
+from prom_pusher import PrometheusMetricsExporter
+
+
+class FakeInfo:
+    """模拟 Info：只记录订阅回调."""
+
+    def __init__(self):
+        self.subscriptions = {}
+
+    def subscribe(self, subscription, callback):
+        self.subscriptions[subscription["type"]] = callback
+        return len(self.subscriptions)
+
+    def unsubscribe(self, subscription, sub_id):
+        return True
+
+
+def make_trade(trade_id="T1"):
+    """一笔各阶段耗时已知的交易（纳秒）."""
+    return TradeLatency(
+        trade_id=trade_id,
+        action="open",
+        exchange_ms=1_764_000_000_000,
+        recv_wall_ns=1_764_000_000_000 * 1_000_000 + 3_000_000,   # 网络 3ms
+        recv_ns=1_000_000,
+        parsed_ns=1_020_000,        # 解析 20µs
+        decision_ns=1_050_000,      # 策略 30µs
+        legs={
+            "ib": {"send_ns": 1_100_000, "ack_ns": 6_100_000, "fill_ns": 9_100_000},
+            "hl": {"send_ns": 1_080_000, "ack_ns": 80_000_000, "fill_ns": 80_000_000},
+        },
+    )
+
+
+def test_histogram_accuracy():
+    """测试直方图百分位与精确值的相对误差."""
+    print("=" * 60)
+    print("Testing LatencyHistogram accuracy")
+    print("=" * 60)
+
+    rng = random.Random(7)
+    samples = [int(rng.lognormvariate(11, 1.5)) for _ in range(20000)]
+    hist = LatencyHistogram()
+    for value in samples:
+        hist.record(value)
+
+    samples.sort()
+    for p in (50, 90, 99, 99.9):
+        exact = samples[int(len(samples) * p / 100) - 1]
+        approx = hist.percentile(p)
+        error = abs(approx - exact) / exact
+        print(f"  p{p}: exact={exact}ns approx={approx:.0f}ns error={error*100:.2f}%")
+        assert error < 0.02
+
+    assert hist.count == len(samples)
+    assert hist.max_ns == samples[-1]
+    assert LatencyHistogram().percentile(50) is None
+
+    # 负值按 0 计，超出范围的值计入最后一个桶
+    hist = LatencyHistogram(max_value_ns=1_000_000)
+    hist.record(-5)
+    hist.record(10**12)
+    assert hist.counts[0] == 1 and hist.counts[-1] == 1
+    print("✓ Percentiles within 2%, negatives and overflow clamped")
+
+
+def test_cumulative_buckets():
+    """测试导出给 Prometheus 的累计桶."""
+    hist = LatencyHistogram()
+    for value in (500, 1500, 1500, 40_000, 3_000_000):
+        hist.record(value)
+    buckets, total = hist.cumulative_buckets([1000, 2000, 50_000, 1_000_000])
+    assert buckets == [(1000, 1), (2000, 3), (50_000, 4), (1_000_000, 4)]
+    assert total == 5
+    print("✓ Cumulative buckets")
+
+
+def test_trade_segments():
+    """测试逐笔交易的阶段拆分."""
+    print("\n" + "=" * 60)
+    print("Testing TradeLatency segments")
+    print("=" * 60)
+
+    trade = make_trade()
+    segments = trade.segments()
+    assert segments == {
+        "ws_network": 3_000_000,
+        "ws_parse": 20_000,
+        "strategy": 30_000,
+        "ib_send": 50_000,
+        "ib_ack": 5_000_000,
+        "ib_fill": 3_000_000,
+        "hl_send": 30_000,
+        "hl_ack": 78_920_000,
+        "hl_fill": 0,
+        "tick_to_order": 80_000,
+        "tick_to_fill": 79_000_000,
+    }
+    print(f"✓ {trade.breakdown()}")
+
+    # 缺少时间戳的阶段不输出；有一条腿没有成交时间时不计算 tick_to_fill
+    partial = TradeLatency("T2", "close", recv_ns=1_000, decision_ns=2_000,
+                           legs={"ib": {"send_ns": 3_000}, "hl": {"send_ns": 4_000, "ack_ns": 5_000, "fill_ns": 6_000}})
+    segments = partial.segments()
+    assert "ws_network" not in segments and "strategy" not in segments
+    assert segments["tick_to_order"] == 2_000
+    assert "tick_to_fill" not in segments
+    print("✓ Missing stamps skipped")
+
+
+def test_tracker_and_dump():
+    """测试收集器的直方图和逐笔 JSON Lines 输出."""
+    print("\n" + "=" * 60)
+    print("Testing LatencyTracker")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_path = str(Path(tmp) / "latency.jsonl")
+        tracker = LatencyTracker(max_trades=2, dump_path=dump_path)
+
+        tracker.record_tick(TickStamps(0, 0, 1_000, 21_000))
+        for i in range(3):
+            tracker.record_trade(make_trade(f"T{i}"))
+
+        assert tracker.histograms["ws_parse"].count == 1          # 行情阶段只来自 record_tick
+        assert tracker.histograms["ws_network"].count == 0        # 没有交易所时间戳
+        assert tracker.histograms["tick_to_fill"].count == 3
+        assert [t.trade_id for t in tracker.recent_trades()] == ["T1", "T2"]
+
+        with open(dump_path) as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 3
+        assert lines[0]["trade_id"] == "T0"
+        assert lines[0]["segments_us"]["ib_ack"] == 5000.0
+        assert lines[0]["legs"]["hl"]["send_ns"] == 1_080_000
+
+        summary = tracker.summary()
+        print(summary)
+        assert "tick_to_fill" in summary and "ws_network" not in summary
+    print("✓ Histograms, recent trades and JSON Lines dump")
+
+
+def test_fetcher_records_tick_stamps():
+    """测试 HL 行情回调记录时间戳并写入收集器."""
+    info = FakeInfo()
+    tracker = LatencyTracker()
+    fetcher = HyperliquidFetcherStreaming("xyz:NVDA", info=info, latency_tracker=tracker)
+    assert fetcher.get_tick_stamps() is None
+
+    info.subscriptions["l2Book"]({
+        "channel": "l2Book",
+        "data": {
+            "coin": "xyz:NVDA",
+            "time": 1764000000000,
+            "levels": [[{"px": "180.50", "sz": "10", "n": 1}], [{"px": "180.52", "sz": "12", "n": 1}]],
+        },
+    })
+
+    stamps = fetcher.get_tick_stamps()
+    assert stamps.exchange_ms == 1764000000000
+    assert stamps.parsed_ns >= stamps.recv_ns > 0
+    assert tracker.histograms["ws_parse"].count == 1
+    assert tracker.histograms["ws_network"].count == 1
+    print(f"✓ Fetcher stamps: parse {stamps.parsed_ns - stamps.recv_ns}ns")
+
+
+def test_prometheus_collector():
+    """测试延迟直方图可以从 /metrics 抓取."""
+    print("\n" + "=" * 60)
+    print("Testing latency Prometheus collector")
+    print("=" * 60)
+
+    tracker = LatencyTracker()
+    exporter = PrometheusMetricsExporter(port=0, addr="127.0.0.1", latency_tracker=tracker)
+    port = exporter._server.server_port
+    try:
+        tracker.record_trade(make_trade())
+        tracker.record_decision(80_000)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+
+        lines = [line for line in body.splitlines() if 'segment="ib_ack"' in line]
+        print("\n".join(lines))
+        assert 'hyib_arb_latency_seconds_bucket{le="0.002",segment="ib_ack"} 0.0' in body
+        assert 'hyib_arb_latency_seconds_bucket{le="0.005",segment="ib_ack"} 1.0' in body
+        assert 'hyib_arb_latency_seconds_bucket{le="+Inf",segment="ib_ack"} 1.0' in body
+        assert 'hyib_arb_latency_seconds_count{segment="ib_ack"} 1.0' in body
+        assert 'hyib_arb_latency_quantile_seconds{quantile="0.99",segment="ib_ack"}' in body
+        assert 'hyib_arb_latency_seconds_count{segment="tick_decision"} 1.0' in body
+        assert tracker.decision_summary().startswith("p50=80.")
+        assert 'segment="ws_parse"' not in body     # 没有样本的阶段不输出
+    finally:
+        exporter.close()
+    print("✓ Histogram and quantiles exported")
+
+
+def main():
+    """运行所有测试."""
+    test_histogram_accuracy()
+    test_cumulative_buckets()
+    test_trade_segments()
+    test_tracker_and_dump()
+    test_fetcher_records_tick_stamps()
+    test_prometheus_collector()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Test the coalescing market event queue used by the event-driven loop."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from trader.market_events import MarketEventQueue
+
+
+def test_coalescing():
+    """测试同一数据源的多次更新被合并."""
+    print("=" * 60)
+    print("Testing MarketEventQueue coalescing")
+    print("=" * 60)
+
+    queue = MarketEventQueue()
+    queue.push("hl_book", 100)
+    queue.push("hl_book", 200)
+    queue.push("hl_book", 300)
+    queue.push("ib", 250)
+
+    assert len(queue) == 2
+    batch = queue.wait(timeout=0)
+    print(f"Batch: {batch}")
+
+    # 保留每个数据源最早的接收时间
+    assert batch == {"hl_book": 100, "ib": 250}
+    assert queue.pushed == 4
+    assert queue.coalesced == 2
+    assert len(queue) == 0
+
+    # 无事件时超时返回空
+    assert queue.wait(timeout=0.01) == {}
+    print("✓ Coalescing checks passed")
+
+
+def test_cross_thread_wakeup():
+    """测试其他线程推送事件能立即唤醒消费者."""
+    queue = MarketEventQueue()
+
+    def producer():
+        time.sleep(0.05)
+        queue.push("hl_book")
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+
+    start = time.perf_counter_ns()
+    batch = queue.wait(timeout=5)
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+    thread.join()
+
+    print(f"Woke up after {elapsed_ms:.1f}ms with {batch}")
+    assert "hl_book" in batch
+    assert elapsed_ms < 1000
+
+
+def main():
+    """运行所有测试."""
+    test_coalescing()
+    test_cross_thread_wakeup()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
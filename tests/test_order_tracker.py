@@ -0,0 +1,192 @@
+"""Test event-driven IB order tracking and order handles (no TWS connection; fake IB)."""
+
+import sys
+import asyncio
+import datetime
+from collections import deque
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import ib_insync
+from trader.order_tracker import OrderTracker, OrderStatus
+
+
+class ScriptedIB:
+    """模拟 ib_insync.IB：订单事件按脚本排队，每次 waitOnUpdate 处理一条（同 IB 消息顺序）."""
+
+    def __init__(self):
+        self.pending = deque()
+        self.wait_calls = 0
+        self._next_order_id = 1
+
+    def placeOrder(self, contract, order):
+        order.orderId = self._next_order_id
+        self._next_order_id += 1
+        return ib_insync.Trade(contract, order, ib_insync.OrderStatus(orderId=order.orderId, status='PendingSubmit'))
+
+    def status(self, trade, status):
+        self.pending.append(lambda: self._set_status(trade, status))
+
+    def fill(self, trade, shares, price):
+        self.pending.append(lambda: self._fill(trade, shares, price))
+
+    def waitOnUpdate(self, timeout=0):
+        self.wait_calls += 1
+        if self.pending:
+            self.pending.popleft()()
+        return True
+
+    def _set_status(self, trade, status):
+        trade.orderStatus.status = status
+        trade.statusEvent.emit(trade)
+        if status == 'Cancelled':
+            trade.cancelledEvent.emit(trade)
+
+    def _fill(self, trade, shares, price):
+        # 与 ib_insync 相同：先 execDetails（fillEvent），再 orderStatus（statusEvent / filledEvent）
+        execution = ib_insync.Execution(shares=shares, price=price)
+        fill = ib_insync.Fill(trade.contract, execution, ib_insync.CommissionReport(),
+                              datetime.datetime.now(datetime.timezone.utc))
+        trade.fills.append(fill)
+        trade.fillEvent.emit(trade, fill)
+
+        status = trade.orderStatus
+        total = status.filled + shares
+        status.avgFillPrice = (status.avgFillPrice * status.filled + price * shares) / total
+        status.filled = total
+        status.remaining = trade.order.totalQuantity - total
+        status.status = 'Filled' if status.remaining == 0 else 'Submitted'
+        trade.statusEvent.emit(trade)
+        if status.status == 'Filled':
+            trade.filledEvent.emit(trade)
+
+
+def stock(symbol):
+    contract = ib_insync.Stock(symbol, 'SMART', 'USD')
+    contract.conId = 1
+    return contract
+
+
+def test_submit_many_without_blocking():
+    """测试连续提交多笔订单不阻塞，统一等待."""
+    print("=" * 60)
+    print("Testing non-blocking submission")
+    print("=" * 60)
+
+    ib = ScriptedIB()
+    tracker = OrderTracker(ib)
+    handles = [tracker.submit(stock(symbol), ib_insync.MarketOrder('BUY', 100))
+               for symbol in ("NVDA", "TSLA", "AAPL")]
+    assert ib.wait_calls == 0
+    assert [h.order_id for h in handles] == [1, 2, 3]
+    assert len(tracker.open_handles()) == 3
+    assert all(h.status == OrderStatus.PENDING for h in handles)
+    print("✓ 3 orders submitted, 0 waits")
+
+    for i, handle in enumerate(handles):
+        ib.status(handle.trade, 'Submitted')
+        ib.fill(handle.trade, 100, 180.0 + i)
+    assert tracker.wait(handles, timeout=1)
+
+    # 每条消息处理后立即检查：6 条消息 6 次等待
+    assert ib.wait_calls == 6
+    assert tracker.open_handles() == []
+    for i, handle in enumerate(handles):
+        result = handle.to_result()
+        assert result["success"] and result["status"] == OrderStatus.FILLED
+        assert result["filled_qty"] == 100 and result["avg_price"] == 180.0 + i
+        assert result["fill_ns"] >= result["ack_ns"] >= result["send_ns"] > 0
+    print("✓ All filled, detected on the message that filled them")
+
+
+def test_partial_fills_reported():
+    """测试部分成交逐笔回调，完成回调只触发一次."""
+    print("\n" + "=" * 60)
+    print("Testing partial fills")
+    print("=" * 60)
+
+    ib = ScriptedIB()
+    tracker = OrderTracker(ib)
+    handle = tracker.submit(stock("NVDA"), ib_insync.LimitOrder('SELL', 100, 180.0))
+
+    fills, done = [], []
+    handle.add_fill_callback(lambda h, fill: fills.append((fill.execution.shares, h.filled_qty, h.status)))
+    handle.add_done_callback(lambda h: done.append(h.order_id))
+
+    ib.fill(handle.trade, 40, 180.0)
+    ib.waitOnUpdate()
+    assert fills == [(40, 40, OrderStatus.PARTIAL)]
+    assert handle.status == OrderStatus.PARTIAL and not handle.done()
+    assert handle.to_result()["filled_qty"] == 40
+
+    ib.fill(handle.trade, 60, 181.0)
+    result = handle.result(timeout=1)
+    assert [f[0] for f in fills] == [40, 60]
+    assert result["success"] and abs(result["avg_price"] - 180.6) < 1e-9
+    assert done == [1]
+
+    # 已完成的订单注册完成回调时立即调用
+    handle.add_done_callback(lambda h: done.append("late"))
+    assert done == [1, "late"]
+    print(f"✓ Fills reported as they happened: {[(f[0], f[2].value) for f in fills]}")
+
+
+def test_cancel_and_timeout():
+    """测试取消和超时."""
+    ib = ScriptedIB()
+    tracker = OrderTracker(ib)
+
+    cancelled = tracker.submit(stock("NVDA"), ib_insync.LimitOrder('BUY', 10, 1.0))
+    ib.status(cancelled.trade, 'Submitted')
+    ib.status(cancelled.trade, 'Cancelled')
+    result = cancelled.result(timeout=1)
+    assert result["status"] == OrderStatus.CANCELLED and not result["success"]
+    assert tracker.open_handles() == []
+
+    pending = tracker.submit(stock("NVDA"), ib_insync.LimitOrder('BUY', 10, 1.0))
+    result = pending.result(timeout=0.05)
+    assert result["status"] == OrderStatus.PENDING and not result["success"]
+    assert tracker.open_handles() == [pending]
+    print("✓ Cancelled and timed-out orders")
+
+
+def test_await_handle():
+    """测试在 asyncio 事件循环中 await 订单句柄."""
+    print("\n" + "=" * 60)
+    print("Testing awaitable handles")
+    print("=" * 60)
+
+    ib = ScriptedIB()
+    tracker = OrderTracker(ib)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        handles = [tracker.submit(stock("NVDA"), ib_insync.MarketOrder('BUY', 10)) for _ in range(2)]
+        for handle in handles:
+            loop.call_later(0.01, ib._fill, handle.trade, 10, 180.0)
+        results = await asyncio.wait_for(asyncio.gather(*handles), 1)
+        assert all(r["success"] for r in results)
+
+        # 已完成的句柄立即返回
+        assert (await handles[0])["filled_qty"] == 10
+
+    asyncio.run(scenario())
+    print("✓ await handle / asyncio.gather")
+
+
+def main():
+    """运行所有测试."""
+    test_submit_many_without_blocking()
+    test_partial_fills_reported()
+    test_cancel_and_timeout()
+    test_await_handle()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Test array-backed L2 order book snapshots."""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from orderbook import L2OrderBook
+
+
+def make_l2_message(coin: str = "xyz:NVDA") -> dict:
+    """构造一条 l2Book 消息（3 档）."""
+    return {
+        "channel": "l2Book",
+        "data": {
+            "coin": coin,
+            "time": 1732406400000,
+            "levels": [
+                [
+                    {"px": "180.50", "sz": "10", "n": 1},
+                    {"px": "180.49", "sz": "25", "n": 2},
+                    {"px": "180.45", "sz": "40", "n": 3},
+                ],
+                [
+                    {"px": "180.52", "sz": "5", "n": 1},
+                    {"px": "180.55", "sz": "30", "n": 2},
+                    {"px": "180.60", "sz": "100", "n": 4},
+                ],
+            ],
+        },
+    }
+
+
+def test_orderbook_snapshot():
+    """测试最优价、深度和累计数量."""
+    print("=" * 60)
+    print("Testing L2OrderBook")
+    print("=" * 60)
+
+    book = L2OrderBook.from_message(make_l2_message()["data"])
+
+    print(f"Best Bid: {book.best_bid}  Best Ask: {book.best_ask}  Mid: {book.mid}")
+    assert book.best_bid == 180.50
+    assert book.best_ask == 180.52
+    assert book.bids.best_size == 10
+    assert book.timestamp == 1732406400000
+
+    depth = book.depth(2)
+    print(f"Depth(2): {depth}")
+    assert depth["bids"] == [(180.50, 10.0), (180.49, 25.0)]
+    assert depth["asks"] == [(180.52, 5.0), (180.55, 30.0)]
+
+    # 累计数量：买盘统计 px >= price，卖盘统计 px <= price
+    assert book.bids.size_at_or_better(180.49) == 35
+    assert book.bids.size_at_or_better(180.00) == 75
+    assert book.bids.size_at_or_better(181.00) == 0
+    assert book.asks.size_at_or_better(180.55) == 35
+    assert book.asks.size_at_or_better(180.51) == 0
+    assert book.asks.total_size == 135
+    print("✓ Depth and cumulative size checks passed")
+
+
+def test_vwap():
+    """测试按数量吃深度的成交均价."""
+    book = L2OrderBook.from_message(make_l2_message()["data"])
+
+    # 顶档内成交
+    assert book.asks.vwap(5) == 180.52
+    # 跨档：5@180.52 + 15@180.55
+    expected = (5 * 180.52 + 15 * 180.55) / 20
+    assert abs(book.asks.vwap(20) - expected) < 1e-9
+    print(f"Ask VWAP(20): {book.asks.vwap(20):.4f} (expected {expected:.4f})")
+
+    # 恰好吃完两档买盘：10@180.50 + 25@180.49
+    expected = (10 * 180.50 + 25 * 180.49) / 35
+    assert abs(book.bids.vwap(35) - expected) < 1e-9
+
+    # 深度不足 / 无效数量
+    assert book.bids.vwap(76) is None
+    assert book.asks.vwap(0) is None
+    assert L2OrderBook.empty().bids.vwap(1) is None
+    print("✓ VWAP checks passed")
+
+
+def test_empty_orderbook():
+    """测试空订单簿."""
+    book = L2OrderBook.empty("xyz:NVDA")
+    assert book.best_bid is None
+    assert book.best_ask is None
+    assert book.mid is None
+    assert book.bids.size_at_or_better(180.0) == 0
+    assert book.depth(5) == {"bids": [], "asks": []}
+    print("✓ Empty orderbook checks passed")
+
+
+def main():
+    """运行所有测试."""
+    test_orderbook_snapshot()
+    test_vwap()
+    test_empty_orderbook()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Test append-only journal storage for PositionManager."""
+
+import sys
+import json
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from trader.position_manager import PositionManager, Position, PositionStatus
+from trader.position_journal import PositionJournal
+
+
+def make_position(i: int) -> Position:
+    return Position(
+        position_id=f"pos_{i}",
+        symbol="NVDA",
+        hl_symbol="xyz:NVDA",
+        quantity=100,
+        entry_time=time.time(),
+        entry_spread=0.001,
+        entry_funding_rate=0.0002,
+        ib_entry_price=180.32,
+        hl_entry_price=180.50,
+    )
+
+
+def test_journal_replay():
+    """测试追加日志写入后重放恢复仓位."""
+    print("=" * 60)
+    print("Testing PositionManager journal storage")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "positions.json"
+        manager = PositionManager(str(data_file), storage="journal")
+
+        for i in range(5):
+            manager.add_position(make_position(i))
+        manager.close_position("pos_1", ib_exit_price=180.40, hl_exit_price=180.45, exit_spread=0.0003)
+
+        # 写线程在后台落盘：等待 6 条记录（5 开仓 + 1 平仓）出现在日志中
+        journal_file = data_file.with_name("positions.json.journal")
+
+        def journal_lines():
+            return journal_file.read_text().splitlines() if journal_file.exists() else []
+
+        deadline = time.time() + 5
+        while len(journal_lines()) < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        print(f"Journal lines: {len(journal_lines())}")
+        assert len(journal_lines()) == 6
+        assert not data_file.exists()
+
+        # 模拟进程重启：不调用 close()，只靠日志重放
+        reloaded = PositionManager(str(data_file), storage="journal")
+        assert len(reloaded.positions) == 5
+        assert reloaded.get_position("pos_1").status == PositionStatus.CLOSED
+        assert reloaded.get_position("pos_1").ib_exit_price == 180.40
+        assert len(reloaded.get_open_positions()) == 4
+        manager.close()
+        reloaded.close()
+
+        # close() 会压缩：快照包含全部仓位，日志清空
+        snapshot = json.loads(data_file.read_text())
+        assert len(snapshot) == 5
+        assert data_file.with_name("positions.json.journal").read_text() == ""
+        print("✓ Replay and compaction checks passed")
+
+
+def test_auto_compaction_and_corrupt_tail():
+    """测试按记录数自动压缩，以及跳过写了一半的最后一行."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "positions.json"
+        journal = PositionJournal(str(data_file), compact_every=3)
+        journal.replay()
+        journal.start()
+
+        for i in range(3):
+            journal.append("open", make_position(i).to_dict())
+
+        # 达到 compact_every 后写线程自动生成快照
+        deadline = time.time() + 5
+        while not data_file.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(json.loads(data_file.read_text())) == 3
+
+        journal.append("open", make_position(3).to_dict())
+        journal.close()
+
+        # 模拟崩溃：追加半行
+        with open(journal.journal_file, 'a') as f:
+            f.write('{"event": "open", "posit')
+
+        state = PositionJournal(str(data_file)).replay()
+        assert sorted(state) == ["pos_0", "pos_1", "pos_2", "pos_3"]
+        print("✓ Auto compaction and corrupt tail checks passed")
+
+
+def test_writer_failure_falls_back_to_sync_write():
+    """写线程异常退出后 append 同步写入，不会阻塞在满队列上."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "positions.json"
+        journal = PositionJournal(str(data_file), max_queue=1, put_timeout=0.05)
+        journal.replay()
+        journal.start()
+
+        # 无法序列化的记录让写线程异常退出
+        journal.append("open", {"position_id": "bad", "value": object()})
+        journal._thread.join(timeout=5)
+        assert not journal.writer_alive
+        assert journal._error is not None
+
+        start = time.perf_counter()
+        for i in range(3):
+            journal.append("open", make_position(i).to_dict())
+        assert time.perf_counter() - start < 1.0
+        journal.close()
+
+        state = PositionJournal(str(data_file)).replay()
+        assert sorted(state) == ["pos_0", "pos_1", "pos_2"]
+        print("✓ Writer failure fallback checks passed")
+
+
+def test_stalled_writer_put_timeout():
+    """写线程仍在但不消费队列时，append 超时报错而不是永久阻塞."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "positions.json"
+        journal = PositionJournal(str(data_file), max_queue=1, put_timeout=0.05)
+
+        # 不启动写线程：队列满后第二条记录无处可去
+        journal.append("open", make_position(0).to_dict())
+        try:
+            journal.append("open", make_position(1).to_dict())
+        except RuntimeError as e:
+            assert "stalled" in str(e)
+        else:
+            raise AssertionError("append should time out on a stalled writer")
+
+
+def test_json_storage_unchanged():
+    """默认 JSON 存储行为不变."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "positions.json"
+        manager = PositionManager(str(data_file))
+        manager.add_position(make_position(0))
+
+        assert json.loads(data_file.read_text())["pos_0"]["status"] == "open"
+        assert not data_file.with_name("positions.json.journal").exists()
+
+
+def main():
+    """运行所有测试."""
+    test_journal_replay()
+    test_auto_compaction_and_corrupt_tail()
+    test_writer_failure_falls_back_to_sync_write()
+    test_stalled_writer_put_timeout()
+    test_json_storage_unchanged()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
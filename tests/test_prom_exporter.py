@@ -0,0 +1,75 @@
+"""Test the pull-mode Prometheus /metrics exporter."""
+
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from prom_pusher import PrometheusMetricsExporter
+
+
+def scrape(port: int) -> str:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+        return response.read().decode()
+
+
+def test_scrape_endpoint():
+    """测试更新后的指标可以从 /metrics 抓取."""
+    print("=" * 60)
+    print("Testing Prometheus pull exporter")
+    print("=" * 60)
+
+    exporter = PrometheusMetricsExporter(port=0, addr="127.0.0.1")
+    port = exporter._server.server_port
+    try:
+        # 尚未更新的指标不输出
+        assert "hyib_arb_perp_bid" not in scrape(port)
+
+        exporter.update_metrics({
+            "perp_bid": 180.45, "perp_ask": 180.50,
+            "spot_bid": -1.0, "spot_ask": 180.32,
+            "funding_rate": -0.0001,
+        })
+        body = scrape(port)
+        print(body.strip())
+        assert "hyib_arb_perp_bid 180.45" in body
+        assert "hyib_arb_spot_ask 180.32" in body
+        assert "hyib_arb_funding_rate -0.0001" in body
+        assert "hyib_arb_spot_bid" not in body      # 负价格被过滤
+        assert exporter.push_metrics() is True
+    finally:
+        exporter.close()
+
+
+def test_update_cost():
+    """更新指标只写内存，不做网络调用."""
+    exporter = PrometheusMetricsExporter(port=0, addr="127.0.0.1")
+    metrics = {"perp_bid": 180.45, "perp_ask": 180.50, "spot_bid": 180.30,
+               "spot_ask": 180.32, "funding_rate": 0.0002}
+    try:
+        n = 10000
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            exporter.update_and_push(metrics)
+        per_update_ns = (time.perf_counter_ns() - start) / n
+        print(f"update_and_push: {per_update_ns:.0f} ns/op")
+        assert per_update_ns < 100_000
+    finally:
+        exporter.close()
+
+
+def main():
+    """运行所有测试."""
+    test_scrape_endpoint()
+    test_update_cost()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
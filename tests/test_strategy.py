@@ -6,8 +6,9 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
-from trader.strategy import ArbitrageStrategy, MarketData, SignalType
+from trader.strategy import ArbitrageStrategy, MarketData, SpreadAnalysis, SignalType, CLOSE_NONE
 from trader.config import StrategyConfig
+from orderbook import BookSide, L2OrderBook
 
 
 def test_spread_calculation():
@@ -150,10 +151,231 @@ def test_with_real_data():
             print(f"📢 {signal.value.upper()}: {reason}")
 
 
+def test_executable_spread():
+    """测试按 position_size 计算的可成交价差."""
+    print("\n" + "=" * 60)
+    print("Testing Executable Spread (VWAP)")
+    print("=" * 60)
+
+    config = StrategyConfig(position_size=100, use_executable_spread=True)
+    strategy = ArbitrageStrategy(config)
+
+    # 顶档只有 20 股，100 股需要吃到第二档
+    perp_book = L2OrderBook(
+        "xyz:NVDA",
+        BookSide(True, [180.50, 180.40], [20, 200]),
+        BookSide(False, [180.51, 180.60], [20, 200]),
+    )
+    spot_book = L2OrderBook(
+        "NVDA",
+        BookSide(True, [180.30, 180.20], [50, 500]),
+        BookSide(False, [180.32, 180.35], [50, 500]),
+    )
+    market_data = MarketData(
+        perp_bid=180.50,
+        perp_ask=180.51,
+        spot_bid=180.30,
+        spot_ask=180.32,
+        funding_rate=0.0002,
+        perp_book=perp_book,
+        spot_book=spot_book,
+    )
+
+    top_of_book = ArbitrageStrategy().calculate_spread(market_data)
+    analysis = strategy.calculate_spread(market_data)
+
+    hl_vwap = (20 * 180.50 + 80 * 180.40) / 100
+    ib_vwap = (50 * 180.32 + 50 * 180.35) / 100
+    print(f"Top-of-book Spread: {top_of_book.spread*100:.4f}%")
+    print(f"Executable Spread:  {analysis.spread*100:.4f}%")
+    assert analysis.is_valid
+    assert abs(analysis.hl_sell_price - hl_vwap) < 1e-9
+    assert abs(analysis.ib_buy_price - ib_vwap) < 1e-9
+    assert analysis.spread < top_of_book.spread
+
+    close_analysis = strategy.calculate_close_spread(market_data)
+    assert abs(close_analysis.hl_sell_price - (20 * 180.51 + 80 * 180.60) / 100) < 1e-9
+    assert abs(close_analysis.ib_buy_price - (50 * 180.30 + 50 * 180.20) / 100) < 1e-9
+
+    # 深度不足时不产生有效分析
+    thin = StrategyConfig(position_size=10000, use_executable_spread=True)
+    analysis = ArbitrageStrategy(thin).calculate_spread(market_data)
+    print(f"Thin book: {analysis.reason}")
+    assert not analysis.is_valid
+
+
+def test_batch_signals():
+    """测试批量信号评估与逐行标量接口一致."""
+    import time
+    import numpy as np
+
+    print("\n" + "=" * 60)
+    print("Testing Batch Signal Evaluation")
+    print("=" * 60)
+
+    config = StrategyConfig(reverse_funding_threshold=-0.0001)
+    strategy = ArbitrageStrategy(config)
+
+    rng = np.random.default_rng(7)
+    n = 2000
+    spot_mid = 180.0 + rng.normal(0, 1, n)
+    spot_bid = spot_mid - 0.01
+    spot_ask = spot_mid + 0.01
+    perp_mid = spot_mid * (1 + rng.normal(0.0005, 0.002, n))
+    perp_bid = perp_mid - 0.01
+    perp_ask = perp_mid + 0.01
+    funding = rng.normal(0.0001, 0.0002, n)
+
+    # 缺失 / 异常 / 过期数据
+    now = time.time()
+    timestamps = np.where(rng.random(n) < 0.1, now - 100.0, now)
+    timestamps[rng.random(n) < 0.1] = np.nan
+    perp_bid[rng.random(n) < 0.05] = np.nan
+    spot_bid[rng.random(n) < 0.05] = np.nan
+    funding[rng.random(n) < 0.05] = np.nan
+    crossed = rng.random(n) < 0.05
+    spot_bid[crossed] = spot_ask[crossed] + 0.01
+
+    batch = strategy.evaluate_batch(perp_bid, perp_ask, spot_bid, spot_ask, funding, timestamps, now=now)
+
+    def none_if_nan(value):
+        return None if np.isnan(value) else float(value)
+
+    for i in range(n):
+        market_data = MarketData(
+            perp_bid=none_if_nan(perp_bid[i]),
+            perp_ask=none_if_nan(perp_ask[i]),
+            spot_bid=none_if_nan(spot_bid[i]),
+            spot_ask=none_if_nan(spot_ask[i]),
+            funding_rate=none_if_nan(funding[i]),
+            timestamp=none_if_nan(timestamps[i]),
+        )
+        analysis = strategy.calculate_spread(market_data)
+        assert analysis.is_valid == bool(batch.valid[i]), i
+
+        open_signal, open_reason = strategy.get_open_signal(analysis)
+        is_open = open_signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP
+        assert is_open == bool(batch.open_mask[i]), i
+        assert batch.open_reasons.get(i) == (open_reason if is_open else None), i
+
+        # evaluate_market：开仓分析有效时才检查平仓
+        is_close, close_reason = False, None
+        if analysis.is_valid:
+            close_analysis = strategy.calculate_close_spread(market_data)
+            if close_analysis.is_valid:
+                close_signal, close_reason = strategy.get_close_signal(close_analysis, batch.open_spread[i])
+                is_close = close_signal == SignalType.CLOSE_POSITION
+        assert is_close == bool(batch.close_mask[i]), i
+        assert batch.close_reasons.get(i) == (close_reason if is_close else None), i
+
+    print(f"✓ {n} rows match the scalar API: "
+          f"{int(batch.valid.sum())} valid, {len(batch.open_reasons)} open, {len(batch.close_reasons)} close")
+
+    # 原因只为触发的行生成
+    assert set(batch.open_reasons) == set(np.flatnonzero(batch.open_mask).tolist())
+    assert set(batch.close_reasons) == set(np.flatnonzero(batch.close_reason != CLOSE_NONE).tolist())
+
+    # 大规模 symbol 集合的耗时
+    m = 10_000
+    start = time.perf_counter()
+    strategy.evaluate_batch(
+        np.full(m, 180.50), np.full(m, 180.51), np.full(m, 180.30), np.full(m, 180.32), np.full(m, 0.0002)
+    )
+    elapsed = time.perf_counter() - start
+    print(f"✓ {m} symbols evaluated in {elapsed*1000:.2f}ms")
+
+
+def test_in_place_reuse():
+    """测试预先分配的 MarketData / SpreadAnalysis 原地更新."""
+    import time
+
+    print("\n" + "=" * 60)
+    print("Testing in-place market data and analysis reuse")
+    print("=" * 60)
+
+    strategy = ArbitrageStrategy()
+    market_data = MarketData(perp_bid=180.50, perp_ask=180.51, funding_rate=0.0002,
+                             spot_bid=180.00, spot_ask=180.02, timestamp=time.time())
+    out = SpreadAnalysis()
+
+    # 没有实例 __dict__，不能添加未声明的字段
+    assert not hasattr(market_data, "__dict__") and not hasattr(out, "__dict__")
+    try:
+        market_data.perp_mid = 180.505
+        assert False, "slotted MarketData accepted an unknown field"
+    except AttributeError:
+        pass
+
+    # 有信号：写入 out 并返回同一个对象
+    analysis = strategy.calculate_spread(market_data, out=out)
+    assert analysis is out and analysis.is_valid
+    signal, _ = strategy.get_open_signal(analysis, explain=False)
+    assert signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP and out.decision_ns > 0
+
+    # 数据失效后复用：上一次的结果被重置，与新建对象的结果相同
+    market_data.spot_ask = None
+    analysis = strategy.calculate_spread(market_data, out=out)
+    fresh = strategy.calculate_spread(market_data)
+    assert analysis is out
+    assert repr(analysis) == repr(fresh)
+    assert analysis.spread is None and analysis.decision_ns == 0 and not analysis.is_valid
+
+    # 无信号：explain=False 返回固定原因，信号判断不变
+    market_data.spot_ask = 180.45
+    strategy.calculate_spread(market_data, out=out)
+    assert strategy.get_open_signal(out, explain=False) == (SignalType.NONE, "No open signal")
+    assert strategy.get_open_signal(out)[1].startswith("Spread")
+
+    # 平仓分析复用同一个对象
+    close = strategy.calculate_close_spread(market_data, out=SpreadAnalysis())
+    assert strategy.calculate_close_spread(market_data, out=close) is close and close.is_valid
+
+    market_data.clear()
+    assert repr(market_data) == repr(MarketData())
+    print("✓ Analysis objects reused in place, stale fields reset")
+
+
+def test_decision_time_excludes_execution():
+    """测试 evaluate_market 记录的决策时间在下单之前（tick-to-decision 不含下单耗时）."""
+    import time
+    from main_trading import TickBuffers, evaluate_market
+
+    class SlowExecutor:
+        def open_arbitrage_position(self, quantity, analysis):
+            self.started_ns = time.perf_counter_ns()
+            time.sleep(0.05)
+
+    class NoPositions:
+        def get_open_positions(self):
+            return []
+
+    buffers, executor = TickBuffers(), SlowExecutor()
+    market_data = MarketData(perp_bid=180.50, perp_ask=180.51, funding_rate=0.0002,
+                             spot_bid=180.00, spot_ask=180.02, timestamp=time.time())
+    signal = evaluate_market(market_data, ArbitrageStrategy(), StrategyConfig(), executor, NoPositions(),
+                             True, verbose=False, buffers=buffers)
+
+    assert signal == SignalType.OPEN_LONG_SPOT_SHORT_PERP
+    assert buffers.decision_ns == buffers.open_analysis.decision_ns
+    assert 0 < buffers.decision_ns <= executor.started_ns
+
+    # 无信号时为评估结束时间
+    market_data.spot_ask = 180.45
+    start = time.perf_counter_ns()
+    evaluate_market(market_data, ArbitrageStrategy(), StrategyConfig(), executor, NoPositions(),
+                    True, verbose=False, buffers=buffers)
+    assert buffers.decision_ns >= start
+    print("✓ Decision time taken before order execution")
+
+
 def main():
     """运行所有测试."""
     test_spread_calculation()
     test_with_real_data()
+    test_executable_spread()
+    test_batch_signals()
+    test_in_place_reuse()
+    test_decision_time_excludes_execution()
 
     print("\n" + "=" * 60)
     print("✓ All tests completed!")
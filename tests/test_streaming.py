@@ -37,7 +37,7 @@ def main():
         while True:
             iteration += 1
 
-            # 直接读取（无需等待，ticker 已经是最新的）
+            # 直接读取快照（无需等待，由 ticker.updateEvent 回调更新）
             price_data = fetcher.get_stock_price()
 
             timestamp = time.strftime("%H:%M:%S")
@@ -46,8 +46,8 @@ def main():
                   f"Ask: ${price_data.get('ask', 'N/A'):>7} | "
                   f"Last: ${price_data.get('last', 'N/A'):>7}")
 
-            # 等待 1 秒（可以更频繁，因为是订阅模式）
-            time.sleep(1)
+            # 等待 1 秒，期间运行 ib_insync 事件循环接收行情
+            fetcher.pump_events(1)
 
     except KeyboardInterrupt:
         print("\n\n停止测试...")
@@ -0,0 +1,89 @@
+"""Test the parallel StrategyConfig parameter sweep."""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from backtest import Backtester, grid_configs, random_configs, run_sweep, format_sweep_table
+from backtest.sweep import _share_spreads, _attach_spreads
+from backtest.engine import compute_spreads
+from test_backtest import make_ticks
+
+
+# 干净的报价（无缺失 / 交叉），资金费率固定
+CLEAN_TICKS = dict(seed=3, max_spot_age=4, funding_swing=0.0, dirty=False)
+
+
+def test_parallel_matches_backtester():
+    """测试多进程扫描结果与单独回测一致，并按盈亏排序."""
+    print("=" * 60)
+    print("Testing parameter sweep")
+    print("=" * 60)
+
+    ticks = make_ticks(20000, **CLEAN_TICKS)
+    configs = grid_configs({
+        "open_spread_threshold": [0.0008, 0.001, 0.0015],
+        "close_spread_threshold": [0.0, 0.0005],
+        "max_data_age": [1.0, 5.0],
+    })
+    assert len(configs) == 12
+
+    results = run_sweep(ticks, configs, workers=2, chunk_size=4)
+    print(format_sweep_table(results, top=5))
+
+    pnls = [r.stats["total_pnl"] for r in results]
+    assert pnls == sorted(pnls, reverse=True)
+
+    best = results[0]
+    config = next(c for c in configs if all(getattr(c, k) == v for k, v in best.params.items()))
+    expected = Backtester(config).run(ticks).stats
+    assert abs(best.stats["total_pnl"] - expected["total_pnl"]) < 1e-6
+    assert best.stats["num_trades"] == expected["num_trades"]
+
+
+def test_shared_arrays_are_views():
+    """工作进程映射的数组与原数组相同，且是只读映射而不是副本."""
+    spreads = compute_spreads(make_ticks(1000, **CLEAN_TICKS))
+    path, rows, layout = _share_spreads(spreads)
+    try:
+        shared = _attach_spreads(path, rows, layout)
+        assert isinstance(shared.open_spread, np.memmap)
+        assert not shared.open_spread.flags.writeable
+        assert np.array_equal(shared.quotes_valid, spreads.quotes_valid)
+        assert np.array_equal(shared.age, spreads.age)
+    finally:
+        Path(path).unlink()
+
+
+def test_random_configs():
+    """随机搜索在给定范围内采样."""
+    configs = random_configs({"open_spread_threshold": (0.001, 0.002)}, samples=50, seed=1)
+    values = [c.open_spread_threshold for c in configs]
+    assert len(configs) == 50
+    assert min(values) >= 0.001 and max(values) <= 0.002
+
+    try:
+        grid_configs({"position_size": [100]})
+        assert False, "unknown parameter should be rejected"
+    except ValueError:
+        pass
+
+
+def main():
+    """运行所有测试."""
+    test_parallel_matches_backtester()
+    test_shared_arrays_are_views()
+    test_random_configs()
+
+    print("\n" + "=" * 60)
+    print("✓ All tests completed!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()